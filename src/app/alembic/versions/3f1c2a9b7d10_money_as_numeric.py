@@ -0,0 +1,71 @@
+"""store money as NUMERIC(38, 18)
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9b7d10"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+MONEY_COLUMNS = (
+    ("transactions", "amount"),
+    ("recurring_transactions", "amount"),
+    ("wallets", "balance"),
+)
+# Round each row to its currency's minor unit, see CURRENCY_SCALE.
+SCALE = "CASE currency::text WHEN 'BTC' THEN 8 WHEN 'ETH' THEN 18 ELSE 2 END"
+
+
+def _copy_in_batches(table: str, source: str, target: str, expression: str) -> None:
+    # Every batch commits on its own, so row locks are held for one batch only.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            result = bind.execute(
+                sa.text(
+                    f"UPDATE {table} SET {target} = {expression} "
+                    f"WHERE id IN (SELECT id FROM {table} "
+                    f"WHERE {target} IS NULL AND {source} IS NOT NULL "
+                    f"LIMIT :batch_size)"
+                ),
+                {"batch_size": BATCH_SIZE},
+            )
+            if result.rowcount == 0:
+                break
+
+
+def upgrade() -> None:
+    for table, column in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(f"{column}_numeric", sa.Numeric(38, 18)))
+        _copy_in_batches(
+            table,
+            column,
+            f"{column}_numeric",
+            f"ROUND({column}::numeric, {SCALE})",
+        )
+        op.drop_column(table, column)
+        op.alter_column(table, f"{column}_numeric", new_column_name=column)
+    op.alter_column("recurring_transactions", "amount", nullable=False)
+    op.alter_column("wallets", "balance", server_default="0")
+
+
+def downgrade() -> None:
+    for table, column in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(f"{column}_float", sa.Float()))
+        _copy_in_batches(
+            table, column, f"{column}_float", f"{column}::double precision"
+        )
+        op.drop_column(table, column)
+        op.alter_column(table, f"{column}_float", new_column_name=column)
+    op.alter_column("recurring_transactions", "amount", nullable=False)
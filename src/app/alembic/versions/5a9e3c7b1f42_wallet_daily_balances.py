@@ -0,0 +1,42 @@
+"""add wallet_daily_balances
+
+Revision ID: 5a9e3c7b1f42
+Revises: c4e7a1d9b250
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a9e3c7b1f42"
+down_revision: Union[str, None] = "c4e7a1d9b250"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The (wallet_id, day) primary key is the index range queries are served from.
+    op.create_table(
+        "wallet_daily_balances",
+        sa.Column(
+            "wallet_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("wallets.id"),
+            primary_key=True,
+        ),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("opening", sa.Numeric(38, 18), nullable=False),
+        sa.Column("closing", sa.Numeric(38, 18), nullable=False),
+        sa.Column("inflow", sa.Numeric(38, 18), nullable=False),
+        sa.Column("outflow", sa.Numeric(38, 18), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("wallet_daily_balances")
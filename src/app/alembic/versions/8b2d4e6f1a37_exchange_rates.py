@@ -0,0 +1,36 @@
+"""add exchange_rates
+
+Revision ID: 8b2d4e6f1a37
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2d4e6f1a37"
+down_revision: Union[str, None] = "3f1c2a9b7d10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "exchange_rates",
+        sa.Column(
+            "currency",
+            postgresql.ENUM(name="currency", create_type=False),
+            primary_key=True,
+        ),
+        sa.Column("rate", sa.Numeric(38, 18), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("exchange_rates")
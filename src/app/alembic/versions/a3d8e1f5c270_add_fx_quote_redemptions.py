@@ -0,0 +1,30 @@
+"""add fx_quote_redemptions
+
+Revision ID: a3d8e1f5c270
+Revises: f4b9d1c7e362
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d8e1f5c270"
+down_revision: Union[str, None] = "f4b9d1c7e362"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fx_quote_redemptions",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fx_quote_redemptions")
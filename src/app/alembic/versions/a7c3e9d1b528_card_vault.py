@@ -0,0 +1,123 @@
+"""encrypt card numbers and cvvs, look cards up by digest
+
+Revision ID: a7c3e9d1b528
+Revises: f6a2c8e4b913
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+import base64
+import hashlib
+import hmac
+import os
+from typing import Sequence, Union
+
+from alembic import op
+from cryptography.fernet import Fernet
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e9d1b528"
+down_revision: Union[str, None] = "f6a2c8e4b913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+cards = sa.table(
+    "cards",
+    sa.column("id"),
+    sa.column("number", sa.String),
+    sa.column("cvv", sa.String),
+    sa.column("number_digest", sa.String),
+    sa.column("number_encrypted", sa.String),
+    sa.column("last4", sa.String),
+    sa.column("cvv_encrypted", sa.String),
+)
+
+
+class _Vault:
+    # The card vault as of this revision, so later changes to the application's
+    # vault cannot change what the migration writes or reads back.
+
+    def __init__(self, secret: str):
+        seed = secret.encode()
+        self.fernet = Fernet(
+            base64.urlsafe_b64encode(hashlib.sha256(b"encrypt:" + seed).digest())
+        )
+        self.hmac_key = hashlib.sha256(b"hmac:" + seed).digest()
+
+    def digest(self, number: str) -> str:
+        return hmac.new(self.hmac_key, number.encode(), hashlib.sha256).hexdigest()
+
+    def encrypt(self, value: str) -> str:
+        return self.fernet.encrypt(value.encode()).decode()
+
+    def decrypt(self, token: str) -> str:
+        return self.fernet.decrypt(token.encode()).decode()
+
+
+def _batches(connection, *columns):
+    last_id = None
+    while True:
+        query = sa.select(cards.c.id, *columns).order_by(cards.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(cards.c.id > last_id)
+        rows = connection.execute(query).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    op.add_column("cards", sa.Column("number_digest", sa.String(64), nullable=True))
+    op.add_column("cards", sa.Column("number_encrypted", sa.String(), nullable=True))
+    op.add_column("cards", sa.Column("last4", sa.String(4), nullable=True))
+    op.add_column("cards", sa.Column("cvv_encrypted", sa.String(), nullable=True))
+
+    vault = _Vault(os.environ["CARD_VAULT_SECRET"])
+    connection = op.get_bind()
+    for rows in _batches(connection, cards.c.number, cards.c.cvv):
+        for card_id, number, cvv in rows:
+            connection.execute(
+                cards.update()
+                .where(cards.c.id == card_id)
+                .values(
+                    number_digest=vault.digest(number) if number else None,
+                    number_encrypted=vault.encrypt(number) if number else None,
+                    last4=number[-4:] if number else None,
+                    cvv_encrypted=vault.encrypt(cvv) if cvv else None,
+                )
+            )
+
+    op.create_index("ix_cards_number_digest", "cards", ["number_digest"], unique=True)
+    op.drop_column("cards", "number")
+    op.drop_column("cards", "cvv")
+
+
+def downgrade() -> None:
+    op.add_column("cards", sa.Column("number", sa.String(), nullable=True))
+    op.add_column("cards", sa.Column("cvv", sa.String(), nullable=True))
+
+    vault = _Vault(os.environ["CARD_VAULT_SECRET"])
+    connection = op.get_bind()
+    for rows in _batches(connection, cards.c.number_encrypted, cards.c.cvv_encrypted):
+        for card_id, number_encrypted, cvv_encrypted in rows:
+            connection.execute(
+                cards.update()
+                .where(cards.c.id == card_id)
+                .values(
+                    number=vault.decrypt(number_encrypted)
+                    if number_encrypted
+                    else None,
+                    cvv=vault.decrypt(cvv_encrypted) if cvv_encrypted else None,
+                )
+            )
+
+    op.create_unique_constraint("cards_number_key", "cards", ["number"])
+    op.drop_index("ix_cards_number_digest", table_name="cards")
+    op.drop_column("cards", "number_digest")
+    op.drop_column("cards", "number_encrypted")
+    op.drop_column("cards", "last4")
+    op.drop_column("cards", "cvv_encrypted")
@@ -0,0 +1,39 @@
+"""add ix_transactions_status_timestamp
+
+Revision ID: b9d4f2a6c731
+Revises: a7c3e9d1b528
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b9d4f2a6c731"
+down_revision: Union[str, None] = "a7c3e9d1b528"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves the expiry sweep, which picks the oldest rows of an open status.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_transactions_status_timestamp",
+            "transactions",
+            ["status", "timestamp"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_transactions_status_timestamp",
+            table_name="transactions",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,61 @@
+"""add archived_transaction_counts
+
+Revision ID: b9e4f2a6d831
+Revises: a3d8e1f5c270
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b9e4f2a6d831"
+down_revision: Union[str, None] = "a3d8e1f5c270"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_transaction_counts",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column(
+            "sender_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "recipient_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            primary_key=True,
+        ),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_archived_transaction_counts_sender_id",
+        "archived_transaction_counts",
+        ["sender_id"],
+    )
+    op.create_index(
+        "ix_archived_transaction_counts_recipient_id",
+        "archived_transaction_counts",
+        ["recipient_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_archived_transaction_counts_recipient_id",
+        table_name="archived_transaction_counts",
+    )
+    op.drop_index(
+        "ix_archived_transaction_counts_sender_id",
+        table_name="archived_transaction_counts",
+    )
+    op.drop_table("archived_transaction_counts")
@@ -0,0 +1,42 @@
+"""add cross-currency columns to transactions
+
+Revision ID: c4e7a1d9b250
+Revises: 8b2d4e6f1a37
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e7a1d9b250"
+down_revision: Union[str, None] = "8b2d4e6f1a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transactions",
+        sa.Column(
+            "target_currency",
+            postgresql.ENUM(name="currency", create_type=False),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "transactions", sa.Column("target_amount", sa.Numeric(38, 18), nullable=True)
+    )
+    op.add_column(
+        "transactions", sa.Column("exchange_rate", sa.Numeric(38, 18), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("transactions", "exchange_rate")
+    op.drop_column("transactions", "target_amount")
+    op.drop_column("transactions", "target_currency")
@@ -0,0 +1,43 @@
+"""add outbox_events
+
+Revision ID: c5e8a2f4d917
+Revises: b9d4f2a6c731
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e8a2f4d917"
+down_revision: Union[str, None] = "b9d4f2a6c731"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Only the unpublished tail is scanned by the relay.
+    op.create_index(
+        "ix_outbox_events_unpublished",
+        "outbox_events",
+        ["id"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_unpublished", table_name="outbox_events")
+    op.drop_table("outbox_events")
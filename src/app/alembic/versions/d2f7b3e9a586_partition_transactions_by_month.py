@@ -0,0 +1,186 @@
+"""partition transactions by month
+
+Revision ID: d2f7b3e9a586
+Revises: c5e8a2f4d917
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+from app.services.common.partitions import (
+    add_months,
+    create_partition_sql,
+    month_start,
+    partition_bounds,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2f7b3e9a586"
+down_revision: Union[str, None] = "c5e8a2f4d917"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+MONTHS_AHEAD = 3
+
+# The rows of transactions are mirrored into the new table while it is backfilled,
+# so the old table keeps serving reads and writes until the final swap.
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION transactions_partitioned_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM transactions_partitioned WHERE id = OLD.id;
+        RETURN OLD;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM transactions_partitioned WHERE id = OLD.id;
+    END IF;
+    INSERT INTO transactions_partitioned SELECT (NEW).*
+        ON CONFLICT (id, timestamp) DO NOTHING;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    # The partition key is part of the primary key, so it cannot be null.
+    op.execute("UPDATE transactions SET timestamp = 'epoch' WHERE timestamp IS NULL")
+    op.execute(
+        "CREATE TABLE transactions_partitioned "
+        "(LIKE transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (timestamp)"
+    )
+    op.execute(
+        "ALTER TABLE transactions_partitioned ALTER COLUMN timestamp SET NOT NULL"
+    )
+    op.execute(
+        "ALTER TABLE transactions_partitioned "
+        "ADD CONSTRAINT transactions_partitioned_pkey PRIMARY KEY (id, timestamp)"
+    )
+    for column, target in (
+        ("card_id", "cards"),
+        ("sender_id", "users"),
+        ("recipient_id", "users"),
+        ("category_id", "categories"),
+        ("wallet_id", "wallets"),
+    ):
+        op.execute(
+            f"ALTER TABLE transactions_partitioned ADD FOREIGN KEY ({column}) "
+            f"REFERENCES {target} (id)"
+        )
+
+    first = connection.execute(sa.text("SELECT min(timestamp) FROM transactions"))
+    now = datetime.now(pytz.utc)
+    oldest = first.scalar() or now
+    for name, start, end in partition_bounds(
+        oldest, add_months(month_start(now), MONTHS_AHEAD)
+    ):
+        op.execute(create_partition_sql(name, start, end, "transactions_partitioned"))
+    op.execute(
+        "CREATE TABLE transactions_default "
+        "PARTITION OF transactions_partitioned DEFAULT"
+    )
+    op.execute(
+        "CREATE INDEX ix_transactions_partitioned_id ON transactions_partitioned (id)"
+    )
+    op.execute(
+        "CREATE INDEX ix_transactions_partitioned_status_timestamp "
+        "ON transactions_partitioned (status, timestamp)"
+    )
+    op.execute(SYNC_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER transactions_partitioned_sync "
+        "AFTER INSERT OR UPDATE OR DELETE ON transactions "
+        "FOR EACH ROW EXECUTE FUNCTION transactions_partitioned_sync()"
+    )
+
+    # Backfill in short transactions of their own, walking the old table by ID.
+    with op.get_context().autocommit_block():
+        last_id = None
+        while True:
+            after = "" if last_id is None else "WHERE id > :last_id "
+            params = {"batch_size": BATCH_SIZE}
+            if last_id is not None:
+                params["last_id"] = last_id
+            batch = (
+                connection.execute(
+                    sa.text(
+                        f"SELECT id FROM transactions {after}"
+                        "ORDER BY id LIMIT :batch_size"
+                    ),
+                    params,
+                )
+                .scalars()
+                .all()
+            )
+            if not batch:
+                break
+            connection.execute(
+                sa.text(
+                    "INSERT INTO transactions_partitioned "
+                    "SELECT * FROM transactions WHERE id = ANY(:ids) "
+                    "ON CONFLICT (id, timestamp) DO NOTHING"
+                ),
+                {"ids": batch},
+            )
+            last_id = batch[-1]
+
+    # The swap is the only step that blocks writers, and it copies nothing.
+    op.execute("LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER transactions_partitioned_sync ON transactions")
+    op.execute("DROP FUNCTION transactions_partitioned_sync()")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute(
+        "ALTER INDEX ix_transactions_id RENAME TO ix_transactions_unpartitioned_id"
+    )
+    op.execute(
+        "ALTER INDEX ix_transactions_status_timestamp "
+        "RENAME TO ix_transactions_unpartitioned_status_timestamp"
+    )
+    op.execute("ALTER TABLE transactions_partitioned RENAME TO transactions")
+    op.execute(
+        "ALTER INDEX ix_transactions_partitioned_id RENAME TO ix_transactions_id"
+    )
+    op.execute(
+        "ALTER INDEX ix_transactions_partitioned_status_timestamp "
+        "RENAME TO ix_transactions_status_timestamp"
+    )
+    op.execute("DROP TABLE transactions_unpartitioned")
+    op.execute(
+        "ALTER TABLE transactions "
+        "RENAME CONSTRAINT transactions_partitioned_pkey TO transactions_pkey"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE TABLE transactions_unpartitioned "
+        "(LIKE transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    op.execute("INSERT INTO transactions_unpartitioned SELECT * FROM transactions")
+    op.execute("DROP TABLE transactions CASCADE")
+    op.execute("ALTER TABLE transactions_unpartitioned RENAME TO transactions")
+    op.execute("ALTER TABLE transactions ADD PRIMARY KEY (id)")
+    for column, target in (
+        ("card_id", "cards"),
+        ("sender_id", "users"),
+        ("recipient_id", "users"),
+        ("category_id", "categories"),
+        ("wallet_id", "wallets"),
+    ):
+        op.execute(
+            f"ALTER TABLE transactions ADD FOREIGN KEY ({column}) "
+            f"REFERENCES {target} (id)"
+        )
+    op.create_index("ix_transactions_id", "transactions", ["id"], unique=True)
+    op.create_index(
+        "ix_transactions_status_timestamp", "transactions", ["status", "timestamp"]
+    )
@@ -0,0 +1,72 @@
+"""add deposits and reconciliation_runs
+
+Revision ID: d81f0b6c2e95
+Revises: 5a9e3c7b1f42
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d81f0b6c2e95"
+down_revision: Union[str, None] = "5a9e3c7b1f42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "deposits",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "wallet_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("wallets.id"),
+            nullable=False,
+        ),
+        sa.Column("amount", sa.Numeric(38, 18), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_deposits_wallet_id", "deposits", ["wallet_id"])
+    op.create_table(
+        "reconciliation_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("incremental", sa.Boolean(), nullable=False),
+        sa.Column("wallets", sa.Integer(), nullable=False),
+        sa.Column("drifted", sa.Integer(), nullable=False),
+    )
+
+    # Deposits were not recorded before, so open the ledger of every wallet with
+    # the funding its current balance implies. Later drift is then real drift.
+    op.execute(
+        """
+        INSERT INTO deposits (id, wallet_id, amount, timestamp)
+        SELECT gen_random_uuid(), w.id,
+               COALESCE(w.balance, 0)
+               - COALESCE((SELECT SUM(COALESCE(t.target_amount, t.amount))
+                             FROM transactions t
+                            WHERE t.status = 'confirmed'
+                              AND t.recipient_id = w.user_id
+                              AND COALESCE(t.target_currency, t.currency) = w.currency), 0)
+               + COALESCE((SELECT SUM(t.amount)
+                             FROM transactions t
+                            WHERE t.status = 'confirmed'
+                              AND t.sender_id = w.user_id
+                              AND t.currency = w.currency), 0),
+               now()
+          FROM wallets w
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reconciliation_runs")
+    op.drop_index("ix_deposits_wallet_id", table_name="deposits")
+    op.drop_table("deposits")
@@ -0,0 +1,26 @@
+"""add ix_contacts_user_id_id
+
+Revision ID: e3b5d7f9a104
+Revises: d81f0b6c2e95
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3b5d7f9a104"
+down_revision: Union[str, None] = "d81f0b6c2e95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves the per-user keyset pagination of the contact list.
+    op.create_index("ix_contacts_user_id_id", "contacts", ["user_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_id_id", table_name="contacts")
@@ -0,0 +1,42 @@
+"""add archived_transaction_totals
+
+Revision ID: e8c4a6f2b190
+Revises: d2f7b3e9a586
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8c4a6f2b190"
+down_revision: Union[str, None] = "d2f7b3e9a586"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_transaction_totals",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "currency",
+            postgresql.ENUM(name="currency", create_type=False),
+            primary_key=True,
+        ),
+        sa.Column("sent", sa.Numeric(38, 18), nullable=False, server_default="0"),
+        sa.Column("received", sa.Numeric(38, 18), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("archived_transaction_totals")
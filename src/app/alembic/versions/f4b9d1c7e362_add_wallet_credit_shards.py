@@ -0,0 +1,48 @@
+"""add wallet_credit_shards
+
+Revision ID: f4b9d1c7e362
+Revises: e8c4a6f2b190
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f4b9d1c7e362"
+down_revision: Union[str, None] = "e8c4a6f2b190"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "wallets",
+        sa.Column("credit_shards", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "wallet_credit_shards",
+        sa.Column(
+            "wallet_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("wallets.id"),
+            primary_key=True,
+        ),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("amount", sa.Numeric(38, 18), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    # Fold the pending credits so no money is lost with the table.
+    op.execute(
+        "UPDATE wallets SET balance = wallets.balance + pending.amount "
+        "FROM (SELECT wallet_id, sum(amount) AS amount FROM wallet_credit_shards "
+        "GROUP BY wallet_id) AS pending WHERE wallets.id = pending.wallet_id"
+    )
+    op.drop_table("wallet_credit_shards")
+    op.drop_column("wallets", "credit_shards")
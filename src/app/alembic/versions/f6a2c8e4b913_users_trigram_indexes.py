@@ -0,0 +1,37 @@
+"""add trigram indexes on users
+
+Revision ID: f6a2c8e4b913
+Revises: e3b5d7f9a104
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f6a2c8e4b913"
+down_revision: Union[str, None] = "e3b5d7f9a104"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Built concurrently so admin searches keep working while the indexes build.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_trgm "
+            "ON users USING gin (email gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_phone_number_trgm "
+            "ON users USING gin (phone_number gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_phone_number_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_trgm")
@@ -8,6 +8,8 @@ from app.api.api_v1.endpoints import (
     card,
     category,
     contact,
+    fx,
+    metrics,
     recurring_transaction,
     transaction,
     user,
@@ -64,3 +66,15 @@ api_router.include_router(
     prefix="",
     tags=["Wallets"],
 )
+
+api_router.include_router(
+    metrics.router,
+    prefix="",
+    tags=["Metrics"],
+)
+
+api_router.include_router(
+    fx.router,
+    prefix="",
+    tags=["Exchange Rates"],
+)
@@ -1,9 +1,10 @@
+from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.card import CardCreate
+from app.schemas.card import CardCreate, CardReveal, CardView
 from app.schemas.user import User
 from app.services.common.utils import get_current_user, process_request
 from app.services.crud.card import (
@@ -11,6 +12,7 @@ from app.services.crud.card import (
     delete_card,
     read_all_cards,
     read_card,
+    reveal_card,
     update_card,
 )
 from app.sql_app.database import get_db
@@ -19,7 +21,7 @@ from app.sql_app.models.models import Card
 router = APIRouter()
 
 
-@router.post("/cards")
+@router.post("/cards", response_model=CardView)
 async def create(
     card: CardCreate,
     db: AsyncSession = Depends(get_db),
@@ -41,7 +43,7 @@ async def create(
     return await process_request(_create_card)
 
 
-@router.get("/cards/{card_id}")
+@router.get("/cards/{card_id}", response_model=CardView)
 async def read(
     card_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -63,7 +65,29 @@ async def read(
     return await process_request(_read_card)
 
 
-@router.get("/cards")
+@router.post("/cards/{card_id}/reveal", response_model=CardReveal)
+async def reveal(
+    card_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Reveal the full number and CVV of a card of the user.
+        Parameters:
+            card_id (UUID): The ID of the card to reveal.
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            CardReveal: The decrypted number and CVV.
+    """
+
+    async def _reveal_card():
+        return await reveal_card(db, card_id, current_user.id)
+
+    return await process_request(_reveal_card)
+
+
+@router.get("/cards", response_model=List[CardView])
 async def read_all(
     db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)
 ):
@@ -82,7 +106,7 @@ async def read_all(
     return await process_request(_read_all_cards)
 
 
-@router.put("/cards/{card_id}")
+@router.put("/cards/{card_id}", response_model=CardView)
 async def update(
     card_id: UUID,
     card: CardCreate,
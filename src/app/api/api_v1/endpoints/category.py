@@ -3,7 +3,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.category import CategoryCreate
 from app.services.common.utils import get_current_user, process_request
-from app.services.crud.category import create_category, delete_category, read_categories
+from app.services.crud.category import (
+    create_category,
+    delete_category,
+    read_categories,
+    summarize_categories,
+)
 from app.sql_app.database import get_db
 from app.sql_app.models.models import Category, User
 
@@ -52,6 +57,25 @@ async def view_categories(
     return await process_request(_read_categories)
 
 
+@router.get("/categories/summary")
+async def view_category_summary(
+    db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)
+):
+    """
+    View the transaction count, totals and last use of each category of the user.
+        Parameters:
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            dict: The summary of each category.
+    """
+
+    async def _summarize_categories() -> dict:
+        return await summarize_categories(db, current_user.id)
+
+    return await process_request(_summarize_categories)
+
+
 @router.delete("/categories")
 async def delete(
     category_name: str,
@@ -47,6 +47,7 @@ async def view_contacts(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
     search: str = None,
+    after: UUID = None,
 ):
     """
     View the contact list of the user.
@@ -56,12 +57,13 @@ async def view_contacts(
             current_user (User): The current user.
             db (AsyncSession): The database session.
             search (str): The search term to filter the contacts.
+            after (UUID): The ID of the last contact of the previous page.
         Returns:
             List[Contact]: The list of contacts.
     """
 
     async def _read_contacts():
-        return await read_contacts(current_user, skip, limit, db, search)
+        return await read_contacts(current_user, skip, limit, db, search, after)
 
     return await process_request(_read_contacts)
 
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.user import User
+from app.services.common.fx import lock_exchange_quote
+from app.services.common.money import parse_amount
+from app.services.common.utils import get_current_user, process_request
+from app.sql_app.database import get_db
+from app.sql_app.models.enums import Currency
+
+router = APIRouter()
+
+
+@router.post("/fx/quotes")
+async def create_quote(
+    source: Currency,
+    target: Currency,
+    amount: Decimal,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Lock an exchange quote for a cross-currency transfer.
+    Pass the quote token with the transaction of the same amount before the quote
+    expires; a quote can be used once.
+        Parameters:
+            source (Currency): The currency of the sender's wallet.
+            target (Currency): The currency of the recipient's wallet.
+            amount (Decimal): The amount to transfer, in the source currency.
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            Quote: The locked quote with its rate and expiry.
+    """
+
+    async def _create_quote():
+        return await lock_exchange_quote(
+            db, current_user.id, source, target, parse_amount(amount, source)
+        )
+
+    return await process_request(_create_quote)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.schemas.user import User
+from app.services.common import metrics
+from app.services.common.utils import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def export_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Export the in-process metrics of this worker in the Prometheus text format,
+    to admins only.
+        Parameters:
+            current_user (User): The current user.
+        Returns:
+            str: The metrics document.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can read metrics.",
+        )
+    return metrics.render()
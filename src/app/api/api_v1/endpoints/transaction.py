@@ -1,12 +1,14 @@
-from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.transaction import Transaction, TransactionCreate, TransactionFilter
 from app.schemas.user import User
+from app.services.common.events import stream_events
 from app.services.common.utils import get_current_user, process_request
+from app.services.crud.analytics import spending_analytics
 from app.services.crud.transaction import (
     approve_transaction,
     confirm_transaction,
@@ -16,6 +18,7 @@ from app.services.crud.transaction import (
     reject_transaction,
 )
 from app.sql_app.database import get_db
+from app.sql_app.models.enums import Currency
 
 router = APIRouter()
 
@@ -38,15 +41,61 @@ async def view_transactions(
             db (AsyncSession): The database session.
             current_user (User): The current user.
         Returns:
-            List[Transaction]: The list of transactions.
+            TransactionList: The page of transactions and their total.
     """
 
-    async def _get_transactions() -> List[Transaction]:
-        return await get_transactions(db, current_user, filter, skip, limit)
+    async def _get_transactions() -> Response:
+        transactions = await get_transactions(db, current_user, filter, skip, limit)
+        # Pydantic encodes the whole page in one pass, instead of jsonable_encoder
+        # walking every field of every row.
+        return Response(transactions.model_dump_json(), media_type="application/json")
 
     return await process_request(_get_transactions)
 
 
+@router.get("/transactions/stream")
+async def stream_transactions(
+    request: Request, current_user: User = Depends(get_current_user)
+):
+    """
+    Stream the status changes of the user's incoming and outgoing transactions as
+    server-sent events, instead of polling the transaction list.
+        Parameters:
+            request (Request): The request, watched for the client going away.
+            current_user (User): The current user.
+        Returns:
+            StreamingResponse: The text/event-stream of transaction events.
+    """
+    return StreamingResponse(
+        stream_events(current_user.id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/transactions/analytics")
+async def view_spending_analytics(
+    base: Currency = Currency.EUR,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    View the user's monthly spending per category, its rolling average, the top
+    recipients and the averages, instead of downloading the whole history.
+        Parameters:
+            base (Currency): The currency to report in.
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            dict: The spending analytics in the base currency.
+    """
+
+    async def _spending_analytics() -> dict:
+        return await spending_analytics(db, current_user.id, base)
+
+    return await process_request(_spending_analytics)
+
+
 @router.post("/transactions")
 async def create_transaction_endpoint(
     transaction: TransactionCreate,
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import AddPhoneRequest, User, UserBase, VerifyPhoneRequest
 from app.services.common.phone import add_phone, verify_phone
 from app.services.common.utils import get_current_user, process_request
+from app.services.crud.dashboard import user_dashboard
 from app.services.crud.user import (
     block_user,
     deactivate_user,
@@ -37,6 +38,45 @@ async def get_user_info(
     return user_details
 
 
+@router.get("/users/dashboard")
+async def get_user_dashboard(
+    fields: str = None,
+    limit: int = None,
+    wallets_cursor: str = None,
+    cards_cursor: str = None,
+    categories_cursor: str = None,
+    contacts_cursor: str = None,
+    transactions_cursor: str = None,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Get a page of the user's wallets, cards, categories, contacts and transactions.
+        Parameters:
+            fields (str): Comma-separated sections to include, e.g. "cards,transactions".
+            limit (int): The maximum number of items per section.
+            wallets_cursor (str): The next_cursor of the wallets section.
+            cards_cursor (str): The next_cursor of the cards section.
+            categories_cursor (str): The next_cursor of the categories section.
+            contacts_cursor (str): The next_cursor of the contacts section.
+            transactions_cursor (str): The next_cursor of the transactions section.
+            current_user (User): The current user.
+        Returns:
+            dict: The user's email and the requested sections with their cursors.
+    """
+
+    async def _get_user_dashboard():
+        cursors = {
+            "wallets": wallets_cursor,
+            "cards": cards_cursor,
+            "categories": categories_cursor,
+            "contacts": contacts_cursor,
+            "transactions": transactions_cursor,
+        }
+        return await user_dashboard(current_user, fields, limit, cursors)
+
+    return await process_request(_get_user_dashboard)
+
+
 @router.get("/users/{email}")
 async def get_user(email: str, db: AsyncSession = Depends(get_db)):
     """
@@ -193,6 +233,7 @@ async def search_all_users(
     search: str = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: str = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -202,6 +243,7 @@ async def search_all_users(
             search (str): The search query.
             skip (int): The number of users to skip.
             limit (int): The number of users to return.
+            cursor (str): The next_cursor returned with the previous page.
             db (AsyncSession): The database session.
             current_user (User): The current user.
         Returns:
@@ -209,6 +251,6 @@ async def search_all_users(
     """
 
     async def _search_users():
-        return await search_users(db, skip, limit, current_user, search)
+        return await search_users(db, skip, limit, current_user, search, cursor)
 
     return await process_request(_search_users)
@@ -1,16 +1,23 @@
+from datetime import date
+from uuid import UUID
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.user import User
 from app.schemas.wallet import WalletBase, WalletCreate
 from app.services.common.utils import get_current_user, process_request
+from app.services.crud.balance_history import get_balance_history
 from app.services.crud.wallet import (
     add_funds_to_wallet,
     check_balance,
     create_wallet,
+    portfolio_valuation,
+    set_credit_shards,
     withdraw_funds_from_wallet,
 )
 from app.sql_app.database import get_db
+from app.sql_app.models.enums import Currency
 
 router = APIRouter()
 
@@ -102,3 +109,75 @@ async def get_balance(
         return await check_balance(db, current_user)
 
     return await process_request(_get_balance)
+
+
+@router.get("/wallets/portfolio")
+async def get_portfolio(
+    base: Currency = Currency.EUR,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Value all of the user's wallets in a single currency.
+        Parameters:
+            base (Currency): The currency to value the wallets in.
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            dict: The total and the value of each wallet.
+    """
+
+    async def _get_portfolio():
+        return await portfolio_valuation(db, current_user, base)
+
+    return await process_request(_get_portfolio)
+
+
+@router.get("/wallets/history")
+async def get_wallet_history(
+    currency: Currency,
+    start: date | None = None,
+    end: date | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    View the daily balance history of the user's wallet.
+        Parameters:
+            currency (Currency): The currency of the wallet.
+            start (date): The first day, 30 days before the end by default.
+            end (date): The last day, today by default.
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            list: The opening, closing, inflow, outflow and count of each active day.
+    """
+
+    async def _get_wallet_history():
+        return await get_balance_history(db, current_user, currency, start, end)
+
+    return await process_request(_get_wallet_history)
+
+
+@router.put("/wallets/{wallet_id}/credit-shards")
+async def update_credit_shards(
+    wallet_id: UUID,
+    shards: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Spread the credits of a hot wallet over shards, or turn sharding off with 0.
+        Parameters:
+            wallet_id (UUID): The ID of the wallet.
+            shards (int): The number of shards.
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            Wallet: The updated wallet object.
+    """
+
+    async def _update_credit_shards():
+        return await set_credit_shards(db, current_user, wallet_id, shards)
+
+    return await process_request(_update_credit_shards)
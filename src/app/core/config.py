@@ -1,5 +1,6 @@
+from decimal import Decimal
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -21,6 +22,92 @@ class Settings(BaseSettings):
 
     PROJECT_NAME: str = "virtual wallet"
 
+    SCHEDULER_LOCK_KEY: int = 7270001
+    SCHEDULER_HEARTBEAT_SECONDS: int = 15
+    RECURRING_INTERVAL_MINUTES: int = 10
+    SCHEDULER_ENABLED: bool = True
+
+    WORKER_POOL_SIZE: int = 5
+    WORKER_MAX_OVERFLOW: int = 0
+    WORKER_CONCURRENCY: int = 2
+
+    FX_RATES_FILE: Optional[str] = None
+    FX_RATES_TTL_SECONDS: int = 300
+    FX_RATES_REFRESH_MINUTES: int = 15
+    FX_QUOTE_TTL_SECONDS: int = 30
+    FX_QUOTE_SECRET: str
+    FX_QUOTE_MAX_DRIFT: Decimal = Decimal("0.01")
+
+    CARD_VAULT_SECRET: str
+
+    RECONCILIATION_SHARDS: int = 16
+    RECONCILIATION_CONCURRENCY: int = 4
+
+    TRANSACTION_PENDING_EXPIRY_HOURS: int = 24
+    TRANSACTION_AWAITING_EXPIRY_HOURS: int = 72
+    TRANSACTION_EXPIRY_BATCH_SIZE: int = 500
+    TRANSACTION_EXPIRY_INTERVAL_MINUTES: int = 15
+
+    TRANSACTION_PARTITION_MONTHS_AHEAD: int = 3
+
+    # Written by the worker and read by every API node, so it must be storage
+    # shared by all of them, e.g. one volume mounted into each container.
+    TRANSACTION_ARCHIVE_DIR: Optional[str] = None
+    TRANSACTION_ARCHIVE_AFTER_DAYS: int = 730
+    TRANSACTION_ARCHIVE_BATCH_SIZE: int = 5000
+
+    SHARED_STORE_URL: Optional[str] = None
+
+    VELOCITY_ENABLED: bool = True
+    VELOCITY_WINDOW_SECONDS: int = 3600
+    VELOCITY_MAX_COUNT: int = 30
+    VELOCITY_MAX_AMOUNT: Dict[str, Decimal] = {
+        "BGN": Decimal(20000),
+        "EUR": Decimal(10000),
+        "USD": Decimal(10000),
+        "GBP": Decimal(10000),
+        "BTC": Decimal(1),
+        "ETH": Decimal(20),
+    }
+    VELOCITY_NEW_RECIPIENT_WINDOW_SECONDS: int = 86400
+    VELOCITY_NEW_RECIPIENT_MAX: int = 10
+    VELOCITY_CARD_BURST_SECONDS: int = 60
+    VELOCITY_CARD_BURST_MAX: int = 5
+    VELOCITY_MAX_KEYS: int = 100000
+
+    WALLET_CREDIT_SHARDS_MAX: int = 64
+    WALLET_CREDIT_FOLD_SECONDS: int = 5
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_RATE: float = 10.0
+    RATE_LIMIT_BURST: int = 40
+    RATE_LIMIT_ROUTES: Dict[str, Tuple[float, int]] = {
+        "/api/v1/search/users": (2.0, 10),
+        "/api/v1/transactions": (5.0, 20),
+    }
+    RATE_LIMIT_EXEMPT: List[str] = []
+    RATE_LIMIT_MAX_KEYS: int = 100000
+
+    EVENT_STREAM_BUFFER_SIZE: int = 100
+    EVENT_STREAM_KEEPALIVE_SECONDS: int = 15
+
+    OUTBOX_LOG_FILE: Optional[str] = None
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_RELAY_INTERVAL_SECONDS: int = 5
+    OUTBOX_RETENTION_HOURS: int = 72
+    OUTBOX_PURGE_INTERVAL_MINUTES: int = 60
+
+    CATEGORY_SUMMARY_TTL_SECONDS: int = 60
+    ANALYTICS_TTL_SECONDS: int = 300
+    ANALYTICS_MONTHS: int = 12
+    ANALYTICS_ROLLING_MONTHS: int = 3
+    ANALYTICS_TOP_RECIPIENTS: int = 5
+    REFERENCE_CACHE_TTL_SECONDS: int = 300
+    REFERENCE_CACHE_MAX_ENTRIES: int = 10000
+
+    DASHBOARD_SECTION_LIMIT: int = 20
+    DASHBOARD_MAX_SECTION_LIMIT: int = 100
+
     PYDEVD: bool = False
     PYDEVD_PORT: Optional[int] = None
     PYDEVD_HOST: Optional[str] = None
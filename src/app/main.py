@@ -5,15 +5,15 @@ Boot FastApi app
 from contextlib import asynccontextmanager
 from urllib.parse import urljoin
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.api.api_v1.api import api_router
 from app.core.config import get_settings
-from app.services.crud.recurring_transaction import process_recurring_transactions
-from app.sql_app.database import get_db
+from app.services.common.broadcast import broadcast
+from app.services.common.ratelimit import RateLimitMiddleware
+from app.services.common.scheduler import create_scheduler, election
 
 SECRET_KEY = "supersecretkey"
 CORS = [
@@ -36,31 +36,22 @@ def _setup_cors(p_app: FastAPI) -> None:
     )
 
 
-scheduler = AsyncIOScheduler()
-
-
-async def scheduled_task():
-    async for db in get_db():
-        try:
-            await process_recurring_transactions(db)
-            await db.commit()
-        except Exception as e:
-            await db.rollback()
-            raise e
-        finally:
-            await db.close()
-
-
-scheduler.add_job(scheduled_task, "interval", minutes=10)
+scheduler = create_scheduler(election)
 
 
 @asynccontextmanager
 async def lifespan(p_app: FastAPI):
     print("Starting FastAPI application...")
-    scheduler.start()
+    scheduling = get_settings().SCHEDULER_ENABLED
+    if scheduling:
+        scheduler.start()
+    broadcast.start()
     yield
     print("Shutting down FastAPI application...")
-    scheduler.shutdown()
+    await broadcast.stop()
+    if scheduling:
+        scheduler.shutdown()
+        await election.release()
 
 
 def _create_app() -> FastAPI:
@@ -77,6 +68,8 @@ def _create_app() -> FastAPI:
     )
 
     app_.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+    if get_settings().RATE_LIMIT_ENABLED:
+        app_.add_middleware(RateLimitMiddleware)
 
     return app_
 
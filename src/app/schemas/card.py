@@ -29,3 +29,20 @@ class Card(CardBase):
 
     class Config:
         from_attributes = True
+
+
+class CardView(BaseModel):
+    id: UUID
+    number: str
+    card_holder: str
+    exp_date: str
+    design: str
+
+    class Config:
+        from_attributes = True
+
+
+class CardReveal(BaseModel):
+    id: UUID
+    number: str
+    cvv: str
@@ -0,0 +1,13 @@
+from decimal import Decimal
+from typing import Annotated
+
+from pydantic import PlainSerializer
+
+# Money is exact in Python and in the database, and reaches clients as a decimal
+# string without exponent, since a JSON number is read as a float and loses digits.
+Amount = Annotated[
+    Decimal,
+    PlainSerializer(
+        lambda amount: format(amount, "f"), return_type=str, when_used="json"
+    ),
+]
@@ -4,11 +4,12 @@ from uuid import UUID
 
 from pydantic import BaseModel
 
+from app.schemas.money import Amount
 from app.sql_app.models.enums import Currency, IntervalType
 
 
 class TransactionBase(BaseModel):
-    amount: int
+    amount: Amount
     currency: Currency
     timestamp: datetime
     card_id: UUID
@@ -19,12 +20,13 @@ class TransactionBase(BaseModel):
 
 
 class TransactionCreate(BaseModel):
-    amount: float
+    amount: Amount
     currency: str
     timestamp: Optional[datetime] = None
     card_number: str
     recipient_email: str
     category: str
+    quote_token: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -48,7 +50,7 @@ class Category(BaseModel):
 
 class TransactionView(BaseModel):
     id: UUID
-    amount: int
+    amount: Amount
     currency: str
     timestamp: datetime
     card_id: UUID
@@ -79,7 +81,7 @@ class TransactionList(BaseModel):
 
 
 class RecurringTransactionCreate(BaseModel):
-    amount: int
+    amount: Amount
     currency: Currency
     card_id: UUID
     recipient_id: UUID
@@ -1,7 +1,9 @@
+from decimal import Decimal
 from uuid import UUID
 
 from pydantic import BaseModel
 
+from app.schemas.money import Amount
 from app.sql_app.models.enums import Currency
 
 
@@ -10,13 +12,13 @@ class WalletBase(BaseModel):
 
 
 class WalletCreate(BaseModel):
-    amount: float = 0.0
+    amount: Amount = Decimal(0)
     currency: Currency
 
 
 class Wallet(WalletBase):
     id: UUID
-    amount: float = 0.0
+    amount: Amount = Decimal(0)
 
     class Config:
         from_attributes = True
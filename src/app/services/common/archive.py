@@ -0,0 +1,571 @@
+"""
+Cold archive of old, settled transactions in monthly Parquet files
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Sequence, Tuple
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytz
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from app.core.config import get_settings
+from app.schemas.transaction import TransactionFilter
+from app.services.common import metrics
+from app.services.common.outbox import record_transaction_event
+from app.services.common.partitions import as_utc, month_start, partition_name
+from app.services.crud.analytics import invalidate_spending_analytics
+from app.services.crud.category import invalidate_category_summary
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import (
+    ArchivedTransactionCount,
+    ArchivedTransactionTotal,
+    Transaction,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_STATUSES = (Status.confirmed, Status.declined)
+
+UUID_COLUMNS = (
+    "id",
+    "card_id",
+    "sender_id",
+    "recipient_id",
+    "category_id",
+    "wallet_id",
+)
+
+# Besides the table columns, each row keeps the card, recipient and category it
+# is listed with, since those rows may change or go away after archiving.
+SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("amount", pa.decimal128(38, 18)),
+        ("currency", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("status", pa.string()),
+        ("card_id", pa.string()),
+        ("sender_id", pa.string()),
+        ("recipient_id", pa.string()),
+        ("category_id", pa.string()),
+        ("wallet_id", pa.string()),
+        ("target_currency", pa.string()),
+        ("target_amount", pa.decimal128(38, 18)),
+        ("exchange_rate", pa.decimal128(38, 18)),
+        ("card_number", pa.string()),
+        ("recipient_email", pa.string()),
+        ("category_name", pa.string()),
+    ]
+)
+
+
+def _value(enum) -> str | None:
+    return None if enum is None else getattr(enum, "value", enum)
+
+
+def archive_record(transaction: Transaction) -> dict:
+    """
+    Flatten a transaction and the names it is listed with into an archive row.
+        Parameters:
+            transaction (Transaction): The transaction with its card, recipient and
+                category loaded.
+        Returns:
+            dict: The row in the archive schema.
+    """
+    return {
+        "id": str(transaction.id),
+        "amount": transaction.amount,
+        "currency": _value(transaction.currency),
+        "timestamp": as_utc(transaction.timestamp).astimezone(pytz.utc),
+        "status": _value(transaction.status),
+        "card_id": str(transaction.card_id),
+        "sender_id": str(transaction.sender_id),
+        "recipient_id": str(transaction.recipient_id),
+        "category_id": str(transaction.category_id),
+        "wallet_id": str(transaction.wallet_id),
+        "target_currency": _value(transaction.target_currency),
+        "target_amount": transaction.target_amount,
+        "exchange_rate": transaction.exchange_rate,
+        "card_number": transaction.card.number,
+        "recipient_email": transaction.recipient.email,
+        "category_name": transaction.category.name,
+    }
+
+
+def _utc(value: datetime) -> datetime:
+    return as_utc(value).astimezone(pytz.utc)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=pytz.utc)
+
+
+def _time_range(
+    condition: pc.Expression | None, start: datetime | None, end: datetime | None
+) -> Tuple[pc.Expression | None, datetime | None, datetime | None]:
+    if start is not None:
+        start = _utc(start)
+        condition = _and(condition, pc.field("timestamp") >= start)
+    if end is not None:
+        end = _utc(end)
+        condition = _and(condition, pc.field("timestamp") <= end)
+    return condition, start, end
+
+
+class TransactionArchive:
+    """
+    Zstandard-compressed Parquet files under one directory per month, named like
+    the table partitions. Files are immutable: every archived batch adds new ones,
+    so a batch written again after a crash is deduplicated by ID on read.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _directory(self, month: date) -> str:
+        return os.path.join(self.root, partition_name(month))
+
+    def months(self) -> List[date]:
+        if not os.path.isdir(self.root):
+            return []
+        months = []
+        for name in os.listdir(self.root):
+            prefix, _, suffix = name.rpartition("_y")
+            if prefix != "transactions" or len(suffix) != 7 or suffix[4] != "m":
+                continue
+            months.append(date(int(suffix[:4]), int(suffix[5:]), 1))
+        return sorted(months)
+
+    def write(self, records: Sequence[dict]) -> List[str]:
+        """
+        Write archive rows to a new file in the directory of each of their months.
+        Every file is synced to disk before it appears under its final name.
+            Parameters:
+                records (Sequence[dict]): The rows in the archive schema.
+            Returns:
+                List[str]: The paths of the files written.
+        """
+        by_month: Dict[date, List[dict]] = defaultdict(list)
+        for record in records:
+            by_month[month_start(record["timestamp"])].append(record)
+        paths = []
+        for month, rows in sorted(by_month.items()):
+            directory = self._directory(month)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+            staging = path + ".tmp"
+            table = pa.Table.from_pylist(rows, schema=SCHEMA)
+            pq.write_table(table, staging, compression="zstd")
+            with open(staging, "rb") as staged:
+                os.fsync(staged.fileno())
+            os.replace(staging, path)
+            paths.append(path)
+        return paths
+
+    def _month_tables(
+        self,
+        condition: pc.Expression | None,
+        start: datetime | None,
+        end: datetime | None,
+        columns: List[str] | None = None,
+    ) -> Iterator[pa.Table]:
+        # One table per month overlapping the range, oldest month first.
+        for month in self.months():
+            if start is not None and month < month_start(start):
+                continue
+            if end is not None and month > month_start(end):
+                continue
+            directory = self._directory(month)
+            tables = [
+                pq.read_table(
+                    os.path.join(directory, name),
+                    columns=columns,
+                    memory_map=True,
+                    filters=condition,
+                    schema=SCHEMA,
+                )
+                for name in sorted(os.listdir(directory))
+                if name.endswith(".parquet")
+            ]
+            if tables:
+                yield pa.concat_tables(tables)
+
+    def read(
+        self,
+        condition: pc.Expression | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        sort_by: str | None = None,
+    ) -> List[dict]:
+        """
+        Read the archived rows matching a condition, oldest first or by amount.
+        Only the months overlapping the time range are opened, and in time order
+        no further month once the limit is reached. Each file is memory mapped so
+        the filter runs without first copying it into the heap. By amount, every
+        matching row is sorted in Arrow and only the first are turned into dicts.
+            Parameters:
+                condition (pc.Expression): The filter on the archive columns.
+                start (datetime): The earliest timestamp, inclusive.
+                end (datetime): The latest timestamp, inclusive.
+                limit (int): The most rows to return, all by default.
+                sort_by (str): "amount" to order by amount, by time otherwise.
+            Returns:
+                List[dict]: The rows, with UUID columns parsed.
+        """
+        condition, start, end = _time_range(condition, start, end)
+        tables = self._month_tables(condition, start, end)
+        keys = [("timestamp", "ascending")]
+        if sort_by == "amount":
+            # The smallest amounts may be in any month, so all are sorted together.
+            tables = list(tables)
+            tables = [pa.concat_tables(tables)] if tables else []
+            keys.insert(0, ("amount", "ascending"))
+        rows = []
+        seen = set()
+        for table in tables:
+            for row in _sorted_rows(table, keys, limit):
+                if row["id"] in seen:
+                    continue
+                seen.add(row["id"])
+                rows.append(row)
+                if limit is not None and len(rows) >= limit:
+                    break
+            if limit is not None and len(rows) >= limit:
+                break
+        rows = rows[:limit]
+        for row in rows:
+            for column in UUID_COLUMNS:
+                row[column] = UUID(row[column])
+        metrics.inc("transaction_archive_rows_read_total", len(rows))
+        return rows
+
+    def count(
+        self,
+        condition: pc.Expression | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> int:
+        """
+        Count the archived rows matching a condition, reading only their IDs.
+            Parameters:
+                condition (pc.Expression): The filter on the archive columns.
+                start (datetime): The earliest timestamp, inclusive.
+                end (datetime): The latest timestamp, inclusive.
+            Returns:
+                int: The number of distinct rows.
+        """
+        condition, start, end = _time_range(condition, start, end)
+        ids = set()
+        for table in self._month_tables(condition, start, end, columns=["id"]):
+            ids.update(table.column("id").to_pylist())
+        return len(ids)
+
+
+def _sorted_rows(
+    table: pa.Table, keys: List[Tuple[str, str]], batch: int | None
+) -> Iterator[dict]:
+    # Sort the table in Arrow and turn only a batch of rows at a time into dicts.
+    indices = pc.sort_indices(table, sort_keys=keys)
+    batch = max(batch or len(indices), 1)
+    for offset in range(0, len(indices), batch):
+        yield from table.take(indices[offset : offset + batch]).to_pylist()
+
+
+def _and(condition: pc.Expression | None, other: pc.Expression) -> pc.Expression:
+    return other if condition is None else condition & other
+
+
+def archive_filter(
+    current_user: User, filter: TransactionFilter
+) -> pc.Expression | None:
+    """
+    Translate the transaction list filters, other than the time range, into a
+    condition on the archive columns.
+        Parameters:
+            current_user (User): The user listing the transactions.
+            filter (TransactionFilter): The filters of the list.
+        Returns:
+            pc.Expression: The condition, or None to read every row.
+    """
+    user_id = str(current_user.id)
+    condition = None
+    if not current_user.is_admin:
+        condition = (pc.field("sender_id") == user_id) | (
+            pc.field("recipient_id") == user_id
+        )
+    if filter.sender_id:
+        condition = _and(condition, pc.field("sender_id") == str(filter.sender_id))
+    if filter.recipient_id:
+        condition = _and(
+            condition, pc.field("recipient_id") == str(filter.recipient_id)
+        )
+    if filter.direction == "incoming":
+        condition = _and(condition, pc.field("recipient_id") == user_id)
+    elif filter.direction == "outgoing":
+        condition = _and(condition, pc.field("sender_id") == user_id)
+    return condition
+
+
+def get_archive() -> TransactionArchive | None:
+    directory = get_settings().TRANSACTION_ARCHIVE_DIR
+    return TransactionArchive(directory) if directory else None
+
+
+async def read_archived_transactions(
+    current_user: User, filter: TransactionFilter, limit: int | None = None
+) -> List[dict]:
+    """
+    Read the first archived transactions listed with the given filters, in the
+    order of the list, if archiving is enabled.
+        Parameters:
+            current_user (User): The user listing the transactions.
+            filter (TransactionFilter): The filters of the list.
+            limit (int): The most rows to read, all by default.
+        Returns:
+            List[dict]: The matching archive rows.
+    """
+    archive = get_archive()
+    if archive is None:
+        return []
+    return await asyncio.to_thread(
+        archive.read,
+        archive_filter(current_user, filter),
+        filter.start_date,
+        filter.end_date,
+        limit,
+        filter.sort_by,
+    )
+
+
+async def count_archived_transactions(
+    db: AsyncSession, current_user: User, filter: TransactionFilter
+) -> int:
+    """
+    Count the archived transactions listed with the given filters, if archiving
+    is enabled. Whole days are summed from archived_transaction_counts, and only
+    the days the time range cuts through are counted in the archive itself.
+        Parameters:
+            db (AsyncSession): The database session.
+            current_user (User): The user listing the transactions.
+            filter (TransactionFilter): The filters of the list.
+        Returns:
+            int: The number of matching archived transactions.
+    """
+    archive = get_archive()
+    if archive is None:
+        return 0
+    start = _utc(filter.start_date) if filter.start_date else None
+    end = _utc(filter.end_date) if filter.end_date else None
+    first_day = last_day = None
+    if start is not None:
+        first_day = start.date()
+        if start != _midnight(first_day):
+            first_day += timedelta(days=1)
+    if end is not None:
+        last_day = end.date()
+        if end < _midnight(last_day + timedelta(days=1)) - timedelta(microseconds=1):
+            last_day -= timedelta(days=1)
+    partial = []
+    if first_day is not None and last_day is not None and first_day > last_day:
+        partial.append((start, end))
+    else:
+        if start is not None and first_day != start.date():
+            partial.append((start, _midnight(first_day) - timedelta(microseconds=1)))
+        if end is not None and last_day != end.date():
+            partial.append((_midnight(last_day + timedelta(days=1)), end))
+
+    total = 0
+    if not (partial and partial[0] == (start, end)):
+        query = select(func.coalesce(func.sum(ArchivedTransactionCount.count), 0))
+        for condition in _count_conditions(current_user, filter):
+            query = query.where(condition)
+        if first_day is not None:
+            query = query.where(ArchivedTransactionCount.day >= first_day)
+        if last_day is not None:
+            query = query.where(ArchivedTransactionCount.day <= last_day)
+        total = (await db.execute(query)).scalar_one()
+    condition = archive_filter(current_user, filter)
+    for partial_start, partial_end in partial:
+        total += await asyncio.to_thread(
+            archive.count, condition, partial_start, partial_end
+        )
+    return total
+
+
+def _count_conditions(current_user: User, filter: TransactionFilter) -> list:
+    # Mirrors archive_filter on the columns of archived_transaction_counts.
+    counts = ArchivedTransactionCount
+    conditions = []
+    if not current_user.is_admin:
+        conditions.append(
+            (counts.sender_id == current_user.id)
+            | (counts.recipient_id == current_user.id)
+        )
+    if filter.sender_id:
+        conditions.append(counts.sender_id == filter.sender_id)
+    if filter.recipient_id:
+        conditions.append(counts.recipient_id == filter.recipient_id)
+    if filter.direction == "incoming":
+        conditions.append(counts.recipient_id == current_user.id)
+    elif filter.direction == "outgoing":
+        conditions.append(counts.sender_id == current_user.id)
+    return conditions
+
+
+async def _fold_totals(db: AsyncSession, transactions: Sequence[Transaction]) -> None:
+    # Mirrors the sums reconciliation takes over the confirmed transactions.
+    totals: Dict[Tuple[UUID, Currency], List[Decimal]] = defaultdict(
+        lambda: [Decimal(0), Decimal(0)]
+    )
+    for transaction in transactions:
+        if transaction.status != Status.confirmed:
+            continue
+        totals[(transaction.sender_id, transaction.currency)][0] += Decimal(
+            transaction.amount
+        )
+        credit_currency = transaction.target_currency or transaction.currency
+        credit = transaction.target_amount
+        if credit is None:
+            credit = transaction.amount
+        totals[(transaction.recipient_id, credit_currency)][1] += Decimal(credit)
+    for (user_id, currency), (sent, received) in totals.items():
+        total = await db.get(ArchivedTransactionTotal, (user_id, currency))
+        if total is None:
+            db.add(
+                ArchivedTransactionTotal(
+                    user_id=user_id, currency=currency, sent=sent, received=received
+                )
+            )
+        else:
+            total.sent += sent
+            total.received += received
+
+
+async def _fold_counts(db: AsyncSession, transactions: Sequence[Transaction]) -> None:
+    counts = Counter(
+        (
+            _utc(transaction.timestamp).date(),
+            transaction.sender_id,
+            transaction.recipient_id,
+        )
+        for transaction in transactions
+    )
+    for key, count in counts.items():
+        row = await db.get(ArchivedTransactionCount, key)
+        if row is None:
+            day, sender_id, recipient_id = key
+            db.add(
+                ArchivedTransactionCount(
+                    day=day, sender_id=sender_id, recipient_id=recipient_id, count=count
+                )
+            )
+        else:
+            row.count += count
+
+
+async def _archive_batch(
+    session_factory: sessionmaker,
+    archive: TransactionArchive,
+    cutoff: datetime,
+    batch_size: int,
+) -> int:
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Transaction)
+            .options(
+                joinedload(Transaction.card),
+                joinedload(Transaction.recipient),
+                joinedload(Transaction.category),
+            )
+            .where(
+                Transaction.status.in_(ARCHIVED_STATUSES),
+                Transaction.timestamp < cutoff,
+            )
+            .order_by(Transaction.timestamp)
+            .limit(batch_size)
+        )
+        transactions = result.scalars().all()
+        if not transactions:
+            return 0
+        records = [archive_record(transaction) for transaction in transactions]
+        await asyncio.to_thread(archive.write, records)
+        # The files are durable before the rows go, and the rows only go together
+        # with their totals, counts and events, so a crash in between at worst archives
+        # them twice.
+        await _fold_totals(db, transactions)
+        await _fold_counts(db, transactions)
+        for transaction in transactions:
+            record_transaction_event(db, transaction, "transaction.archived")
+        await db.execute(
+            delete(Transaction)
+            .where(
+                Transaction.id.in_([transaction.id for transaction in transactions]),
+                Transaction.timestamp < cutoff,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        senders = {str(transaction.sender_id) for transaction in transactions}
+        owners = {str(transaction.category.user_id) for transaction in transactions}
+        await db.commit()
+    # The category summaries and spending analytics only count live rows.
+    invalidate_category_summary(*senders | owners)
+    invalidate_spending_analytics(*senders)
+    return len(transactions)
+
+
+async def archive_transactions(
+    session_factory: sessionmaker,
+    archive: TransactionArchive | None = None,
+    batch_size: int | None = None,
+    now: datetime | None = None,
+) -> int:
+    """
+    Move the confirmed and declined transactions older than the archive age out
+    of the database into the archive, one batch per database transaction.
+        Parameters:
+            session_factory (sessionmaker): The sessions to run with.
+            archive (TransactionArchive): The archive, from the settings by default.
+            batch_size (int): The rows per batch, from the settings by default.
+            now (datetime): The time the age is measured at.
+        Returns:
+            int: The number of transactions archived.
+    """
+    settings = get_settings()
+    archive = archive or get_archive()
+    if archive is None:
+        return 0
+    batch_size = batch_size or settings.TRANSACTION_ARCHIVE_BATCH_SIZE
+    cutoff = (now or datetime.now(pytz.utc)) - timedelta(
+        days=settings.TRANSACTION_ARCHIVE_AFTER_DAYS
+    )
+    started = time.perf_counter()
+    archived = 0
+    while True:
+        moved = await _archive_batch(session_factory, archive, cutoff, batch_size)
+        archived += moved
+        if moved < batch_size:
+            break
+    metrics.inc("transactions_archived_total", archived)
+    metrics.set_gauge(
+        "transaction_archive_duration_seconds", time.perf_counter() - started
+    )
+    if archived:
+        logger.info(
+            "Archived %s transactions created before %s.", archived, cutoff.isoformat()
+        )
+    return archived
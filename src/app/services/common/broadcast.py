@@ -0,0 +1,130 @@
+"""
+Messages to every process of every node over the shared store's pub/sub
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Set
+
+from app.services.common import metrics
+from app.services.common.shared_store import get_shared_store
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "broadcast"
+
+
+class Broadcast:
+    """
+    Delivers each message to the handlers of its kind in every process. The
+    sending process handles it at once and the others receive it from the shared
+    store while they listen. Without a shared store messages stay in the process,
+    which is all a single node needs. Delivery is best effort: a process that is
+    not listening when a message is published never sees it.
+    """
+
+    def __init__(self, client=None, channel: str = CHANNEL):
+        self.client = client
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+        self._sending: Set[asyncio.Task] = set()
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, kind: str, handler: Callable[[dict], None]) -> None:
+        """
+        Call a handler with the data of every message of a kind.
+            Parameters:
+                kind (str): The kind of message, e.g. "transaction".
+                handler (Callable): Called with the JSON-serializable data.
+        """
+        self._handlers[kind].append(handler)
+
+    def _handle(self, kind: str, data: dict) -> None:
+        for handler in self._handlers.get(kind, ()):
+            handler(data)
+
+    def send(self, kind: str, data: dict) -> None:
+        """
+        Handle a message in this process and publish it to the others without
+        waiting for the shared store.
+            Parameters:
+                kind (str): The kind of message.
+                data (dict): The JSON-serializable data.
+        """
+        self._handle(kind, data)
+        if self.client is None:
+            return
+        message = json.dumps({"origin": self.origin, "kind": kind, "data": data})
+        task = asyncio.get_running_loop().create_task(
+            self.client.publish(self.channel, message)
+        )
+        self._sending.add(task)
+        task.add_done_callback(self._sent)
+
+    def _sent(self, task: asyncio.Task) -> None:
+        self._sending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            metrics.inc("broadcast_errors_total")
+            logger.warning("Failed to publish a broadcast: %s", task.exception())
+
+    def receive(self, raw: bytes | str) -> None:
+        """
+        Handle a message published by another process.
+            Parameters:
+                raw (bytes | str): The message as read from the channel.
+        """
+        message = json.loads(raw)
+        if message["origin"] == self.origin:
+            return
+        metrics.inc("broadcast_received_total", kind=message["kind"])
+        self._handle(message["kind"], message["data"])
+
+    async def listen(self, retry_seconds: float = 1.0) -> None:
+        """
+        Receive the messages of the other processes until cancelled, subscribing
+        again whenever the connection to the shared store is lost.
+            Parameters:
+                retry_seconds (float): The pause before subscribing again.
+        """
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message and message.get("type") == "message":
+                        self.receive(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                metrics.inc("broadcast_errors_total")
+                logger.exception("Lost the broadcast channel, subscribing again.")
+                await asyncio.sleep(retry_seconds)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        """
+        Start listening in the background, if there is a shared store.
+        """
+        if self.client is not None and self._listener is None:
+            self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        """
+        Stop listening.
+        """
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+
+broadcast = Broadcast(get_shared_store())
@@ -0,0 +1,106 @@
+"""
+In-process caches with LRU eviction, TTL expiry and hit-rate metrics
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.services.common import metrics
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    A bounded cache whose entries expire after a TTL. The least recently used
+    entry is evicted once the cache is full. Every cache is local to its process,
+    so writers invalidate the entries they change, through the broadcast channel
+    when other processes cache them too, and the TTL bounds how stale an entry
+    can get when an invalidation is missed.
+
+    Each invalidation bumps the cache version. A value loaded under an older
+    version is not stored, so a read racing a write never caches the old row.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 1024):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self._version = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Return the cached value, or MISSING if it is absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > time.monotonic()
+            if hit:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+            ratio = self._hits / (self._hits + self._misses)
+        metrics.inc(
+            "cache_hits_total" if hit else "cache_misses_total", cache=self.name
+        )
+        metrics.set_gauge("cache_hit_ratio", ratio, cache=self.name)
+        return entry[1] if hit else MISSING
+
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        """
+        Store a value. When the version it was loaded under is given and the cache
+        was invalidated since, the value is dropped.
+        """
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.inc("cache_evictions_total", cache=self.name)
+            metrics.set_gauge("cache_entries", len(self._entries), cache=self.name)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                self._entries.pop(key, None)
+            metrics.set_gauge("cache_entries", len(self._entries), cache=self.name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            metrics.set_gauge("cache_entries", 0, cache=self.name)
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached value, loading and caching it on a miss.
+            Parameters:
+                key (Hashable): The cache key.
+                loader (Callable): The coroutine function producing the value.
+            Returns:
+                Any: The cached or freshly loaded value.
+        """
+        value = self.get(key)
+        if value is MISSING:
+            version = self._version
+            value = await loader()
+            self.set(key, value, version)
+        return value
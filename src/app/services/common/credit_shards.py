@@ -0,0 +1,144 @@
+"""
+Sharded credits of hot wallets, folded into their balance in the background
+"""
+
+import logging
+import random
+import time
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.services.common import metrics
+from app.services.common.money import sum_amounts
+from app.services.crud.balance_history import record_balance_change
+from app.sql_app.models.models import Wallet, WalletCreditShard
+
+logger = logging.getLogger(__name__)
+
+
+async def credit_wallet_shard(
+    db: AsyncSession, wallet: Wallet, amount: Decimal
+) -> None:
+    """
+    Add a credit to a random shard of a sharded wallet with one upsert, leaving
+    the wallet row unlocked. Concurrent credits only wait on each other when they
+    pick the same shard.
+        Parameters:
+            db (AsyncSession): The database session.
+            wallet (Wallet): The wallet, with credit_shards above 0.
+            amount (Decimal): The amount credited.
+    """
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    statement = insert(WalletCreditShard).values(
+        wallet_id=wallet.id,
+        shard=random.randrange(wallet.credit_shards),
+        amount=amount,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[WalletCreditShard.wallet_id, WalletCreditShard.shard],
+        set_={"amount": WalletCreditShard.amount + statement.excluded.amount},
+    )
+    await db.execute(statement)
+    metrics.inc("wallet_shard_credits_total")
+
+
+async def available_balance(db: AsyncSession, wallet: Wallet) -> Decimal:
+    """
+    The balance of a wallet plus the credits not yet folded into it.
+        Parameters:
+            db (AsyncSession): The database session.
+            wallet (Wallet): The wallet.
+        Returns:
+            Decimal: The total the wallet can be debited.
+    """
+    if not wallet.credit_shards:
+        return wallet.balance
+    result = await db.execute(
+        select(func.coalesce(func.sum(WalletCreditShard.amount), 0)).where(
+            WalletCreditShard.wallet_id == wallet.id
+        )
+    )
+    return wallet.balance + Decimal(result.scalar())
+
+
+def available_balance_column():
+    """
+    The balance of each selected wallet plus the credits not yet folded into it,
+    as a column for queries reading many wallets at once.
+        Returns:
+            Label: The balance column, labelled "balance".
+    """
+    pending = (
+        select(func.coalesce(func.sum(WalletCreditShard.amount), 0))
+        .where(WalletCreditShard.wallet_id == Wallet.id)
+        .scalar_subquery()
+    )
+    return (func.coalesce(Wallet.balance, 0) + pending).label("balance")
+
+
+async def fold_wallet_credits(db: AsyncSession, wallet: Wallet) -> Decimal:
+    """
+    Move the credits of every shard into the balance of a wallet the caller
+    holds locked, recording them in the daily rollup as one inflow.
+        Parameters:
+            db (AsyncSession): The database session.
+            wallet (Wallet): The wallet, locked for update.
+        Returns:
+            Decimal: The amount folded.
+    """
+    result = await db.execute(
+        delete(WalletCreditShard)
+        .where(WalletCreditShard.wallet_id == wallet.id)
+        .returning(WalletCreditShard.amount)
+        .execution_options(synchronize_session=False)
+    )
+    folded = sum_amounts(result.scalars().all(), wallet.currency)
+    if folded:
+        wallet.balance += folded
+        await record_balance_change(db, wallet.id, wallet.balance, inflow=folded)
+    return folded
+
+
+async def _fold_wallet(session_factory: sessionmaker, wallet_id: UUID) -> Decimal:
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Wallet).where(Wallet.id == wallet_id).with_for_update()
+        )
+        wallet = result.scalars().first()
+        if wallet is None:
+            return Decimal(0)
+        folded = await fold_wallet_credits(db, wallet)
+        await db.commit()
+        return folded
+
+
+async def fold_credit_shards(session_factory: sessionmaker) -> int:
+    """
+    Fold the pending credits of every wallet that has any, one wallet per
+    database transaction so each wallet row is only locked briefly.
+        Parameters:
+            session_factory (sessionmaker): The sessions to run with.
+        Returns:
+            int: The number of wallets folded.
+    """
+    started = time.perf_counter()
+    async with session_factory() as db:
+        result = await db.execute(select(WalletCreditShard.wallet_id).distinct())
+        wallet_ids = result.scalars().all()
+    folded = 0
+    for wallet_id in wallet_ids:
+        if await _fold_wallet(session_factory, wallet_id):
+            folded += 1
+    metrics.inc("wallet_credit_folds_total", folded)
+    metrics.set_gauge(
+        "wallet_credit_fold_duration_seconds", time.perf_counter() - started
+    )
+    if folded:
+        logger.info("Folded the sharded credits of %s wallets.", folded)
+    return folded
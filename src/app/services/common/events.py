@@ -0,0 +1,186 @@
+"""
+Pub/sub of transaction status changes, streamed to users over SSE
+"""
+
+import asyncio
+import json
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.services.common.broadcast import broadcast
+from app.sql_app.models.models import Transaction
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class TransactionEvent:
+    transaction_id: str
+    status: str
+    sender_id: str
+    recipient_id: str
+    amount: Optional[str]
+    currency: str
+    timestamp: Optional[str]
+
+    @classmethod
+    def from_transaction(cls, transaction: Transaction) -> "TransactionEvent":
+        status = getattr(transaction.status, "value", transaction.status)
+        currency = getattr(transaction.currency, "value", transaction.currency)
+        timestamp = transaction.timestamp
+        return cls(
+            transaction_id=str(transaction.id),
+            status=str(status),
+            sender_id=str(transaction.sender_id),
+            recipient_id=str(transaction.recipient_id),
+            amount=None if transaction.amount is None else str(transaction.amount),
+            currency=str(currency),
+            timestamp=timestamp.isoformat()
+            if isinstance(timestamp, datetime)
+            else None,
+        )
+
+
+class Subscription:
+    """
+    The buffer of one connection. Publishing never waits on a slow reader: once
+    the buffer is full the oldest event is dropped and counted, and the reader is
+    told how many it missed so it can refetch the transaction list.
+    """
+
+    def __init__(self, user_id: str, max_buffer: int):
+        self.user_id = user_id
+        self._events: Deque[TransactionEvent] = deque(maxlen=max_buffer)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, event: TransactionEvent) -> None:
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+            metrics.inc("event_stream_dropped_total")
+        self._events.append(event)
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[TransactionEvent]:
+        """
+        Wait for the next event.
+            Parameters:
+                timeout (float): The seconds to wait.
+            Returns:
+                TransactionEvent: The oldest buffered event, or None on timeout.
+        """
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.popleft()
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class EventBroker:
+    """
+    Fans transaction events out to the connections of their sender and recipient
+    held by this process. publish_transaction reaches the brokers of the other
+    processes through the broadcast channel.
+    """
+
+    def __init__(self, max_buffer: int):
+        self.max_buffer = max_buffer
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, user_id) -> Subscription:
+        subscription = Subscription(str(user_id), self.max_buffer)
+        self._subscriptions.setdefault(subscription.user_id, set()).add(subscription)
+        metrics.set_gauge("event_stream_connections", self.connections)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id, set())
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            self._subscriptions.pop(subscription.user_id, None)
+        metrics.set_gauge("event_stream_connections", self.connections)
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, event: TransactionEvent) -> None:
+        """
+        Buffer an event for every connection of its sender and recipient.
+            Parameters:
+                event (TransactionEvent): The status change.
+        """
+        metrics.inc("event_stream_published_total", status=event.status)
+        for user_id in {event.sender_id, event.recipient_id}:
+            for subscription in self._subscriptions.get(user_id, ()):
+                subscription.push(event)
+
+
+broker = EventBroker(settings.EVENT_STREAM_BUFFER_SIZE)
+broadcast.subscribe(
+    "transaction", lambda data: broker.publish(TransactionEvent(**data))
+)
+
+
+def publish_transaction(transaction: Transaction) -> None:
+    """
+    Publish the current status of a transaction after it was committed, to the
+    connections of every process.
+        Parameters:
+            transaction (Transaction): The created or updated transaction.
+    """
+    broadcast.send(
+        "transaction", asdict(TransactionEvent.from_transaction(transaction))
+    )
+
+
+def format_event(event: str, data: dict, event_id: int | None = None) -> str:
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_events(
+    user_id,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    keepalive_seconds: float | None = None,
+    events: EventBroker = broker,
+) -> AsyncIterator[str]:
+    """
+    Yield the server-sent events of a user's transactions until the client
+    disconnects.
+        Parameters:
+            user_id (UUID): The ID of the connected user.
+            is_disconnected (Callable): Tells whether the client went away.
+            keepalive_seconds (float): The idle time after which a comment is sent.
+            events (EventBroker): The broker to subscribe to.
+        Returns:
+            AsyncIterator[str]: The encoded events.
+    """
+    keepalive_seconds = keepalive_seconds or settings.EVENT_STREAM_KEEPALIVE_SECONDS
+    subscription = events.subscribe(user_id)
+    event_id = 0
+    try:
+        while not await is_disconnected():
+            event = await subscription.next(keepalive_seconds)
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield format_event("overflow", {"dropped": dropped})
+            event_id += 1
+            yield format_event("transaction", asdict(event), event_id)
+    finally:
+        events.unsubscribe(subscription)
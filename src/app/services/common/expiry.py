@@ -0,0 +1,160 @@
+"""
+Expiry of transactions left pending or awaiting for too long
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import pytz
+from sqlalchemy import Row, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.services.common.outbox import record_transaction_event
+from app.services.crud.category import invalidate_category_summary
+from app.sql_app.models.enums import Status
+from app.sql_app.models.models import Transaction
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ExpiryPolicy:
+    """
+    How long a transaction may stay in each open status before it is declined.
+    A status without a maximum age never expires.
+    """
+
+    max_age: Dict[Status, timedelta]
+
+    @classmethod
+    def from_settings(cls) -> "ExpiryPolicy":
+        settings = get_settings()
+        hours = {
+            Status.pending: settings.TRANSACTION_PENDING_EXPIRY_HOURS,
+            Status.awaiting: settings.TRANSACTION_AWAITING_EXPIRY_HOURS,
+        }
+        return cls(
+            {
+                transaction_status: timedelta(hours=value)
+                for transaction_status, value in hours.items()
+                if value > 0
+            }
+        )
+
+
+def expire_statement(transaction_status: Status, cutoff: datetime, batch_size: int):
+    """
+    Build the UPDATE declining one batch of transactions of a status older than
+    the cutoff. The batch is picked oldest first from the (status, timestamp)
+    index, and rows locked by a concurrent transition are skipped, not waited for.
+        Parameters:
+            transaction_status (Status): The open status to expire.
+            cutoff (datetime): Transactions created before it expire.
+            batch_size (int): The maximum number of transactions to decline.
+        Returns:
+            Update: The statement returning the event columns of each declined row.
+    """
+    batch = (
+        select(Transaction.id)
+        .where(
+            Transaction.status == transaction_status,
+            Transaction.timestamp < cutoff,
+        )
+        .order_by(Transaction.timestamp)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(Transaction)
+        .where(Transaction.id.in_(batch), Transaction.status == transaction_status)
+        .values(status=Status.declined)
+        .returning(
+            Transaction.id,
+            Transaction.status,
+            Transaction.sender_id,
+            Transaction.recipient_id,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.timestamp,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _expire_batch(
+    session_factory: sessionmaker,
+    transaction_status: Status,
+    cutoff: datetime,
+    batch_size: int,
+) -> List[Row]:
+    async with session_factory() as db:
+        result = await db.execute(
+            expire_statement(transaction_status, cutoff, batch_size)
+        )
+        rows = result.all()
+        for row in rows:
+            record_transaction_event(db, row)
+        await db.commit()
+    if rows:
+        invalidate_category_summary(*{row.sender_id for row in rows})
+    return rows
+
+
+async def expire_transactions(
+    session_factory: sessionmaker,
+    policy: ExpiryPolicy | None = None,
+    batch_size: int | None = None,
+    now: datetime | None = None,
+) -> Dict[Status, int]:
+    """
+    Decline every transaction past the maximum age of its status, one bounded
+    batch per database transaction so no sweep holds many row locks for long.
+        Parameters:
+            session_factory (sessionmaker): The sessions to run with.
+            policy (ExpiryPolicy): The maximum ages, from the settings by default.
+            batch_size (int): The rows per batch, from the settings by default.
+            now (datetime): The time the ages are measured at.
+        Returns:
+            Dict[Status, int]: The number of transactions expired per status.
+    """
+    policy = policy or ExpiryPolicy.from_settings()
+    batch_size = batch_size or get_settings().TRANSACTION_EXPIRY_BATCH_SIZE
+    now = now or datetime.now(pytz.utc)
+    started = time.perf_counter()
+    expired = {}
+    for transaction_status, max_age in policy.max_age.items():
+        cutoff = now - max_age
+        expired[transaction_status] = 0
+        while True:
+            rows = await _expire_batch(
+                session_factory, transaction_status, cutoff, batch_size
+            )
+            expired[transaction_status] += len(rows)
+            if len(rows) < batch_size:
+                break
+        metrics.inc(
+            "transactions_expired_total",
+            expired[transaction_status],
+            status=transaction_status.value,
+        )
+        metrics.set_gauge(
+            "transactions_expired_last_run",
+            expired[transaction_status],
+            status=transaction_status.value,
+        )
+        if expired[transaction_status]:
+            logger.info(
+                "Expired %s %s transactions created before %s.",
+                expired[transaction_status],
+                transaction_status.value,
+                cutoff.isoformat(),
+            )
+    metrics.set_gauge(
+        "transaction_expiry_duration_seconds", time.perf_counter() - started
+    )
+    return expired
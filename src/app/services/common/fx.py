@@ -0,0 +1,365 @@
+"""
+Exchange rates: providers, the exchange_rates table and an in-memory TTL cache
+"""
+
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal, localcontext
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pytz
+from fastapi import HTTPException, status
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.sql_app.models.enums import Currency
+from app.sql_app.models.models import ExchangeRate, FxQuoteRedemption
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Rates are the value of one unit of a currency in a common pivot currency, so any
+# cross rate is rates[source] / rates[target].
+Rates = Dict[Currency, Decimal]
+
+CURRENCIES = list(Currency)
+
+
+class RateProvider(ABC):
+    """
+    Source of exchange rates quoted against a common pivot currency.
+    """
+
+    @abstractmethod
+    async def get_rates(self, db: AsyncSession | None = None) -> Rates:
+        """
+        Fetch the current rates.
+            Parameters:
+                db (AsyncSession): A database session, for providers that need one.
+            Returns:
+                Rates: The rate of each known currency.
+        """
+
+
+class FileRateProvider(RateProvider):
+    """
+    Read rates from a local JSON file, e.g. app/fixtures/fx_rates.json.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    async def get_rates(self, db: AsyncSession | None = None) -> Rates:
+        document = json.loads(self.path.read_text())
+        return {
+            Currency(code): Decimal(str(rate))
+            for code, rate in document["rates"].items()
+        }
+
+
+class DatabaseRateProvider(RateProvider):
+    """
+    Read the rates stored in the exchange_rates table in a single query.
+    """
+
+    async def get_rates(self, db: AsyncSession | None = None) -> Rates:
+        result = await db.execute(select(ExchangeRate.currency, ExchangeRate.rate))
+        return {currency: rate for currency, rate in result.all()}
+
+
+class RateCache:
+    """
+    Keep the rates in memory and reload them from the provider once they are older
+    than the TTL, so valuations never hit the provider per request.
+    """
+
+    def __init__(self, provider: RateProvider, ttl_seconds: float):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self._rates: Rates = {}
+        self._loaded_at: float | None = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    async def get_rates(self, db: AsyncSession | None = None) -> Rates:
+        """
+        Return the cached rates, reloading them when they expired.
+            Parameters:
+                db (AsyncSession): A database session passed on to the provider.
+            Returns:
+                Rates: The rate of each known currency.
+        """
+        if not self.is_fresh:
+            await self.reload(db)
+        return self._rates
+
+    async def reload(self, db: AsyncSession | None = None) -> None:
+        self._rates = await self.provider.get_rates(db)
+        self._loaded_at = time.monotonic()
+        metrics.inc("fx_rate_cache_reloads_total")
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+
+def conversion_factors(rates: Rates, currencies: list, base: Currency) -> np.ndarray:
+    """
+    The exact factors converting each currency into the base currency, as an
+    object array of Decimals, so multiplying Decimal amounts by them stays exact.
+        Parameters:
+            rates (Rates): The current rates.
+            currencies (list): The currency of each amount.
+            base (Currency): The currency to convert into.
+        Returns:
+            np.ndarray: The factor of each currency.
+    """
+    if base not in rates or any(currency not in rates for currency in currencies):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Exchange rates are not available.",
+        )
+    with localcontext() as ctx:
+        ctx.prec = 38
+        return np.array(
+            [rates[currency] / rates[base] for currency in currencies], dtype=object
+        )
+
+
+async def store_rates(db: AsyncSession, rates: Rates) -> None:
+    """
+    Replace the contents of the exchange_rates table with the given rates.
+        Parameters:
+            db (AsyncSession): The database session.
+            rates (Rates): The rates to store.
+    """
+    now = datetime.now(pytz.utc)
+    await db.execute(delete(ExchangeRate))
+    db.add_all(
+        ExchangeRate(currency=currency, rate=rate, updated_at=now)
+        for currency, rate in rates.items()
+    )
+    await db.commit()
+
+
+async def refresh_exchange_rates(db: AsyncSession, provider: RateProvider) -> None:
+    """
+    Pull the rates from an external provider into the exchange_rates table.
+        Parameters:
+            db (AsyncSession): The database session.
+            provider (RateProvider): The provider to pull from.
+    """
+    rates = await provider.get_rates(db)
+    await store_rates(db, rates)
+    logger.info("Stored %d exchange rates.", len(rates))
+    await purge_quote_redemptions(db)
+
+
+def cross_rate(rates: Rates, source: Currency, target: Currency) -> Decimal:
+    """
+    The rate converting one unit of the source currency into the target currency.
+        Parameters:
+            rates (Rates): The current rates.
+            source (Currency): The currency that is debited.
+            target (Currency): The currency that is credited.
+        Returns:
+            Decimal: The cross rate.
+    """
+    if source not in rates or target not in rates:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Exchange rates are not available.",
+        )
+    return rates[source] / rates[target]
+
+
+@dataclass(frozen=True)
+class Quote:
+    id: str
+    sender_id: str
+    source: Currency
+    target: Currency
+    amount: Decimal
+    rate: Decimal
+    expires_at: datetime
+    token: str
+
+
+class QuoteBook:
+    """
+    Lock exchange quotes for a few seconds as signed tokens. The token binds the
+    rate to the sender and the source amount, and any API worker can verify a
+    quote issued by another without a lookup.
+    """
+
+    def __init__(self, secret: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._serializer = URLSafeTimedSerializer(secret, salt="fx-quote")
+
+    def lock(
+        self,
+        sender_id,
+        source: Currency,
+        target: Currency,
+        amount: Decimal,
+        rates: Rates,
+    ) -> Quote:
+        """
+        Lock the current cross rate between two currencies for one transfer.
+            Parameters:
+                sender_id (UUID): The ID of the user the quote is issued to.
+                source (Currency): The currency that is debited.
+                target (Currency): The currency that is credited.
+                amount (Decimal): The amount that is debited.
+                rates (Rates): The current rates.
+            Returns:
+                Quote: The locked quote.
+        """
+        if source == target:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Source and target currencies must differ.",
+            )
+        rate = cross_rate(rates, source, target)
+        quote_id = uuid.uuid4().hex
+        token = self._serializer.dumps(
+            [
+                quote_id,
+                str(sender_id),
+                source.value,
+                target.value,
+                str(amount),
+                str(rate),
+            ]
+        )
+        return Quote(
+            id=quote_id,
+            sender_id=str(sender_id),
+            source=source,
+            target=target,
+            amount=amount,
+            rate=rate,
+            expires_at=datetime.now(pytz.utc) + timedelta(seconds=self.ttl_seconds),
+            token=token,
+        )
+
+    def get(self, token: str, sender_id, amount: Decimal) -> Quote:
+        """
+        Verify a quote token that has not expired yet and was issued for this
+        sender and amount.
+            Parameters:
+                token (str): The token returned when the quote was locked.
+                sender_id (UUID): The ID of the user transferring the money.
+                amount (Decimal): The amount that is debited.
+            Returns:
+                Quote: The locked quote.
+        """
+        try:
+            payload, issued_at = self._serializer.loads(
+                token, max_age=self.ttl_seconds, return_timestamp=True
+            )
+            quote_id, quote_sender, source, target, quote_amount, rate = payload
+        except (BadSignature, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Exchange quote is invalid or expired.",
+            )
+        if quote_sender != str(sender_id) or Decimal(quote_amount) != amount:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Exchange quote does not match the transaction.",
+            )
+        return Quote(
+            id=quote_id,
+            sender_id=quote_sender,
+            source=Currency(source),
+            target=Currency(target),
+            amount=Decimal(quote_amount),
+            rate=Decimal(rate),
+            expires_at=issued_at + timedelta(seconds=self.ttl_seconds),
+            token=token,
+        )
+
+
+async def lock_exchange_quote(
+    db: AsyncSession, sender_id, source: Currency, target: Currency, amount: Decimal
+) -> Quote:
+    """
+    Lock an exchange quote from the cached rates.
+        Parameters:
+            db (AsyncSession): The database session, used only to reload stale rates.
+            sender_id (UUID): The ID of the user the quote is issued to.
+            source (Currency): The currency that is debited.
+            target (Currency): The currency that is credited.
+            amount (Decimal): The amount that is debited.
+        Returns:
+            Quote: The locked quote.
+    """
+    rates = await rate_cache.get_rates(db)
+    return quote_book.lock(sender_id, source, target, amount, rates)
+
+
+async def redeem_exchange_quote(
+    db: AsyncSession, token: str, sender_id, amount: Decimal
+) -> Quote:
+    """
+    Verify a quote and spend it. The quote is rejected when the cached rate has
+    moved more than FX_QUOTE_MAX_DRIFT since it was locked, and it is recorded in
+    fx_quote_redemptions in the caller's transaction so it is used at most once.
+        Parameters:
+            db (AsyncSession): The database session.
+            token (str): The token returned when the quote was locked.
+            sender_id (UUID): The ID of the user transferring the money.
+            amount (Decimal): The amount that is debited.
+        Returns:
+            Quote: The redeemed quote.
+    """
+    quote = quote_book.get(token, sender_id, amount)
+    current = cross_rate(await rate_cache.get_rates(db), quote.source, quote.target)
+    if abs(quote.rate - current) > current * settings.FX_QUOTE_MAX_DRIFT:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Exchange rate has moved, lock a new quote.",
+        )
+    db.add(FxQuoteRedemption(id=quote.id, expires_at=quote.expires_at))
+    try:
+        await db.flush()
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Exchange quote was already used.",
+        )
+    return quote
+
+
+async def purge_quote_redemptions(db: AsyncSession) -> None:
+    """
+    Forget the redeemed quotes that have expired and can no longer be replayed.
+        Parameters:
+            db (AsyncSession): The database session.
+    """
+    await db.execute(
+        delete(FxQuoteRedemption).where(
+            FxQuoteRedemption.expires_at < datetime.now(pytz.utc)
+        )
+    )
+    await db.commit()
+
+
+rate_cache = RateCache(DatabaseRateProvider(), settings.FX_RATES_TTL_SECONDS)
+quote_book = QuoteBook(settings.FX_QUOTE_SECRET, settings.FX_QUOTE_TTL_SECONDS)
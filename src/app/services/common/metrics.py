@@ -0,0 +1,79 @@
+"""
+In-process metrics exported in the Prometheus text format
+"""
+
+from threading import Lock
+from typing import Dict, Tuple
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_lock = Lock()
+_counters: Dict[_Key, float] = {}
+_gauges: Dict[_Key, float] = {}
+
+
+def _key(name: str, labels: dict) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    """
+    Increase a counter.
+        Parameters:
+            name (str): The metric name.
+            value (float): The amount to add.
+            labels: The metric labels.
+    """
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """
+    Set a gauge to the given value.
+        Parameters:
+            name (str): The metric name.
+            value (float): The new value.
+            labels: The metric labels.
+    """
+    with _lock:
+        _gauges[_key(name, labels)] = float(value)
+
+
+def get(name: str, **labels) -> float:
+    """
+    Read the current value of a counter or gauge, 0.0 if it was never set.
+    """
+    key = _key(name, labels)
+    with _lock:
+        return _counters.get(key, _gauges.get(key, 0.0))
+
+
+def reset() -> None:
+    """
+    Drop all recorded values.
+    """
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+
+
+def render() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+        Returns:
+            str: The metrics document.
+    """
+    lines = []
+    with _lock:
+        for kind, values in (("counter", _counters), ("gauge", _gauges)):
+            seen = set()
+            for (name, labels), value in sorted(values.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} {kind}")
+                    seen.add(name)
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                suffix = f"{{{label_str}}}" if label_str else ""
+                lines.append(f"{name}{suffix} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,110 @@
+"""
+Exact money arithmetic on Decimal amounts and integer minor units
+"""
+
+from decimal import Decimal, InvalidOperation, localcontext
+from typing import Iterable
+
+import numpy as np
+from fastapi import HTTPException, status
+
+from app.sql_app.models.enums import CURRENCY_SCALE, Currency
+
+# Matches the NUMERIC(38, 18) money columns, wide enough for wei.
+PRECISION = 38
+# Sums of up to this many int64 minor units cannot overflow.
+_INT64_SAFE = 2**62
+
+
+def _currency(currency: Currency | str) -> Currency:
+    return currency if isinstance(currency, Currency) else Currency(currency)
+
+
+def scale_of(currency: Currency | str) -> int:
+    """
+    Number of decimal places of the currency's minor unit (cents, satoshi, wei).
+    """
+    return CURRENCY_SCALE[_currency(currency)]
+
+
+def quantize(amount, currency: Currency | str) -> Decimal:
+    """
+    Round an amount to the currency's minor unit, half to even.
+        Parameters:
+            amount: The amount as Decimal, int, float or str.
+            currency (Currency | str): The currency of the amount.
+        Returns:
+            Decimal: The rounded amount.
+    """
+    with localcontext() as ctx:
+        ctx.prec = PRECISION
+        return Decimal(str(amount)).quantize(Decimal(1).scaleb(-scale_of(currency)))
+
+
+def parse_amount(amount, currency: Currency | str) -> Decimal:
+    """
+    Validate a user supplied amount: positive and no finer than the minor unit.
+        Parameters:
+            amount: The amount as Decimal, int, float or str.
+            currency (Currency | str): The currency of the amount.
+        Returns:
+            Decimal: The validated amount.
+    """
+    try:
+        currency = _currency(currency)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid currency."
+        )
+    try:
+        value = Decimal(str(amount))
+        exact = quantize(value, currency) == value
+    except InvalidOperation:
+        value, exact = Decimal(0), False
+    if value <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Amount must be greater than zero.",
+        )
+    if not exact:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Amount has more decimal places than {currency.value} allows.",
+        )
+    return value
+
+
+def to_minor(amount, currency: Currency | str) -> int:
+    """
+    Convert an amount to integer minor units, e.g. 12.34 EUR -> 1234.
+    """
+    return int(quantize(amount, currency).scaleb(scale_of(currency)))
+
+
+def from_minor(units: int, currency: Currency | str) -> Decimal:
+    """
+    Convert integer minor units back to a Decimal amount.
+    """
+    with localcontext() as ctx:
+        ctx.prec = PRECISION
+        return Decimal(int(units)).scaleb(-scale_of(currency))
+
+
+def sum_amounts(amounts: Iterable, currency: Currency | str) -> Decimal:
+    """
+    Sum amounts exactly. Amounts are converted to minor units and summed as a
+    vectorized int64 reduction when that cannot overflow, otherwise as Python ints.
+        Parameters:
+            amounts (Iterable): The amounts to add up.
+            currency (Currency | str): The currency of all amounts.
+        Returns:
+            Decimal: The exact total.
+    """
+    units = [to_minor(amount, currency) for amount in amounts]
+    if not units:
+        return from_minor(0, currency)
+    if max(abs(min(units)), abs(max(units))) * len(units) < _INT64_SAFE:
+        total = int(np.asarray(units, dtype=np.int64).sum())
+    else:
+        total = sum(units)
+    return from_minor(total, currency)
@@ -0,0 +1,254 @@
+"""
+Transactional outbox of domain events and the relay delivering them to sinks
+"""
+
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List, Sequence
+from uuid import UUID
+
+import pytz
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.services.common.events import TransactionEvent
+from app.services.common.money import quantize
+from app.sql_app.models.models import OutboxEvent, Transaction, Wallet
+
+
+def record_event(
+    db: AsyncSession, topic: str, aggregate_id: UUID, payload: dict
+) -> OutboxEvent:
+    """
+    Add an event to the outbox. It is committed together with the change it
+    describes, so an event exists if and only if the change does.
+        Parameters:
+            db (AsyncSession): The session of the change.
+            topic (str): The kind of event, e.g. "transaction.confirmed".
+            aggregate_id (UUID): The ID of the changed transaction or wallet.
+            payload (dict): The JSON-serializable event data.
+        Returns:
+            OutboxEvent: The pending event.
+    """
+    event = OutboxEvent(
+        topic=topic,
+        aggregate_id=aggregate_id,
+        payload=payload,
+        created_at=datetime.now(pytz.utc),
+    )
+    db.add(event)
+    return event
+
+
+def record_transaction_event(
+    db: AsyncSession, transaction: Transaction, topic: str | None = None
+) -> None:
+    payload = asdict(TransactionEvent.from_transaction(transaction))
+    topic = topic or f"transaction.{payload['status']}"
+    record_event(db, topic, transaction.id, payload)
+
+
+def record_wallet_event(
+    db: AsyncSession, topic: str, wallet: Wallet, amount: Decimal | None = None
+) -> None:
+    currency = getattr(wallet.currency, "value", wallet.currency)
+    payload = {
+        "wallet_id": str(wallet.id),
+        "user_id": str(wallet.user_id),
+        "currency": str(currency),
+        "balance": str(quantize(wallet.balance or 0, currency)),
+        "amount": None if amount is None else str(quantize(amount, currency)),
+    }
+    record_event(db, topic, wallet.id, payload)
+
+
+def envelope(event: OutboxEvent) -> dict:
+    return {
+        "id": event.id,
+        "topic": event.topic,
+        "aggregate_id": str(event.aggregate_id),
+        "created_at": event.created_at.isoformat(),
+        "payload": event.payload,
+    }
+
+
+class OutboxSink(ABC):
+    """
+    Destination of outbox events. A batch may be delivered more than once, so
+    consumers deduplicate by event ID.
+    """
+
+    name = "sink"
+
+    @abstractmethod
+    async def deliver(self, events: Sequence[dict]) -> None:
+        """
+        Deliver a batch of event envelopes, raising if any was not delivered.
+        """
+
+
+class LogFileSink(OutboxSink):
+    """
+    Appends events to a JSON-lines file, synced to disk before the batch is
+    marked as published.
+    """
+
+    name = "log_file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, lines: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as log_file:
+            log_file.write(lines)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+    async def deliver(self, events: Sequence[dict]) -> None:
+        lines = "".join(json.dumps(event) + "\n" for event in events)
+        await asyncio.to_thread(self._append, lines)
+
+
+class QueueSink(OutboxSink):
+    """
+    Puts events on a local asyncio queue. A bounded queue slows the relay down to
+    the pace of its consumer.
+    """
+
+    name = "queue"
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def deliver(self, events: Sequence[dict]) -> None:
+        for event in events:
+            await self.queue.put(event)
+
+
+class OutboxRelay:
+    """
+    Drains the outbox in batches of the oldest unpublished events. Each batch is
+    locked with SKIP LOCKED, delivered to every sink and only then marked as
+    published in the same transaction, so events are delivered at least once.
+    Without sinks the events are only marked as published. Published events are
+    kept for the retention period, then purged.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        sinks: List[OutboxSink],
+        batch_size: int | None = None,
+        retention: timedelta | None = None,
+    ):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.sinks = sinks
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.retention = retention or timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+
+    async def _relay_batch(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+            envelopes = [envelope(event) for event in events]
+            for sink in self.sinks:
+                try:
+                    await sink.deliver(envelopes)
+                except Exception:
+                    metrics.inc("outbox_delivery_errors_total", sink=sink.name)
+                    await db.rollback()
+                    raise
+                metrics.inc("outbox_delivered_total", len(envelopes), sink=sink.name)
+            await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([event.id for event in events]))
+                .values(published_at=datetime.now(pytz.utc))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return len(events)
+
+    async def purge(self, now: datetime | None = None) -> int:
+        """
+        Delete the events published before the retention period, one batch per
+        database transaction.
+            Parameters:
+                now (datetime): The time the retention is measured from.
+            Returns:
+                int: The number of events deleted.
+        """
+        cutoff = (now or datetime.now(pytz.utc)) - self.retention
+        purged = 0
+        while True:
+            async with self.session_factory() as db:
+                batch = (
+                    select(OutboxEvent.id)
+                    .where(OutboxEvent.published_at < cutoff)
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                )
+                result = await db.execute(
+                    delete(OutboxEvent)
+                    .where(OutboxEvent.id.in_(batch))
+                    .execution_options(synchronize_session=False)
+                )
+                deleted = result.rowcount
+                await db.commit()
+            purged += deleted
+            if deleted < self.batch_size:
+                break
+        metrics.inc("outbox_purged_total", purged)
+        return purged
+
+    async def record_lag(self) -> None:
+        """
+        Export how many events wait for delivery and how old the oldest one is.
+        """
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(func.count(), func.min(OutboxEvent.created_at)).where(
+                    OutboxEvent.published_at.is_(None)
+                )
+            )
+            pending, oldest = result.one()
+        lag = 0.0
+        if oldest is not None:
+            if oldest.tzinfo is None:
+                oldest = oldest.replace(tzinfo=pytz.utc)
+            lag = max((datetime.now(pytz.utc) - oldest).total_seconds(), 0.0)
+        metrics.set_gauge("outbox_lag_events", pending)
+        metrics.set_gauge("outbox_lag_seconds", lag)
+
+    async def drain(self) -> int:
+        """
+        Relay batches until the outbox is empty.
+            Returns:
+                int: The number of events published.
+        """
+        published = 0
+        try:
+            while True:
+                relayed = await self._relay_batch()
+                published += relayed
+                if relayed < self.batch_size:
+                    break
+        finally:
+            await self.record_lag()
+        return published
@@ -0,0 +1,125 @@
+"""
+Monthly range partitions of the transactions table on Postgres
+"""
+
+import logging
+from datetime import date, datetime
+from typing import List, Tuple
+
+import pytz
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.services.common import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Read a naive datetime as UTC, the zone the partition bounds are in.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=pytz.utc)
+    return value
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date, table: str = "transactions") -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds(first: date, last: date) -> List[Tuple[str, date, date]]:
+    """
+    List the monthly partitions covering a range of months.
+        Parameters:
+            first (date): A day in the first month.
+            last (date): A day in the last month.
+        Returns:
+            List[Tuple[str, date, date]]: The name, inclusive start and exclusive
+                end of each partition.
+    """
+    month = month_start(first)
+    bounds = []
+    while month <= month_start(last):
+        bounds.append((partition_name(month), month, add_months(month, 1)))
+        month = add_months(month, 1)
+    return bounds
+
+
+def create_partition_sql(
+    name: str, start: date, end: date, parent: str = "transactions"
+) -> str:
+    # Bounds are UTC midnights, so a month holds the same rows in every time zone.
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') "
+        f"TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+def create_default_partition_sql(parent: str = "transactions") -> str:
+    # Rows outside every monthly range land here instead of failing the insert.
+    return f"CREATE TABLE IF NOT EXISTS {parent}_default PARTITION OF {parent} DEFAULT"
+
+
+async def ensure_partitions(
+    db: AsyncSession, months_ahead: int | None = None, now: datetime | None = None
+) -> List[str]:
+    """
+    Create the partitions of the current month and the months ahead that do not
+    exist yet, so inserts never fall into the default partition, and the default
+    partition itself if it is missing. A no-op on databases without declarative
+    partitioning.
+        Parameters:
+            db (AsyncSession): The database session.
+            months_ahead (int): The months to create ahead, from the settings by
+                default.
+            now (datetime): The current time.
+        Returns:
+            List[str]: The names of the partitions created.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    if months_ahead is None:
+        months_ahead = get_settings().TRANSACTION_PARTITION_MONTHS_AHEAD
+    current = month_start(now or datetime.now(pytz.utc))
+    bounds = partition_bounds(current, add_months(current, months_ahead))
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'transactions'"
+        )
+    )
+    existing = set(result.scalars().all())
+    created = []
+    for name, start, end in bounds:
+        if name in existing:
+            continue
+        await db.execute(text(create_partition_sql(name, start, end)))
+        created.append(name)
+    if "transactions_default" not in existing:
+        await db.execute(text(create_default_partition_sql()))
+        created.append("transactions_default")
+    await db.commit()
+    for name in created:
+        logger.info("Created transaction partition %s.", name)
+    metrics.inc("transaction_partitions_created_total", len(created))
+    return created
+
+
+async def ensure_partitions_job(session_factory: sessionmaker) -> None:
+    async with session_factory() as db:
+        await ensure_partitions(db)
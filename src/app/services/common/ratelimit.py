@@ -0,0 +1,223 @@
+"""
+Token-bucket rate limiting of API requests per user and route
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from http.cookies import SimpleCookie
+from typing import Dict, List, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.services.common.shared_store import get_shared_store
+from app.services.common.utils import decode_access_token
+
+
+@dataclass(frozen=True)
+class Limit:
+    """
+    Requests refill at rate per second, up to a burst of requests.
+    """
+
+    rate: float
+    burst: int
+
+
+class RateLimitStore(ABC):
+    """
+    Keeps the token buckets.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, limit: Limit, now: float) -> float:
+        """
+        Take a token from a bucket.
+            Parameters:
+                key (str): The bucket.
+                limit (Limit): The refill rate and size of the bucket.
+                now (float): The current time in seconds.
+            Returns:
+                float: 0 if a token was taken, else the seconds until one is free.
+        """
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Buckets in process memory, each node limiting on its own. The least recently
+    used buckets are dropped once there are more than max_keys of them; a dropped
+    bucket comes back full.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: Limit, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(limit.burst), now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        tokens, updated = bucket
+        tokens = min(limit.burst, tokens + max(now - updated, 0.0) * limit.rate)
+        if tokens >= 1:
+            bucket[0], bucket[1] = tokens - 1, now
+            return 0.0
+        bucket[0], bucket[1] = tokens, now
+        return (1 - tokens) / limit.rate
+
+
+# Refills and takes from a bucket stored as a hash of tokens and update time.
+# Returns 0 or the seconds until a token is free, as a string to keep decimals.
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class SharedRateLimitStore(RateLimitStore):
+    """
+    Buckets in a Redis-compatible store shared by all nodes, refilled and taken
+    from by one server-side script per request. A bucket expires once it would
+    be full again.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, limit: Limit, now: float) -> float:
+        wait = await self.client.eval(
+            TAKE_SCRIPT,
+            1,
+            f"{self.prefix}:{key}",
+            str(limit.rate),
+            str(limit.burst),
+            repr(now),
+        )
+        return float(wait)
+
+
+def _client_key(scope: Scope) -> str:
+    """
+    Identify the caller by the subject of a valid auth cookie, else by address.
+    """
+    for name, value in scope.get("headers", ()):
+        if name != b"cookie":
+            continue
+        morsel = SimpleCookie(value.decode("latin-1")).get("user")
+        if morsel is None:
+            continue
+        try:
+            claims = decode_access_token(morsel.value)
+        except Exception:
+            break
+        subject = claims.get("sub") or claims.get("email")
+        if subject:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    Answers 429 Too Many Requests with a Retry-After header once a caller has
+    used up the token bucket of a route. Each caller gets one bucket per method
+    and route template, so /transactions/{transaction_id} shares one bucket
+    across IDs.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: RateLimitStore | None = None,
+        default: Limit | None = None,
+        routes: Dict[str, Limit] | None = None,
+        exempt: Tuple[str, ...] | None = None,
+    ):
+        settings = get_settings()
+        self.app = app
+        if store is None:
+            client = get_shared_store()
+            store = (
+                MemoryRateLimitStore(settings.RATE_LIMIT_MAX_KEYS)
+                if client is None
+                else SharedRateLimitStore(client)
+            )
+        self.store = store
+        self.default = default or Limit(
+            settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST
+        )
+        self.routes = (
+            routes
+            if routes is not None
+            else {
+                path: Limit(rate, burst)
+                for path, (rate, burst) in settings.RATE_LIMIT_ROUTES.items()
+            }
+        )
+        self.exempt = (
+            exempt if exempt is not None else tuple(settings.RATE_LIMIT_EXEMPT)
+        )
+        self._templates: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    def _template(self, scope: Scope) -> str:
+        # Matching the routes is the costly part, so templates are memoized by
+        # concrete path.
+        cache_key = (scope["method"], scope["path"])
+        template = self._templates.get(cache_key)
+        if template is not None:
+            return template
+        template = scope["path"]
+        router = scope.get("app")
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", template)
+                break
+        self._templates[cache_key] = template
+        if len(self._templates) > 4096:
+            self._templates.popitem(last=False)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+        template = self._template(scope)
+        limit = self.routes.get(template, self.default)
+        key = f"{_client_key(scope)}:{scope['method']}:{template}"
+        wait = await self.store.take(key, limit, time.time())
+        if wait > 0:
+            metrics.inc("rate_limit_rejected_total", route=template)
+            response = JSONResponse(
+                {"detail": "Too many requests."},
+                status_code=429,
+                headers={"Retry-After": str(max(math.ceil(wait), 1))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,313 @@
+"""
+Reconciliation of wallet balances against confirmed transactions and deposits
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+import pytz
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.sql_app.database import create_session_factory
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import (
+    ArchivedTransactionTotal,
+    Deposit,
+    ReconciliationRun,
+    Transaction,
+    Wallet,
+    WalletCreditShard,
+    WalletDailyBalance,
+)
+
+logger = logging.getLogger(__name__)
+
+Shard = Tuple[Optional[UUID], Optional[UUID]]
+
+
+@dataclass(frozen=True)
+class Drift:
+    wallet_id: UUID
+    currency: Currency
+    balance: Decimal
+    expected: Decimal
+
+    @property
+    def difference(self) -> Decimal:
+        return self.balance - self.expected
+
+
+@dataclass
+class ReconciliationReport:
+    started_at: datetime
+    since: datetime | None = None
+    wallets: int = 0
+    drifts: List[Drift] = field(default_factory=list)
+
+
+def shard_bounds(shards: int) -> List[Shard]:
+    """
+    Split the UUID space into contiguous ranges of wallet IDs.
+        Parameters:
+            shards (int): The number of ranges.
+        Returns:
+            List[Shard]: The (lower, upper) bounds, None meaning unbounded.
+    """
+    step = 2**128 // shards
+    edges = [UUID(int=i * step) for i in range(1, shards)]
+    return list(zip([None] + edges, edges + [None]))
+
+
+def _shard_wallets(shard: Shard, since: datetime | None):
+    lower, upper = shard
+    conditions = []
+    if lower is not None:
+        conditions.append(Wallet.id >= lower)
+    if upper is not None:
+        conditions.append(Wallet.id < upper)
+    if since is not None:
+        # Every balance change since the watermark touched that day's rollup.
+        conditions.append(
+            Wallet.id.in_(
+                select(WalletDailyBalance.wallet_id).where(
+                    WalletDailyBalance.day >= since.date()
+                )
+            )
+        )
+    # Credits still in shards are part of the balance.
+    pending = (
+        select(func.sum(WalletCreditShard.amount))
+        .where(WalletCreditShard.wallet_id == Wallet.id)
+        .scalar_subquery()
+    )
+    return select(
+        Wallet.id,
+        Wallet.user_id,
+        Wallet.currency,
+        (func.coalesce(Wallet.balance, 0) + func.coalesce(pending, 0)).label("balance"),
+    ).where(*conditions)
+
+
+def expected_balances(shard: Shard, since: datetime | None = None):
+    """
+    Build the set-based query returning the wallets of a shard whose balance does
+    not match their deposits plus incoming minus outgoing confirmed transactions,
+    archived ones included.
+        Parameters:
+            shard (Shard): The range of wallet IDs.
+            since (datetime): Only check wallets changed since this watermark.
+        Returns:
+            Select: The query returning id, currency, balance and expected.
+    """
+    wallets = _shard_wallets(shard, since).subquery()
+    users = select(wallets.c.user_id)
+
+    funding = (
+        select(Deposit.wallet_id, func.sum(Deposit.amount).label("total"))
+        .where(Deposit.wallet_id.in_(select(wallets.c.id)))
+        .group_by(Deposit.wallet_id)
+        .subquery()
+    )
+    outgoing = (
+        select(
+            Transaction.sender_id.label("user_id"),
+            Transaction.currency.label("currency"),
+            func.sum(Transaction.amount).label("total"),
+        )
+        .where(Transaction.status == Status.confirmed, Transaction.sender_id.in_(users))
+        .group_by(Transaction.sender_id, Transaction.currency)
+        .subquery()
+    )
+    credit_currency = func.coalesce(Transaction.target_currency, Transaction.currency)
+    incoming = (
+        select(
+            Transaction.recipient_id.label("user_id"),
+            credit_currency.label("currency"),
+            func.sum(
+                func.coalesce(Transaction.target_amount, Transaction.amount)
+            ).label("total"),
+        )
+        .where(
+            Transaction.status == Status.confirmed, Transaction.recipient_id.in_(users)
+        )
+        .group_by(Transaction.recipient_id, credit_currency)
+        .subquery()
+    )
+    archived = (
+        select(ArchivedTransactionTotal)
+        .where(ArchivedTransactionTotal.user_id.in_(users))
+        .subquery()
+    )
+
+    expected = (
+        func.coalesce(funding.c.total, 0)
+        + func.coalesce(incoming.c.total, 0)
+        - func.coalesce(outgoing.c.total, 0)
+        + func.coalesce(archived.c.received, 0)
+        - func.coalesce(archived.c.sent, 0)
+    )
+    return (
+        select(
+            wallets.c.id,
+            wallets.c.currency,
+            wallets.c.balance,
+            expected.label("expected"),
+        )
+        .select_from(wallets)
+        .outerjoin(funding, funding.c.wallet_id == wallets.c.id)
+        .outerjoin(
+            incoming,
+            and_(
+                incoming.c.user_id == wallets.c.user_id,
+                incoming.c.currency == wallets.c.currency,
+            ),
+        )
+        .outerjoin(
+            outgoing,
+            and_(
+                outgoing.c.user_id == wallets.c.user_id,
+                outgoing.c.currency == wallets.c.currency,
+            ),
+        )
+        .outerjoin(
+            archived,
+            and_(
+                archived.c.user_id == wallets.c.user_id,
+                archived.c.currency == wallets.c.currency,
+            ),
+        )
+        .where(func.coalesce(wallets.c.balance, 0) != expected)
+    )
+
+
+async def reconcile_shard(
+    session_factory: sessionmaker, shard: Shard, since: datetime | None = None
+) -> Tuple[int, List[Drift]]:
+    """
+    Reconcile the wallets of one shard on a session of its own.
+        Parameters:
+            session_factory (sessionmaker): The sessions to run with.
+            shard (Shard): The range of wallet IDs.
+            since (datetime): Only check wallets changed since this watermark.
+        Returns:
+            Tuple[int, List[Drift]]: The number of wallets checked and their drifts.
+    """
+    async with session_factory() as db:
+        wallets = _shard_wallets(shard, since).subquery()
+        checked = await db.execute(select(func.count()).select_from(wallets))
+        result = await db.execute(expected_balances(shard, since))
+        drifts = [
+            Drift(
+                wallet_id=wallet_id,
+                currency=currency,
+                balance=Decimal(str(balance or 0)),
+                expected=Decimal(str(expected)),
+            )
+            for wallet_id, currency, balance, expected in result.all()
+        ]
+        return checked.scalar_one(), drifts
+
+
+async def run_reconciliation(
+    session_factory: sessionmaker,
+    shards: int,
+    concurrency: int,
+    incremental: bool = False,
+) -> ReconciliationReport:
+    """
+    Reconcile all wallets shard by shard, at most `concurrency` shards at a time.
+    Incremental runs only check the wallets changed since the last finished run.
+        Parameters:
+            session_factory (sessionmaker): The sessions to run with.
+            shards (int): The number of shards to split the wallets into.
+            concurrency (int): The number of shards reconciled at once.
+            incremental (bool): Start from the watermark of the last finished run.
+        Returns:
+            ReconciliationReport: The wallets checked and the drifts found.
+    """
+    started = time.perf_counter()
+    report = ReconciliationReport(started_at=datetime.now(pytz.utc))
+    async with session_factory() as db:
+        if incremental:
+            result = await db.execute(
+                select(func.max(ReconciliationRun.started_at)).where(
+                    ReconciliationRun.finished_at.is_not(None)
+                )
+            )
+            report.since = result.scalar_one_or_none()
+        run = ReconciliationRun(
+            started_at=report.started_at, incremental=report.since is not None
+        )
+        db.add(run)
+        await db.commit()
+
+        limiter = asyncio.Semaphore(concurrency)
+
+        async def _reconcile(shard: Shard):
+            async with limiter:
+                return await reconcile_shard(session_factory, shard, report.since)
+
+        for checked, drifts in await asyncio.gather(
+            *[_reconcile(shard) for shard in shard_bounds(shards)]
+        ):
+            report.wallets += checked
+            report.drifts.extend(drifts)
+
+        for drift in report.drifts:
+            logger.warning(
+                "Wallet %s (%s) drifted by %s: balance %s, expected %s.",
+                drift.wallet_id,
+                drift.currency.value,
+                drift.difference,
+                drift.balance,
+                drift.expected,
+            )
+        run.finished_at = datetime.now(pytz.utc)
+        run.wallets = report.wallets
+        run.drifted = len(report.drifts)
+        await db.commit()
+
+    metrics.set_gauge("reconciliation_wallets_checked", report.wallets)
+    metrics.set_gauge("reconciliation_wallets_drifted", len(report.drifts))
+    metrics.set_gauge("reconciliation_duration_seconds", time.perf_counter() - started)
+    return report
+
+
+async def reconcile_database(
+    shards: int | None = None,
+    concurrency: int | None = None,
+    incremental: bool = False,
+) -> ReconciliationReport:
+    """
+    Run a reconciliation with a connection pool sized for its concurrency.
+        Parameters:
+            shards (int): The number of shards, RECONCILIATION_SHARDS by default.
+            concurrency (int): The shards at once, RECONCILIATION_CONCURRENCY by default.
+            incremental (bool): Start from the watermark of the last finished run.
+        Returns:
+            ReconciliationReport: The wallets checked and the drifts found.
+    """
+    settings = get_settings()
+    concurrency = concurrency or settings.RECONCILIATION_CONCURRENCY
+    reconciliation_engine = create_async_engine(
+        settings.DATABASE_URL, pool_size=concurrency + 1, max_overflow=0
+    )
+    try:
+        return await run_reconciliation(
+            create_session_factory(reconciliation_engine),
+            shards or settings.RECONCILIATION_SHARDS,
+            concurrency,
+            incremental,
+        )
+    finally:
+        await reconciliation_engine.dispose()
@@ -0,0 +1,199 @@
+"""
+Read-through caches for categories and cards, which change rarely but are read
+on every transfer
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import get_settings
+from app.services.common.broadcast import broadcast
+from app.services.common.cache import MISSING, TTLCache
+from app.services.common.vault import vault
+from app.sql_app.models.models import Card, Category
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CategorySnapshot:
+    id: UUID
+    name: str
+    user_id: UUID
+
+
+@dataclass(frozen=True)
+class CardSnapshot:
+    id: UUID
+    number: str  # masked
+    user_id: UUID
+
+
+category_cache = TTLCache(
+    "categories",
+    settings.REFERENCE_CACHE_TTL_SECONDS,
+    settings.REFERENCE_CACHE_MAX_ENTRIES,
+)
+card_cache = TTLCache(
+    "cards", settings.REFERENCE_CACHE_TTL_SECONDS, settings.REFERENCE_CACHE_MAX_ENTRIES
+)
+
+
+async def _read_through(cache: TTLCache, key, db: AsyncSession, query, snapshot):
+    value = cache.get(key)
+    if value is not MISSING:
+        return value
+    version = cache.version
+    result = await db.execute(query)
+    row = result.scalars().first()
+    if row is None:
+        # Misses are not cached, so a new row is visible right after it is created.
+        return None
+    value = snapshot(row)
+    cache.set(key, value, version)
+    return value
+
+
+def _category_snapshot(category: Category) -> CategorySnapshot:
+    return CategorySnapshot(
+        id=category.id, name=category.name, user_id=category.user_id
+    )
+
+
+def _card_snapshot(card: Card) -> CardSnapshot:
+    return CardSnapshot(id=card.id, number=card.number, user_id=card.user_id)
+
+
+async def get_category_by_name(
+    db: AsyncSession, name: str
+) -> Optional[CategorySnapshot]:
+    """
+    Look up a category by name through the cache.
+        Parameters:
+            db (AsyncSession): The database session, used on a miss.
+            name (str): The name of the category.
+        Returns:
+            CategorySnapshot: The category, or None if it does not exist.
+    """
+    return await _read_through(
+        category_cache,
+        ("name", name),
+        db,
+        select(Category).where(Category.name == name),
+        _category_snapshot,
+    )
+
+
+async def get_category_by_id(
+    db: AsyncSession, category_id: UUID
+) -> Optional[CategorySnapshot]:
+    """
+    Look up a category by ID through the cache.
+        Parameters:
+            db (AsyncSession): The database session, used on a miss.
+            category_id (UUID): The ID of the category.
+        Returns:
+            CategorySnapshot: The category, or None if it does not exist.
+    """
+    return await _read_through(
+        category_cache,
+        ("id", category_id),
+        db,
+        select(Category).where(Category.id == category_id),
+        _category_snapshot,
+    )
+
+
+async def get_card_by_number(
+    db: AsyncSession, number: str, user_id: UUID
+) -> Optional[CardSnapshot]:
+    """
+    Look up a card of the user by number through the cache.
+        Parameters:
+            db (AsyncSession): The database session, used on a miss.
+            number (str): The card number.
+            user_id (UUID): The ID of the card owner.
+        Returns:
+            CardSnapshot: The card, or None if the user has no such card.
+    """
+    # Keyed by digest so that no plaintext card number is held in memory.
+    digest = vault.digest(number)
+    return await _read_through(
+        card_cache,
+        ("number", digest, user_id),
+        db,
+        select(Card).where(Card.number_digest == digest, Card.user_id == user_id),
+        _card_snapshot,
+    )
+
+
+async def get_card_by_id(db: AsyncSession, card_id: UUID) -> Optional[CardSnapshot]:
+    """
+    Look up a card by ID through the cache.
+        Parameters:
+            db (AsyncSession): The database session, used on a miss.
+            card_id (UUID): The ID of the card.
+        Returns:
+            CardSnapshot: The card, or None if it does not exist.
+    """
+    return await _read_through(
+        card_cache,
+        ("id", card_id),
+        db,
+        select(Card).where(Card.id == card_id),
+        _card_snapshot,
+    )
+
+
+def _uuid(value: str | None) -> UUID | None:
+    return None if value is None else UUID(value)
+
+
+def _str(value: UUID | None) -> str | None:
+    return None if value is None else str(value)
+
+
+def _drop_category(data: dict) -> None:
+    category_cache.invalidate(("id", _uuid(data["id"])), ("name", data["name"]))
+
+
+def _drop_card(data: dict) -> None:
+    user_id = _uuid(data["user_id"])
+    card_cache.invalidate(
+        ("id", _uuid(data["id"])),
+        *(("number", digest, user_id) for digest in data["digests"]),
+    )
+
+
+broadcast.subscribe("category", _drop_category)
+broadcast.subscribe("card", _drop_card)
+
+
+def invalidate_category(category_id: UUID, name: str) -> None:
+    """
+    Drop the cached entries of a category in every process after it was created
+    or deleted.
+        Parameters:
+            category_id (UUID): The ID of the category.
+            name (str): The name of the category.
+    """
+    broadcast.send("category", {"id": _str(category_id), "name": name})
+
+
+def invalidate_card(card_id: UUID, user_id: UUID, *digests: str) -> None:
+    """
+    Drop the cached entries of a card in every process after it was created,
+    changed or deleted.
+        Parameters:
+            card_id (UUID): The ID of the card.
+            user_id (UUID): The ID of the card owner.
+            digests (str): The digests of the numbers the card had and has.
+    """
+    broadcast.send(
+        "card",
+        {"id": _str(card_id), "user_id": _str(user_id), "digests": list(digests)},
+    )
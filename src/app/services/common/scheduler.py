@@ -0,0 +1,306 @@
+"""
+Leader-elected scheduling of periodic jobs
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from functools import partial
+from typing import Awaitable, Callable
+
+import pytz
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.services.common.archive import archive_transactions
+from app.services.common.credit_shards import fold_credit_shards
+from app.services.common.expiry import expire_transactions
+from app.services.common.fx import FileRateProvider, refresh_exchange_rates
+from app.services.common.outbox import LogFileSink, OutboxRelay
+from app.services.common.partitions import ensure_partitions_job
+from app.services.crud.recurring_transaction import process_recurring_transactions
+from app.sql_app.database import AsyncSessionLocal, engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class LeaderElection:
+    """
+    Elect a single scheduler leader across all processes using a session-level
+    Postgres advisory lock. The lock is held by a dedicated connection, so when the
+    leader dies the lock is released and a follower takes over on its next heartbeat.
+    """
+
+    def __init__(self, bind: AsyncEngine, lock_key: int):
+        self._bind = bind
+        self._lock_key = lock_key
+        self._connection: AsyncConnection | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._connection is not None
+
+    async def heartbeat(self) -> bool:
+        """
+        Keep the leader connection alive, or try to take over leadership.
+            Returns:
+                bool: True if this process is the leader after the heartbeat.
+        """
+        if self._connection is not None:
+            try:
+                await self._connection.execute(text("SELECT 1"))
+                await self._connection.commit()
+            except Exception:
+                logger.exception("Scheduler leader connection lost, stepping down.")
+                await self._discard_connection()
+        if self._connection is None:
+            await self._try_acquire()
+        metrics.set_gauge("scheduler_is_leader", int(self.is_leader))
+        return self.is_leader
+
+    async def release(self) -> None:
+        """
+        Give up leadership so another process can take over immediately.
+        """
+        if self._connection is None:
+            return
+        try:
+            await self._connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": self._lock_key}
+            )
+            await self._connection.commit()
+            await self._connection.close()
+        except Exception:
+            logger.exception("Failed to release scheduler leadership cleanly.")
+            await self._discard_connection()
+        self._connection = None
+        metrics.set_gauge("scheduler_is_leader", 0)
+
+    async def _try_acquire(self) -> None:
+        connection = await self._bind.connect()
+        try:
+            result = await connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self._lock_key}
+            )
+            acquired = bool(result.scalar())
+            await connection.commit()
+        except Exception:
+            logger.exception("Failed to acquire scheduler leadership.")
+            await connection.invalidate()
+            return
+        if not acquired:
+            await connection.close()
+            return
+        logger.info("This process is now the scheduler leader.")
+        metrics.inc("scheduler_leader_takeovers_total")
+        self._connection = connection
+
+    async def _discard_connection(self) -> None:
+        # Never hand a connection that may still hold the lock back to the pool.
+        connection, self._connection = self._connection, None
+        try:
+            await connection.invalidate()
+        except Exception:
+            logger.exception("Failed to invalidate scheduler leader connection.")
+
+
+def leader_only(
+    election: LeaderElection,
+    job_name: str,
+    job: Callable[[], Awaitable[None]],
+    limiter: asyncio.Semaphore | None = None,
+) -> Callable[[], Awaitable[None]]:
+    """
+    Wrap a job so it only runs in the elected leader and records its metrics.
+        Parameters:
+            election (LeaderElection): The leader election of this process.
+            job_name (str): The name used as the metric label.
+            job (Callable): The coroutine function to run.
+            limiter (asyncio.Semaphore): Optional limit shared by concurrent jobs.
+        Returns:
+            Callable: The wrapped coroutine function.
+    """
+
+    async def _run():
+        if not election.is_leader:
+            metrics.inc("scheduler_job_skipped_total", job=job_name)
+            return
+        if limiter is None:
+            await _timed()
+            return
+        async with limiter:
+            await _timed()
+
+    async def _timed():
+        started = time.perf_counter()
+        try:
+            await job()
+        except Exception:
+            metrics.inc("scheduler_job_errors_total", job=job_name)
+            raise
+        finally:
+            metrics.set_gauge(
+                "scheduler_job_duration_seconds",
+                time.perf_counter() - started,
+                job=job_name,
+            )
+        metrics.inc("scheduler_job_runs_total", job=job_name)
+        metrics.set_gauge(
+            "scheduler_job_last_success_timestamp", time.time(), job=job_name
+        )
+
+    _run.__name__ = job_name
+    return _run
+
+
+def _record_job_event(event) -> None:
+    if event.code == EVENT_JOB_SUBMITTED:
+        scheduled = event.scheduled_run_times[-1]
+        lag = (datetime.now(pytz.utc) - scheduled).total_seconds()
+        metrics.set_gauge("scheduler_job_lag_seconds", max(lag, 0.0), job=event.job_id)
+    elif event.code == EVENT_JOB_MISSED:
+        metrics.inc("scheduler_job_missed_total", job=event.job_id)
+
+
+async def process_recurring_job(session_factory: sessionmaker = AsyncSessionLocal):
+    async with session_factory() as db:
+        try:
+            await process_recurring_transactions(db)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+
+async def refresh_rates_job(
+    session_factory: sessionmaker = AsyncSessionLocal,
+    provider: FileRateProvider | None = None,
+):
+    async with session_factory() as db:
+        await refresh_exchange_rates(db, provider)
+
+
+def create_scheduler(
+    election: LeaderElection,
+    session_factory: sessionmaker = AsyncSessionLocal,
+    concurrency: int | None = None,
+) -> AsyncIOScheduler:
+    """
+    Create the scheduler with the leadership heartbeat and the leader-only jobs.
+        Parameters:
+            election (LeaderElection): The leader election of this process.
+            session_factory (sessionmaker): The sessions the jobs run with.
+            concurrency (int): The maximum number of jobs running at once.
+        Returns:
+            AsyncIOScheduler: The configured, not yet started scheduler.
+    """
+    limiter = asyncio.Semaphore(concurrency) if concurrency else None
+    scheduler = AsyncIOScheduler(
+        timezone=pytz.utc, job_defaults={"coalesce": True, "max_instances": 1}
+    )
+    scheduler.add_listener(_record_job_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
+    scheduler.add_job(
+        election.heartbeat,
+        "interval",
+        seconds=settings.SCHEDULER_HEARTBEAT_SECONDS,
+        id="leader_heartbeat",
+        next_run_time=datetime.now(pytz.utc),
+    )
+    scheduler.add_job(
+        leader_only(
+            election,
+            "recurring_transactions",
+            partial(process_recurring_job, session_factory),
+            limiter,
+        ),
+        "interval",
+        minutes=settings.RECURRING_INTERVAL_MINUTES,
+        id="recurring_transactions",
+    )
+    scheduler.add_job(
+        leader_only(
+            election,
+            "transaction_expiry",
+            partial(expire_transactions, session_factory),
+            limiter,
+        ),
+        "interval",
+        minutes=settings.TRANSACTION_EXPIRY_INTERVAL_MINUTES,
+        id="transaction_expiry",
+    )
+    scheduler.add_job(
+        leader_only(
+            election,
+            "transaction_partitions",
+            partial(ensure_partitions_job, session_factory),
+            limiter,
+        ),
+        "interval",
+        hours=24,
+        id="transaction_partitions",
+        next_run_time=datetime.now(pytz.utc),
+    )
+    scheduler.add_job(
+        leader_only(
+            election,
+            "wallet_credit_fold",
+            partial(fold_credit_shards, session_factory),
+            limiter,
+        ),
+        "interval",
+        seconds=settings.WALLET_CREDIT_FOLD_SECONDS,
+        id="wallet_credit_fold",
+    )
+    if settings.TRANSACTION_ARCHIVE_DIR:
+        scheduler.add_job(
+            leader_only(
+                election,
+                "transaction_archive",
+                partial(archive_transactions, session_factory),
+                limiter,
+            ),
+            "interval",
+            hours=24,
+            id="transaction_archive",
+        )
+    # The outbox is written on every transfer and wallet change, so it is relayed
+    # and purged even without a sink, or it would grow without bound.
+    sinks = [LogFileSink(settings.OUTBOX_LOG_FILE)] if settings.OUTBOX_LOG_FILE else []
+    relay = OutboxRelay(session_factory, sinks)
+    scheduler.add_job(
+        leader_only(election, "outbox_relay", relay.drain, limiter),
+        "interval",
+        seconds=settings.OUTBOX_RELAY_INTERVAL_SECONDS,
+        id="outbox_relay",
+    )
+    scheduler.add_job(
+        leader_only(election, "outbox_purge", relay.purge, limiter),
+        "interval",
+        minutes=settings.OUTBOX_PURGE_INTERVAL_MINUTES,
+        id="outbox_purge",
+    )
+    if settings.FX_RATES_FILE:
+        provider = FileRateProvider(settings.FX_RATES_FILE)
+        scheduler.add_job(
+            leader_only(
+                election,
+                "fx_rates",
+                partial(refresh_rates_job, session_factory, provider),
+                limiter,
+            ),
+            "interval",
+            minutes=settings.FX_RATES_REFRESH_MINUTES,
+            id="fx_rates",
+            next_run_time=datetime.now(pytz.utc),
+        )
+    return scheduler
+
+
+election = LeaderElection(engine, settings.SCHEDULER_LOCK_KEY)
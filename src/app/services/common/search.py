@@ -0,0 +1,207 @@
+"""
+Ranked user search: pg_trgm on Postgres, an in-memory trigram index elsewhere
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.sql_app.models.models import User
+
+Cursor = Tuple[float, UUID]
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(value: str | None) -> Set[str]:
+    """
+    Split a value into trigrams the way pg_trgm does: lowercase alphanumeric
+    words padded with two spaces in front and one behind.
+    """
+    grams = set()
+    for word in _WORD.findall((value or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(left: str | None, right: str | None) -> float:
+    """
+    The share of trigrams two values have in common, like pg_trgm's similarity().
+    """
+    a, b = trigrams(left), trigrams(right)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def parse_cursor(cursor: str | None) -> Optional[Cursor]:
+    """
+    Parse a "<score>:<user_id>" cursor returned with the previous page.
+    """
+    if not cursor:
+        return None
+    try:
+        score, user_id = cursor.rsplit(":", 1)
+        return float(score), UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+
+
+def format_cursor(score: float, user_id: UUID) -> str:
+    return f"{score!r}:{user_id}"
+
+
+def _like_pattern(search: str) -> str:
+    escaped = search.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
+class NGramIndex:
+    """
+    In-memory trigram index over user emails and phone numbers, used where
+    pg_trgm is not available, e.g. the SQLite test database. Candidates are taken
+    from the posting lists of the search's inner trigrams, as pg_trgm does for
+    ILIKE, and then verified and ranked.
+    """
+
+    def __init__(self, documents: Iterable[Tuple[UUID, str | None, str | None]]):
+        self._documents: Dict[UUID, Tuple[str, str]] = {}
+        self._postings: Dict[str, Set[UUID]] = {}
+        for user_id, email, phone_number in documents:
+            fields = ((email or "").lower(), (phone_number or "").lower())
+            self._documents[user_id] = fields
+            for field in fields:
+                for i in range(len(field) - 2):
+                    self._postings.setdefault(field[i : i + 3], set()).add(user_id)
+
+    def search(self, search: str | None) -> List[Cursor]:
+        """
+        Find the users whose email or phone number contains the search.
+            Parameters:
+                search (str): The search query, empty to match everyone.
+            Returns:
+                List[Cursor]: (score, user ID) pairs, best match first.
+        """
+        if not search:
+            return sorted((0.0, user_id) for user_id in self._documents)
+        needle = search.lower()
+        grams = {needle[i : i + 3] for i in range(len(needle) - 2)}
+        if grams:
+            candidates = set.intersection(
+                *(self._postings.get(gram, set()) for gram in grams)
+            )
+        else:
+            candidates = set(self._documents)
+        ranked = []
+        for user_id in candidates:
+            email, phone_number = self._documents[user_id]
+            if needle in email or needle in phone_number:
+                score = max(similarity(search, email), similarity(search, phone_number))
+                ranked.append((score, user_id))
+        ranked.sort(key=lambda match: (-match[0], match[1]))
+        return ranked
+
+
+async def _search_postgres(
+    db: AsyncSession, search: str | None, after: Cursor | None, skip: int, limit: int
+) -> Tuple[List[Tuple[User, float]], int]:
+    conditions = []
+    score = literal(0.0)
+    if search:
+        pattern = _like_pattern(search)
+        # Both predicates are served by the gin_trgm_ops indexes on users.
+        conditions.append(
+            or_(
+                User.email.ilike(pattern, escape="/"),
+                User.phone_number.ilike(pattern, escape="/"),
+            )
+        )
+        score = func.greatest(
+            func.word_similarity(search, User.email),
+            func.word_similarity(search, func.coalesce(User.phone_number, "")),
+        )
+
+    page = select(User, score.label("score")).where(*conditions)
+    if after is not None:
+        after_score, after_id = after
+        page = page.where(
+            or_(score < after_score, and_(score == after_score, User.id > after_id))
+        )
+    result = await db.execute(
+        page.order_by(score.desc(), User.id).offset(skip).limit(limit + 1)
+    )
+    rows = [(user, float(rank)) for user, rank in result.all()]
+
+    # The planner's row estimate is the approximate total; nothing is executed.
+    estimate = select(User.id).where(*conditions)
+    connection = await db.connection()
+    sql = estimate.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return rows, int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _search_in_memory(
+    db: AsyncSession, search: str | None, after: Cursor | None, skip: int, limit: int
+) -> Tuple[List[Tuple[User, float]], int]:
+    documents = await db.execute(select(User.id, User.email, User.phone_number))
+    ranked = NGramIndex(documents.all()).search(search)
+    total = len(ranked)
+    if after is not None:
+        after_key = (-after[0], after[1])
+        ranked = [match for match in ranked if (-match[0], match[1]) > after_key]
+    ranked = ranked[skip : skip + limit + 1]
+    if not ranked:
+        return [], total
+    result = await db.execute(
+        select(User).where(User.id.in_([user_id for _, user_id in ranked]))
+    )
+    users = {user.id: user for user in result.scalars().all()}
+    return [(users[user_id], score) for score, user_id in ranked], total
+
+
+async def rank_users(
+    db: AsyncSession,
+    search: str | None,
+    skip: int,
+    limit: int,
+    cursor: str | None = None,
+) -> dict:
+    """
+    Search users by email or phone number, best match first.
+        Parameters:
+            db (AsyncSession): The database session.
+            search (str): The search query, empty to list all users.
+            skip (int): The number of users to skip after the cursor.
+            limit (int): The number of users to return.
+            cursor (str): The next_cursor of the previous page.
+        Returns:
+            dict: The users, the approximate total and the cursor of the next page.
+    """
+    after = parse_cursor(cursor)
+    if db.get_bind().dialect.name == "postgresql":
+        rows, total = await _search_postgres(db, search, after, skip, limit)
+    else:
+        rows, total = await _search_in_memory(db, search, after, skip, limit)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_user, last_score = rows[-1]
+        next_cursor = format_cursor(last_score, last_user.id)
+    return {
+        "users": [user for user, _ in rows],
+        "total": total,
+        "next_cursor": next_cursor,
+    }
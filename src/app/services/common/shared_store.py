@@ -0,0 +1,28 @@
+"""
+Connection to the Redis-compatible store shared by all nodes
+"""
+
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+@lru_cache
+def get_shared_store():
+    """
+    Connect to the shared store configured in SHARED_STORE_URL.
+        Returns:
+            Redis: The asyncio client, or None when no shared store is configured
+                and every node keeps its counters in process.
+    """
+    url = get_settings().SHARED_STORE_URL
+    if not url:
+        return None
+    try:
+        from redis import asyncio as redis
+    except ImportError as ex:
+        raise RuntimeError(
+            "SHARED_STORE_URL is set but the redis package is not installed; "
+            "install the project with the [shared-store] extra."
+        ) from ex
+    return redis.from_url(url)
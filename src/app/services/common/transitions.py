@@ -0,0 +1,141 @@
+"""
+Guarded status transitions of transactions, each a single UPDATE ... RETURNING
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.sql_app.models.enums import Status
+from app.sql_app.models.models import Transaction
+
+
+@dataclass(frozen=True)
+class Transition:
+    """
+    A status change a transaction may go through.
+        sources: The statuses the transaction may be in.
+        target: The status it moves to.
+        actor: The column the acting user must match, None if anyone may act.
+        forbidden: The detail of the 403 when the actor does not match.
+        conflict: The detail of the 409 when the transaction is in another status.
+        not_found: The detail of the 404, formatted with the transaction_id.
+    """
+
+    sources: Tuple[Status, ...]
+    target: Status
+    actor: Optional[str]
+    forbidden: str
+    conflict: str
+    not_found: str = "Transaction with id {transaction_id} not found."
+
+
+CONFIRM = Transition(
+    sources=(Status.pending,),
+    target=Status.awaiting,
+    actor="sender_id",
+    forbidden="You are not allowed to confirm this transaction.",
+    conflict="You can only confirm transactions that are pending your confirmation.",
+)
+APPROVE = Transition(
+    sources=(Status.awaiting,),
+    target=Status.confirmed,
+    actor="recipient_id",
+    forbidden="You are not allowed to approve this transaction.",
+    conflict="You can only approve transactions that are awaiting your approval.",
+)
+REJECT = Transition(
+    sources=(Status.awaiting,),
+    target=Status.declined,
+    actor="recipient_id",
+    forbidden="You are not allowed to reject this transaction.",
+    conflict="You can only reject awaiting transactions.",
+)
+DENY = Transition(
+    sources=(Status.pending, Status.awaiting),
+    target=Status.declined,
+    actor=None,
+    forbidden="Only admins can deny transactions.",
+    conflict="Transaction is not pending or awaiting.",
+    not_found="Transaction not found.",
+)
+
+
+def transition_statement(
+    transition: Transition, transaction_id: UUID, actor_id: UUID | None = None
+):
+    """
+    Build the UPDATE that applies a transition only if the transaction is in one of
+    its source statuses and, if it has an actor, belongs to the acting user.
+        Parameters:
+            transition (Transition): The transition to apply.
+            transaction_id (UUID): The ID of the transaction.
+            actor_id (UUID): The ID of the acting user.
+        Returns:
+            Update: The statement returning the updated transaction.
+    """
+    conditions = [
+        Transaction.id == transaction_id,
+        Transaction.status.in_(transition.sources),
+    ]
+    if transition.actor is not None:
+        conditions.append(getattr(Transaction, transition.actor) == actor_id)
+    return (
+        update(Transaction)
+        .where(*conditions)
+        .values(status=transition.target)
+        .returning(Transaction)
+    )
+
+
+async def _explain_failure(
+    db: AsyncSession, transition: Transition, transaction_id: UUID, actor_id
+) -> HTTPException:
+    columns = [Transaction.status]
+    if transition.actor is not None:
+        columns.append(getattr(Transaction, transition.actor))
+    result = await db.execute(select(*columns).where(Transaction.id == transaction_id))
+    row = result.first()
+    if row is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=transition.not_found.format(transaction_id=transaction_id),
+        )
+    if transition.actor is not None and row[1] != actor_id:
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=transition.forbidden
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT, detail=transition.conflict
+    )
+
+
+async def apply_transition(
+    db: AsyncSession,
+    transition: Transition,
+    transaction_id: UUID,
+    actor_id: UUID | None = None,
+) -> Transaction:
+    """
+    Apply a transition in one round trip. Only when no row was updated is the
+    transaction probed once to tell why: it does not exist, it belongs to another
+    user, or it is no longer in a source status. The caller commits.
+        Parameters:
+            db (AsyncSession): The database session.
+            transition (Transition): The transition to apply.
+            transaction_id (UUID): The ID of the transaction.
+            actor_id (UUID): The ID of the acting user.
+        Returns:
+            Transaction: The updated transaction.
+    """
+    result = await db.execute(
+        transition_statement(transition, transaction_id, actor_id)
+    )
+    transaction = result.scalars().first()
+    if transaction is None:
+        raise await _explain_failure(db, transition, transaction_id, actor_id)
+    return transaction
@@ -0,0 +1,71 @@
+"""
+Card vault: card numbers and CVVs are encrypted at rest and looked up by digest
+"""
+
+import base64
+import hashlib
+import hmac
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class CardVault:
+    """
+    Encrypts card secrets with Fernet and derives a keyed HMAC-SHA256 digest of
+    the card number. The digest is deterministic, so it is stored in a unique,
+    indexed column and a card is found by number without decrypting any row.
+    The encryption and HMAC keys are both derived from one secret, but neither
+    can be recovered from the other.
+    """
+
+    def __init__(self, secret: str):
+        seed = secret.encode()
+        self._fernet = Fernet(
+            base64.urlsafe_b64encode(hashlib.sha256(b"encrypt:" + seed).digest())
+        )
+        self._hmac_key = hashlib.sha256(b"hmac:" + seed).digest()
+
+    def digest(self, number: str) -> str:
+        """
+        Return the lookup digest of a card number.
+            Parameters:
+                number (str): The card number.
+            Returns:
+                str: The hex HMAC-SHA256 of the number.
+        """
+        return hmac.new(self._hmac_key, number.encode(), hashlib.sha256).hexdigest()
+
+    def encrypt(self, value: str) -> str:
+        """
+        Encrypt a card secret for storage.
+            Parameters:
+                value (str): The plaintext value.
+            Returns:
+                str: The Fernet token.
+        """
+        return self._fernet.encrypt(value.encode()).decode()
+
+    def decrypt(self, token: str) -> str:
+        """
+        Decrypt a stored card secret.
+            Parameters:
+                token (str): The Fernet token.
+            Returns:
+                str: The plaintext value.
+        """
+        try:
+            return self._fernet.decrypt(token.encode()).decode()
+        except InvalidToken:
+            raise ValueError("Card secret was not encrypted with this vault key.")
+
+
+def mask(last4: str | None) -> str:
+    # Matches Card.number, for rows read without the model.
+    return f"**** **** **** {last4 or ''}"
+
+
+vault = CardVault(settings.CARD_VAULT_SECRET)
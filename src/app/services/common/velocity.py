@@ -0,0 +1,471 @@
+"""
+Velocity rules limiting how fast users move money, over sliding-window counters
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Hashable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.services.common import metrics
+from app.services.common.shared_store import get_shared_store
+from app.sql_app.models.enums import Currency
+
+# Each window is tracked in this many buckets, so it slides in steps of 1/60th.
+BUCKETS = 60
+
+
+@dataclass(frozen=True)
+class TransferAttempt:
+    sender_id: UUID
+    recipient_id: UUID
+    card_id: UUID
+    amount: Decimal
+    currency: Currency
+    new_recipient: bool = False
+
+
+@dataclass(frozen=True)
+class VelocityRule:
+    """
+    A limit on the transfers sharing a key within a window. The key function
+    returns None for the transfers the rule does not apply to. A rule keyed on
+    new_recipient says so, since that flag costs a query to compute.
+    """
+
+    name: str
+    window_seconds: int
+    key: Callable[[TransferAttempt], Optional[Hashable]]
+    max_count: int | None = None
+    max_amount: Decimal | None = None
+    uses_new_recipient: bool = False
+
+    @property
+    def bucket_seconds(self) -> float:
+        return self.window_seconds / BUCKETS
+
+
+@dataclass(frozen=True)
+class Violation:
+    rule: str
+    retry_after: int
+
+
+Check = Tuple[VelocityRule, Hashable, Decimal]
+
+
+@dataclass(frozen=True)
+class Reservation:
+    """
+    The checks a transfer was counted in and when, to take it back out if the
+    transfer is not written after all.
+    """
+
+    checks: Tuple[Check, ...]
+    now: float
+
+
+class SlidingWindow:
+    """
+    The count and sum of the events of one key over the last BUCKETS buckets.
+    Reads and updates clear the buckets that left the window and keep running
+    totals, so both are O(1) amortized.
+    """
+
+    __slots__ = ("counts", "amounts", "head", "count", "amount")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.amounts = [Decimal(0)] * BUCKETS
+        self.head: int | None = None
+        self.count = 0
+        self.amount = Decimal(0)
+
+    def _advance(self, bucket: int) -> None:
+        if self.head is None:
+            self.head = bucket
+            return
+        for index in range(self.head + 1, min(bucket, self.head + BUCKETS) + 1):
+            slot = index % BUCKETS
+            self.count -= self.counts[slot]
+            self.amount -= self.amounts[slot]
+            self.counts[slot] = 0
+            self.amounts[slot] = Decimal(0)
+        self.head = max(self.head, bucket)
+
+    def read(self, bucket: int) -> Tuple[int, Decimal]:
+        self._advance(bucket)
+        return self.count, self.amount
+
+    def add(self, bucket: int, amount: Decimal) -> None:
+        self._advance(bucket)
+        slot = bucket % BUCKETS
+        self.counts[slot] += 1
+        self.amounts[slot] += amount
+        self.count += 1
+        self.amount += amount
+
+    def remove(self, bucket: int, amount: Decimal) -> None:
+        # An event whose bucket already left the window has nothing to undo.
+        if self.head is None or bucket <= self.head - BUCKETS:
+            return
+        slot = bucket % BUCKETS
+        if not self.counts[slot]:
+            return
+        self.counts[slot] -= 1
+        self.amounts[slot] -= amount
+        self.count -= 1
+        self.amount -= amount
+
+    def oldest(self) -> int | None:
+        """
+        The index of the oldest bucket still holding events.
+        """
+        if self.head is None:
+            return None
+        for index in range(self.head - BUCKETS + 1, self.head + 1):
+            if self.counts[index % BUCKETS]:
+                return index
+        return None
+
+
+def _exceeds(rule: VelocityRule, count: int, total: Decimal, amount: Decimal) -> bool:
+    if rule.max_count is not None and count + 1 > rule.max_count:
+        return True
+    return rule.max_amount is not None and total + amount > rule.max_amount
+
+
+def _retry_after(rule: VelocityRule, oldest: int | None, now: float) -> int:
+    if oldest is None:
+        return rule.window_seconds
+    frees_at = (oldest + BUCKETS) * rule.bucket_seconds
+    return max(math.ceil(frees_at - now), 1)
+
+
+class VelocityStore(ABC):
+    """
+    Keeps the sliding windows of the velocity rules.
+    """
+
+    @abstractmethod
+    async def check_and_record(
+        self, checks: Sequence[Check], now: float
+    ) -> Violation | None:
+        """
+        Count a transfer in the window of every check, unless that would break
+        any of their rules. Checking and recording is atomic per store.
+            Parameters:
+                checks (Sequence[Check]): The rule, key and amount of each check.
+                now (float): The current time in seconds.
+            Returns:
+                Violation: The first rule broken, or None if the transfer counted.
+        """
+
+    @abstractmethod
+    async def release(self, checks: Sequence[Check], now: float) -> None:
+        """
+        Take a transfer counted at the given time back out of its windows.
+            Parameters:
+                checks (Sequence[Check]): The rule, key and amount of each check.
+                now (float): The time the transfer was counted at.
+        """
+
+
+class MemoryVelocityStore(VelocityStore):
+    """
+    Windows in process memory. Each node enforces the limits on its own, so
+    with N nodes a user can get up to N times the limits. The least recently
+    used windows are dropped once there are more than max_keys of them.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[Tuple[str, Hashable], SlidingWindow]" = (
+            OrderedDict()
+        )
+
+    def _window(self, rule: VelocityRule, key: Hashable) -> SlidingWindow:
+        window = self._windows.get((rule.name, key))
+        if window is None:
+            window = self._windows[(rule.name, key)] = SlidingWindow()
+            if len(self._windows) > self.max_keys:
+                self._evict()
+        else:
+            self._windows.move_to_end((rule.name, key))
+        return window
+
+    def _evict(self) -> None:
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+            metrics.inc("velocity_windows_evicted_total")
+
+    async def check_and_record(
+        self, checks: Sequence[Check], now: float
+    ) -> Violation | None:
+        windows = []
+        for rule, key, amount in checks:
+            bucket = int(now // rule.bucket_seconds)
+            window = self._window(rule, key)
+            count, total = window.read(bucket)
+            if _exceeds(rule, count, total, amount):
+                return Violation(rule.name, _retry_after(rule, window.oldest(), now))
+            windows.append((window, bucket, amount))
+        for window, bucket, amount in windows:
+            window.add(bucket, amount)
+        return None
+
+    async def release(self, checks: Sequence[Check], now: float) -> None:
+        for rule, key, amount in checks:
+            window = self._windows.get((rule.name, key))
+            if window is not None:
+                window.remove(int(now // rule.bucket_seconds), amount)
+
+
+# Sums each window over its hash of per-bucket fields, then records the transfer
+# in all of them only if none is exceeded. Returns {index, oldest bucket} of the
+# first exceeded window, or {0, 0}.
+CHECK_AND_RECORD_SCRIPT = """
+local checks = #KEYS
+for i = 1, checks do
+    local arg = (i - 1) * 6
+    local bucket = tonumber(ARGV[arg + 1])
+    local first = bucket - tonumber(ARGV[arg + 2]) + 1
+    local max_count = tonumber(ARGV[arg + 3])
+    local max_amount = tonumber(ARGV[arg + 4])
+    local amount = tonumber(ARGV[arg + 5])
+    local fields = redis.call('HGETALL', KEYS[i])
+    local count, total, oldest = 0, 0, nil
+    for j = 1, #fields, 2 do
+        local index = tonumber(string.sub(fields[j], 3))
+        if index < first then
+            redis.call('HDEL', KEYS[i], fields[j])
+        elseif string.sub(fields[j], 1, 1) == 'c' then
+            count = count + tonumber(fields[j + 1])
+            if oldest == nil or index < oldest then
+                oldest = index
+            end
+        else
+            total = total + tonumber(fields[j + 1])
+        end
+    end
+    if (max_count >= 0 and count + 1 > max_count)
+        or (max_amount >= 0 and total + amount > max_amount) then
+        return {i, oldest or 0}
+    end
+end
+for i = 1, checks do
+    local arg = (i - 1) * 6
+    local bucket = ARGV[arg + 1]
+    redis.call('HINCRBY', KEYS[i], 'c:' .. bucket, 1)
+    redis.call('HINCRBYFLOAT', KEYS[i], 'a:' .. bucket, ARGV[arg + 5])
+    redis.call('PEXPIRE', KEYS[i], ARGV[arg + 6])
+end
+return {0, 0}
+"""
+
+
+# Takes one transfer back out of the bucket it was recorded in, unless that bucket
+# already expired.
+RELEASE_SCRIPT = """
+for i = 1, #KEYS do
+    local arg = (i - 1) * 2
+    local bucket = ARGV[arg + 1]
+    if redis.call('HEXISTS', KEYS[i], 'c:' .. bucket) == 1 then
+        redis.call('HINCRBY', KEYS[i], 'c:' .. bucket, -1)
+        redis.call('HINCRBYFLOAT', KEYS[i], 'a:' .. bucket, ARGV[arg + 2])
+    end
+end
+return 0
+"""
+
+
+class SharedVelocityStore(VelocityStore):
+    """
+    Windows in a Redis-compatible store shared by all nodes, as one hash of
+    per-bucket counts and sums per rule and key, updated by a server-side script
+    so concurrent transfers on different nodes cannot both take the last slot.
+    Sums are kept as floats by the store.
+    """
+
+    def __init__(self, client, prefix: str = "velocity"):
+        self.client = client
+        self.prefix = prefix
+
+    async def check_and_record(
+        self, checks: Sequence[Check], now: float
+    ) -> Violation | None:
+        if not checks:
+            return None
+        keys: List[str] = []
+        args: List[str] = []
+        for rule, key, amount in checks:
+            keys.append(f"{self.prefix}:{rule.name}:{key}")
+            args.extend(
+                [
+                    str(int(now // rule.bucket_seconds)),
+                    str(BUCKETS),
+                    str(-1 if rule.max_count is None else rule.max_count),
+                    str(-1 if rule.max_amount is None else rule.max_amount),
+                    str(amount),
+                    str(rule.window_seconds * 1000),
+                ]
+            )
+        index, oldest = await self.client.eval(
+            CHECK_AND_RECORD_SCRIPT, len(keys), *keys, *args
+        )
+        if not int(index):
+            return None
+        rule = checks[int(index) - 1][0]
+        return Violation(rule.name, _retry_after(rule, int(oldest) or None, now))
+
+    async def release(self, checks: Sequence[Check], now: float) -> None:
+        if not checks:
+            return
+        keys: List[str] = []
+        args: List[str] = []
+        for rule, key, amount in checks:
+            keys.append(f"{self.prefix}:{rule.name}:{key}")
+            args.extend([str(int(now // rule.bucket_seconds)), str(-amount)])
+        await self.client.eval(RELEASE_SCRIPT, len(keys), *keys, *args)
+
+
+def default_rules() -> List[VelocityRule]:
+    """
+    Build the rules from the settings. A limit of 0 disables its rule.
+    """
+    settings = get_settings()
+    if not settings.VELOCITY_ENABLED:
+        return []
+    rules = []
+    if settings.VELOCITY_MAX_COUNT:
+        rules.append(
+            VelocityRule(
+                "user_count",
+                settings.VELOCITY_WINDOW_SECONDS,
+                lambda attempt: attempt.sender_id,
+                max_count=settings.VELOCITY_MAX_COUNT,
+            )
+        )
+    for currency, limit in settings.VELOCITY_MAX_AMOUNT.items():
+        if not limit:
+            continue
+        rules.append(
+            VelocityRule(
+                f"user_amount_{currency}",
+                settings.VELOCITY_WINDOW_SECONDS,
+                lambda attempt, currency=currency: attempt.sender_id
+                if attempt.currency.value == currency
+                else None,
+                max_amount=Decimal(limit),
+            )
+        )
+    if settings.VELOCITY_NEW_RECIPIENT_MAX:
+        rules.append(
+            VelocityRule(
+                "new_recipients",
+                settings.VELOCITY_NEW_RECIPIENT_WINDOW_SECONDS,
+                lambda attempt: attempt.sender_id if attempt.new_recipient else None,
+                max_count=settings.VELOCITY_NEW_RECIPIENT_MAX,
+                uses_new_recipient=True,
+            )
+        )
+    if settings.VELOCITY_CARD_BURST_MAX:
+        rules.append(
+            VelocityRule(
+                "card_burst",
+                settings.VELOCITY_CARD_BURST_SECONDS,
+                lambda attempt: attempt.card_id,
+                max_count=settings.VELOCITY_CARD_BURST_MAX,
+            )
+        )
+    return rules
+
+
+class VelocityEngine:
+    """
+    Evaluates the velocity rules of a transfer against a store of windows.
+    """
+
+    def __init__(self, rules: List[VelocityRule], store: VelocityStore):
+        self.rules = rules
+        self.store = store
+
+    @property
+    def uses_new_recipient(self) -> bool:
+        return any(rule.uses_new_recipient for rule in self.rules)
+
+    def _checks(self, attempt: TransferAttempt) -> Tuple[Check, ...]:
+        checks = []
+        for rule in self.rules:
+            key = rule.key(attempt)
+            if key is not None:
+                checks.append((rule, key, attempt.amount))
+        return tuple(checks)
+
+    async def evaluate(
+        self, attempt: TransferAttempt, now: float | None = None
+    ) -> Violation | None:
+        """
+        Count a transfer against every rule that applies to it.
+            Parameters:
+                attempt (TransferAttempt): The transfer about to be created.
+                now (float): The current time in seconds, the clock by default.
+            Returns:
+                Violation: The first rule the transfer breaks, or None.
+        """
+        started = time.perf_counter()
+        violation = await self.store.check_and_record(
+            self._checks(attempt), time.time() if now is None else now
+        )
+        metrics.set_gauge("velocity_evaluation_seconds", time.perf_counter() - started)
+        if violation is not None:
+            metrics.inc("velocity_rejections_total", rule=violation.rule)
+        return violation
+
+    async def enforce(self, attempt: TransferAttempt) -> Reservation:
+        """
+        Count a transfer, raising 429 Too Many Requests if it breaks a rule. The
+        transfer is counted before it is written, so concurrent transfers cannot
+        both take the last slot; release the reservation if the write fails.
+            Parameters:
+                attempt (TransferAttempt): The transfer about to be created.
+            Returns:
+                Reservation: What to release if the transfer is not written.
+        """
+        now = time.time()
+        violation = await self.evaluate(attempt, now)
+        if violation is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Transfer limit exceeded: {violation.rule}.",
+                headers={"Retry-After": str(violation.retry_after)},
+            )
+        return Reservation(self._checks(attempt), now)
+
+    async def release(self, reservation: Reservation) -> None:
+        """
+        Take a counted transfer back out of the windows, after its write failed.
+            Parameters:
+                reservation (Reservation): The reservation returned by enforce.
+        """
+        await self.store.release(reservation.checks, reservation.now)
+        metrics.inc("velocity_releases_total")
+
+
+def create_engine() -> VelocityEngine:
+    client = get_shared_store()
+    if client is None:
+        store = MemoryVelocityStore(get_settings().VELOCITY_MAX_KEYS)
+    else:
+        store = SharedVelocityStore(client)
+    return VelocityEngine(default_rules(), store)
+
+
+velocity = create_engine()
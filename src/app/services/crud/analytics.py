@@ -0,0 +1,227 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+import numpy as np
+import pytz
+from sqlalchemy import extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.common.broadcast import broadcast
+from app.services.common.cache import TTLCache
+from app.services.common.fx import CURRENCIES, conversion_factors, rate_cache
+from app.services.common.money import quantize
+from app.services.common.partitions import add_months, month_start
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import Category, Transaction, User
+
+settings = get_settings()
+
+spending_cache = TTLCache("spending_analytics", settings.ANALYTICS_TTL_SECONDS)
+broadcast.subscribe(
+    "spending_analytics", lambda data: spending_cache.invalidate(*data["user_ids"])
+)
+
+
+@dataclass(frozen=True)
+class SpendingGroups:
+    """
+    The confirmed outgoing amounts of a user grouped in their own currencies,
+    indexed like CURRENCIES on the first axis. The sums are exact Decimals in
+    object arrays, sized by the groups rather than by the transactions.
+    """
+
+    months: List[str]
+    categories: List[str]
+    recipients: List[str]
+    by_category: np.ndarray  # (currency, category, month)
+    by_recipient: np.ndarray  # (currency, recipient)
+    recipient_counts: np.ndarray  # (recipient,)
+    count: int
+
+
+def _decimal_zeros(shape) -> np.ndarray:
+    return np.full(shape, Decimal(0), dtype=object)
+
+
+def _utc(column, dialect: str):
+    # Months are UTC months, whatever the time zone of the Postgres session.
+    return func.timezone("UTC", column) if dialect == "postgresql" else column
+
+
+async def load_spending_groups(
+    db: AsyncSession, user_id, months: int, now: datetime | None = None
+) -> SpendingGroups:
+    """
+    Sum the user's confirmed outgoing transactions of the last months in the
+    database, grouped once by currency, category and month and once by currency
+    and recipient, so only the groups are read back.
+        Parameters:
+            db (AsyncSession): The database session.
+            user_id (UUID): The ID of the user.
+            months (int): The number of months, the current one included.
+            now (datetime): The current time.
+        Returns:
+            SpendingGroups: The sums per currency, category, month and recipient.
+    """
+    first = add_months(month_start(now or datetime.now(pytz.utc)), 1 - months)
+    start = datetime(first.year, first.month, 1, tzinfo=pytz.utc)
+    conditions = (
+        Transaction.sender_id == user_id,
+        Transaction.status == Status.confirmed,
+        Transaction.timestamp >= start,
+    )
+    timestamp = _utc(Transaction.timestamp, db.get_bind().dialect.name)
+    year, month = extract("year", timestamp), extract("month", timestamp)
+    result = await db.execute(
+        select(
+            Transaction.currency,
+            Category.name,
+            year,
+            month,
+            func.sum(Transaction.amount),
+        )
+        .join(Category, Category.id == Transaction.category_id)
+        .where(*conditions)
+        .group_by(Transaction.currency, Category.name, year, month)
+    )
+    category_rows = result.all()
+    result = await db.execute(
+        select(
+            Transaction.currency,
+            User.email,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id),
+        )
+        .join(User, User.id == Transaction.recipient_id)
+        .where(*conditions)
+        .group_by(Transaction.currency, User.email)
+    )
+    recipient_rows = result.all()
+
+    labels = [add_months(first, offset).strftime("%Y-%m") for offset in range(months)]
+    categories = sorted({name for _, name, _, _, _ in category_rows})
+    recipients = sorted({email for _, email, _, _ in recipient_rows})
+    category_index = {name: index for index, name in enumerate(categories)}
+    recipient_index = {email: index for index, email in enumerate(recipients)}
+    by_category = _decimal_zeros((len(CURRENCIES), len(categories), months))
+    for currency, name, row_year, row_month, total in category_rows:
+        offset = int(row_year) * 12 + int(row_month) - first.year * 12 - first.month
+        # Rows of the current month written after now still land in the last month.
+        offset = min(max(offset, 0), months - 1)
+        by_category[
+            CURRENCIES.index(currency), category_index[name], offset
+        ] += Decimal(total)
+    by_recipient = _decimal_zeros((len(CURRENCIES), len(recipients)))
+    recipient_counts = np.zeros(len(recipients), dtype=np.int64)
+    for currency, email, total, count in recipient_rows:
+        by_recipient[CURRENCIES.index(currency), recipient_index[email]] = Decimal(
+            total
+        )
+        recipient_counts[recipient_index[email]] += count
+    return SpendingGroups(
+        months=labels,
+        categories=categories,
+        recipients=recipients,
+        by_category=by_category,
+        by_recipient=by_recipient,
+        recipient_counts=recipient_counts,
+        count=int(recipient_counts.sum()),
+    )
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    The mean of each value and up to window - 1 values before it.
+    """
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(values) + 1), window).astype(object)
+
+
+async def spending_analytics(db: AsyncSession, user_id, base: Currency) -> dict:
+    """
+    View the monthly spending of the user per category, its rolling average, the
+    top recipients and the average transaction, converted into the base currency.
+    Only confirmed outgoing transactions count. The groups are cached per user
+    until the next transaction write, while the conversion always uses the
+    current exchange rates.
+        Parameters:
+            db (AsyncSession): The database session.
+            user_id (UUID): The ID of the user.
+            base (Currency): The currency to report in.
+        Returns:
+            dict: The monthly, per category and per recipient spending.
+    """
+
+    async def _load():
+        return await load_spending_groups(db, user_id, settings.ANALYTICS_MONTHS)
+
+    groups = await spending_cache.get_or_load(str(user_id), _load)
+    used = (groups.by_recipient != 0).any(axis=1)
+    factors = _decimal_zeros(len(CURRENCIES))
+    if used.any():
+        currencies = [
+            currency for currency, is_used in zip(CURRENCIES, used) if is_used
+        ]
+        factors[used] = conversion_factors(
+            await rate_cache.get_rates(db), currencies, base
+        )
+    by_category = np.tensordot(factors, groups.by_category, axes=1)
+    by_recipient = factors @ groups.by_recipient
+    monthly = by_category.sum(axis=0)
+    rolling = rolling_mean(monthly, settings.ANALYTICS_ROLLING_MONTHS)
+    category_totals = by_category.sum(axis=1)
+    top = np.argsort(-by_recipient, kind="stable")[: settings.ANALYTICS_TOP_RECIPIENTS]
+    total = monthly.sum()
+    return {
+        "base": base,
+        "count": groups.count,
+        "total": quantize(total, base),
+        "average_transaction": quantize(
+            total / groups.count if groups.count else 0, base
+        ),
+        "average_month": quantize(monthly.mean(), base),
+        "months": [
+            {
+                "month": month,
+                "total": quantize(monthly[i], base),
+                "rolling_average": quantize(rolling[i], base),
+                "categories": {
+                    name: quantize(by_category[j, i], base)
+                    for j, name in enumerate(groups.categories)
+                    if by_category[j, i]
+                },
+            }
+            for i, month in enumerate(groups.months)
+        ],
+        "categories": [
+            {
+                "name": groups.categories[j],
+                "total": quantize(category_totals[j], base),
+                "average_month": quantize(
+                    category_totals[j] / len(groups.months), base
+                ),
+            }
+            for j in np.argsort(-category_totals, kind="stable")
+        ],
+        "top_recipients": [
+            {
+                "email": groups.recipients[j],
+                "total": quantize(by_recipient[j], base),
+                "count": int(groups.recipient_counts[j]),
+            }
+            for j in top
+        ],
+    }
+
+
+def invalidate_spending_analytics(*user_ids) -> None:
+    """
+    Drop the cached spending groups of the given users in every process.
+    """
+    broadcast.send(
+        "spending_analytics", {"user_ids": [str(user_id) for user_id in user_ids]}
+    )
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+from uuid import UUID
+
+import pytz
+from fastapi import HTTPException, status
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.sql_app.models.enums import Currency
+from app.sql_app.models.models import User, Wallet, WalletDailyBalance
+
+MAX_HISTORY_DAYS = 366
+
+
+async def record_balance_change(
+    db: AsyncSession,
+    wallet_id: UUID,
+    balance: Decimal,
+    inflow: Decimal = Decimal(0),
+    outflow: Decimal = Decimal(0),
+) -> None:
+    """
+    Fold a balance change into today's rollup of the wallet with one upsert.
+    It must run in the same transaction as the balance update, so the wallet row
+    lock orders concurrent changes and the closing balance is always the latest.
+        Parameters:
+            db (AsyncSession): The database session.
+            wallet_id (UUID): The ID of the wallet.
+            balance (Decimal): The balance after the change.
+            inflow (Decimal): The amount credited.
+            outflow (Decimal): The amount debited.
+    """
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    statement = insert(WalletDailyBalance).values(
+        wallet_id=wallet_id,
+        day=datetime.now(pytz.utc).date(),
+        opening=balance - inflow + outflow,
+        closing=balance,
+        inflow=inflow,
+        outflow=outflow,
+        count=1,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[WalletDailyBalance.wallet_id, WalletDailyBalance.day],
+        set_={
+            "closing": statement.excluded.closing,
+            "inflow": WalletDailyBalance.inflow + statement.excluded.inflow,
+            "outflow": WalletDailyBalance.outflow + statement.excluded.outflow,
+            "count": WalletDailyBalance.count + 1,
+        },
+    )
+    await db.execute(statement)
+
+
+async def get_balance_history(
+    db: AsyncSession,
+    current_user: User,
+    currency: Currency,
+    start: date | None = None,
+    end: date | None = None,
+) -> List[WalletDailyBalance]:
+    """
+    Read the daily rollups of the user's wallet in one query over the
+    (wallet_id, day) primary key. Days without activity have no row; their
+    balance is the closing balance of the previous row.
+        Parameters:
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+            currency (Currency): The currency of the wallet.
+            start (date): The first day, 30 days before the end by default.
+            end (date): The last day, today by default.
+        Returns:
+            List[WalletDailyBalance]: The rollups ordered by day.
+    """
+    end = end or datetime.now(pytz.utc).date()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must not be after end date.",
+        )
+    if (end - start).days >= MAX_HISTORY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must not exceed {MAX_HISTORY_DAYS} days.",
+        )
+    result = await db.execute(
+        select(WalletDailyBalance)
+        .join(Wallet, Wallet.id == WalletDailyBalance.wallet_id)
+        .where(
+            Wallet.user_id == current_user.id,
+            Wallet.currency == currency,
+            WalletDailyBalance.day.between(start, end),
+        )
+        .order_by(WalletDailyBalance.day)
+    )
+    return result.scalars().all()
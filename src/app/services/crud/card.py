@@ -6,9 +6,30 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.schemas.card import CardCreate
+from app.services.common.reference_cache import invalidate_card
+from app.services.common.vault import vault
 from app.sql_app.models.models import Card
 
 
+def seal_card(card: Card, number: str, cvv: str | None = None) -> Card:
+    """
+    Store the number and CVV of a card encrypted, with the digest its number is
+    found by and the last four digits it is shown with.
+        Parameters:
+            card (Card): The card to update.
+            number (str): The card number.
+            cvv (str): The CVV, left unchanged if None.
+        Returns:
+            Card: The same card.
+    """
+    card.number_digest = vault.digest(number)
+    card.number_encrypted = vault.encrypt(number)
+    card.last4 = number[-4:]
+    if cvv is not None:
+        card.cvv_encrypted = vault.encrypt(cvv)
+    return card
+
+
 async def create_card(db: AsyncSession, card: CardCreate, user_id: UUID):
     """
     Create a new card for the user. It checks if card with the same number already exists.
@@ -19,24 +40,29 @@ async def create_card(db: AsyncSession, card: CardCreate, user_id: UUID):
         Returns:
             Card: The created card object.
     """
-    result = await db.execute(select(Card).filter_by(number=card.number))
+    result = await db.execute(
+        select(Card).where(Card.number_digest == vault.digest(card.number))
+    )
     existing_card = result.scalar_one_or_none()
     if existing_card is not None:
         raise HTTPException(
             status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
             detail=f"Card with id {card.number} is taken.",
         )
-    db_card = Card(
-        number=card.number,
-        card_holder=card.card_holder,
-        exp_date=card.exp_date,
-        cvv=card.cvv,
-        design=card.design,
-        user_id=user_id,
+    db_card = seal_card(
+        Card(
+            card_holder=card.card_holder,
+            exp_date=card.exp_date,
+            design=card.design,
+            user_id=user_id,
+        ),
+        card.number,
+        card.cvv,
     )
     db.add(db_card)
     await db.commit()
     await db.refresh(db_card)
+    invalidate_card(db_card.id, user_id, db_card.number_digest)
     return db_card
 
 
@@ -62,6 +88,25 @@ async def read_card(db: AsyncSession, card_id: UUID, user_id: UUID):
     return db_card
 
 
+async def reveal_card(db: AsyncSession, card_id: UUID, user_id: UUID):
+    """
+    Decrypt the full number and CVV of a card. This is the only place they are
+    decrypted; every other read returns the masked number.
+        Parameters:
+            db (AsyncSession): The database session.
+            card_id (UUID): The ID of the card.
+            user_id (UUID): The ID of the user.
+        Returns:
+            dict: The ID, number and CVV of the card.
+    """
+    db_card = await read_card(db, card_id, user_id)
+    return {
+        "id": db_card.id,
+        "number": vault.decrypt(db_card.number_encrypted),
+        "cvv": vault.decrypt(db_card.cvv_encrypted),
+    }
+
+
 async def read_all_cards(db: AsyncSession, user_id: UUID):
     """
     Retrieve all cards belonging to a user.
@@ -87,20 +132,21 @@ async def update_card(db: AsyncSession, card_id: UUID, card: CardCreate, user_id
             Card: The updated card object.
     """
     result = await db.execute(
-        select(Card).where(Card.id == card_id), Card.user_id == user_id
+        select(Card).where(and_(Card.id == card_id, Card.user_id == user_id))
     )
     db_card = result.scalars().first()
     if db_card is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Card not found."
         )
-    db_card.number = card.number
+    old_digest = db_card.number_digest
+    seal_card(db_card, card.number, card.cvv)
     db_card.card_holder = card.card_holder
     db_card.exp_date = card.exp_date
-    db_card.cvv = card.cvv
     db_card.design = card.design
     await db.commit()
     await db.refresh(db_card)
+    invalidate_card(db_card.id, db_card.user_id, old_digest, db_card.number_digest)
     return db_card
 
 
@@ -124,4 +170,5 @@ async def delete_card(db: AsyncSession, card_id: UUID, user_id: UUID):
         )
     await db.delete(db_card)
     await db.commit()
+    invalidate_card(db_card.id, db_card.user_id, db_card.number_digest)
     return {"message": "Card deleted successfully."}
@@ -1,10 +1,23 @@
 from fastapi import HTTPException, status
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.config import get_settings
 from app.schemas.category import CategoryCreate
-from app.sql_app.models.models import Category
+from app.services.common.broadcast import broadcast
+from app.services.common.cache import TTLCache
+from app.services.common.reference_cache import invalidate_category
+from app.sql_app.models.enums import Status
+from app.sql_app.models.models import Category, Transaction
+
+category_summary_cache = TTLCache(
+    "category_summary", get_settings().CATEGORY_SUMMARY_TTL_SECONDS
+)
+broadcast.subscribe(
+    "category_summary",
+    lambda data: category_summary_cache.invalidate(*data["user_ids"]),
+)
 
 
 async def create_category(db: AsyncSession, category: CategoryCreate, user_id: str):
@@ -31,6 +44,8 @@ async def create_category(db: AsyncSession, category: CategoryCreate, user_id: s
     db.add(db_category)
     await db.commit()
     await db.refresh(db_category)
+    invalidate_category(db_category.id, db_category.name)
+    invalidate_category_summary(user_id)
     return db_category
 
 
@@ -52,6 +67,72 @@ async def read_categories(db: AsyncSession, user_id: str):
     return {"categories": categories}
 
 
+async def summarize_categories(db: AsyncSession, user_id: str):
+    """
+    View the number of transactions, the total per currency and the last use of each
+    category of the user. Declined transactions are not counted. The summary is
+    computed with one GROUP BY and cached per user until a transaction or category
+    of the user changes.
+        Parameters:
+            db (AsyncSession): The database session.
+            user_id (str): The ID of the user.
+        Returns:
+            dict: A dictionary with the summary of each category.
+    """
+
+    async def _load():
+        result = await db.execute(
+            select(
+                Category.id,
+                Category.name,
+                Transaction.currency,
+                func.count(Transaction.id),
+                func.sum(Transaction.amount),
+                func.max(Transaction.timestamp),
+            )
+            .outerjoin(
+                Transaction,
+                and_(
+                    Transaction.category_id == Category.id,
+                    Transaction.status != Status.declined,
+                ),
+            )
+            .where(Category.user_id == user_id)
+            .group_by(Category.id, Category.name, Transaction.currency)
+            .order_by(Category.name)
+        )
+        summaries = {}
+        for category_id, name, currency, count, total, last_used in result.all():
+            summary = summaries.setdefault(
+                category_id,
+                {
+                    "id": category_id,
+                    "name": name,
+                    "count": 0,
+                    "totals": {},
+                    "last_used": None,
+                },
+            )
+            if currency is None:
+                continue
+            summary["count"] += count
+            summary["totals"][currency.value] = total
+            if summary["last_used"] is None or last_used > summary["last_used"]:
+                summary["last_used"] = last_used
+        return {"categories": list(summaries.values())}
+
+    return await category_summary_cache.get_or_load(str(user_id), _load)
+
+
+def invalidate_category_summary(*user_ids) -> None:
+    """
+    Drop the cached category summaries of the given users in every process.
+    """
+    broadcast.send(
+        "category_summary", {"user_ids": [str(user_id) for user_id in user_ids]}
+    )
+
+
 async def delete_category(db: AsyncSession, category_name: str, user_id: str):
     """
     Delete category by name.
@@ -74,4 +155,6 @@ async def delete_category(db: AsyncSession, category_name: str, user_id: str):
         )
     await db.delete(db_category)
     await db.commit()
+    invalidate_category(db_category.id, db_category.name)
+    invalidate_category_summary(user_id)
     return {"message": "Category has been deleted."}
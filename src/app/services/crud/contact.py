@@ -48,39 +48,51 @@ async def create_contact(current_user: User, contact: ContactCreate, db: AsyncSe
 
 
 async def read_contacts(
-    current_user: User, skip: int, limit: int, db: AsyncSession, search: str = None
+    current_user: User,
+    skip: int,
+    limit: int,
+    db: AsyncSession,
+    search: str = None,
+    after: UUID = None,
 ):
     """
     View all contacts for the user. It also allows searching by email or phone number.
+    The contacts and their user details are read in one joined query ordered by
+    contact ID, so a page can start after the last contact of the previous one.
         Parameters:
             current_user (User): The current user.
             skip (int): The number of contacts to skip.
             limit (int): The number of contacts to return.
             db (AsyncSession): The database session.
             search (str): The search query.
+            after (UUID): Return only contacts after the contact with this ID.
         Returns:
             list: A list of contacts with their details.
     """
-    query = select(Contact).filter(Contact.user_id == current_user.id)
+    query = (
+        select(Contact.id, User.name, User.email, User.phone_number)
+        .join(User, User.id == Contact.user_contact_id)
+        .filter(Contact.user_id == current_user.id)
+    )
     if search:
         query = query.filter(
-            or_(User.email.contains(search), User.phone_number.contains(search))
-        )
-    result = await db.execute(query.distinct().offset(skip).limit(limit))
-    contacts = result.scalars().all()
-    response = []
-    for contact in contacts:
-        user = await db.execute(select(User).filter(User.id == contact.user_contact_id))
-        user = user.scalars().first()
-        response.append(
-            {
-                "contact_id": contact.id,
-                "contact_name": user.name,
-                "contact_email": user.email,
-                "contact_phone_number": user.phone_number,
-            }
+            or_(
+                User.email.contains(search, autoescape=True),
+                User.phone_number.contains(search, autoescape=True),
+            )
         )
-    return response
+    if after:
+        query = query.filter(Contact.id > after)
+    result = await db.execute(query.order_by(Contact.id).offset(skip).limit(limit))
+    return [
+        {
+            "contact_id": contact_id,
+            "contact_name": name,
+            "contact_email": email,
+            "contact_phone_number": phone_number,
+        }
+        for contact_id, name, email, phone_number in result.all()
+    ]
 
 
 async def read_contact(current_user: User, contact_id: UUID, db: AsyncSession):
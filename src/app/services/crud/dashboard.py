@@ -0,0 +1,223 @@
+import asyncio
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.services.common.credit_shards import available_balance_column
+from app.services.common.vault import mask
+from app.sql_app.database import AsyncSessionLocal
+from app.sql_app.models.models import Card, Category, Contact, Transaction, User, Wallet
+
+settings = get_settings()
+
+SECTIONS = ("wallets", "cards", "categories", "contacts", "transactions")
+
+
+def _parse_id(cursor: str) -> UUID:
+    return UUID(cursor)
+
+
+def _parse_transaction_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    timestamp, transaction_id = cursor.rsplit("|", 1)
+    return datetime.fromisoformat(timestamp), UUID(transaction_id)
+
+
+def _wallets_query(user_id: UUID, after: Optional[UUID]):
+    query = select(Wallet.id, Wallet.currency, available_balance_column()).where(
+        Wallet.user_id == user_id
+    )
+    if after is not None:
+        query = query.where(Wallet.id > after)
+    return query.order_by(Wallet.id)
+
+
+def _wallet_item(row) -> dict:
+    return dict(row._mapping)
+
+
+def _cards_query(user_id: UUID, after: Optional[UUID]):
+    query = select(
+        Card.id, Card.last4, Card.card_holder, Card.exp_date, Card.design
+    ).where(Card.user_id == user_id)
+    if after is not None:
+        query = query.where(Card.id > after)
+    return query.order_by(Card.id)
+
+
+def _card_item(row) -> dict:
+    card_id, last4, card_holder, exp_date, design = row
+    return {
+        "id": card_id,
+        "number": mask(last4),
+        "card_holder": card_holder,
+        "exp_date": exp_date,
+        "design": design,
+    }
+
+
+def _categories_query(user_id: UUID, after: Optional[UUID]):
+    query = select(Category.id, Category.name).where(Category.user_id == user_id)
+    if after is not None:
+        query = query.where(Category.id > after)
+    return query.order_by(Category.id)
+
+
+def _category_item(row) -> dict:
+    category_id, name = row
+    return {"id": category_id, "name": name}
+
+
+def _contacts_query(user_id: UUID, after: Optional[UUID]):
+    query = (
+        select(Contact.id, User.name, User.email)
+        .join(User, User.id == Contact.user_contact_id)
+        .where(Contact.user_id == user_id)
+    )
+    if after is not None:
+        query = query.where(Contact.id > after)
+    return query.order_by(Contact.id)
+
+
+def _contact_item(row) -> dict:
+    contact_id, name, email = row
+    return {"contact_id": contact_id, "contact_name": name, "contact_email": email}
+
+
+def _transactions_query(user_id: UUID, after: Optional[Tuple[datetime, UUID]]):
+    query = select(
+        Transaction.id,
+        Transaction.amount,
+        Transaction.currency,
+        Transaction.timestamp,
+        Transaction.status,
+        Transaction.sender_id,
+        Transaction.recipient_id,
+        Transaction.category_id,
+    ).where(or_(Transaction.sender_id == user_id, Transaction.recipient_id == user_id))
+    if after is not None:
+        timestamp, transaction_id = after
+        query = query.where(
+            or_(
+                Transaction.timestamp < timestamp,
+                and_(
+                    Transaction.timestamp == timestamp,
+                    Transaction.id < transaction_id,
+                ),
+            )
+        )
+    return query.order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+
+
+def _transaction_item(row) -> dict:
+    return dict(row._mapping)
+
+
+# Each section: cursor parser, query builder, row formatter, cursor of a row.
+_SECTIONS: Dict[str, Tuple[Callable, Callable, Callable, Callable]] = {
+    "wallets": (_parse_id, _wallets_query, _wallet_item, lambda row: str(row[0])),
+    "cards": (_parse_id, _cards_query, _card_item, lambda row: str(row[0])),
+    "categories": (
+        _parse_id,
+        _categories_query,
+        _category_item,
+        lambda row: str(row[0]),
+    ),
+    "contacts": (_parse_id, _contacts_query, _contact_item, lambda row: str(row[0])),
+    "transactions": (
+        _parse_transaction_cursor,
+        _transactions_query,
+        _transaction_item,
+        lambda row: f"{row.timestamp.isoformat()}|{row.id}",
+    ),
+}
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated fields= selector, all sections if it is empty.
+        Parameters:
+            fields (str): The requested sections.
+        Returns:
+            List[str]: The sections to fetch.
+    """
+    if not fields:
+        return list(SECTIONS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(selected) - set(SECTIONS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown dashboard fields: {', '.join(unknown)}.",
+        )
+    return list(dict.fromkeys(selected))
+
+
+async def _read_section(
+    session_factory: sessionmaker, section: str, user_id: UUID, after, limit: int
+) -> dict:
+    _, build_query, to_item, cursor_of = _SECTIONS[section]
+    async with session_factory() as db:
+        result = await db.execute(build_query(user_id, after).limit(limit + 1))
+        rows = result.all()
+    next_cursor = cursor_of(rows[limit - 1]) if len(rows) > limit else None
+    return {"items": [to_item(row) for row in rows[:limit]], "next_cursor": next_cursor}
+
+
+async def user_dashboard(
+    current_user: User,
+    fields: Optional[str] = None,
+    limit: int = None,
+    cursors: Optional[Dict[str, str]] = None,
+    session_factory: sessionmaker = AsyncSessionLocal,
+) -> dict:
+    """
+    View the user's wallets, cards, categories, contacts and transactions. The requested
+    sections are read concurrently, each on a pooled connection of its own, and
+    each is capped at `limit` items with a cursor to the next page.
+        Parameters:
+            current_user (User): The current user.
+            fields (str): Comma-separated sections to include, all by default.
+            limit (int): The maximum number of items per section.
+            cursors (dict): The next_cursor of a section to continue it from.
+            session_factory (sessionmaker): The sessions the sections run on.
+        Returns:
+            dict: The email of the user and the requested sections.
+    """
+    sections = parse_fields(fields)
+    limit = min(
+        limit or settings.DASHBOARD_SECTION_LIMIT, settings.DASHBOARD_MAX_SECTION_LIMIT
+    )
+    if limit < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be greater than zero.",
+        )
+    afters = {}
+    for section in sections:
+        cursor = (cursors or {}).get(section)
+        if not cursor:
+            afters[section] = None
+            continue
+        try:
+            afters[section] = _SECTIONS[section][0](cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid {section} cursor.",
+            )
+
+    results = await asyncio.gather(
+        *[
+            _read_section(
+                session_factory, section, current_user.id, afters[section], limit
+            )
+            for section in sections
+        ]
+    )
+    return {"email": current_user.email, **dict(zip(sections, results))}
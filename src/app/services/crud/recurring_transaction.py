@@ -9,11 +9,13 @@ from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.transaction import RecurringTransactionCreate, TransactionCreate
+from app.services.common.credit_shards import available_balance
+from app.services.common.money import parse_amount
+from app.services.common.reference_cache import get_card_by_id, get_category_by_id
 from app.services.crud.transaction import create_transaction
 from app.sql_app.models.enums import IntervalType
 from app.sql_app.models.models import (
     Card,
-    Category,
     RecurringTransaction,
     Transaction,
     User,
@@ -44,6 +46,7 @@ async def create_recurring_transaction(
             status_code=status.HTTP_403_FORBIDDEN, detail="Sender is blocked."
         )
 
+    amount = parse_amount(transaction_data.amount, transaction_data.currency)
     sender_wallet_result = await db.execute(
         select(Wallet).where(
             Wallet.user_id == sender_id, Wallet.currency == transaction_data.currency
@@ -56,7 +59,7 @@ async def create_recurring_transaction(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sender's wallet in the specified currency not found.",
         )
-    if sender_wallet.balance < transaction_data.amount:
+    if await available_balance(db, sender_wallet) < amount:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds."
         )
@@ -98,7 +101,7 @@ async def create_recurring_transaction(
         card_id=transaction_data.card_id,
         recipient_id=transaction_data.recipient_id,
         category_id=transaction_data.category_id,
-        amount=transaction_data.amount,
+        amount=amount,
         interval=transaction_data.interval,
         interval_type=transaction_data.interval_type,
         next_execution_date=transaction_data.next_execution_date,
@@ -111,7 +114,9 @@ async def create_recurring_transaction(
 
 async def process_recurring_transactions(db: AsyncSession):
     """
-    Process any recurring transactions that are due for payment.
+    Process any recurring transactions that are due for payment. They skip the
+    velocity rules: the sender authorized them when scheduling, and a burst of
+    due payments must not be rejected as one.
         Parameters:
             db (AsyncSession): The database session.
     """
@@ -123,18 +128,12 @@ async def process_recurring_transactions(db: AsyncSession):
     )
     due_recurring_transactions = result.scalars().all()
     for recurring_transaction in due_recurring_transactions:
-        card_result = await db.execute(
-            select(Card).where(Card.id == recurring_transaction.card_id)
-        )
-        card = card_result.scalars().first()
+        card = await get_card_by_id(db, recurring_transaction.card_id)
         recipient_result = await db.execute(
             select(User).where(User.id == recurring_transaction.recipient_id)
         )
         recipient = recipient_result.scalars().first()
-        category_result = await db.execute(
-            select(Category).where(Category.id == recurring_transaction.category_id)
-        )
-        category = category_result.scalars().first()
+        category = await get_category_by_id(db, recurring_transaction.category_id)
 
         transaction_data = TransactionCreate(
             amount=recurring_transaction.amount,
@@ -146,7 +145,11 @@ async def process_recurring_transactions(db: AsyncSession):
         )
         try:
             await create_transaction(
-                db, transaction_data, recurring_transaction.user_id
+                db,
+                transaction_data,
+                recurring_transaction.user_id,
+                card,
+                enforce_velocity=False,
             )
             if recurring_transaction.interval_type == IntervalType.DAILY:
                 recurring_transaction.next_execution_date += timedelta(days=1)
@@ -1,11 +1,15 @@
+import heapq
 import uuid
 from datetime import datetime
+from typing import List
 from uuid import UUID
 
+import pytz
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
 from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.schemas.transaction import (
     TransactionCreate,
@@ -13,12 +17,83 @@ from app.schemas.transaction import (
     TransactionList,
     TransactionView,
 )
-from app.sql_app.models.enums import Status
+from app.services.common.archive import (
+    count_archived_transactions,
+    read_archived_transactions,
+)
+from app.services.common.credit_shards import (
+    available_balance,
+    credit_wallet_shard,
+    fold_wallet_credits,
+)
+from app.services.common.events import publish_transaction
+from app.services.common.fx import redeem_exchange_quote
+from app.services.common.money import parse_amount, quantize
+from app.services.common.outbox import record_transaction_event
+from app.services.common.partitions import as_utc
+from app.services.common.reference_cache import (
+    CardSnapshot,
+    CategorySnapshot,
+    get_card_by_number,
+    get_category_by_id,
+    get_category_by_name,
+)
+from app.services.common.transitions import (
+    APPROVE,
+    CONFIRM,
+    DENY,
+    REJECT,
+    apply_transition,
+)
+from app.services.common.vault import mask
+from app.services.common.velocity import TransferAttempt, velocity
+from app.services.crud.analytics import invalidate_spending_analytics
+from app.services.crud.balance_history import record_balance_change
+from app.services.crud.category import invalidate_category_summary
+from app.sql_app.models.enums import Currency, Status
 from app.sql_app.models.models import Card, Category, Transaction, User, Wallet
 
+# The columns of a TransactionView, labelled with its field names. The card
+# number is read as the last four digits and masked like Card.number.
+TRANSACTION_VIEW_COLUMNS = (
+    Transaction.id,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.timestamp,
+    Transaction.card_id,
+    Transaction.sender_id,
+    Transaction.recipient_id,
+    Transaction.category_id,
+    Transaction.status,
+    Card.last4.label("card_number"),
+    User.email.label("recipient_email"),
+    Category.name.label("category_name"),
+)
+
+transaction_views = TypeAdapter(List[TransactionView])
+
+
+async def _invalidate_summaries(
+    db: AsyncSession,
+    transaction: Transaction,
+    category: CategorySnapshot | None = None,
+) -> None:
+    # Category summaries are cached per category owner, who may not be the sender.
+    if category is None:
+        category = await get_category_by_id(db, transaction.category_id)
+    owners = {str(transaction.sender_id)}
+    if category is not None:
+        owners.add(str(category.user_id))
+    invalidate_category_summary(*owners)
+    invalidate_spending_analytics(transaction.sender_id)
+
 
 async def create_transaction(
-    db: AsyncSession, transaction_data: TransactionCreate, sender_id: UUID
+    db: AsyncSession,
+    transaction_data: TransactionCreate,
+    sender_id: UUID,
+    card: CardSnapshot | None = None,
+    enforce_velocity: bool = True,
 ) -> Transaction:
     """
     Create a transaction to send money from one user's wallet to another user's wallet.
@@ -26,6 +101,10 @@ async def create_transaction(
             db (AsyncSession): The database session.
             transaction_data (TransactionCreate): The transaction data.
             sender_id (UUID): The ID of the sender.
+            card (CardSnapshot): The sender's card if already resolved, in which
+                case transaction_data.card_number is not looked up.
+            enforce_velocity (bool): Whether the velocity rules apply, False for
+                transfers the sender scheduled in advance.
         Returns:
             Transaction: The created transaction object.
     """
@@ -41,6 +120,7 @@ async def create_transaction(
             status_code=status.HTTP_403_FORBIDDEN, detail="Sender is blocked."
         )
 
+    amount = parse_amount(transaction_data.amount, transaction_data.currency)
     sender_wallet_result = await db.execute(
         select(Wallet).where(
             Wallet.user_id == sender_id, Wallet.currency == transaction_data.currency
@@ -52,18 +132,14 @@ async def create_transaction(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sender's wallet in the specified currency not found.",
         )
-    if sender_wallet.balance < transaction_data.amount:
+    if await available_balance(db, sender_wallet) < amount:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds."
         )
 
-    card_result = await db.execute(
-        select(Card).where(
-            Card.number == transaction_data.card_number, Card.user_id == sender_id
-        )
-    )
-    card = card_result.scalars().first()
-    if not card:
+    if card is None:
+        card = await get_card_by_number(db, transaction_data.card_number, sender_id)
+    if not card or card.user_id != sender_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Card not found."
         )
@@ -77,18 +153,28 @@ async def create_transaction(
             status_code=status.HTTP_404_NOT_FOUND, detail="Recipient not found."
         )
 
-    category_result = await db.execute(
-        select(Category).where(Category.name == transaction_data.category)
-    )
-    category = category_result.scalars().first()
+    category = await get_category_by_name(db, transaction_data.category)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Category not found."
         )
 
+    quote = None
+    target_currency = transaction_data.currency
+    if transaction_data.quote_token:
+        quote = await redeem_exchange_quote(
+            db, transaction_data.quote_token, sender_id, amount
+        )
+        if quote.source.value != transaction_data.currency:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Exchange quote does not match the transaction currency.",
+            )
+        target_currency = quote.target
+
     recipient_wallet_result = await db.execute(
         select(Wallet).where(
-            Wallet.user_id == recipient.id, Wallet.currency == transaction_data.currency
+            Wallet.user_id == recipient.id, Wallet.currency == target_currency
         )
     )
     recipient_wallet = recipient_wallet_result.scalars().first()
@@ -98,16 +184,32 @@ async def create_transaction(
             detail="Recipient's wallet not found.",
         )
 
-    if sender_wallet.currency != recipient_wallet.currency:
+    if quote is None and sender_wallet.currency != recipient_wallet.currency:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Sender's and recipient's wallets must be in the same currency.",
         )
 
-    date_time = datetime.now()
+    reservation = None
+    if enforce_velocity and velocity.rules:
+        new_recipient = velocity.uses_new_recipient and await is_new_recipient(
+            db, sender_id, recipient.id
+        )
+        reservation = await velocity.enforce(
+            TransferAttempt(
+                sender_id=sender_id,
+                recipient_id=recipient.id,
+                card_id=card.id,
+                amount=amount,
+                currency=Currency(transaction_data.currency),
+                new_recipient=new_recipient,
+            )
+        )
+
+    date_time = datetime.now(pytz.utc)
     new_transaction = Transaction(
         id=uuid.uuid4(),
-        amount=transaction_data.amount,
+        amount=amount,
         currency=transaction_data.currency,
         timestamp=date_time,
         card_id=card.id,
@@ -117,16 +219,30 @@ async def create_transaction(
         wallet_id=sender_wallet.id,
         status="pending",
     )
+    if quote is not None:
+        new_transaction.target_currency = quote.target
+        new_transaction.target_amount = quantize(amount * quote.rate, quote.target)
+        new_transaction.exchange_rate = quote.rate
     db.add(new_transaction)
-    await db.commit()
+    record_transaction_event(db, new_transaction)
+    try:
+        await db.commit()
+    except Exception:
+        # A transfer that was not written does not use up the sender's limits.
+        if reservation is not None:
+            await velocity.release(reservation)
+        raise
     await db.refresh(new_transaction)
+    await _invalidate_summaries(db, new_transaction, category)
+    publish_transaction(new_transaction)
     transaction_result = TransactionCreate(
-        amount=transaction_data.amount,
+        amount=amount,
         currency=transaction_data.currency,
         timestamp=date_time,
         card_number=card.number,
         recipient_email=recipient.email,
         category=category.name,
+        quote_token=transaction_data.quote_token,
     )
     return transaction_result
 
@@ -143,40 +259,39 @@ async def confirm_transaction(
         Returns:
             Transaction: The updated transaction object.
     """
-    current_user_id = UUID(current_user_id)
-
-    async with db.begin():
-        result = await db.execute(
-            select(Transaction).where(Transaction.id == transaction_id)
-        )
-        transaction = result.scalars().first()
-
-        if not transaction:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Transaction with id {transaction_id} not found.",
-            )
-
-        sender_id = UUID(str(transaction.sender_id))
-
-        if sender_id != current_user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not allowed to confirm this transaction.",
-            )
-
-        if transaction.status != Status.pending:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="You can only confirm transactions that are pending your confirmation.",
-            )
-
-    transaction.status = Status.awaiting
+    transaction = await apply_transition(
+        db, CONFIRM, transaction_id, UUID(current_user_id)
+    )
+    record_transaction_event(db, transaction)
     await db.commit()
-    await db.refresh(transaction)
+    await _invalidate_summaries(db, transaction)
+    publish_transaction(transaction)
     return transaction
 
 
+async def is_new_recipient(db: AsyncSession, sender_id: UUID, recipient_id: UUID):
+    """
+    Check whether the sender never sent a transaction to the recipient that was
+    not declined.
+        Parameters:
+            db (AsyncSession): The database session.
+            sender_id (UUID): The ID of the sender.
+            recipient_id (UUID): The ID of the recipient.
+        Returns:
+            bool: True if the recipient is new to the sender.
+    """
+    result = await db.execute(
+        select(Transaction.id)
+        .where(
+            Transaction.sender_id == sender_id,
+            Transaction.recipient_id == recipient_id,
+            Transaction.status != Status.declined,
+        )
+        .limit(1)
+    )
+    return result.scalars().first() is None
+
+
 async def get_transactions_by_user_id(db: AsyncSession, user_id: UUID):
     """
     Get all transactions made by a user with the given user_id.
@@ -212,10 +327,13 @@ async def get_transactions(
     Returns:
         TransactionList: A list of transactions matching the filters and pagination parameters, along with the total count.
     """
-    query = select(Transaction).options(
-        joinedload(Transaction.card),
-        joinedload(Transaction.category),
-        joinedload(Transaction.recipient),
+    # Only the columns of the view are selected, so the rows are plain tuples
+    # that never go through the ORM identity map.
+    query = (
+        select(*TRANSACTION_VIEW_COLUMNS)
+        .outerjoin(Card, Card.id == Transaction.card_id)
+        .outerjoin(User, User.id == Transaction.recipient_id)
+        .outerjoin(Category, Category.id == Transaction.category_id)
     )
 
     if not current_user.is_admin:
@@ -224,10 +342,12 @@ async def get_transactions(
             | (Transaction.recipient_id == current_user.id)
         )
 
+    # Comparing the partition key with time zone aware bounds lets the planner
+    # prune the monthly partitions outside the range.
     if filter.start_date:
-        query = query.where(Transaction.timestamp >= filter.start_date)
+        query = query.where(Transaction.timestamp >= as_utc(filter.start_date))
     if filter.end_date:
-        query = query.where(Transaction.timestamp <= filter.end_date)
+        query = query.where(Transaction.timestamp <= as_utc(filter.end_date))
     if filter.sender_id:
         query = query.where(Transaction.sender_id == filter.sender_id)
     if filter.recipient_id:
@@ -247,35 +367,56 @@ async def get_transactions(
     total_result = await db.execute(total_query)
     total = total_result.scalar_one()
 
-    transactions_result = await db.execute(query.offset(skip).limit(limit))
-    transactions = transactions_result.scalars().all()
-
-    transactions_data = []
-    for transaction in transactions:
-        transaction_view = TransactionView(
-            id=transaction.id,
-            amount=transaction.amount,
-            currency=transaction.currency,
-            timestamp=transaction.timestamp,
-            card_id=transaction.card_id,
-            sender_id=transaction.sender_id,
-            recipient_id=transaction.recipient_id,
-            category_id=transaction.category_id,
-            status=transaction.status,
-            card_number=transaction.card.number,
-            recipient_email=transaction.recipient.email,
-            category_name=transaction.category.name,
+    archived_total = await count_archived_transactions(db, current_user, filter)
+    ordered = filter.sort_by in ("amount", "date")
+    # Unordered, archived rows are listed after every live one, so the archive is
+    # only read once the page reaches past the live rows.
+    if not archived_total or (not ordered and skip + limit <= total):
+        transactions_result = await db.execute(query.offset(skip).limit(limit))
+        transactions_data = _transaction_views(transactions_result.mappings().all())
+        return TransactionList(
+            transactions=transactions_data, total=total + archived_total
         )
-        transactions_data.append(transaction_view)
 
-    return TransactionList(transactions=transactions_data, total=total)
+    if not ordered:
+        transactions_result = await db.execute(query.offset(skip).limit(limit))
+        live = _transaction_views(transactions_result.mappings().all())
+        archived = await read_archived_transactions(
+            current_user, filter, limit=skip + limit - total
+        )
+        cold = [TransactionView(**row) for row in archived[max(skip - total, 0) :]]
+        transactions_data = (live + cold)[:limit]
+    else:
+        # The page may span both stores, so the first rows of each up to its end
+        # are merged before it is cut out.
+        transactions_result = await db.execute(query.limit(skip + limit))
+        live = _transaction_views(transactions_result.mappings().all())
+        archived = await read_archived_transactions(
+            current_user, filter, limit=skip + limit
+        )
+        cold = [TransactionView(**row) for row in archived]
+        if filter.sort_by == "amount":
+            merged = heapq.merge(live, cold, key=lambda view: view.amount)
+        else:
+            merged = heapq.merge(live, cold, key=lambda view: as_utc(view.timestamp))
+        transactions_data = list(merged)[skip : skip + limit]
+    return TransactionList(transactions=transactions_data, total=total + archived_total)
+
+
+def _transaction_views(rows) -> List[TransactionView]:
+    # One validation call for the whole page instead of one model per row.
+    return transaction_views.validate_python(
+        [{**row, "card_number": mask(row["card_number"])} for row in rows]
+    )
 
 
 async def approve_transaction(
     db: AsyncSession, transaction_id: UUID, current_user_id: str
 ) -> Transaction:
     """
-    Approve an incoming transaction by the recipient.
+    Approve an incoming transaction by the recipient. The status moves to confirmed
+    with the guarded UPDATE first, so the row stays locked against the expiry
+    sweeper and money only moves when the transaction was still awaiting.
         Parameters:
             db (AsyncSession): The database session.
             transaction_id (UUID): The ID of the transaction.
@@ -286,58 +427,80 @@ async def approve_transaction(
     current_user_id = UUID(current_user_id)
 
     async with db.begin():
-        result = await db.execute(
-            select(Transaction).where(Transaction.id == transaction_id)
+        transaction = await apply_transition(
+            db, APPROVE, transaction_id, current_user_id
         )
-        transaction = result.scalars().first()
-
-        if not transaction:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Transaction with id {transaction_id} not found.",
-            )
-
-        recipient_id = UUID(str(transaction.recipient_id))
 
-        if recipient_id != current_user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not allowed to approve this transaction.",
-            )
-
-        if transaction.status != Status.awaiting:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="You can only approve transactions that are awaiting your approval.",
-            )
+        # Cross-currency transfers debit the source currency and credit the amount
+        # converted with the quote locked when the transaction was created.
+        credit_currency = transaction.target_currency or transaction.currency
+        credit_amount = (
+            transaction.target_amount
+            if transaction.target_currency
+            else transaction.amount
+        )
 
         sender_wallet_result = await db.execute(
-            select(Wallet).where(Wallet.user_id == transaction.sender_id)
+            select(Wallet)
+            .where(
+                Wallet.user_id == transaction.sender_id,
+                Wallet.currency == transaction.currency,
+            )
+            .with_for_update()
         )
         sender_wallet = sender_wallet_result.scalars().first()
 
+        # The recipient's wallet row is only locked by the credit itself, and not
+        # at all when its credits are sharded.
         recipient_wallet_result = await db.execute(
-            select(Wallet).where(Wallet.user_id == transaction.recipient_id)
+            select(Wallet).where(
+                Wallet.user_id == transaction.recipient_id,
+                Wallet.currency == credit_currency,
+            )
         )
         recipient_wallet = recipient_wallet_result.scalars().first()
 
+        if sender_wallet is None or recipient_wallet is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found."
+            )
+
+        if sender_wallet.balance < transaction.amount and sender_wallet.credit_shards:
+            # Debits see the exact total: pending credits are folded under the lock.
+            await fold_wallet_credits(db, sender_wallet)
         if sender_wallet.balance < transaction.amount:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds."
             )
 
         sender_wallet.balance -= transaction.amount
-        recipient_wallet.balance += transaction.amount
-        transaction.status = Status.confirmed
-
-        db.add(transaction)
         db.add(sender_wallet)
-        db.add(recipient_wallet)
+        await record_balance_change(
+            db, sender_wallet.id, sender_wallet.balance, outflow=transaction.amount
+        )
+        if recipient_wallet.credit_shards:
+            # The fold job records these credits in the rollup once folded.
+            await credit_wallet_shard(db, recipient_wallet, credit_amount)
+        else:
+            credit_result = await db.execute(
+                update(Wallet)
+                .where(Wallet.id == recipient_wallet.id)
+                .values(balance=Wallet.balance + credit_amount)
+                .returning(Wallet.balance)
+                .execution_options(synchronize_session=False)
+            )
+            set_committed_value(recipient_wallet, "balance", credit_result.scalar_one())
+            await record_balance_change(
+                db, recipient_wallet.id, recipient_wallet.balance, inflow=credit_amount
+            )
+        record_transaction_event(db, transaction)
 
     await db.commit()
     await db.refresh(transaction)
     await db.refresh(sender_wallet)
     await db.refresh(recipient_wallet)
+    await _invalidate_summaries(db, transaction)
+    publish_transaction(transaction)
     return transaction
 
 
@@ -353,39 +516,14 @@ async def reject_transaction(
         Returns:
             Transaction: The updated transaction object.
     """
-    current_user_id = UUID(current_user_id)
-
-    async with db.begin():
-        result = await db.execute(
-            select(Transaction).where(Transaction.id == transaction_id)
-        )
-        transaction = result.scalars().first()
-
-        if not transaction:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Transaction with id {transaction_id} not found.",
-            )
-
-        if transaction.recipient_id != current_user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not allowed to reject this transaction.",
-            )
-
-        if transaction.status != Status.awaiting:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="You can only reject awaiting transactions.",
-            )
-
-        transaction.status = Status.declined
-
-        await db.commit()
-
-        await db.refresh(transaction)
-
-        return transaction
+    transaction = await apply_transition(
+        db, REJECT, transaction_id, UUID(current_user_id)
+    )
+    record_transaction_event(db, transaction)
+    await db.commit()
+    await _invalidate_summaries(db, transaction)
+    publish_transaction(transaction)
+    return transaction
 
 
 async def deny_transaction(db: AsyncSession, current_user: User, transaction_id: UUID):
@@ -403,25 +541,9 @@ async def deny_transaction(db: AsyncSession, current_user: User, transaction_id:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can deny transactions.",
         )
-    transaction = await db.execute(
-        select(Transaction).where(Transaction.id == transaction_id)
-    )
-    transaction = transaction.scalars().first()
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found."
-        )
-    if (transaction.status != Status.pending) and (
-        transaction.status != Status.awaiting
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Transaction is not pending or awaiting.",
-        )
-    await db.execute(
-        update(Transaction)
-        .where(Transaction.id == transaction_id)
-        .values(status="declined")
-    )
+    transaction = await apply_transition(db, DENY, transaction_id)
+    record_transaction_event(db, transaction)
     await db.commit()
+    await _invalidate_summaries(db, transaction)
+    publish_transaction(transaction)
     return {"message": "Transaction declined."}
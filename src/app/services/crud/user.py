@@ -1,13 +1,14 @@
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, or_, update
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from twilio.rest import Client
 
 from app.core.config import get_settings
 from app.schemas.user import UserBase
+from app.services.common.search import rank_users
 from app.sql_app.database import engine
 from app.sql_app.models.models import Card, Category, Contact, Transaction, User
 
@@ -243,32 +244,29 @@ async def unblock_user(user_id: UUID, db: AsyncSession, current_user: User):
 
 
 async def search_users(
-    db: AsyncSession, skip: int, limit: int, current_user: User, search: str = None
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    current_user: User,
+    search: str = None,
+    cursor: str = None,
 ):
     """
     View all users and their details. It also allows searching by email or phone number.
+    Matches are ranked by trigram similarity and paginated with a keyset cursor.
         Parameters:
             db (AsyncSession): The database session.
             skip (int): The number of users to skip.
             limit (int): The number of users to return.
             current_user (User): The current user.
             search (str): The search query.
+            cursor (str): The next_cursor returned with the previous page.
         Returns:
-            dict: A dictionary containing a list of users with their details and the total count of users.
+            dict: A dictionary containing a list of users with their details, the approximate total count of users and the cursor of the next page.
     """
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not authorized to perform this action.",
         )
-    query = select(User)
-    if search:
-        query = query.where(
-            or_(User.email.contains(search), User.phone_number.contains(search))
-        )
-
-    total_users = await db.execute(select(func.count()).select_from(query.subquery()))
-    result = await db.execute(query.offset(skip).limit(limit))
-
-    users = result.scalars().all()
-    return {"users": users, "total": total_users.scalar()}
+    return await rank_users(db, search, skip, limit, cursor)
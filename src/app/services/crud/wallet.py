@@ -1,13 +1,27 @@
 import uuid
+from datetime import datetime
+from decimal import Decimal
 from typing import List, Tuple
 from uuid import UUID
 
+import numpy as np
+import pytz
 from fastapi import HTTPException, status
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core.config import get_settings
+from app.services.common.credit_shards import (
+    available_balance_column,
+    fold_wallet_credits,
+)
+from app.services.common.fx import conversion_factors, rate_cache
+from app.services.common.money import parse_amount, quantize
+from app.services.common.outbox import record_wallet_event
+from app.services.crud.balance_history import record_balance_change
 from app.sql_app.models.enums import Currency
-from app.sql_app.models.models import User, Wallet
+from app.sql_app.models.models import Deposit, User, Wallet
 
 
 async def create_wallet(db: AsyncSession, user_id: UUID, currency: Currency) -> Wallet:
@@ -44,63 +58,155 @@ async def create_wallet(db: AsyncSession, user_id: UUID, currency: Currency) ->
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Wallet already exists for this user and currency.",
         )
-    new_wallet = Wallet(
-        id=uuid.uuid4(), user_id=user_id, balance=0.0, currency=currency
-    )
+    new_wallet = Wallet(id=uuid.uuid4(), user_id=user_id, balance=0, currency=currency)
     db.add(new_wallet)
+    record_wallet_event(db, "wallet.created", new_wallet)
     await db.commit()
     await db.refresh(new_wallet)
     return new_wallet
 
 
 async def add_funds_to_wallet(
-    db: AsyncSession, amount: float, current_user: User, currency: Currency
+    db: AsyncSession, amount: Decimal, current_user: User, currency: Currency
 ) -> Wallet:
-    """Add funds to the user's wallet."""
-    db_wallet = await db.execute(
-        select(Wallet).where(
-            Wallet.user_id == current_user.id, Wallet.currency == currency
-        )
+    """
+    Add funds to the user's wallet with a single atomic UPDATE ... RETURNING,
+    so concurrent deposits never overwrite each other.
+        Parameters:
+            db (AsyncSession): The database session.
+            amount (Decimal): The amount to add.
+            current_user (User): The current user.
+            currency (Currency): The currency of the wallet.
+        Returns:
+            Wallet: The updated wallet object.
+    """
+    amount = parse_amount(amount, currency)
+    result = await db.execute(
+        update(Wallet)
+        .where(Wallet.user_id == current_user.id, Wallet.currency == currency)
+        .values(balance=Wallet.balance + amount)
+        .returning(Wallet)
     )
-    db_wallet = db_wallet.scalars().first()
-    if db_wallet is None:
+    wallet = result.scalars().first()
+    if wallet is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found."
         )
-    db_wallet.balance += amount
+    db.add(
+        Deposit(wallet_id=wallet.id, amount=amount, timestamp=datetime.now(pytz.utc))
+    )
+    await record_balance_change(db, wallet.id, wallet.balance, inflow=amount)
+    record_wallet_event(db, "wallet.funded", wallet, amount)
     await db.commit()
-    await db.refresh(db_wallet)
-    return db_wallet
+    return wallet
 
 
 async def withdraw_funds_from_wallet(
-    db: AsyncSession, current_user: User, amount: float, currency: Currency
+    db: AsyncSession, current_user: User, amount: Decimal, currency: Currency
 ) -> Wallet:
     """
-    Withdraw funds from the user's wallet.
+    Withdraw funds from the user's wallet with a single guarded UPDATE ... RETURNING.
+    The wallet is only probed again when the update matched no row, and a wallet
+    with sharded credits is then locked and its pending credits folded in first.
         Parameters:
             db (AsyncSession): The database session.
             current_user (User): The current user.
-            amount (float): The amount to withdraw.
+            amount (Decimal): The amount to withdraw.
             currency (Currency): The currency to withdraw.
         Returns:
             Wallet: The updated wallet object.
     """
+    amount = parse_amount(amount, currency)
     result = await db.execute(
-        select(Wallet).where(
-            Wallet.user_id == current_user.id, Wallet.currency == currency
+        update(Wallet)
+        .where(
+            Wallet.user_id == current_user.id,
+            Wallet.currency == currency,
+            Wallet.balance >= amount,
         )
+        .values(balance=Wallet.balance - amount)
+        .returning(Wallet)
     )
     wallet = result.scalars().first()
     if wallet is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found."
+        probe = await db.execute(
+            select(Wallet.credit_shards).where(
+                Wallet.user_id == current_user.id, Wallet.currency == currency
+            )
         )
+        credit_shards = probe.scalars().first()
+        if credit_shards is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found."
+            )
+        if credit_shards:
+            wallet = await _debit_with_pending_credits(
+                db, current_user, amount, currency
+            )
+        if wallet is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds."
+            )
+    db.add(
+        Deposit(wallet_id=wallet.id, amount=-amount, timestamp=datetime.now(pytz.utc))
+    )
+    await record_balance_change(db, wallet.id, wallet.balance, outflow=amount)
+    record_wallet_event(db, "wallet.withdrawn", wallet, amount)
+    await db.commit()
+    return wallet
+
+
+async def _debit_with_pending_credits(
+    db: AsyncSession, current_user: User, amount: Decimal, currency: Currency
+) -> Wallet | None:
+    result = await db.execute(
+        select(Wallet)
+        .where(Wallet.user_id == current_user.id, Wallet.currency == currency)
+        .with_for_update()
+    )
+    wallet = result.scalars().first()
+    await fold_wallet_credits(db, wallet)
     if wallet.balance < amount:
+        return None
+    wallet.balance -= amount
+    return wallet
+
+
+async def set_credit_shards(
+    db: AsyncSession, current_user: User, wallet_id: UUID, shards: int
+) -> Wallet:
+    """
+    Spread the credits of a hot wallet over shard rows, or credit it directly
+    again with 0 shards. Pending credits are folded into the balance first.
+        Parameters:
+            db (AsyncSession): The database session.
+            current_user (User): The current user, who must be an admin.
+            wallet_id (UUID): The ID of the wallet.
+            shards (int): The number of shards, 0 to disable sharding.
+        Returns:
+            Wallet: The updated wallet object.
+    """
+    if not current_user.is_admin:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds."
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to perform this action.",
         )
-    wallet.balance -= amount
+    maximum = get_settings().WALLET_CREDIT_SHARDS_MAX
+    if not 0 <= shards <= maximum:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Credit shards must be between 0 and {maximum}.",
+        )
+    result = await db.execute(
+        select(Wallet).where(Wallet.id == wallet_id).with_for_update()
+    )
+    wallet = result.scalars().first()
+    if wallet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found."
+        )
+    await fold_wallet_credits(db, wallet)
+    wallet.credit_shards = shards
     await db.commit()
     await db.refresh(wallet)
     return wallet
@@ -108,19 +214,64 @@ async def withdraw_funds_from_wallet(
 
 async def check_balance(
     db: AsyncSession, current_user: User
-) -> List[Tuple[float, Currency]]:
+) -> List[Tuple[Decimal, Currency]]:
+    """
+    Check the balance of all wallets for the user, including sharded credits not
+    yet folded into it.
+        Parameters:
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+        Returns:
+            List[Tuple[Decimal, Currency]]: A list of tuples with the balance and currency of the wallets.
+    """
+    result = await db.execute(
+        select(available_balance_column(), Wallet.currency).where(
+            Wallet.user_id == current_user.id
+        )
+    )
+    rows = result.all()
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No wallets found."
+        )
+    return [(balance, currency) for balance, currency in rows]
+
+
+async def portfolio_valuation(
+    db: AsyncSession, current_user: User, base: Currency
+) -> dict:
     """
-    Check the balance of all wallets for the user.
+    Value all wallets of the user in the base currency. The balances, with their
+    unfolded sharded credits, are read in one query and multiplied by the cached
+    exchange rates in one vectorized pass over Decimals, so 18-decimal balances
+    are valued exactly before rounding.
         Parameters:
             db (AsyncSession): The database session.
             current_user (User): The current user.
+            base (Currency): The currency to value the wallets in.
         Returns:
-            List[Tuple[float, Currency]]: A list of tuples with the balance and currency of the wallets.
+            dict: The total and the value of each wallet in the base currency.
     """
-    result = await db.execute(select(Wallet).where(Wallet.user_id == current_user.id))
-    wallets = result.scalars().all()
-    if not wallets:
+    result = await db.execute(
+        select(Wallet.currency, available_balance_column()).where(
+            Wallet.user_id == current_user.id
+        )
+    )
+    rows = result.all()
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No wallets found."
         )
-    return [(wallet.balance, wallet.currency) for wallet in wallets]
+    currencies = [currency for currency, _ in rows]
+    balances = np.array([Decimal(balance or 0) for _, balance in rows], dtype=object)
+    values = balances * conversion_factors(
+        await rate_cache.get_rates(db), currencies, base
+    )
+    return {
+        "base": base,
+        "total": quantize(values.sum(), base),
+        "wallets": [
+            {"currency": currency, "balance": balance, "value": quantize(value, base)}
+            for (currency, balance), value in zip(rows, values)
+        ],
+    }
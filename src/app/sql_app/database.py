@@ -1,4 +1,4 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -6,9 +6,20 @@ from app.core.config import get_settings
 
 settings = get_settings()
 engine = create_async_engine(settings.DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False
-)
+
+
+def create_session_factory(bind: AsyncEngine) -> sessionmaker:
+    """
+    Create a session factory bound to the given engine.
+        Parameters:
+            bind (AsyncEngine): The engine to use.
+        Returns:
+            sessionmaker: The factory producing AsyncSession objects.
+    """
+    return sessionmaker(bind=bind, class_=AsyncSession, expire_on_commit=False)
+
+
+AsyncSessionLocal = create_session_factory(engine)
 
 
 async def get_db():
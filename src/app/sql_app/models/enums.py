@@ -20,4 +20,14 @@ class Currency(Enum):
 class IntervalType(Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
-    MONTHLY = "monthly"
\ No newline at end of file
+    MONTHLY = "monthly"
+
+
+CURRENCY_SCALE = {
+    Currency.BGN: 2,
+    Currency.EUR: 2,
+    Currency.USD: 2,
+    Currency.GBP: 2,
+    Currency.BTC: 8,
+    Currency.ETH: 18,
+}
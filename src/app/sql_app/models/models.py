@@ -1,20 +1,26 @@
 import uuid
 
 from sqlalchemy import (
+    JSON,
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum,
-    Float,
     ForeignKey,
+    Index,
     Integer,
+    Numeric,
     String,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import relationship
 
 from app.core.config import get_settings
-from app.sql_app.database import Base, engine
+from app.services.common.partitions import ensure_partitions
+from app.sql_app.database import Base, create_session_factory, engine
 from app.sql_app.models.enums import Currency, IntervalType, Status
 
 
@@ -82,10 +88,14 @@ class Card(Base):
         unique=True,
         nullable=False,
     )
-    number = Column(String, unique=True)
+    # The number and CVV are only stored encrypted, see seal_card; cards are
+    # found by the keyed digest of their number.
+    number_digest = Column(String(64), unique=True, index=True)
+    number_encrypted = Column(String)
+    last4 = Column(String(4))
     card_holder = Column(String)
     exp_date = Column(String)
-    cvv = Column(String)
+    cvv_encrypted = Column(String)
     design = Column(String)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
 
@@ -99,21 +109,35 @@ class Card(Base):
         back_populates="card",
     )
 
+    @property
+    def number(self) -> str:
+        """The masked card number; see reveal_card for the full one."""
+        return f"**** **** **** {self.last4 or ''}"
+
+    @property
+    def cvv(self) -> str:
+        return "***"
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Range partitioned by month on Postgres, so the primary key includes the
+    # timestamp; see app.services.common.partitions.
+    __table_args__ = (
+        Index("ix_transactions_status_timestamp", "status", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
         index=True,
         default=uuid.uuid4,
-        unique=True,
         nullable=False,
     )
-    amount = Column(Float)
+    amount = Column(Numeric(38, 18))
     currency = Column(Enum(Currency), default="BGN")
-    timestamp = Column(DateTime(timezone=True))
+    timestamp = Column(DateTime(timezone=True), primary_key=True, nullable=False)
     category = Column(String)
     status = Column(Enum(Status), default="pending")
     card_id = Column(UUID(as_uuid=True), ForeignKey("cards.id"), nullable=False)
@@ -123,6 +147,9 @@ class Transaction(Base):
         UUID(as_uuid=True), ForeignKey("categories.id"), nullable=False
     )
     wallet_id = Column(UUID(as_uuid=True), ForeignKey("wallets.id"), nullable=False)
+    target_currency = Column(Enum(Currency), nullable=True)
+    target_amount = Column(Numeric(38, 18), nullable=True)
+    exchange_rate = Column(Numeric(38, 18), nullable=True)
 
     card = relationship("Card", back_populates="transactions")
     sender = relationship(
@@ -155,6 +182,7 @@ class Category(Base):
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (Index("ix_contacts_user_id_id", "user_id", "id"),)
 
     id = Column(
         UUID(as_uuid=True),
@@ -191,7 +219,7 @@ class RecurringTransaction(Base):
     category_id = Column(
         UUID(as_uuid=True), ForeignKey("categories.id"), nullable=False
     )
-    amount = Column(Float, nullable=False)
+    amount = Column(Numeric(38, 18), nullable=False)
     interval = Column(Integer, nullable=True)
     interval_type = Column(Enum(IntervalType), nullable=False)
     next_execution_date = Column(DateTime(timezone=True), nullable=False)
@@ -222,8 +250,10 @@ class Wallet(Base):
         nullable=False,
     )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    balance = Column(Float, default=0.0)
+    balance = Column(Numeric(38, 18), default=0)
     currency = Column(Enum(Currency))
+    # 0 credits the balance directly; N spreads credits over N shard rows.
+    credit_shards = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="wallets")
     transactions = relationship(
@@ -231,9 +261,119 @@ class Wallet(Base):
     )
 
 
+class Deposit(Base):
+    __tablename__ = "deposits"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    wallet_id = Column(
+        UUID(as_uuid=True), ForeignKey("wallets.id"), nullable=False, index=True
+    )
+    # Withdrawals are negative, so the sum per wallet is its net external funding.
+    amount = Column(Numeric(38, 18), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+
+
+class ReconciliationRun(Base):
+    __tablename__ = "reconciliation_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    incremental = Column(Boolean, nullable=False, default=False)
+    wallets = Column(Integer, nullable=False, default=0)
+    drifted = Column(Integer, nullable=False, default=0)
+
+
+class ArchivedTransactionTotal(Base):
+    __tablename__ = "archived_transaction_totals"
+
+    # Confirmed amounts moved to the cold archive, so reconciliation still adds up.
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    currency = Column(Enum(Currency), primary_key=True)
+    sent = Column(Numeric(38, 18), nullable=False, default=0)
+    received = Column(Numeric(38, 18), nullable=False, default=0)
+
+
+class ArchivedTransactionCount(Base):
+    __tablename__ = "archived_transaction_counts"
+
+    # Transactions moved to the cold archive per day and pair of users, so a
+    # listing can count them without reading the archive.
+    day = Column(Date, primary_key=True)
+    sender_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True, index=True
+    )
+    recipient_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True, index=True
+    )
+    count = Column(Integer, nullable=False, default=0)
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_unpublished",
+            "id",
+            postgresql_where=text("published_at IS NULL"),
+            sqlite_where=text("published_at IS NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    topic = Column(String, nullable=False)
+    aggregate_id = Column(UUID(as_uuid=True), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class WalletDailyBalance(Base):
+    __tablename__ = "wallet_daily_balances"
+
+    wallet_id = Column(UUID(as_uuid=True), ForeignKey("wallets.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    opening = Column(Numeric(38, 18), nullable=False)
+    closing = Column(Numeric(38, 18), nullable=False)
+    inflow = Column(Numeric(38, 18), nullable=False, default=0)
+    outflow = Column(Numeric(38, 18), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class WalletCreditShard(Base):
+    __tablename__ = "wallet_credit_shards"
+
+    # Credits of a hot wallet not yet folded into its balance.
+    wallet_id = Column(UUID(as_uuid=True), ForeignKey("wallets.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    amount = Column(Numeric(38, 18), nullable=False, default=0)
+
+
+class ExchangeRate(Base):
+    __tablename__ = "exchange_rates"
+
+    currency = Column(Enum(Currency), primary_key=True)
+    rate = Column(Numeric(38, 18), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class FxQuoteRedemption(Base):
+    __tablename__ = "fx_quote_redemptions"
+
+    # Exchange quotes already spent by a transfer, kept until they expire.
+    id = Column(String, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
 settings = get_settings()
 
 
-async def create_tables():
-    async with engine.begin() as conn:
+async def create_tables(bind: AsyncEngine | None = None):
+    bind = bind or engine
+    async with bind.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # create_all only creates the parent of the partitioned transactions table.
+    async with create_session_factory(bind)() as db:
+        await ensure_partitions(
+            db, months_ahead=max(settings.TRANSACTION_PARTITION_MONTHS_AHEAD, 1)
+        )
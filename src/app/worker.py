@@ -0,0 +1,68 @@
+"""
+Boot the background worker running scheduled jobs outside the API process
+"""
+
+import asyncio
+import signal
+
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.api_v1.endpoints import metrics
+from app.core.config import get_settings
+from app.services.common.scheduler import LeaderElection, create_scheduler
+from app.sql_app.database import create_session_factory
+
+
+def _create_metrics_app() -> FastAPI:
+    app_ = FastAPI(title=f"{get_settings().PROJECT_NAME} worker", docs_url=None)
+    app_.include_router(metrics.router)
+    return app_
+
+
+async def run_worker(metrics_port: int | None = None) -> None:
+    """
+    Run the scheduler with its own connection pool until SIGINT or SIGTERM.
+        Parameters:
+            metrics_port (int): Serve /metrics on this port when given.
+    """
+    settings = get_settings()
+    worker_engine = create_async_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.WORKER_POOL_SIZE,
+        max_overflow=settings.WORKER_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+    election = LeaderElection(worker_engine, settings.SCHEDULER_LOCK_KEY)
+    scheduler = create_scheduler(
+        election,
+        create_session_factory(worker_engine),
+        concurrency=settings.WORKER_CONCURRENCY,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    metrics_server = None
+    if metrics_port:
+        metrics_server = uvicorn.Server(
+            uvicorn.Config(_create_metrics_app(), host="0.0.0.0", port=metrics_port)
+        )
+        # The worker owns the signal handlers, uvicorn must not replace them.
+        metrics_server.install_signal_handlers = lambda: None
+        loop.create_task(metrics_server.serve())
+
+    print("Starting worker...")
+    scheduler.start()
+    try:
+        await stop.wait()
+    finally:
+        print("Shutting down worker...")
+        scheduler.shutdown()
+        await election.release()
+        if metrics_server is not None:
+            metrics_server.should_exit = True
+        await worker_engine.dispose()
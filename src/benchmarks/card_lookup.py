@@ -0,0 +1,118 @@
+"""
+Benchmark of the card lookup on the transfer path: the vault's digest match
+against the plain card number match it replaced
+
+    python -m benchmarks.card_lookup -n 10000 -l 2000
+"""
+
+import asyncio
+import random
+import tempfile
+import time
+import uuid
+from argparse import ArgumentParser
+from pathlib import Path
+
+from sqlalchemy import Column, MetaData, String, Table, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.common.vault import vault
+
+metadata = MetaData()
+
+plain_cards = Table(
+    "plain_cards",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("number", String, unique=True),
+    Column("cvv", String),
+)
+vault_cards = Table(
+    "vault_cards",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("number_digest", String(64), unique=True),
+    Column("number_encrypted", String),
+    Column("last4", String(4)),
+    Column("cvv_encrypted", String),
+)
+
+
+def _card_number() -> str:
+    return "".join(random.choices("0123456789", k=16))
+
+
+async def _time_lookups(connection, numbers, lookup) -> float:
+    started = time.perf_counter()
+    for number in numbers:
+        row = (await connection.execute(lookup(number))).first()
+        assert row is not None
+    return time.perf_counter() - started
+
+
+async def run(database_url: str, cards: int, lookups: int) -> None:
+    engine = create_async_engine(database_url)
+    numbers = list({_card_number() for _ in range(cards)})
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.create_all)
+        started = time.perf_counter()
+        await connection.execute(
+            insert(plain_cards),
+            [{"id": str(uuid.uuid4()), "number": n, "cvv": "123"} for n in numbers],
+        )
+        plain_insert = time.perf_counter() - started
+        started = time.perf_counter()
+        await connection.execute(
+            insert(vault_cards),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "number_digest": vault.digest(n),
+                    "number_encrypted": vault.encrypt(n),
+                    "last4": n[-4:],
+                    "cvv_encrypted": vault.encrypt("123"),
+                }
+                for n in numbers
+            ],
+        )
+        vault_insert = time.perf_counter() - started
+
+    sample = random.choices(numbers, k=lookups)
+    async with engine.connect() as connection:
+        plain = await _time_lookups(
+            connection,
+            sample,
+            lambda n: select(plain_cards.c.id).where(plain_cards.c.number == n),
+        )
+        digest = await _time_lookups(
+            connection,
+            sample,
+            lambda n: select(vault_cards.c.id).where(
+                vault_cards.c.number_digest == vault.digest(n)
+            ),
+        )
+    await engine.dispose()
+
+    print(f"{len(numbers)} cards, {lookups} lookups")
+    print(f"insert plain   {plain_insert * 1e6 / len(numbers):10.1f} us/card")
+    print(f"insert vault   {vault_insert * 1e6 / len(numbers):10.1f} us/card")
+    print(f"lookup plain   {plain * 1e6 / lookups:10.1f} us/lookup")
+    print(f"lookup digest  {digest * 1e6 / lookups:10.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("-n", "--cards", type=int, default=10000)
+    parser.add_argument("-l", "--lookups", type=int, default=2000)
+    parser.add_argument(
+        "-u",
+        "--database-url",
+        default=None,
+        help="database to run against (default: a temporary SQLite file)",
+    )
+    config = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        url = config.database_url or (
+            f"sqlite+aiosqlite:///{Path(directory) / 'cards.db'}"
+        )
+        asyncio.run(run(url, config.cards, config.lookups))
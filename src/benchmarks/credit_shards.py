@@ -0,0 +1,156 @@
+"""
+Benchmark of approval throughput into one hot wallet by number of credit shards,
+running concurrent approve_transaction calls against Postgres
+
+    python -m benchmarks.credit_shards -w 32 -n 2000
+
+Every run seeds a fresh merchant wallet with the given number of credit shards
+and one awaiting payment per approval, each from a sender of its own so only the
+merchant's wallet is contended, then approves them all with concurrent workers,
+each on a pooled connection of its own. The tables are created in the database
+at DATABASE_URL (or --database-url) and the seeded rows are left behind, so run
+it against a disposable database.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from argparse import ArgumentParser
+from datetime import datetime
+from decimal import Decimal
+
+import pytz
+from fastapi import HTTPException
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import get_settings
+from app.services.common.credit_shards import available_balance
+from app.services.crud.card import seal_card
+from app.services.crud.transaction import approve_transaction
+from app.sql_app.database import create_session_factory
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import (
+    Card,
+    Category,
+    Deposit,
+    Transaction,
+    User,
+    Wallet,
+    create_tables,
+)
+
+AMOUNT = Decimal("2.50")
+
+
+async def _seed(session_factory, shards: int, approvals: int):
+    merchant = User(id=uuid.uuid4(), email=f"merchant-{uuid.uuid4()}@example.com")
+    wallet = Wallet(
+        id=uuid.uuid4(),
+        user_id=merchant.id,
+        currency=Currency.EUR,
+        balance=0,
+        credit_shards=shards,
+    )
+    category = Category(
+        id=uuid.uuid4(), name=f"sales-{uuid.uuid4()}", user_id=merchant.id
+    )
+    rows = [merchant, wallet, category]
+    transactions = []
+    now = datetime.now(pytz.utc)
+    for _ in range(approvals):
+        sender = User(id=uuid.uuid4(), email=f"sender-{uuid.uuid4()}@example.com")
+        # Card numbers are unique, so each sender gets a random one.
+        number = "".join(random.choices("0123456789", k=16))
+        card = seal_card(Card(id=uuid.uuid4(), user_id=sender.id), number)
+        sender_wallet = Wallet(
+            id=uuid.uuid4(), user_id=sender.id, currency=Currency.EUR, balance=AMOUNT
+        )
+        transaction = Transaction(
+            id=uuid.uuid4(),
+            amount=AMOUNT,
+            currency=Currency.EUR,
+            timestamp=now,
+            status=Status.awaiting,
+            card_id=card.id,
+            sender_id=sender.id,
+            recipient_id=merchant.id,
+            category_id=category.id,
+            wallet_id=sender_wallet.id,
+        )
+        deposit = Deposit(wallet_id=sender_wallet.id, amount=AMOUNT, timestamp=now)
+        rows.extend([sender, card, sender_wallet, deposit])
+        transactions.append(transaction)
+    async with session_factory() as session:
+        session.add_all(rows)
+        await session.flush()
+        session.add_all(transactions)
+        await session.commit()
+    return merchant, wallet, [transaction.id for transaction in transactions]
+
+
+async def _approve_all(session_factory, merchant, transaction_ids, workers: int):
+    queue = asyncio.Queue()
+    for transaction_id in transaction_ids:
+        queue.put_nowait(transaction_id)
+    failed = 0
+
+    async def _worker():
+        nonlocal failed
+        while not queue.empty():
+            transaction_id = queue.get_nowait()
+            # A fresh session per approval, like a request.
+            async with session_factory() as session:
+                try:
+                    await approve_transaction(session, transaction_id, str(merchant.id))
+                except HTTPException:
+                    failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(workers)])
+    return time.perf_counter() - started, failed
+
+
+async def run(database_url: str, workers: int, approvals: int) -> None:
+    if make_url(database_url).get_backend_name() != "postgresql":
+        raise SystemExit("The credit shard benchmark needs a Postgres database.")
+    engine = create_async_engine(database_url, pool_size=workers, max_overflow=0)
+    await create_tables(engine)
+    session_factory = create_session_factory(engine)
+
+    print(f"{approvals} approvals into one wallet by {workers} concurrent workers")
+    baseline = None
+    for shards in (0, 4, 8, 32):
+        merchant, wallet, transaction_ids = await _seed(
+            session_factory, shards, approvals
+        )
+        elapsed, failed = await _approve_all(
+            session_factory, merchant, transaction_ids, workers
+        )
+        async with session_factory() as session:
+            stored = await session.get(Wallet, wallet.id)
+            credited = await available_balance(session, stored)
+        assert credited == AMOUNT * (approvals - failed)
+        throughput = (approvals - failed) / elapsed
+        baseline = baseline or throughput
+        print(
+            f"shards {shards:3d} {throughput:10.0f} approvals/s "
+            f"{throughput / baseline:6.1f}x {failed:6d} failed"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("-w", "--workers", type=int, default=32)
+    parser.add_argument("-n", "--approvals", type=int, default=2000)
+    parser.add_argument(
+        "-u",
+        "--database-url",
+        default=None,
+        help="Postgres database to run against (default: DATABASE_URL)",
+    )
+    config = parser.parse_args()
+    url = config.database_url or get_settings().DATABASE_URL
+    asyncio.run(run(url, config.workers, config.approvals))
@@ -0,0 +1,82 @@
+"""
+Benchmark of the rate limiting overhead per request: the same endpoint served
+with and without the middleware, and the bare token bucket
+
+    python -m benchmarks.rate_limit -r 5000 -u 100
+"""
+
+import asyncio
+import time
+from argparse import ArgumentParser
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.services.common.ratelimit import (
+    Limit,
+    MemoryRateLimitStore,
+    RateLimitMiddleware,
+)
+from app.services.common.utils import create_access_token
+
+
+def _app(limited: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/transactions/{transaction_id}")
+    async def read_transaction(transaction_id: str):
+        return {"id": transaction_id}
+
+    if limited:
+        # Buckets large enough that every request is let through and timed.
+        app.add_middleware(
+            RateLimitMiddleware,
+            store=MemoryRateLimitStore(100000),
+            default=Limit(rate=1e9, burst=10**9),
+        )
+    return app
+
+
+async def _time_requests(app: FastAPI, requests: int, users: int) -> float:
+    tokens = [create_access_token({"sub": f"user-{i}"}) for i in range(users)]
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        started = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(
+                f"/transactions/{i}",
+                headers={"Cookie": f"user={tokens[i % users]}"},
+            )
+            assert response.status_code == 200
+        return time.perf_counter() - started
+
+
+async def run(requests: int, users: int) -> None:
+    # Warm up both apps so route compilation is not timed.
+    await _time_requests(_app(False), 100, users)
+    await _time_requests(_app(True), 100, users)
+    plain = await _time_requests(_app(False), requests, users)
+    limited = await _time_requests(_app(True), requests, users)
+
+    store = MemoryRateLimitStore(100000)
+    limit = Limit(rate=1e9, burst=10**9)
+    keys = [f"user:user-{i}:GET:/transactions/{{transaction_id}}" for i in range(users)]
+    started = time.perf_counter()
+    for i in range(requests):
+        await store.take(keys[i % users], limit, time.time())
+    bucket = time.perf_counter() - started
+
+    print(f"{requests} requests from {users} users")
+    print(f"without limiter {plain * 1e6 / requests:10.1f} us/request")
+    print(f"with limiter    {limited * 1e6 / requests:10.1f} us/request")
+    print(f"overhead        {(limited - plain) * 1e6 / requests:10.1f} us/request")
+    print(f"bucket take     {bucket * 1e6 / requests:10.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("-r", "--requests", type=int, default=5000)
+    parser.add_argument("-u", "--users", type=int, default=100)
+    config = parser.parse_args()
+    asyncio.run(run(config.requests, config.users))
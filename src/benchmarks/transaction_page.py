@@ -0,0 +1,168 @@
+"""
+Benchmark of one page of the transaction list: the projection get_transactions
+reads and its one-pass JSON encoding, against the ORM objects with joined card,
+recipient and category and the jsonable_encoder response they replaced
+
+    python -m benchmarks.transaction_page -p 1000 -i 20
+"""
+
+import asyncio
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytz
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import joinedload
+
+from app.schemas.transaction import TransactionFilter, TransactionList, TransactionView
+from app.services.crud.card import seal_card
+from app.services.crud.transaction import get_transactions
+from app.sql_app.database import Base, create_session_factory
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import Card, Category, Transaction, User, Wallet
+
+
+async def _orm_page(db, current_user, filter, skip, limit) -> bytes:
+    query = (
+        select(Transaction)
+        .options(
+            joinedload(Transaction.card),
+            joinedload(Transaction.category),
+            joinedload(Transaction.recipient),
+        )
+        .order_by(Transaction.timestamp)
+    )
+    result = await db.execute(query.offset(skip).limit(limit))
+    views = [
+        TransactionView(
+            id=transaction.id,
+            amount=transaction.amount,
+            currency=transaction.currency,
+            timestamp=transaction.timestamp,
+            card_id=transaction.card_id,
+            sender_id=transaction.sender_id,
+            recipient_id=transaction.recipient_id,
+            category_id=transaction.category_id,
+            status=transaction.status,
+            card_number=transaction.card.number,
+            recipient_email=transaction.recipient.email,
+            category_name=transaction.category.name,
+        )
+        for transaction in result.scalars().all()
+    ]
+    listed = TransactionList(transactions=views, total=len(views))
+    return json.dumps(jsonable_encoder(listed)).encode()
+
+
+async def _projection_page(db, current_user, filter, skip, limit) -> bytes:
+    listed = await get_transactions(db, current_user, filter, skip, limit)
+    return listed.model_dump_json().encode()
+
+
+async def _seed(session_factory, rows: int) -> User:
+    admin = User(id=uuid.uuid4(), email="admin@example.com", is_admin=True)
+    users = [
+        User(id=uuid.uuid4(), email=f"user{i}@example.com", is_admin=False)
+        for i in range(50)
+    ]
+    cards = []
+    for user in users:
+        number = "".join(random.choices("0123456789", k=16))
+        cards.append(seal_card(Card(id=uuid.uuid4(), user_id=user.id), number))
+    wallets = [
+        Wallet(id=uuid.uuid4(), user_id=user.id, currency=Currency.EUR, balance=0)
+        for user in users
+    ]
+    categories = [
+        Category(id=uuid.uuid4(), name=f"category{i}", user_id=users[0].id)
+        for i in range(10)
+    ]
+    start = datetime(2026, 1, 1, tzinfo=pytz.utc)
+    transactions = []
+    for i in range(rows):
+        sender, recipient = random.sample(range(len(users)), 2)
+        transactions.append(
+            Transaction(
+                id=uuid.uuid4(),
+                amount=Decimal(random.randint(1, 100000)) / 100,
+                currency=random.choice(list(Currency)),
+                timestamp=start + timedelta(minutes=i),
+                status=Status.confirmed,
+                card_id=cards[sender].id,
+                sender_id=users[sender].id,
+                recipient_id=users[recipient].id,
+                category_id=random.choice(categories).id,
+                wallet_id=wallets[sender].id,
+            )
+        )
+    async with session_factory() as session:
+        session.add_all([admin, *users, *cards, *wallets, *categories])
+        session.add_all(transactions)
+        await session.commit()
+    return admin
+
+
+async def _measure(session_factory, page, admin, page_size, iterations):
+    filter = TransactionFilter(sort_by="date")
+
+    async def _once():
+        # A fresh session per page, like a request.
+        async with session_factory() as session:
+            return await page(session, admin, filter, 0, page_size)
+
+    assert len(json.loads(await _once())["transactions"]) == page_size
+    started = time.process_time()
+    for _ in range(iterations):
+        await _once()
+    cpu = (time.process_time() - started) / iterations
+
+    tracemalloc.start()
+    await _once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+async def run(database_url: str, page_size: int, iterations: int) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    session_factory = create_session_factory(engine)
+    admin = await _seed(session_factory, page_size * 2)
+
+    print(f"{page_size} rows per page, {iterations} pages")
+    for name, page in (("orm", _orm_page), ("projection", _projection_page)):
+        cpu, peak = await _measure(session_factory, page, admin, page_size, iterations)
+        print(
+            f"{name:10s} {cpu * 1000:8.2f} ms CPU/page "
+            f"{peak / 1024:10.0f} KiB peak allocated/page"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("-p", "--page-size", type=int, default=1000)
+    parser.add_argument("-i", "--iterations", type=int, default=20)
+    parser.add_argument(
+        "-u",
+        "--database-url",
+        default=None,
+        help="database to run against (default: a temporary SQLite file)",
+    )
+    config = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        url = config.database_url or (
+            f"sqlite+aiosqlite:///{Path(directory) / 'transactions.db'}"
+        )
+        asyncio.run(run(url, config.page_size, config.iterations))
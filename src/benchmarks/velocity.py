@@ -0,0 +1,66 @@
+"""
+Benchmark of the velocity rule evaluation on the transfer path, with the
+default rules over the in-process store
+
+    python -m benchmarks.velocity -u 10000 -t 100000
+"""
+
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from argparse import ArgumentParser
+from decimal import Decimal
+
+from app.services.common.velocity import (
+    MemoryVelocityStore,
+    TransferAttempt,
+    VelocityEngine,
+    default_rules,
+)
+from app.sql_app.models.enums import Currency
+
+
+async def run(users: int, transfers: int) -> None:
+    engine = VelocityEngine(default_rules(), MemoryVelocityStore(users * 8))
+    senders = [uuid.uuid4() for _ in range(users)]
+    cards = {sender: uuid.uuid4() for sender in senders}
+    currencies = list(Currency)
+    attempts = []
+    for _ in range(transfers):
+        sender = random.choice(senders)
+        attempts.append(
+            TransferAttempt(
+                sender_id=sender,
+                recipient_id=random.choice(senders),
+                card_id=cards[sender],
+                amount=Decimal(random.randint(1, 50000)) / 100,
+                currency=random.choice(currencies),
+                new_recipient=random.random() < 0.2,
+            )
+        )
+
+    now = time.time()
+    timings = []
+    rejected = 0
+    for index, attempt in enumerate(attempts):
+        started = time.perf_counter()
+        violation = await engine.evaluate(attempt, now + index * 0.01)
+        timings.append(time.perf_counter() - started)
+        rejected += violation is not None
+
+    timings.sort()
+    print(f"{users} users, {transfers} transfers, {len(engine.rules)} rules")
+    print(f"rejected       {rejected:10d}")
+    print(f"mean           {statistics.fmean(timings) * 1e6:10.1f} us/transfer")
+    print(f"p99            {timings[int(len(timings) * 0.99)] * 1e6:10.1f} us/transfer")
+    print(f"max            {timings[-1] * 1e6:10.1f} us/transfer")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("-u", "--users", type=int, default=10000)
+    parser.add_argument("-t", "--transfers", type=int, default=100000)
+    config = parser.parse_args()
+    asyncio.run(run(config.users, config.transfers))
@@ -0,0 +1,51 @@
+"""
+Entry point for reconciling wallet balances
+"""
+
+import asyncio
+import sys
+from argparse import ArgumentParser
+
+from app.services.common.reconciliation import reconcile_database
+
+config = None
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-s",
+        "--shards",
+        type=int,
+        default=None,
+        help="split the wallets into this many ID ranges (default: settings)",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=None,
+        help="reconcile this many shards at once (default: settings)",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="only check wallets changed since the last finished run",
+    )
+    config = parser.parse_args()
+
+    report = asyncio.run(
+        reconcile_database(config.shards, config.concurrency, config.incremental)
+    )
+    for drift in report.drifts:
+        print(
+            f"{drift.wallet_id}\t{drift.currency.value}\t"
+            f"balance={drift.balance}\texpected={drift.expected}\t"
+            f"drift={drift.difference}"
+        )
+    print(
+        f"Checked {report.wallets} wallets"
+        + (f" changed since {report.since.isoformat()}" if report.since else "")
+        + f", {len(report.drifts)} drifted."
+    )
+    sys.exit(1 if report.drifts else 0)
@@ -0,0 +1,23 @@
+"""
+Entry point for running the background worker
+"""
+
+import asyncio
+from argparse import ArgumentParser
+
+from app.worker import run_worker
+
+config = None
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-m",
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve the worker metrics on this port (default: disabled)",
+    )
+    config = parser.parse_args()
+
+    asyncio.run(run_worker(config.metrics_port))
@@ -0,0 +1,39 @@
+import pytest
+import pytest_asyncio
+from app.services.common.reference_cache import card_cache, category_cache
+from app.services.crud.category import category_summary_cache
+from app.sql_app.database import Base, create_session_factory
+from app.sql_app.models import models  # noqa: F401
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Start every test with empty in-process caches.
+    """
+    caches = (category_summary_cache, category_cache, card_cache)
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory(tmp_path):
+    """
+    Session factory over a throwaway SQLite database with the full schema.
+    Every session opens its own connection, so concurrent sessions contend
+    for the database the same way separate requests do.
+    """
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'wallet.db'}",
+        poolclass=NullPool,
+        connect_args={"timeout": 30},
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield create_session_factory(engine)
+    await engine.dispose()
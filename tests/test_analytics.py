@@ -0,0 +1,165 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import numpy as np
+import pytest
+import pytz
+from app.services.common.fx import CURRENCIES
+from app.services.crud.analytics import (
+    invalidate_spending_analytics,
+    load_spending_groups,
+    rolling_mean,
+    spending_analytics,
+    spending_cache,
+)
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import Category, Transaction, User
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=pytz.utc)
+
+
+def _rates():
+    rates = {currency: Decimal(1) for currency in CURRENCIES}
+    rates[Currency.USD] = Decimal("0.5")
+    return rates
+
+
+async def _seed(session_factory):
+    sender = User(id=uuid4(), email="sender@example.com")
+    shop = User(id=uuid4(), email="shop@example.com")
+    landlord = User(id=uuid4(), email="landlord@example.com")
+    food = Category(id=uuid4(), name="food", user_id=sender.id)
+    rent = Category(id=uuid4(), name="rent", user_id=sender.id)
+    rows = [
+        (datetime(2026, 8, 3, tzinfo=pytz.utc), 20, Currency.EUR, food, shop),
+        (datetime(2026, 10, 1, tzinfo=pytz.utc), 10, Currency.EUR, food, shop),
+        (datetime(2026, 10, 2, tzinfo=pytz.utc), 200, Currency.USD, rent, landlord),
+        (datetime(2026, 10, 5, tzinfo=pytz.utc), 5, Currency.EUR, rent, landlord),
+    ]
+    transactions = [
+        Transaction(
+            id=uuid4(),
+            amount=Decimal(amount),
+            currency=currency,
+            timestamp=timestamp,
+            status=Status.confirmed,
+            card_id=uuid4(),
+            sender_id=sender.id,
+            recipient_id=recipient.id,
+            category_id=category.id,
+            wallet_id=uuid4(),
+        )
+        for timestamp, amount, currency, category, recipient in rows
+    ]
+    # Neither a pending nor a too old transaction counts.
+    transactions.append(
+        Transaction(
+            id=uuid4(),
+            amount=Decimal(1000),
+            currency=Currency.EUR,
+            timestamp=datetime(2026, 10, 6, tzinfo=pytz.utc),
+            status=Status.pending,
+            card_id=uuid4(),
+            sender_id=sender.id,
+            recipient_id=shop.id,
+            category_id=food.id,
+            wallet_id=uuid4(),
+        )
+    )
+    transactions.append(
+        Transaction(
+            id=uuid4(),
+            amount=Decimal(1000),
+            currency=Currency.EUR,
+            timestamp=datetime(2026, 7, 31, tzinfo=pytz.utc),
+            status=Status.confirmed,
+            card_id=uuid4(),
+            sender_id=sender.id,
+            recipient_id=shop.id,
+            category_id=food.id,
+            wallet_id=uuid4(),
+        )
+    )
+    async with session_factory() as session:
+        session.add_all([sender, shop, landlord, food, rent, *transactions])
+        await session.commit()
+    return sender
+
+
+def test_rolling_mean_averages_the_available_window():
+    values = np.array([3.0, 6.0, 9.0, 12.0])
+
+    assert rolling_mean(values, 3).tolist() == [3.0, 4.5, 6.0, 9.0]
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_load_spending_groups_groups_by_currency_category_and_month(
+    sqlite_session_factory,
+):
+    sender = await _seed(sqlite_session_factory)
+
+    async with sqlite_session_factory() as session:
+        groups = await load_spending_groups(session, sender.id, 3, now=NOW)
+
+    assert groups.months == ["2026-08", "2026-09", "2026-10"]
+    assert groups.categories == ["food", "rent"]
+    assert groups.recipients == ["landlord@example.com", "shop@example.com"]
+    eur = CURRENCIES.index(Currency.EUR)
+    usd = CURRENCIES.index(Currency.USD)
+    assert groups.by_category[eur].tolist() == [[20, 0, 10], [0, 0, 5]]
+    assert groups.by_category[usd].tolist() == [[0, 0, 0], [0, 0, 200]]
+    assert groups.recipient_counts.tolist() == [2, 2]
+    assert groups.count == 4
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_spending_analytics_converts_and_caches_until_a_write(
+    sqlite_session_factory, monkeypatch
+):
+    from app.services.crud import analytics
+
+    monkeypatch.setattr(analytics.settings, "ANALYTICS_MONTHS", 3)
+    monkeypatch.setattr(analytics.settings, "ANALYTICS_TOP_RECIPIENTS", 1)
+    spending_cache.clear()
+    sender = await _seed(sqlite_session_factory)
+
+    async def _load(db, user_id, months):
+        return await load_spending_groups(db, user_id, months, now=NOW)
+
+    load = AsyncMock(side_effect=_load)
+
+    with patch("app.services.crud.analytics.rate_cache") as cache, patch(
+        "app.services.crud.analytics.load_spending_groups", load
+    ):
+        cache.get_rates = AsyncMock(return_value=_rates())
+        async with sqlite_session_factory() as session:
+            report = await spending_analytics(session, sender.id, Currency.EUR)
+            again = await spending_analytics(session, sender.id, Currency.EUR)
+            assert load.await_count == 1
+
+            invalidate_spending_analytics(sender.id)
+            await spending_analytics(session, sender.id, Currency.EUR)
+            assert load.await_count == 2
+
+    assert again == report
+    assert report["count"] == 4
+    assert report["total"] == Decimal("135.00")
+    assert report["average_transaction"] == Decimal("33.75")
+    assert [month["total"] for month in report["months"]] == [
+        Decimal("20.00"),
+        Decimal("0.00"),
+        Decimal("115.00"),
+    ]
+    assert report["months"][2]["rolling_average"] == Decimal("45.00")
+    assert report["months"][2]["categories"] == {
+        "food": Decimal("10.00"),
+        "rent": Decimal("105.00"),
+    }
+    assert [category["name"] for category in report["categories"]] == ["rent", "food"]
+    assert report["top_recipients"] == [
+        {"email": "landlord@example.com", "total": Decimal("105.00"), "count": 2}
+    ]
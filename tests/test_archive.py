@@ -0,0 +1,298 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+import pytz
+from app.core.config import get_settings
+from app.schemas.transaction import TransactionFilter
+from app.services.common import metrics
+from app.services.common.archive import (
+    TransactionArchive,
+    archive_filter,
+    archive_transactions,
+)
+from app.services.common.reconciliation import run_reconciliation
+from app.services.crud.card import seal_card
+from app.services.crud.transaction import get_transactions
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import (
+    ArchivedTransactionCount,
+    ArchivedTransactionTotal,
+    Card,
+    Category,
+    OutboxEvent,
+    Transaction,
+    User,
+    Wallet,
+)
+from sqlalchemy import select
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=pytz.utc)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "archive"
+    monkeypatch.setattr(get_settings(), "TRANSACTION_ARCHIVE_DIR", str(directory))
+    monkeypatch.setattr(get_settings(), "TRANSACTION_ARCHIVE_AFTER_DAYS", 365)
+    return directory
+
+
+async def _seed(session_factory, *rows):
+    """
+    Create a sender paying a recipient once per (status, age, amount) row. The
+    wallets hold the balances the confirmed rows leave behind.
+    """
+    sender = User(id=uuid4(), email="sender@example.com", is_admin=False)
+    recipient = User(id=uuid4(), email="recipient@example.com", is_admin=False)
+    card = Card(id=uuid4(), user_id=sender.id)
+    seal_card(card, "4111111111111111")
+    category = Category(id=uuid4(), name="rent", user_id=sender.id)
+    sent = sum(amount for status, _, amount in rows if status == Status.confirmed)
+    sender_wallet = Wallet(
+        id=uuid4(), user_id=sender.id, currency=Currency.EUR, balance=-sent
+    )
+    recipient_wallet = Wallet(
+        id=uuid4(), user_id=recipient.id, currency=Currency.EUR, balance=sent
+    )
+    transactions = [
+        Transaction(
+            id=uuid4(),
+            amount=amount,
+            currency=Currency.EUR,
+            timestamp=NOW - age,
+            status=transaction_status,
+            card_id=card.id,
+            sender_id=sender.id,
+            recipient_id=recipient.id,
+            category_id=category.id,
+            wallet_id=sender_wallet.id,
+        )
+        for transaction_status, age, amount in rows
+    ]
+    async with session_factory() as session:
+        session.add_all(
+            [sender, recipient, card, category, sender_wallet, recipient_wallet]
+        )
+        session.add_all(transactions)
+        await session.commit()
+    return sender, transactions
+
+
+def test_archive_filter_limits_users_to_their_transactions():
+    user = User(id=uuid4(), is_admin=False)
+
+    condition = archive_filter(user, TransactionFilter(direction="incoming"))
+
+    assert str(user.id) in str(condition)
+    assert "recipient_id" in str(condition)
+    assert archive_filter(User(id=uuid4(), is_admin=True), TransactionFilter()) is None
+
+
+def test_archive_writes_a_file_per_month_and_deduplicates_on_read(tmp_path):
+    archive = TransactionArchive(str(tmp_path))
+    record = {
+        "id": str(uuid4()),
+        "amount": Decimal("12.50"),
+        "currency": "EUR",
+        "timestamp": datetime(2024, 1, 31, 23, 30, tzinfo=pytz.utc),
+        "status": "confirmed",
+        "card_id": str(uuid4()),
+        "sender_id": str(uuid4()),
+        "recipient_id": str(uuid4()),
+        "category_id": str(uuid4()),
+        "wallet_id": str(uuid4()),
+        "target_currency": None,
+        "target_amount": None,
+        "exchange_rate": None,
+        "card_number": "**** **** **** 1111",
+        "recipient_email": "recipient@example.com",
+        "category_name": "rent",
+    }
+    later = dict(
+        record, id=str(uuid4()), timestamp=datetime(2024, 2, 1, tzinfo=pytz.utc)
+    )
+
+    paths = archive.write([record, later])
+    archive.write([record])
+
+    assert [path.split("/")[-2] for path in paths] == [
+        "transactions_y2024m01",
+        "transactions_y2024m02",
+    ]
+    rows = archive.read()
+    assert [str(row["id"]) for row in rows] == [record["id"], later["id"]]
+    assert rows[0]["amount"] == Decimal("12.50")
+    assert archive.read(start=datetime(2024, 2, 1)) == rows[1:]
+    assert archive.read(limit=1) == rows[:1]
+    assert archive.count() == 2
+    assert archive.count(end=datetime(2024, 1, 31, 23, 59)) == 1
+
+
+def test_archive_reads_the_smallest_amounts_of_all_months(tmp_path):
+    archive = TransactionArchive(str(tmp_path))
+    record = {
+        "currency": "EUR",
+        "status": "confirmed",
+        "card_id": str(uuid4()),
+        "sender_id": str(uuid4()),
+        "recipient_id": str(uuid4()),
+        "category_id": str(uuid4()),
+        "wallet_id": str(uuid4()),
+        "target_currency": None,
+        "target_amount": None,
+        "exchange_rate": None,
+        "card_number": "**** **** **** 1111",
+        "recipient_email": "recipient@example.com",
+        "category_name": "rent",
+    }
+    records = [
+        dict(
+            record,
+            id=str(uuid4()),
+            amount=Decimal(amount),
+            timestamp=datetime(2024, month, 1, tzinfo=pytz.utc),
+        )
+        for month, amount in [(1, "30"), (2, "10"), (3, "20"), (3, "5")]
+    ]
+    archive.write(records)
+    archive.write(records[1:2])
+
+    rows = archive.read(limit=2, sort_by="amount")
+
+    assert [row["amount"] for row in rows] == [Decimal(5), Decimal(10)]
+    assert len(archive.read(sort_by="amount")) == 4
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_archive_transactions_moves_settled_rows(
+    sqlite_session_factory, archive_dir
+):
+    metrics.reset()
+    sender, transactions = await _seed(
+        sqlite_session_factory,
+        (Status.confirmed, timedelta(days=800), Decimal(10)),
+        (Status.declined, timedelta(days=700), Decimal(20)),
+        (Status.pending, timedelta(days=600), Decimal(30)),
+        (Status.confirmed, timedelta(days=10), Decimal(5)),
+    )
+
+    archived = await archive_transactions(sqlite_session_factory, batch_size=1, now=NOW)
+
+    assert archived == 2
+    assert metrics.get("transactions_archived_total") == 2
+    async with sqlite_session_factory() as session:
+        result = await session.execute(select(Transaction.id))
+        remaining = set(result.scalars().all())
+        totals = (await session.execute(select(ArchivedTransactionTotal))).scalars()
+        totals = {(total.user_id, total.currency): total for total in totals}
+        result = await session.execute(
+            select(OutboxEvent.topic, OutboxEvent.aggregate_id)
+        )
+        events = result.all()
+    assert remaining == {transactions[2].id, transactions[3].id}
+    assert sorted(events) == sorted(
+        ("transaction.archived", transaction.id) for transaction in transactions[:2]
+    )
+    assert totals[(sender.id, Currency.EUR)].sent == Decimal(10)
+    assert totals[(transactions[0].recipient_id, Currency.EUR)].received == 10
+    assert sorted(path.name for path in archive_dir.iterdir()) == [
+        "transactions_y2024m08",
+        "transactions_y2024m11",
+    ]
+
+    report = await run_reconciliation(sqlite_session_factory, shards=2, concurrency=1)
+    assert report.drifts == []
+
+    async with sqlite_session_factory() as session:
+        listed = await get_transactions(
+            session, sender, TransactionFilter(sort_by="amount"), skip=1, limit=2
+        )
+    assert listed.total == 4
+    assert [view.amount for view in listed.transactions] == [10, 20]
+    assert listed.transactions[0].card_number == "**** **** **** 1111"
+    assert listed.transactions[1].category_name == "rent"
+
+    async with sqlite_session_factory() as session:
+        recent = await get_transactions(
+            session,
+            sender,
+            TransactionFilter(start_date=NOW - timedelta(days=100)),
+            skip=0,
+            limit=10,
+        )
+    assert [view.id for view in recent.transactions] == [transactions[3].id]
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_archive_transactions_invalidates_summaries(
+    sqlite_session_factory, archive_dir
+):
+    sender, _ = await _seed(
+        sqlite_session_factory, (Status.confirmed, timedelta(days=800), Decimal(10))
+    )
+
+    with patch(
+        "app.services.common.archive.invalidate_category_summary"
+    ) as summary, patch(
+        "app.services.common.archive.invalidate_spending_analytics"
+    ) as spending:
+        await archive_transactions(sqlite_session_factory, now=NOW)
+
+    summary.assert_called_once_with(str(sender.id))
+    spending.assert_called_once_with(str(sender.id))
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_listing_counts_the_archive_and_reads_it_only_past_live_rows(
+    sqlite_session_factory, archive_dir
+):
+    sender, transactions = await _seed(
+        sqlite_session_factory,
+        (Status.confirmed, timedelta(days=800), Decimal(10)),
+        (Status.declined, timedelta(days=700, hours=6), Decimal(20)),
+        (Status.confirmed, timedelta(days=10), Decimal(5)),
+    )
+    await archive_transactions(sqlite_session_factory, now=NOW)
+    async with sqlite_session_factory() as session:
+        counts = (await session.execute(select(ArchivedTransactionCount))).scalars()
+        assert sorted(count.day for count in counts) == [
+            (NOW - timedelta(days=800)).date(),
+            (NOW - timedelta(days=700, hours=6)).date(),
+        ]
+    metrics.reset()
+
+    async with sqlite_session_factory() as session:
+        first = await get_transactions(
+            session, sender, TransactionFilter(), skip=0, limit=1
+        )
+        assert metrics.get("transaction_archive_rows_read_total") == 0
+        second = await get_transactions(
+            session, sender, TransactionFilter(), skip=1, limit=1
+        )
+        # Half of the day the declined row is on is outside the range.
+        ranged = await get_transactions(
+            session,
+            sender,
+            TransactionFilter(
+                start_date=NOW - timedelta(days=700, hours=9),
+                end_date=NOW - timedelta(days=5),
+            ),
+            skip=0,
+            limit=10,
+        )
+
+    assert first.total == second.total == 3
+    assert [view.id for view in first.transactions] == [transactions[2].id]
+    assert [view.id for view in second.transactions] == [transactions[0].id]
+    assert metrics.get("transaction_archive_rows_read_total") == 2
+    assert ranged.total == 2
+    assert {view.id for view in ranged.transactions} == {
+        transactions[1].id,
+        transactions[2].id,
+    }
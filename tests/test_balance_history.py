@@ -0,0 +1,93 @@
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from app.services.crud.balance_history import get_balance_history
+from app.services.crud.wallet import add_funds_to_wallet, withdraw_funds_from_wallet
+from app.sql_app.models.enums import Currency
+from app.sql_app.models.models import User, Wallet
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+
+def sql_string(query):
+    return str(query.compile(compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.asyncio
+async def test_get_balance_history_reads_range_in_one_query():
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.return_value = MagicMock()
+    user = User(id=uuid4())
+
+    await get_balance_history(
+        db, user, Currency.EUR, date(2026, 1, 1), date(2026, 1, 31)
+    )
+
+    db.execute.assert_awaited_once()
+    statement = sql_string(db.execute.call_args.args[0])
+    assert "JOIN wallets ON wallets.id = wallet_daily_balances.wallet_id" in statement
+    assert (
+        "wallet_daily_balances.day BETWEEN '2026-01-01' AND '2026-01-31'" in statement
+    )
+    assert "ORDER BY wallet_daily_balances.day" in statement
+
+
+@pytest.mark.asyncio
+async def test_get_balance_history_rejects_inverted_range():
+    db = AsyncMock(spec=AsyncSession)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_balance_history(
+            db, User(id=uuid4()), Currency.EUR, date(2026, 2, 1), date(2026, 1, 1)
+        )
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_balance_history_rejects_long_range():
+    db = AsyncMock(spec=AsyncSession)
+    end = date(2026, 1, 1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_balance_history(
+            db, User(id=uuid4()), Currency.EUR, end - timedelta(days=400), end
+        )
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    db.execute.assert_not_called()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_deposits_and_withdrawals_roll_up_per_day(sqlite_session_factory):
+    user = User(id=uuid4(), email=f"{uuid4()}@example.com")
+    async with sqlite_session_factory() as session:
+        session.add(user)
+        session.add(Wallet(user_id=user.id, currency=Currency.EUR, balance=5))
+        await session.commit()
+
+    async def _deposit():
+        async with sqlite_session_factory() as session:
+            await add_funds_to_wallet(session, 2.5, user, Currency.EUR)
+
+    await asyncio.gather(*[_deposit() for _ in range(10)])
+    async with sqlite_session_factory() as session:
+        await withdraw_funds_from_wallet(session, user, 4.0, Currency.EUR)
+
+    async with sqlite_session_factory() as session:
+        history = await get_balance_history(session, user, Currency.EUR)
+
+    assert len(history) == 1
+    day = history[0]
+    assert Decimal(day.opening) == Decimal("5")
+    assert Decimal(day.closing) == Decimal("26")
+    assert Decimal(day.inflow) == Decimal("25")
+    assert Decimal(day.outflow) == Decimal("4")
+    assert day.count == 11
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+from app.services.common import events, metrics
+from app.services.common.broadcast import Broadcast, broadcast
+from app.services.common.cache import MISSING
+from app.services.crud.analytics import spending_cache
+from app.services.crud.category import category_summary_cache
+
+
+class FakeStore:
+    """
+    The publish and pubsub calls of the shared store, shared by every client.
+    """
+
+    def __init__(self):
+        self.queues = []
+
+    async def publish(self, channel, message):
+        for queue in self.queues:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        store = self
+
+        class PubSub:
+            async def subscribe(self, channel):
+                self.queue = asyncio.Queue()
+                store.queues.append(self.queue)
+
+            async def listen(self):
+                while True:
+                    yield await self.queue.get()
+
+            async def aclose(self):
+                store.queues.remove(self.queue)
+
+        return PubSub()
+
+
+def test_messages_stay_in_process_without_a_shared_store():
+    bus = Broadcast()
+    received = []
+    bus.subscribe("ping", received.append)
+
+    bus.send("ping", {"n": 1})
+
+    assert received == [{"n": 1}]
+
+
+@pytest.mark.asyncio
+async def test_messages_reach_the_other_processes_once():
+    store = FakeStore()
+    sender, other = Broadcast(store), Broadcast(store)
+    sent, received = [], []
+    sender.subscribe("ping", sent.append)
+    other.subscribe("ping", received.append)
+    sender.start()
+    other.start()
+    await asyncio.sleep(0)
+
+    sender.send("ping", {"n": 1})
+    await asyncio.sleep(0.05)
+    await sender.stop()
+    await other.stop()
+
+    assert sent == [{"n": 1}]
+    assert received == [{"n": 1}]
+    assert store.queues == []
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_is_counted_not_raised():
+    metrics.reset()
+    client = AsyncMock()
+    client.publish.side_effect = ConnectionError("down")
+    bus = Broadcast(client)
+
+    bus.send("ping", {})
+    await asyncio.sleep(0.01)
+
+    client.publish.assert_awaited_once()
+    assert metrics.get("broadcast_errors_total") == 1
+
+
+@pytest.mark.asyncio
+async def test_transaction_events_of_other_processes_reach_local_connections():
+    user_id = uuid4()
+    subscription = events.broker.subscribe(user_id)
+    event = {
+        "transaction_id": str(uuid4()),
+        "status": "confirmed",
+        "sender_id": str(uuid4()),
+        "recipient_id": str(user_id),
+        "amount": "10.00",
+        "currency": "EUR",
+        "timestamp": None,
+    }
+    try:
+        events.broadcast.receive(
+            json.dumps({"origin": "other", "kind": "transaction", "data": event})
+        )
+
+        assert (await subscription.next(0.1)).transaction_id == event["transaction_id"]
+    finally:
+        events.broker.unsubscribe(subscription)
+
+
+@pytest.mark.parametrize(
+    "kind, cache",
+    [
+        ("category_summary", category_summary_cache),
+        ("spending_analytics", spending_cache),
+    ],
+)
+def test_cache_invalidations_of_other_processes_drop_local_entries(kind, cache):
+    user_id, other_id = str(uuid4()), str(uuid4())
+    cache.set(user_id, "summary")
+    cache.set(other_id, "summary")
+
+    broadcast.receive(
+        json.dumps({"origin": "other", "kind": kind, "data": {"user_ids": [user_id]}})
+    )
+
+    assert cache.get(user_id) is MISSING
+    assert cache.get(other_id) == "summary"
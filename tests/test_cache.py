@@ -0,0 +1,93 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.services.common import metrics
+from app.services.common.cache import MISSING, TTLCache
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_get_returns_cached_value_and_counts_hits():
+    cache = TTLCache("test", ttl_seconds=60)
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.get("other") is MISSING
+    assert metrics.get("cache_hits_total", cache="test") == 1
+    assert metrics.get("cache_misses_total", cache="test") == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("test", ttl_seconds=10)
+    with patch("app.services.common.cache.time.monotonic", return_value=100.0):
+        cache.set("key", "value")
+    with patch("app.services.common.cache.time.monotonic", return_value=109.0):
+        assert cache.get("key") == "value"
+    with patch("app.services.common.cache.time.monotonic", return_value=111.0):
+        assert cache.get("key") is MISSING
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test", ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert metrics.get("cache_evictions_total", cache="test") == 1
+    assert metrics.get("cache_entries", cache="test") == 2
+
+
+def test_invalidate_drops_entries():
+    cache = TTLCache("test", ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a", "missing")
+
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == 2
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_loads_once():
+    cache = TTLCache("test", ttl_seconds=60)
+    loader = AsyncMock(return_value=[1, 2])
+
+    assert await cache.get_or_load("key", loader) == [1, 2]
+    assert await cache.get_or_load("key", loader) == [1, 2]
+
+    loader.assert_awaited_once()
+
+
+def test_hit_ratio_is_exported():
+    cache = TTLCache("test", ttl_seconds=60)
+    cache.set("key", "value")
+
+    cache.get("key")
+    cache.get("key")
+    cache.get("key")
+    cache.get("other")
+
+    assert metrics.get("cache_hit_ratio", cache="test") == 0.75
+    assert 'cache_hit_ratio{cache="test"} 0.75' in metrics.render()
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_stored():
+    cache = TTLCache("test", ttl_seconds=60)
+
+    async def _load_while_invalidated():
+        cache.invalidate("key")
+        return "stale"
+
+    assert await cache.get_or_load("key", _load_while_invalidated) == "stale"
+    assert cache.get("key") is MISSING
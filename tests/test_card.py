@@ -10,9 +10,13 @@ from app.services.crud.card import (
     delete_card,
     read_all_cards,
     read_card,
+    reveal_card,
+    seal_card,
     update_card,
 )
+from app.services.common.vault import vault
 from app.sql_app.models.models import Card
+from app.sql_app.models.models import User as UserModel
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -70,14 +74,16 @@ async def test_read_card_success():
     db = MagicMock(spec=AsyncSession)
     card_id = uuid4()
     user_id = uuid4()
-    mock_card = Card(
-        id=card_id,
-        user_id=user_id,
-        number="1234567890123456",
-        card_holder="Test User",
-        exp_date="01/24",
-        cvv="123",
-        design="Design1",
+    mock_card = seal_card(
+        Card(
+            id=card_id,
+            user_id=user_id,
+            card_holder="Test User",
+            exp_date="01/24",
+            design="Design1",
+        ),
+        "1234567890123456",
+        "123",
     )
 
     mock_result = MagicMock()
@@ -108,27 +114,58 @@ async def test_read_card_not_found():
     )
 
 
+@pytest.mark.asyncio
+async def test_reveal_card_decrypts_number_and_cvv():
+    db = MagicMock(spec=AsyncSession)
+    card_id = uuid4()
+    user_id = uuid4()
+    mock_card = seal_card(
+        Card(
+            id=card_id,
+            user_id=user_id,
+            card_holder="Test User",
+            exp_date="01/24",
+            design="Design1",
+        ),
+        "1234567890123456",
+        "123",
+    )
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.first.return_value = mock_card
+    db.execute = AsyncMock(return_value=mock_result)
+
+    result = await reveal_card(db, card_id, user_id)
+
+    assert result == {"id": card_id, "number": "1234567890123456", "cvv": "123"}
+    assert mock_card.number == "**** **** **** 3456"
+    assert "1234567890123456" not in mock_card.number_encrypted
+
+
 @pytest.mark.asyncio
 async def test_read_all_cards_success():
     db = MagicMock(spec=AsyncSession)
     user_id = uuid4()
-    card1 = Card(
-        id=uuid4(),
-        user_id=user_id,
-        number="1234567890123456",
-        card_holder="Test User 1",
-        exp_date="01/24",
-        cvv="123",
-        design="Design1",
+    card1 = seal_card(
+        Card(
+            id=uuid4(),
+            user_id=user_id,
+            card_holder="Test User 1",
+            exp_date="01/24",
+            design="Design1",
+        ),
+        "1234567890123456",
+        "123",
     )
-    card2 = Card(
-        id=uuid4(),
-        user_id=user_id,
-        number="6543210987654321",
-        card_holder="Test User 2",
-        exp_date="01/25",
-        cvv="321",
-        design="Design2",
+    card2 = seal_card(
+        Card(
+            id=uuid4(),
+            user_id=user_id,
+            card_holder="Test User 2",
+            exp_date="01/25",
+            design="Design2",
+        ),
+        "6543210987654321",
+        "321",
     )
     mock_result = MagicMock()
     mock_result.scalars.return_value.all.return_value = [card1, card2]
@@ -146,14 +183,16 @@ async def test_update_card_success():
     db = MagicMock(spec=AsyncSession)
     card_id = uuid4()
     user_id = uuid4()
-    mock_card = Card(
-        id=card_id,
-        user_id=user_id,
-        number="1234567890123456",
-        card_holder="Test User",
-        exp_date="01/24",
-        cvv="123",
-        design="Design1",
+    mock_card = seal_card(
+        Card(
+            id=card_id,
+            user_id=user_id,
+            card_holder="Test User",
+            exp_date="01/24",
+            design="Design1",
+        ),
+        "1234567890123456",
+        "123",
     )
     updated_card_data = CardCreate(
         number="6543210987654321",
@@ -181,10 +220,12 @@ async def test_update_card_success():
 
     result = await update_card(db, card_id, updated_card_data, current_user)
 
-    assert result.number == updated_card_data.number
+    assert result.number == "**** **** **** " + updated_card_data.number[-4:]
+    assert vault.decrypt(result.number_encrypted) == updated_card_data.number
+    assert result.number_digest == vault.digest(updated_card_data.number)
     assert result.card_holder == updated_card_data.card_holder
     assert result.exp_date == updated_card_data.exp_date
-    assert result.cvv == updated_card_data.cvv
+    assert vault.decrypt(result.cvv_encrypted) == updated_card_data.cvv
     assert result.design == updated_card_data.design
 
 
@@ -230,14 +271,16 @@ async def test_update_card_unauthorized():
     card_id = uuid4()
     card_owner_id = uuid4()
     current_user_id = uuid4()
-    mock_card = Card(
-        id=card_id,
-        user_id=card_owner_id,
-        number="1234567890123456",
-        card_holder="Test User",
-        exp_date=date(2024, 11, 1),
-        cvv="123",
-        design="Design1",
+    mock_card = seal_card(
+        Card(
+            id=card_id,
+            user_id=card_owner_id,
+            card_holder="Test User",
+            exp_date=date(2024, 11, 1),
+            design="Design1",
+        ),
+        "1234567890123456",
+        "123",
     )
     updated_card_data = CardCreate(
         number="6543210987654321",
@@ -253,14 +296,16 @@ async def test_delete_card_success():
     db = MagicMock(spec=AsyncSession)
     card_id = uuid4()
     user_id = uuid4()
-    mock_card = Card(
-        id=card_id,
-        user_id=user_id,
-        number="1234567890123456",
-        card_holder="Test User",
-        exp_date="01/24",
-        cvv="123",
-        design="Design1",
+    mock_card = seal_card(
+        Card(
+            id=card_id,
+            user_id=user_id,
+            card_holder="Test User",
+            exp_date="01/24",
+            design="Design1",
+        ),
+        "1234567890123456",
+        "123",
     )
 
     mock_result = MagicMock()
@@ -292,3 +337,37 @@ async def test_delete_card_not_found():
 
     assert excinfo.value.status_code == status.HTTP_404_NOT_FOUND
     assert excinfo.value.detail == "Card not found."
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_update_card_of_another_user_is_not_found(sqlite_session_factory):
+    owner = UserModel(id=uuid4(), email="owner@example.com")
+    other = UserModel(id=uuid4(), email="other@example.com")
+    card = seal_card(
+        Card(id=uuid4(), user_id=owner.id, card_holder="Owner", design="Design1"),
+        "1234567890123456",
+        "123",
+    )
+    async with sqlite_session_factory() as session:
+        session.add_all([owner, other])
+        await session.flush()
+        session.add(card)
+        await session.commit()
+    updated_card_data = CardCreate(
+        number="6543210987654321",
+        card_holder="Other User",
+        exp_date="01/24",
+        cvv="321",
+        design="Design2",
+    )
+
+    async with sqlite_session_factory() as session:
+        with pytest.raises(HTTPException) as excinfo:
+            await update_card(session, card.id, updated_card_data, other.id)
+
+    assert excinfo.value.status_code == status.HTTP_404_NOT_FOUND
+    async with sqlite_session_factory() as session:
+        stored = await session.get(Card, card.id)
+    assert stored.card_holder == "Owner"
+    assert stored.number_digest == vault.digest("1234567890123456")
@@ -1,9 +1,18 @@
+from datetime import datetime, timezone
+from decimal import Decimal
 from unittest.mock import ANY, AsyncMock, MagicMock
 from uuid import uuid4
 
 import pytest
 from app.schemas.category import CategoryCreate
-from app.services.crud.category import create_category, delete_category, read_categories
+from app.services.crud.category import (
+    create_category,
+    delete_category,
+    invalidate_category_summary,
+    read_categories,
+    summarize_categories,
+)
+from app.sql_app.models.enums import Currency
 from app.sql_app.models.models import Category, Transaction
 from fastapi import HTTPException, status
 from sqlalchemy import and_, select
@@ -134,3 +143,82 @@ async def test_delete_category_not_found():
     assert str(db.execute.await_args[0][0]) == str(expected_query)
     db.delete.assert_not_awaited()
     db.commit.assert_not_awaited()
+
+
+def _summary_db(rows):
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.all.return_value = rows
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_summarize_categories_groups_in_one_query():
+    groceries, travel = uuid4(), uuid4()
+    earlier = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    later = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    db = _summary_db(
+        [
+            (groceries, "Groceries", Currency.BGN, 3, Decimal("30.00"), earlier),
+            (groceries, "Groceries", Currency.EUR, 1, Decimal("5.00"), later),
+            (travel, "Travel", None, 0, None, None),
+        ]
+    )
+
+    response = await summarize_categories(db, uuid4())
+
+    assert response == {
+        "categories": [
+            {
+                "id": groceries,
+                "name": "Groceries",
+                "count": 4,
+                "totals": {"BGN": Decimal("30.00"), "EUR": Decimal("5.00")},
+                "last_used": later,
+            },
+            {
+                "id": travel,
+                "name": "Travel",
+                "count": 0,
+                "totals": {},
+                "last_used": None,
+            },
+        ]
+    }
+    db.execute.assert_awaited_once()
+    statement = str(db.execute.await_args[0][0])
+    assert "LEFT OUTER JOIN transactions" in statement
+    assert "GROUP BY categories.id, categories.name, transactions.currency" in statement
+
+
+@pytest.mark.asyncio
+async def test_summarize_categories_is_cached_until_invalidated():
+    user_id = uuid4()
+    db = _summary_db([])
+
+    await summarize_categories(db, user_id)
+    await summarize_categories(db, user_id)
+    assert db.execute.await_count == 1
+
+    invalidate_category_summary(user_id)
+    await summarize_categories(db, user_id)
+    assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_category_invalidates_summary():
+    user_id = uuid4()
+    await summarize_categories(_summary_db([]), user_id)
+    db = MagicMock(spec=AsyncSession)
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.first.return_value = None
+    db.execute = AsyncMock(return_value=mock_result)
+    db.commit = AsyncMock()
+    db.refresh = AsyncMock()
+
+    await create_category(db, CategoryCreate(name="New"), user_id)
+
+    summary_db = _summary_db([])
+    await summarize_categories(summary_db, user_id)
+    summary_db.execute.assert_awaited_once()
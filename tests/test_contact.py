@@ -11,7 +11,7 @@ from app.services.crud.contact import (
 )
 from app.sql_app.models.models import Contact, User
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -111,77 +111,55 @@ async def test_create_contact_success():
     }
 
 
-@pytest.mark.asyncio
-async def test_read_contacts_no_search():
-    db = AsyncMock(spec=AsyncSession)
-    current_user = User(id=uuid4())
-    contact_1 = Contact(id=uuid4(), user_id=current_user.id, user_contact_id=uuid4())
-    contact_2 = Contact(id=uuid4(), user_id=current_user.id, user_contact_id=uuid4())
-
-    user_1 = User(
-        id=contact_1.user_contact_id,
-        name="User 1",
-        email="user1@example.com",
-        phone_number="1234567890",
-    )
-    user_2 = User(
-        id=contact_2.user_contact_id,
-        name="User 2",
-        email="user2@example.com",
-        phone_number="0987654321",
-    )
+def _contact_rows(*users):
+    rows = [(uuid4(), user.name, user.email, user.phone_number) for user in users]
+    result = MagicMock()
+    result.all.return_value = rows
+    return rows, result
 
-    contact_mock_result = MagicMock()
-    contact_mock_result.scalars.return_value.all.return_value = [contact_1, contact_2]
 
-    user_mock_result_1 = MagicMock()
-    user_mock_result_1.scalars.return_value.first.return_value = user_1
+def sql_string(query):
+    return str(query.compile(compile_kwargs={"literal_binds": True}))
 
-    user_mock_result_2 = MagicMock()
-    user_mock_result_2.scalars.return_value.first.return_value = user_2
 
-    db.execute = AsyncMock(
-        side_effect=[contact_mock_result, user_mock_result_1, user_mock_result_2]
-    )
+@pytest.mark.asyncio
+async def test_read_contacts_no_search():
+    db = AsyncMock(spec=AsyncSession)
+    current_user = User(id=uuid4())
+    user_1 = User(name="User 1", email="user1@example.com", phone_number="1234567890")
+    user_2 = User(name="User 2", email="user2@example.com", phone_number="0987654321")
+    rows, result = _contact_rows(user_1, user_2)
+    db.execute = AsyncMock(return_value=result)
 
     response = await read_contacts(current_user, skip=0, limit=10, db=db)
 
     assert response == [
         {
-            "contact_id": contact_1.id,
+            "contact_id": rows[0][0],
             "contact_name": user_1.name,
             "contact_email": user_1.email,
             "contact_phone_number": user_1.phone_number,
         },
         {
-            "contact_id": contact_2.id,
+            "contact_id": rows[1][0],
             "contact_name": user_2.name,
             "contact_email": user_2.email,
             "contact_phone_number": user_2.phone_number,
         },
     ]
+    db.execute.assert_awaited_once()
+    statement = sql_string(db.execute.call_args.args[0])
+    assert "JOIN users ON users.id = contacts.user_contact_id" in statement
+    assert "ORDER BY contacts.id" in statement
 
 
 @pytest.mark.asyncio
 async def test_read_contacts_with_search():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4())
-    contact_1 = Contact(id=uuid4(), user_id=current_user.id, user_contact_id=uuid4())
-
-    user_1 = User(
-        id=contact_1.user_contact_id,
-        name="User 1",
-        email="user1@example.com",
-        phone_number="1234567890",
-    )
-
-    contact_mock_result = MagicMock()
-    contact_mock_result.scalars.return_value.all.return_value = [contact_1]
-
-    user_mock_result_1 = MagicMock()
-    user_mock_result_1.scalars.return_value.first.return_value = user_1
-
-    db.execute = AsyncMock(side_effect=[contact_mock_result, user_mock_result_1])
+    user_1 = User(name="User 1", email="user1@example.com", phone_number="1234567890")
+    rows, result = _contact_rows(user_1)
+    db.execute = AsyncMock(return_value=result)
 
     response = await read_contacts(
         current_user, skip=0, limit=10, db=db, search="user1"
@@ -189,70 +167,83 @@ async def test_read_contacts_with_search():
 
     assert response == [
         {
-            "contact_id": contact_1.id,
+            "contact_id": rows[0][0],
             "contact_name": user_1.name,
             "contact_email": user_1.email,
             "contact_phone_number": user_1.phone_number,
         },
     ]
+    statement = sql_string(db.execute.call_args.args[0])
+    assert "users.email LIKE '%' || 'user1' || '%' ESCAPE '/'" in statement
+    assert "FROM contacts JOIN users" in statement
 
 
 @pytest.mark.asyncio
 async def test_read_contacts_pagination():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4())
-    contact_1 = Contact(id=uuid4(), user_id=current_user.id, user_contact_id=uuid4())
-    contact_2 = Contact(id=uuid4(), user_id=current_user.id, user_contact_id=uuid4())
-    contact_3 = Contact(id=uuid4(), user_id=current_user.id, user_contact_id=uuid4())
-
-    user_1 = User(
-        id=contact_1.user_contact_id,
-        name="User 1",
-        email="user1@example.com",
-        phone_number="1234567890",
-    )
-    user_2 = User(
-        id=contact_2.user_contact_id,
-        name="User 2",
-        email="user2@example.com",
-        phone_number="0987654321",
-    )
-    user_3 = User(
-        id=contact_3.user_contact_id,
-        name="User 3",
-        email="user3@example.com",
-        phone_number="1122334455",
-    )
+    db.execute = AsyncMock(return_value=_contact_rows()[1])
 
-    contact_mock_result = MagicMock()
-    contact_mock_result.scalars.return_value.all.return_value = [contact_2, contact_3]
+    await read_contacts(current_user, skip=1, limit=2, db=db)
 
-    user_mock_result_1 = MagicMock()
-    user_mock_result_1.scalars.return_value.first.return_value = user_2
+    statement = sql_string(db.execute.call_args.args[0])
+    assert "LIMIT 2 OFFSET 1" in statement
 
-    user_mock_result_2 = MagicMock()
-    user_mock_result_2.scalars.return_value.first.return_value = user_3
 
-    db.execute = AsyncMock(
-        side_effect=[contact_mock_result, user_mock_result_1, user_mock_result_2]
-    )
+@pytest.mark.asyncio
+async def test_read_contacts_keyset_pagination():
+    db = AsyncMock(spec=AsyncSession)
+    current_user = User(id=uuid4())
+    after = uuid4()
+    db.execute = AsyncMock(return_value=_contact_rows()[1])
 
-    response = await read_contacts(current_user, skip=1, limit=2, db=db)
+    await read_contacts(current_user, skip=0, limit=2, db=db, after=after)
 
-    assert response == [
-        {
-            "contact_id": contact_2.id,
-            "contact_name": user_2.name,
-            "contact_email": user_2.email,
-            "contact_phone_number": user_2.phone_number,
-        },
-        {
-            "contact_id": contact_3.id,
-            "contact_name": user_3.name,
-            "contact_email": user_3.email,
-            "contact_phone_number": user_3.phone_number,
-        },
+    statement = sql_string(db.execute.call_args.args[0])
+    assert f"contacts.id > '{after.hex}'" in statement
+    assert "ORDER BY contacts.id" in statement
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_read_contacts_runs_one_statement_per_page(sqlite_session_factory):
+    owner = User(id=uuid4(), email="owner@example.com")
+    others = [
+        User(id=uuid4(), name=f"User {i}", email=f"user{i}@example.com")
+        for i in range(25)
     ]
+    async with sqlite_session_factory() as session:
+        session.add_all([owner, *others])
+        session.add_all(
+            Contact(id=uuid4(), user_id=owner.id, user_contact_id=other.id)
+            for other in others
+        )
+        await session.commit()
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = sqlite_session_factory.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        pages, after = [], None
+        async with sqlite_session_factory() as session:
+            while True:
+                before = len(statements)
+                page = await read_contacts(owner, 0, 10, session, after=after)
+                assert len(statements) - before == 1
+                if not page:
+                    break
+                pages.append(page)
+                after = page[-1]["contact_id"]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    emails = [contact["contact_email"] for page in pages for contact in page]
+    assert sorted(emails) == sorted(other.email for other in others)
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,213 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+import pytz
+from app.services.common.credit_shards import (
+    available_balance,
+    credit_wallet_shard,
+    fold_credit_shards,
+)
+from app.services.common.expiry import ExpiryPolicy, expire_transactions
+from app.services.common.reconciliation import expected_balances
+from app.services.crud.card import seal_card
+from app.services.crud.dashboard import user_dashboard
+from app.services.crud.transaction import approve_transaction
+from app.services.crud.wallet import (
+    check_balance,
+    portfolio_valuation,
+    set_credit_shards,
+    withdraw_funds_from_wallet,
+)
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import (
+    Card,
+    Category,
+    Deposit,
+    Transaction,
+    User,
+    Wallet,
+    WalletCreditShard,
+    WalletDailyBalance,
+)
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+
+async def _merchant(session_factory, shards, balance=0):
+    merchant = User(id=uuid4(), email=f"{uuid4()}@example.com", is_admin=False)
+    wallet = Wallet(
+        id=uuid4(),
+        user_id=merchant.id,
+        currency=Currency.EUR,
+        balance=balance,
+        credit_shards=shards,
+    )
+    async with session_factory() as session:
+        session.add_all([merchant, wallet])
+        await session.commit()
+    return merchant, wallet
+
+
+async def _payments(session_factory, merchant, count, amount):
+    sender = User(id=uuid4(), email=f"{uuid4()}@example.com", is_admin=False)
+    card = Card(id=uuid4(), user_id=sender.id)
+    seal_card(card, "4111111111111111")
+    category = Category(id=uuid4(), name="shopping", user_id=sender.id)
+    funded = amount * count
+    wallet = Wallet(
+        id=uuid4(), user_id=sender.id, currency=Currency.EUR, balance=funded
+    )
+    transactions = [
+        Transaction(
+            id=uuid4(),
+            amount=amount,
+            currency=Currency.EUR,
+            timestamp=datetime.now(pytz.utc),
+            status=Status.awaiting,
+            card_id=card.id,
+            sender_id=sender.id,
+            recipient_id=merchant.id,
+            category_id=category.id,
+            wallet_id=wallet.id,
+        )
+        for _ in range(count)
+    ]
+    async with session_factory() as session:
+        session.add_all([sender, card, category, wallet])
+        session.add(
+            Deposit(
+                wallet_id=wallet.id, amount=funded, timestamp=datetime.now(pytz.utc)
+            )
+        )
+        session.add_all(transactions)
+        await session.commit()
+    return transactions
+
+
+async def _scalar(session_factory, statement):
+    async with session_factory() as session:
+        return (await session.execute(statement)).scalar()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_sharded_credits_skip_the_balance_until_folded(sqlite_session_factory):
+    merchant, wallet = await _merchant(sqlite_session_factory, shards=4)
+    transactions = await _payments(
+        sqlite_session_factory, merchant, 20, Decimal("2.50")
+    )
+
+    for transaction in transactions:
+        async with sqlite_session_factory() as session:
+            await approve_transaction(session, transaction.id, str(merchant.id))
+
+    balance = select(Wallet.balance).where(Wallet.id == wallet.id)
+    assert await _scalar(sqlite_session_factory, balance) == 0
+    shards = select(func.count()).select_from(WalletCreditShard)
+    assert 1 <= await _scalar(sqlite_session_factory, shards) <= 4
+    async with sqlite_session_factory() as session:
+        stored = await session.get(Wallet, wallet.id)
+        assert await available_balance(session, stored) == 50
+        # Reconciliation counts the pending credits as part of the balance.
+        drifts = (await session.execute(expected_balances((None, None)))).all()
+        assert drifts == []
+        assert await check_balance(session, merchant) == [(50, Currency.EUR)]
+        with patch("app.services.crud.wallet.rate_cache") as cache:
+            cache.get_rates = AsyncMock(return_value={Currency.EUR: Decimal(1)})
+            portfolio = await portfolio_valuation(session, merchant, Currency.EUR)
+        assert portfolio["total"] == 50
+    dashboard = await user_dashboard(
+        merchant, "wallets", session_factory=sqlite_session_factory
+    )
+    assert dashboard["wallets"]["items"] == [
+        {"id": wallet.id, "currency": Currency.EUR, "balance": 50}
+    ]
+
+    assert await fold_credit_shards(sqlite_session_factory) == 1
+
+    assert await _scalar(sqlite_session_factory, balance) == 50
+    assert await _scalar(sqlite_session_factory, shards) == 0
+    async with sqlite_session_factory() as session:
+        rollup = (
+            await session.execute(
+                select(WalletDailyBalance).where(
+                    WalletDailyBalance.wallet_id == wallet.id
+                )
+            )
+        ).scalar_one()
+    assert rollup.inflow == 50
+    assert rollup.closing == 50
+    assert await fold_credit_shards(sqlite_session_factory) == 0
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_debits_see_pending_credits(sqlite_session_factory):
+    merchant, wallet = await _merchant(sqlite_session_factory, shards=2, balance=5)
+    async with sqlite_session_factory() as session:
+        await credit_wallet_shard(session, wallet, Decimal(25))
+        await session.commit()
+
+    async with sqlite_session_factory() as session:
+        updated = await withdraw_funds_from_wallet(
+            session, merchant, Decimal(20), Currency.EUR
+        )
+        assert updated.balance == 10
+
+    async with sqlite_session_factory() as session:
+        with pytest.raises(HTTPException) as exc_info:
+            await withdraw_funds_from_wallet(
+                session, merchant, Decimal(20), Currency.EUR
+            )
+    assert exc_info.value.detail == "Insufficient funds."
+    shards = select(func.count()).select_from(WalletCreditShard)
+    assert await _scalar(sqlite_session_factory, shards) == 0
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_set_credit_shards_folds_pending_credits(sqlite_session_factory):
+    merchant, wallet = await _merchant(sqlite_session_factory, shards=8)
+    admin = User(id=uuid4(), email="admin@example.com", is_admin=True)
+    async with sqlite_session_factory() as session:
+        await credit_wallet_shard(session, wallet, Decimal(7))
+        await session.commit()
+
+    async with sqlite_session_factory() as session:
+        with pytest.raises(HTTPException) as exc_info:
+            await set_credit_shards(session, merchant, wallet.id, 0)
+        assert exc_info.value.status_code == 403
+        with pytest.raises(HTTPException) as exc_info:
+            await set_credit_shards(session, admin, wallet.id, 1000)
+        assert exc_info.value.status_code == 400
+
+        updated = await set_credit_shards(session, admin, wallet.id, 0)
+
+    assert updated.credit_shards == 0
+    assert updated.balance == 7
+    shards = select(func.count()).select_from(WalletCreditShard)
+    assert await _scalar(sqlite_session_factory, shards) == 0
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_approve_after_expiry_moves_no_money(sqlite_session_factory):
+    merchant, wallet = await _merchant(sqlite_session_factory, shards=0)
+    (transaction,) = await _payments(
+        sqlite_session_factory, merchant, 1, Decimal("2.50")
+    )
+    policy = ExpiryPolicy({Status.awaiting: timedelta(0)})
+    await expire_transactions(sqlite_session_factory, policy)
+
+    async with sqlite_session_factory() as session:
+        with pytest.raises(HTTPException) as exc_info:
+            await approve_transaction(session, transaction.id, str(merchant.id))
+
+    assert exc_info.value.status_code == 409
+    balance = select(Wallet.balance).where(Wallet.id == wallet.id)
+    assert await _scalar(sqlite_session_factory, balance) == 0
+    sender_balance = select(Wallet.balance).where(Wallet.id == transaction.wallet_id)
+    assert await _scalar(sqlite_session_factory, sender_balance) == Decimal("2.50")
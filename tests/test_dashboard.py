@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from app.services.crud.card import seal_card
+from app.services.crud.dashboard import SECTIONS, parse_fields, user_dashboard
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import Card, Category, Contact, Transaction, User
+from fastapi import HTTPException, status
+
+
+def test_parse_fields_defaults_to_all_sections():
+    assert parse_fields(None) == list(SECTIONS)
+    assert parse_fields(" cards, transactions,cards") == ["cards", "transactions"]
+
+
+def test_parse_fields_rejects_unknown_sections():
+    with pytest.raises(HTTPException) as exc_info:
+        parse_fields("cards,accounts")
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert exc_info.value.detail == "Unknown dashboard fields: accounts."
+
+
+@pytest.mark.asyncio
+async def test_user_dashboard_rejects_invalid_cursor():
+    with pytest.raises(HTTPException) as exc_info:
+        await user_dashboard(
+            User(id=uuid4()), "transactions", cursors={"transactions": "garbage"}
+        )
+
+    assert exc_info.value.detail == "Invalid transactions cursor."
+
+
+async def _seed(session_factory):
+    user = User(id=uuid4(), email="owner@example.com")
+    friend = User(id=uuid4(), name="Friend", email="friend@example.com")
+    cards = [
+        seal_card(Card(id=uuid4(), user_id=user.id), f"411111111111{i:04d}", "123")
+        for i in range(3)
+    ]
+    category = Category(id=uuid4(), name="Bills", user_id=user.id)
+    start = datetime(2026, 1, 1)
+    transactions = [
+        Transaction(
+            id=uuid4(),
+            amount=Decimal(i + 1),
+            currency=Currency.EUR,
+            timestamp=start + timedelta(hours=i),
+            status=Status.confirmed,
+            card_id=cards[0].id,
+            sender_id=user.id if i % 2 else friend.id,
+            recipient_id=friend.id if i % 2 else user.id,
+            category_id=category.id,
+            wallet_id=uuid4(),
+        )
+        for i in range(5)
+    ]
+    async with session_factory() as session:
+        session.add_all([user, friend, *cards, category, *transactions])
+        session.add(Contact(id=uuid4(), user_id=user.id, user_contact_id=friend.id))
+        await session.commit()
+    return user, transactions
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_user_dashboard_reads_sections_on_separate_sessions(
+    sqlite_session_factory,
+):
+    user, _ = await _seed(sqlite_session_factory)
+    opened = []
+
+    def session_factory():
+        opened.append(1)
+        return sqlite_session_factory()
+
+    dashboard = await user_dashboard(user, limit=2, session_factory=session_factory)
+
+    assert len(opened) == len(SECTIONS)
+    assert dashboard["email"] == "owner@example.com"
+    assert len(dashboard["cards"]["items"]) == 2
+    assert dashboard["cards"]["next_cursor"] is not None
+    assert "cvv" not in dashboard["cards"]["items"][0]
+    assert dashboard["cards"]["items"][0]["number"].startswith("**** **** ****")
+    assert dashboard["categories"] == {
+        "items": [{"id": dashboard["categories"]["items"][0]["id"], "name": "Bills"}],
+        "next_cursor": None,
+    }
+    assert dashboard["contacts"]["items"][0]["contact_email"] == "friend@example.com"
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_user_dashboard_pages_a_single_section(sqlite_session_factory):
+    user, transactions = await _seed(sqlite_session_factory)
+
+    seen, cursor = [], None
+    while True:
+        dashboard = await user_dashboard(
+            user,
+            "transactions",
+            limit=2,
+            cursors={"transactions": cursor},
+            session_factory=sqlite_session_factory,
+        )
+        assert set(dashboard) == {"email", "transactions"}
+        seen.extend(item["id"] for item in dashboard["transactions"]["items"])
+        cursor = dashboard["transactions"]["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [transaction.id for transaction in reversed(transactions)]
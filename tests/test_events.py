@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from app.services.common import metrics
+from app.services.common.events import (
+    EventBroker,
+    TransactionEvent,
+    stream_events,
+)
+from app.services.crud.transaction import confirm_transaction
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import Transaction
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _event(sender_id, recipient_id, status="awaiting"):
+    return TransactionEvent(
+        transaction_id=str(uuid4()),
+        status=status,
+        sender_id=str(sender_id),
+        recipient_id=str(recipient_id),
+        amount="10.00",
+        currency="EUR",
+        timestamp=None,
+    )
+
+
+def test_event_from_transaction():
+    transaction = Transaction(
+        id=uuid4(),
+        status=Status.awaiting,
+        sender_id=uuid4(),
+        recipient_id=uuid4(),
+        amount=10,
+        currency=Currency.EUR,
+        timestamp=datetime(2026, 1, 1),
+    )
+
+    event = TransactionEvent.from_transaction(transaction)
+
+    assert event.status == "awaiting"
+    assert event.currency == "EUR"
+    assert event.amount == "10"
+    assert event.timestamp == "2026-01-01T00:00:00"
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_only_sender_and_recipient():
+    broker = EventBroker(10)
+    sender, recipient, other = uuid4(), uuid4(), uuid4()
+    sender_connection = broker.subscribe(sender)
+    recipient_connections = [broker.subscribe(recipient), broker.subscribe(recipient)]
+    other_connection = broker.subscribe(other)
+    event = _event(sender, recipient)
+
+    broker.publish(event)
+
+    assert await sender_connection.next(0.1) == event
+    for connection in recipient_connections:
+        assert await connection.next(0.1) == event
+    assert await other_connection.next(0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_drops_oldest_events():
+    metrics.reset()
+    broker = EventBroker(2)
+    recipient = uuid4()
+    connection = broker.subscribe(recipient)
+    events = [_event(uuid4(), recipient) for _ in range(3)]
+
+    for event in events:
+        broker.publish(event)
+
+    assert connection.take_dropped() == 1
+    assert await connection.next(0.1) == events[1]
+    assert await connection.next(0.1) == events[2]
+    assert metrics.get("event_stream_dropped_total") == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_events_keepalives_and_unsubscribes():
+    broker = EventBroker(10)
+    recipient = uuid4()
+    disconnected = AsyncMock(side_effect=[False, False, True])
+    stream = stream_events(recipient, disconnected, 0.01, broker)
+
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    assert broker.connections == 1
+    event = _event(uuid4(), recipient)
+    broker.publish(event)
+    message = await first
+    keepalive = await stream.__anext__()
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+
+    lines = message.strip().split("\n")
+    assert lines[:2] == ["id: 1", "event: transaction"]
+    assert json.loads(lines[2][len("data: ") :])["transaction_id"] == (
+        event.transaction_id
+    )
+    assert keepalive == ": keepalive\n\n"
+    assert broker.connections == 0
+
+
+@pytest.mark.asyncio
+async def test_confirm_transaction_publishes_status_change():
+    db = AsyncMock(spec=AsyncSession)
+    sender_id = uuid4()
+    transaction = Transaction(
+        id=uuid4(), status=Status.awaiting, sender_id=sender_id, recipient_id=uuid4()
+    )
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = transaction
+    db.execute = AsyncMock(return_value=result)
+
+    with patch("app.services.crud.transaction.publish_transaction") as publish, patch(
+        "app.services.crud.transaction.get_category_by_id", AsyncMock(return_value=None)
+    ):
+        await confirm_transaction(transaction.id, db, str(sender_id))
+
+    publish.assert_called_once_with(transaction)
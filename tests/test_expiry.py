@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import pytz
+from app.services.common import metrics
+from app.services.common.expiry import (
+    ExpiryPolicy,
+    expire_statement,
+    expire_transactions,
+)
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import OutboxEvent, Transaction
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=pytz.utc)
+
+POLICY = ExpiryPolicy(
+    {Status.pending: timedelta(hours=24), Status.awaiting: timedelta(hours=72)}
+)
+
+
+def test_policy_from_settings_skips_disabled_statuses(monkeypatch):
+    from app.core import config
+
+    settings = config.get_settings()
+    monkeypatch.setattr(settings, "TRANSACTION_PENDING_EXPIRY_HOURS", 0)
+    monkeypatch.setattr(settings, "TRANSACTION_AWAITING_EXPIRY_HOURS", 48)
+
+    policy = ExpiryPolicy.from_settings()
+
+    assert policy.max_age == {Status.awaiting: timedelta(hours=48)}
+
+
+def test_expire_statement_skips_locked_rows():
+    statement = str(
+        expire_statement(Status.pending, NOW, 100).compile(dialect=postgresql.dialect())
+    )
+
+    assert statement.startswith("UPDATE transactions SET status=")
+    assert "ORDER BY transactions.timestamp" in statement
+    assert "FOR UPDATE SKIP LOCKED" in statement
+    assert "RETURNING transactions.id, transactions.status" in statement
+
+
+async def _create_transactions(session_factory, *rows):
+    transactions = [
+        Transaction(
+            id=uuid4(),
+            amount=10,
+            currency=Currency.EUR,
+            timestamp=NOW - age,
+            status=transaction_status,
+            card_id=uuid4(),
+            sender_id=uuid4(),
+            recipient_id=uuid4(),
+            category_id=uuid4(),
+            wallet_id=uuid4(),
+        )
+        for transaction_status, age in rows
+    ]
+    async with session_factory() as session:
+        session.add_all(transactions)
+        await session.commit()
+    return transactions
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_expire_transactions_declines_stale_rows_in_batches(
+    sqlite_session_factory,
+):
+    metrics.reset()
+    transactions = await _create_transactions(
+        sqlite_session_factory,
+        (Status.pending, timedelta(hours=30)),
+        (Status.pending, timedelta(hours=40)),
+        (Status.pending, timedelta(hours=50)),
+        (Status.pending, timedelta(hours=1)),
+        (Status.awaiting, timedelta(hours=30)),
+        (Status.awaiting, timedelta(hours=100)),
+        (Status.confirmed, timedelta(hours=500)),
+    )
+
+    expired = await expire_transactions(
+        sqlite_session_factory, POLICY, batch_size=2, now=NOW
+    )
+
+    assert expired == {Status.pending: 3, Status.awaiting: 1}
+    async with sqlite_session_factory() as session:
+        result = await session.execute(select(Transaction.id, Transaction.status))
+        statuses = dict(result.all())
+    assert [statuses[transaction.id] for transaction in transactions] == [
+        Status.declined,
+        Status.declined,
+        Status.declined,
+        Status.pending,
+        Status.awaiting,
+        Status.declined,
+        Status.confirmed,
+    ]
+    assert metrics.get("transactions_expired_total", status="pending") == 3
+    assert metrics.get("transactions_expired_last_run", status="awaiting") == 1
+    async with sqlite_session_factory() as session:
+        result = await session.execute(
+            select(OutboxEvent.topic, OutboxEvent.aggregate_id, OutboxEvent.payload)
+        )
+        events = result.all()
+    assert sorted(aggregate_id for _, aggregate_id, _ in events) == sorted(
+        transactions[index].id for index in (0, 1, 2, 5)
+    )
+    assert {topic for topic, _, _ in events} == {"transaction.declined"}
+    assert {payload["status"] for _, _, payload in events} == {"declined"}
+
+    again = await expire_transactions(
+        sqlite_session_factory, POLICY, batch_size=2, now=NOW
+    )
+
+    assert again == {Status.pending: 0, Status.awaiting: 0}
+    assert metrics.get("transactions_expired_total", status="pending") == 3
+    assert metrics.get("transactions_expired_last_run", status="pending") == 0
@@ -0,0 +1,231 @@
+import json
+from decimal import Decimal, localcontext
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.services.common.fx import (
+    DatabaseRateProvider,
+    FileRateProvider,
+    QuoteBook,
+    RateCache,
+    conversion_factors,
+    redeem_exchange_quote,
+    store_rates,
+)
+from app.sql_app.models.enums import Currency
+from fastapi import HTTPException, status
+
+FIXTURE = Path(__file__).parents[1] / "src/app/fixtures/fx_rates.json"
+RATES = {
+    Currency.EUR: Decimal("1"),
+    Currency.USD: Decimal("0.9"),
+    Currency.BGN: Decimal("0.5"),
+}
+
+
+@pytest.mark.asyncio
+async def test_file_rate_provider_reads_fixture(tmp_path):
+    path = tmp_path / "rates.json"
+    path.write_text(json.dumps({"pivot": "EUR", "rates": {"EUR": "1", "USD": "0.9"}}))
+
+    rates = await FileRateProvider(path).get_rates()
+
+    assert rates == {Currency.EUR: Decimal("1"), Currency.USD: Decimal("0.9")}
+
+
+@pytest.mark.asyncio
+async def test_bundled_fixture_covers_all_currencies():
+    rates = await FileRateProvider(FIXTURE).get_rates()
+
+    assert set(rates) == set(Currency)
+
+
+@pytest.mark.asyncio
+async def test_database_rate_provider_uses_one_query():
+    db = AsyncMock()
+    db.execute.return_value.all = MagicMock(return_value=list(RATES.items()))
+
+    rates = await DatabaseRateProvider().get_rates(db)
+
+    assert rates == RATES
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_rate_cache_reloads_only_after_ttl():
+    provider = MagicMock()
+    provider.get_rates = AsyncMock(return_value=RATES)
+    cache = RateCache(provider, ttl_seconds=60)
+
+    await cache.get_rates()
+    assert provider.get_rates.await_count == 1
+
+    cache.invalidate()
+    await cache.get_rates()
+    assert provider.get_rates.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_cache_with_zero_ttl_always_reloads():
+    provider = MagicMock()
+    provider.get_rates = AsyncMock(return_value=RATES)
+    cache = RateCache(provider, ttl_seconds=0)
+
+    await cache.get_rates()
+    await cache.get_rates()
+
+    assert provider.get_rates.await_count == 2
+
+
+def test_conversion_factors_are_exact_cross_rates():
+    factors = conversion_factors(
+        RATES, [Currency.EUR, Currency.BGN, Currency.USD], Currency.USD
+    )
+
+    with localcontext() as ctx:
+        ctx.prec = 38
+        assert factors.tolist() == [
+            Decimal(1) / Decimal("0.9"),
+            Decimal("0.5") / Decimal("0.9"),
+            Decimal(1),
+        ]
+
+
+def test_conversion_factors_missing_rate():
+    with pytest.raises(HTTPException) as exc_info:
+        conversion_factors(RATES, [Currency.BTC], Currency.EUR)
+
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_store_rates_replaces_table():
+    db = MagicMock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+
+    await store_rates(db, RATES)
+
+    assert "DELETE FROM exchange_rates" in str(db.execute.call_args.args[0])
+    stored = list(db.add_all.call_args.args[0])
+    assert {row.currency: row.rate for row in stored} == RATES
+    db.commit.assert_awaited_once()
+
+
+SENDER = "5f0c7b2e-0000-4000-8000-000000000001"
+
+
+def test_quote_book_locks_cross_rate():
+    book = QuoteBook("secret", ttl_seconds=30)
+
+    quote = book.lock(SENDER, Currency.EUR, Currency.BGN, Decimal("10.00"), RATES)
+    verified = book.get(quote.token, SENDER, Decimal("10"))
+
+    assert quote.rate == Decimal(2)
+    assert verified.id == quote.id
+    assert verified.source == Currency.EUR
+    assert verified.target == Currency.BGN
+    assert verified.rate == Decimal(2)
+
+
+def test_quote_book_accepts_quotes_from_other_workers():
+    quote = QuoteBook("secret", ttl_seconds=30).lock(
+        SENDER, Currency.USD, Currency.EUR, Decimal(5), RATES
+    )
+
+    assert (
+        QuoteBook("secret", ttl_seconds=30).get(quote.token, SENDER, Decimal(5)).rate
+        == quote.rate
+    )
+
+
+@pytest.mark.parametrize(
+    "secret, ttl_seconds",
+    [("other-secret", 30), ("secret", -1)],
+)
+def test_quote_book_rejects_forged_or_expired_quotes(secret, ttl_seconds):
+    quote = QuoteBook("secret", ttl_seconds=30).lock(
+        SENDER, Currency.USD, Currency.EUR, Decimal(5), RATES
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        QuoteBook(secret, ttl_seconds=ttl_seconds).get(quote.token, SENDER, Decimal(5))
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert exc_info.value.detail == "Exchange quote is invalid or expired."
+
+
+@pytest.mark.parametrize(
+    "sender_id, amount",
+    [("5f0c7b2e-0000-4000-8000-000000000002", Decimal(5)), (SENDER, Decimal(500))],
+)
+def test_quote_book_rejects_quotes_of_other_transfers(sender_id, amount):
+    book = QuoteBook("secret", ttl_seconds=30)
+    quote = book.lock(SENDER, Currency.USD, Currency.EUR, Decimal(5), RATES)
+
+    with pytest.raises(HTTPException) as exc_info:
+        book.get(quote.token, sender_id, amount)
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert exc_info.value.detail == "Exchange quote does not match the transaction."
+
+
+def test_quote_book_rejects_same_currency():
+    with pytest.raises(HTTPException) as exc_info:
+        QuoteBook("secret", 30).lock(
+            SENDER, Currency.EUR, Currency.EUR, Decimal(5), RATES
+        )
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_quote_book_requires_both_rates():
+    with pytest.raises(HTTPException) as exc_info:
+        QuoteBook("secret", 30).lock(
+            SENDER, Currency.EUR, Currency.ETH, Decimal(5), RATES
+        )
+
+    assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_redeem_exchange_quote_rejects_moved_rates():
+    book = QuoteBook("secret", 30)
+    quote = book.lock(SENDER, Currency.EUR, Currency.BGN, Decimal(5), RATES)
+    moved = {**RATES, Currency.BGN: Decimal("0.45")}
+    db = MagicMock()
+
+    with patch("app.services.common.fx.quote_book", book), patch(
+        "app.services.common.fx.rate_cache"
+    ) as cache:
+        cache.get_rates = AsyncMock(return_value=moved)
+        with pytest.raises(HTTPException) as exc_info:
+            await redeem_exchange_quote(db, quote.token, SENDER, Decimal(5))
+
+    assert exc_info.value.status_code == status.HTTP_409_CONFLICT
+    db.add.assert_not_called()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_redeem_exchange_quote_is_single_use(sqlite_session_factory):
+    book = QuoteBook("secret", 30)
+    quote = book.lock(SENDER, Currency.EUR, Currency.BGN, Decimal(5), RATES)
+
+    with patch("app.services.common.fx.quote_book", book), patch(
+        "app.services.common.fx.rate_cache"
+    ) as cache:
+        cache.get_rates = AsyncMock(return_value=RATES)
+        async with sqlite_session_factory() as session:
+            redeemed = await redeem_exchange_quote(
+                session, quote.token, SENDER, Decimal(5)
+            )
+            await session.commit()
+        async with sqlite_session_factory() as session:
+            with pytest.raises(HTTPException) as exc_info:
+                await redeem_exchange_quote(session, quote.token, SENDER, Decimal(5))
+
+    assert redeemed.rate == Decimal(2)
+    assert exc_info.value.status_code == status.HTTP_409_CONFLICT
+    assert exc_info.value.detail == "Exchange quote was already used."
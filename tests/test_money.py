@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from app.schemas.transaction import TransactionView
+from app.schemas.wallet import Wallet
+from app.services.common.money import (
+    from_minor,
+    parse_amount,
+    quantize,
+    sum_amounts,
+    to_minor,
+)
+from app.sql_app.models.enums import Currency
+from fastapi import HTTPException, status
+
+
+@pytest.mark.parametrize(
+    "amount, currency, units",
+    [
+        ("12.34", Currency.EUR, 1234),
+        ("0.00000001", Currency.BTC, 1),
+        ("1.000000000000000001", Currency.ETH, 10**18 + 1),
+        (Decimal("-5.5"), Currency.USD, -550),
+    ],
+)
+def test_minor_unit_round_trip(amount, currency, units):
+    assert to_minor(amount, currency) == units
+    assert from_minor(units, currency) == Decimal(str(amount))
+
+
+def test_quantize_rounds_half_to_even():
+    assert quantize("0.125", Currency.EUR) == Decimal("0.12")
+    assert quantize("0.135", Currency.EUR) == Decimal("0.14")
+    assert quantize(0.1, "BGN") == Decimal("0.10")
+
+
+def test_sum_amounts_is_exact_where_floats_drift():
+    amounts = [Decimal("0.10")] * 10
+
+    assert sum(0.1 for _ in range(10)) != 1.0
+    assert sum_amounts(amounts, Currency.EUR) == Decimal("1.00")
+
+
+def test_sum_amounts_falls_back_to_python_ints_for_wei():
+    amounts = [Decimal("9.000000000000000001")] * 3
+
+    assert sum_amounts(amounts, Currency.ETH) == Decimal("27.000000000000000003")
+
+
+def test_sum_amounts_empty():
+    assert sum_amounts([], Currency.USD) == Decimal("0.00")
+
+
+def test_parse_amount_accepts_exact_minor_units():
+    assert parse_amount("19.99", "USD") == Decimal("19.99")
+    assert parse_amount(Decimal("0.00000001"), Currency.BTC) == Decimal("0.00000001")
+
+
+@pytest.mark.parametrize(
+    "amount, currency, detail",
+    [
+        ("0", Currency.EUR, "Amount must be greater than zero."),
+        ("-1", Currency.EUR, "Amount must be greater than zero."),
+        ("1.001", Currency.EUR, "Amount has more decimal places than EUR allows."),
+        ("1", "XYZ", "Invalid currency."),
+    ],
+)
+def test_parse_amount_rejects_invalid(amount, currency, detail):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_amount(amount, currency)
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert exc_info.value.detail == detail
+
+
+def test_transaction_view_keeps_cents_in_json():
+    view = TransactionView(
+        id=uuid4(),
+        amount=Decimal("12.34"),
+        currency="EUR",
+        timestamp=datetime.now(timezone.utc),
+        card_id=uuid4(),
+        sender_id=uuid4(),
+        recipient_id=uuid4(),
+        category_id=uuid4(),
+        status="pending",
+        card_number="1234567890123456",
+        recipient_email="recipient@example.com",
+        category_name="Groceries",
+    )
+
+    assert view.amount == Decimal("12.34")
+    assert view.model_dump(mode="json")["amount"] == "12.34"
+
+
+def test_wallet_keeps_wei_in_json():
+    wallet = Wallet(id=uuid4(), currency="ETH", amount=Decimal("1E-18"))
+
+    assert wallet.model_dump(mode="json")["amount"] == "0.000000000000000001"
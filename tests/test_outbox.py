@@ -0,0 +1,150 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+import pytz
+from app.services.common import metrics
+from app.services.common.outbox import (
+    LogFileSink,
+    OutboxRelay,
+    OutboxSink,
+    QueueSink,
+)
+from app.services.crud.wallet import add_funds_to_wallet, withdraw_funds_from_wallet
+from app.sql_app.models.enums import Currency
+from app.sql_app.models.models import OutboxEvent, User, Wallet
+from sqlalchemy import func, select
+
+
+class FailingSink(OutboxSink):
+    name = "failing"
+
+    async def deliver(self, events):
+        raise ConnectionError("sink unavailable")
+
+
+async def _funded_wallet(session_factory):
+    user = User(id=uuid4(), email=f"{uuid4()}@example.com")
+    async with session_factory() as session:
+        session.add(user)
+        session.add(
+            Wallet(id=uuid4(), user_id=user.id, currency=Currency.EUR, balance=0)
+        )
+        await session.commit()
+    async with session_factory() as session:
+        await add_funds_to_wallet(session, 30, user, Currency.EUR)
+    async with session_factory() as session:
+        await withdraw_funds_from_wallet(session, user, 5, Currency.EUR)
+    return user
+
+
+async def _unpublished(session_factory):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(func.count()).where(OutboxEvent.published_at.is_(None))
+        )
+        return result.scalar_one()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_wallet_changes_are_recorded_with_the_change(sqlite_session_factory):
+    user = await _funded_wallet(sqlite_session_factory)
+
+    async with sqlite_session_factory() as session:
+        result = await session.execute(
+            select(OutboxEvent.topic, OutboxEvent.payload).order_by(OutboxEvent.id)
+        )
+        events = result.all()
+
+    assert [topic for topic, _ in events] == ["wallet.funded", "wallet.withdrawn"]
+    assert events[0].payload["user_id"] == str(user.id)
+    assert events[1].payload["balance"] == "25.00"
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_relay_delivers_in_batches_and_marks_published(
+    sqlite_session_factory, tmp_path
+):
+    metrics.reset()
+    await _funded_wallet(sqlite_session_factory)
+    await _funded_wallet(sqlite_session_factory)
+    queue = asyncio.Queue()
+    log_path = tmp_path / "outbox.jsonl"
+    relay = OutboxRelay(
+        sqlite_session_factory,
+        [QueueSink(queue), LogFileSink(str(log_path))],
+        batch_size=3,
+    )
+
+    assert await relay.drain() == 4
+
+    delivered = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert [event["id"] for event in delivered] == [1, 2, 3, 4]
+    logged = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert logged == delivered
+    assert await _unpublished(sqlite_session_factory) == 0
+    assert metrics.get("outbox_delivered_total", sink="queue") == 4
+    assert metrics.get("outbox_lag_events") == 0
+    assert await relay.drain() == 0
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_failed_delivery_keeps_events_for_the_next_run(sqlite_session_factory):
+    metrics.reset()
+    await _funded_wallet(sqlite_session_factory)
+    relay = OutboxRelay(sqlite_session_factory, [FailingSink()], batch_size=10)
+
+    with pytest.raises(ConnectionError):
+        await relay.drain()
+
+    assert await _unpublished(sqlite_session_factory) == 2
+    assert metrics.get("outbox_delivery_errors_total", sink="failing") == 1
+    assert metrics.get("outbox_lag_events") == 2
+    assert metrics.get("outbox_lag_seconds") >= 0
+
+    queue = asyncio.Queue()
+    assert await OutboxRelay(sqlite_session_factory, [QueueSink(queue)]).drain() == 2
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_relayed_events_are_purged_after_the_retention(sqlite_session_factory):
+    metrics.reset()
+    await _funded_wallet(sqlite_session_factory)
+    await _funded_wallet(sqlite_session_factory)
+    relay = OutboxRelay(
+        sqlite_session_factory,
+        [QueueSink(asyncio.Queue())],
+        batch_size=3,
+        retention=timedelta(hours=1),
+    )
+
+    assert await relay.drain() == 4
+    assert await relay.purge() == 0
+
+    await _funded_wallet(sqlite_session_factory)
+    later = datetime.now(pytz.utc) + timedelta(hours=2)
+    assert await relay.purge(now=later) == 4
+
+    async with sqlite_session_factory() as session:
+        result = await session.execute(select(func.count()).select_from(OutboxEvent))
+        assert result.scalar_one() == 2
+    assert await _unpublished(sqlite_session_factory) == 2
+    assert metrics.get("outbox_purged_total") == 4
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_relay_without_sinks_marks_events_for_the_purge(sqlite_session_factory):
+    await _funded_wallet(sqlite_session_factory)
+    relay = OutboxRelay(sqlite_session_factory, [], retention=timedelta(hours=1))
+
+    assert await relay.drain() == 2
+    assert await _unpublished(sqlite_session_factory) == 0
+    later = datetime.now(pytz.utc) + timedelta(hours=2)
+    assert await relay.purge(now=later) == 2
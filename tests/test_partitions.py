@@ -0,0 +1,133 @@
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytz
+from app.services.common import metrics
+from app.services.common.partitions import (
+    add_months,
+    as_utc,
+    create_default_partition_sql,
+    create_partition_sql,
+    ensure_partitions,
+    partition_bounds,
+    partition_name,
+)
+from app.sql_app.models.models import Transaction, create_tables
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+NOW = datetime(2026, 11, 19, 12, tzinfo=pytz.utc)
+
+
+def _postgres_db(existing):
+    db = AsyncMock()
+    db.get_bind = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = existing
+    db.execute.return_value = result
+    return db
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_partition_bounds_cover_every_month():
+    bounds = partition_bounds(date(2026, 11, 19), date(2027, 1, 5))
+
+    assert bounds == [
+        ("transactions_y2026m11", date(2026, 11, 1), date(2026, 12, 1)),
+        ("transactions_y2026m12", date(2026, 12, 1), date(2027, 1, 1)),
+        ("transactions_y2027m01", date(2027, 1, 1), date(2027, 2, 1)),
+    ]
+    assert partition_name(date(2027, 1, 1), "archive") == "archive_y2027m01"
+
+
+def test_create_partition_sql_uses_utc_bounds():
+    sql = create_partition_sql(
+        "transactions_y2026m11", date(2026, 11, 1), date(2026, 12, 1)
+    )
+
+    assert sql == (
+        "CREATE TABLE IF NOT EXISTS transactions_y2026m11 PARTITION OF transactions "
+        "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')"
+    )
+
+
+def test_as_utc_reads_naive_values_as_utc():
+    naive = datetime(2026, 11, 19, 12)
+    sofia = pytz.timezone("Europe/Sofia").localize(naive)
+
+    assert as_utc(naive) == NOW
+    assert as_utc(sofia) is sofia
+
+
+def test_transactions_table_is_range_partitioned():
+    ddl = str(CreateTable(Transaction.__table__).compile(dialect=postgresql.dialect()))
+
+    assert "PARTITION BY RANGE (timestamp)" in ddl
+    assert "PRIMARY KEY (id, timestamp)" in ddl
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months():
+    metrics.reset()
+    db = _postgres_db(["transactions_y2026m11", "transactions_default"])
+
+    created = await ensure_partitions(db, months_ahead=2, now=NOW)
+
+    assert created == ["transactions_y2026m12", "transactions_y2027m01"]
+    statements = [str(call.args[0]) for call in db.execute.await_args_list[1:]]
+    assert all("PARTITION OF transactions" in sql for sql in statements)
+    db.commit.assert_awaited_once()
+    assert metrics.get("transaction_partitions_created_total") == 2
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_the_default_partition():
+    db = _postgres_db(["transactions_y2026m11"])
+
+    created = await ensure_partitions(db, months_ahead=0, now=NOW)
+
+    assert created == ["transactions_default"]
+    assert str(db.execute.await_args_list[-1].args[0]) == (
+        "CREATE TABLE IF NOT EXISTS transactions_default "
+        "PARTITION OF transactions DEFAULT"
+    )
+    assert create_default_partition_sql("archive") == (
+        "CREATE TABLE IF NOT EXISTS archive_default PARTITION OF archive DEFAULT"
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_tables_creates_the_partitions(monkeypatch, tmp_path):
+    from app.core import config
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    monkeypatch.setattr(config.get_settings(), "TRANSACTION_PARTITION_MONTHS_AHEAD", 0)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'wallet.db'}")
+    ensure = AsyncMock(return_value=[])
+
+    with patch("app.sql_app.models.models.ensure_partitions", ensure):
+        await create_tables(engine)
+
+    assert ensure.await_args.kwargs == {"months_ahead": 1}
+    async with engine.connect() as connection:
+        tables = await connection.run_sync(
+            lambda sync: sync.dialect.get_table_names(sync)
+        )
+    assert "transactions" in tables
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_is_a_no_op_without_postgres():
+    db = AsyncMock()
+    db.get_bind = MagicMock()
+    db.get_bind.return_value.dialect.name = "sqlite"
+
+    assert await ensure_partitions(db, now=NOW) == []
+    db.execute.assert_not_awaited()
@@ -0,0 +1,149 @@
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+from app.api.api_v1.endpoints.metrics import export_metrics
+from app.core.config import get_settings
+from app.schemas.user import User
+from app.services.common import metrics
+from app.services.common.ratelimit import (
+    Limit,
+    MemoryRateLimitStore,
+    RateLimitMiddleware,
+    SharedRateLimitStore,
+)
+from app.services.common.utils import create_access_token
+from fastapi import FastAPI, HTTPException, status
+from httpx import ASGITransport, AsyncClient
+
+
+def _app(**options):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/search")
+    async def search():
+        return []
+
+    @app.get("/metrics")
+    async def export_metrics():
+        return ""
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=MemoryRateLimitStore(100),
+        default=Limit(rate=1, burst=2),
+        exempt=("/metrics",),
+        **options,
+    )
+    return app
+
+
+def _client(app, user=None):
+    cookies = {"user": create_access_token({"sub": user})} if user else None
+    return AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test", cookies=cookies
+    )
+
+
+@pytest.mark.asyncio
+async def test_memory_store_refills_at_the_rate():
+    store = MemoryRateLimitStore(10)
+    limit = Limit(rate=2, burst=2)
+
+    assert await store.take("key", limit, 100.0) == 0
+    assert await store.take("key", limit, 100.0) == 0
+    assert await store.take("key", limit, 100.0) == pytest.approx(0.5)
+    assert await store.take("key", limit, 100.5) == 0
+    assert await store.take("key", limit, 1000.0) == 0
+    assert await store.take("key", limit, 1000.0) == 0
+    assert await store.take("key", limit, 1000.0) > 0
+
+
+@pytest.mark.asyncio
+async def test_memory_store_drops_least_recently_used_buckets():
+    store = MemoryRateLimitStore(2)
+    limit = Limit(rate=1, burst=1)
+    for key in ("a", "b", "c"):
+        await store.take(key, limit, 0.0)
+
+    assert list(store._buckets) == ["b", "c"]
+    assert await store.take("a", limit, 0.0) == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_limits_each_user_per_route_template():
+    metrics.reset()
+    app = _app()
+
+    async with _client(app, "alice") as alice, _client(app, "bob") as bob:
+        assert (await alice.get("/items/1")).status_code == 200
+        assert (await alice.get("/items/2")).status_code == 200
+        limited = await alice.get("/items/3")
+        assert (await alice.get("/search")).status_code == 200
+        assert (await bob.get("/items/1")).status_code == 200
+        for _ in range(3):
+            assert (await alice.get("/metrics")).status_code == 200
+
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1"
+    assert limited.json() == {"detail": "Too many requests."}
+    assert metrics.get("rate_limit_rejected_total", route="/items/{item_id}") == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_applies_route_limits_and_keys_anonymous_by_address():
+    app = _app(routes={"/search": Limit(rate=0.1, burst=1)})
+
+    async with _client(app) as anonymous:
+        assert (await anonymous.get("/search")).status_code == 200
+        limited = await anonymous.get("/search")
+
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "10"
+
+
+@pytest.mark.asyncio
+async def test_middleware_ignores_forged_cookies():
+    app = _app()
+    forged = {"user": "not-a-token"}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test", cookies=forged
+    ) as client:
+        statuses = [(await client.get("/items/1")).status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+
+
+@pytest.mark.asyncio
+async def test_shared_store_takes_tokens_with_one_script():
+    client = AsyncMock()
+    client.eval.return_value = b"0.25"
+    store = SharedRateLimitStore(client)
+
+    wait = await store.take("user:1:GET:/search", Limit(rate=2, burst=10), 12.5)
+
+    assert wait == 0.25
+    _, numkeys, key, *arguments = client.eval.await_args.args
+    assert (numkeys, key) == (1, "ratelimit:user:1:GET:/search")
+    assert arguments == ["2", "10", "12.5"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_rate_limited_and_only_exported_to_admins():
+    user = User(id=uuid4(), email="user@example.com", email_verified=True)
+    admin = User(
+        id=uuid4(), email="admin@example.com", email_verified=True, is_admin=True
+    )
+    metrics.inc("requests_total")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await export_metrics(current_user=user)
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+    assert "requests_total 1" in await export_metrics(current_user=admin)
+    assert "/api/v1/metrics" not in get_settings().RATE_LIMIT_EXEMPT
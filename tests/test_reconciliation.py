@@ -0,0 +1,144 @@
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID, uuid4
+
+import pytest
+import pytz
+from app.services.common import metrics
+from app.services.common.reconciliation import (
+    expected_balances,
+    run_reconciliation,
+    shard_bounds,
+)
+from app.services.crud.wallet import add_funds_to_wallet, withdraw_funds_from_wallet
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import ReconciliationRun, Transaction, User, Wallet
+from sqlalchemy import select, update
+
+
+def sql_string(query):
+    return str(query.compile(compile_kwargs={"literal_binds": True}))
+
+
+def test_shard_bounds_cover_the_uuid_space():
+    bounds = shard_bounds(4)
+
+    assert len(bounds) == 4
+    assert bounds[0][0] is None
+    assert bounds[-1][1] is None
+    for (_, upper), (lower, _) in zip(bounds, bounds[1:]):
+        assert upper == lower
+    assert bounds[1][0] == UUID(int=2**126)
+
+
+def test_single_shard_is_unbounded():
+    assert shard_bounds(1) == [(None, None)]
+
+
+def test_expected_balances_is_one_set_based_query():
+    lower, upper = shard_bounds(2)[0]
+
+    statement = sql_string(expected_balances((lower, upper)))
+
+    assert statement.count("GROUP BY") == 3
+    assert "wallets.id < " in statement
+    assert "wallet_daily_balances" not in statement
+
+
+def test_expected_balances_since_watermark_filters_on_rollups():
+    since = datetime(2026, 1, 1, tzinfo=pytz.utc)
+
+    statement = sql_string(expected_balances((None, None), since))
+
+    assert "wallet_daily_balances.day >= '2026-01-01'" in statement
+
+
+async def _create_wallet(session_factory, currency=Currency.EUR):
+    user = User(id=uuid4(), email=f"{uuid4()}@example.com")
+    async with session_factory() as session:
+        session.add(user)
+        session.add(Wallet(id=uuid4(), user_id=user.id, currency=currency, balance=0))
+        await session.commit()
+    return user
+
+
+async def _wallet_id(session_factory, user):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Wallet.id).where(Wallet.user_id == user.id)
+        )
+        return result.scalar_one()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_run_reconciliation_reports_drift(sqlite_session_factory):
+    metrics.reset()
+    sender = await _create_wallet(sqlite_session_factory)
+    recipient = await _create_wallet(sqlite_session_factory)
+    tampered = await _create_wallet(sqlite_session_factory)
+    async with sqlite_session_factory() as session:
+        await add_funds_to_wallet(session, 30, sender, Currency.EUR)
+    async with sqlite_session_factory() as session:
+        await withdraw_funds_from_wallet(session, sender, 5, Currency.EUR)
+    async with sqlite_session_factory() as session:
+        await add_funds_to_wallet(session, 7, tampered, Currency.EUR)
+    async with sqlite_session_factory() as session:
+        session.add(
+            Transaction(
+                id=uuid4(),
+                amount=Decimal(10),
+                currency=Currency.EUR,
+                timestamp=datetime.now(pytz.utc),
+                status=Status.confirmed,
+                card_id=uuid4(),
+                category_id=uuid4(),
+                sender_id=sender.id,
+                recipient_id=recipient.id,
+                wallet_id=await _wallet_id(sqlite_session_factory, sender),
+            )
+        )
+        await session.execute(
+            update(Wallet)
+            .where(Wallet.user_id == sender.id)
+            .values(balance=Wallet.balance - 10)
+        )
+        await session.execute(
+            update(Wallet).where(Wallet.user_id == recipient.id).values(balance=10)
+        )
+        await session.execute(
+            update(Wallet).where(Wallet.user_id == tampered.id).values(balance=9)
+        )
+        await session.commit()
+
+    report = await run_reconciliation(sqlite_session_factory, shards=4, concurrency=2)
+
+    assert report.wallets == 3
+    assert len(report.drifts) == 1
+    drift = report.drifts[0]
+    assert drift.wallet_id == await _wallet_id(sqlite_session_factory, tampered)
+    assert drift.difference == Decimal(2)
+    assert metrics.get("reconciliation_wallets_drifted") == 1
+    async with sqlite_session_factory() as session:
+        run = (await session.execute(select(ReconciliationRun))).scalar_one()
+    assert run.finished_at is not None
+    assert (run.wallets, run.drifted) == (3, 1)
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_incremental_run_only_checks_changed_wallets(sqlite_session_factory):
+    await _create_wallet(sqlite_session_factory)
+    active = await _create_wallet(sqlite_session_factory)
+    first = await run_reconciliation(sqlite_session_factory, shards=2, concurrency=2)
+    async with sqlite_session_factory() as session:
+        await add_funds_to_wallet(session, 3, active, Currency.EUR)
+
+    report = await run_reconciliation(
+        sqlite_session_factory, shards=2, concurrency=2, incremental=True
+    )
+
+    assert first.wallets == 2
+    assert report.since is not None
+    assert report.wallets == 1
+    assert report.drifts == []
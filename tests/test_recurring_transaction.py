@@ -6,6 +6,7 @@ from uuid import uuid4
 import pytest
 import pytz
 from app.schemas.transaction import RecurringTransactionCreate
+from app.services.crud.card import seal_card
 from app.services.crud.recurring_transaction import (
     cancel_recurring_transaction,
     create_recurring_transaction,
@@ -457,7 +458,7 @@ async def test_process_due_recurring_transactions():
 
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, is_blocked=False, email="recipient@example.com")
-    card = Card(id=card_id, user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(id=card_id, user_id=sender_id), "1234567890123456")
     category = Category(id=category_id, name="Groceries")
 
     db.execute = AsyncMock(
@@ -494,6 +495,7 @@ async def test_process_due_recurring_transactions():
         await process_recurring_transactions(db)
 
     mock_create_transaction.assert_called_once()
+    assert mock_create_transaction.call_args.kwargs["enforce_velocity"] is False
 
     print(f"Current time: {current_time}")
     print(f"Updated next_execution_date: {recurring_transaction.next_execution_date}")
@@ -828,7 +830,7 @@ async def test_process_due_recurring_transactions_create_transaction_fail():
 
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, is_blocked=False, email="recipient@example.com")
-    card = Card(id=card_id, user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(id=card_id, user_id=sender_id), "1234567890123456")
     category = Category(id=category_id, name="Groceries")
 
     db.execute = AsyncMock(
@@ -968,7 +970,7 @@ async def test_process_due_recurring_transactions_exception_handling():
 
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, is_blocked=False, email="recipient@example.com")
-    card = Card(id=card_id, user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(id=card_id, user_id=sender_id), "1234567890123456")
     category = Category(id=category_id, name="Groceries")
 
     db.execute = AsyncMock(
@@ -1054,7 +1056,7 @@ async def test_process_due_recurring_transactions_daily():
 
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, is_blocked=False, email="recipient@example.com")
-    card = Card(id=card_id, user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(id=card_id, user_id=sender_id), "1234567890123456")
     category = Category(id=category_id, name="Groceries")
 
     db.execute = AsyncMock(
@@ -1125,7 +1127,7 @@ async def test_process_due_recurring_transactions_weekly():
 
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, is_blocked=False, email="recipient@example.com")
-    card = Card(id=card_id, user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(id=card_id, user_id=sender_id), "1234567890123456")
     category = Category(id=category_id, name="Groceries")
 
     db.execute = AsyncMock(
@@ -1198,7 +1200,7 @@ async def test_process_due_recurring_transactions_monthly():
 
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, is_blocked=False, email="recipient@example.com")
-    card = Card(id=card_id, user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(id=card_id, user_id=sender_id), "1234567890123456")
     category = Category(id=category_id, name="Groceries")
 
     db.execute = AsyncMock(
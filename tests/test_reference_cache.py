@@ -0,0 +1,150 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from app.schemas.card import CardCreate
+from app.services.common import metrics
+from app.services.common.broadcast import broadcast
+from app.services.common.reference_cache import (
+    CardSnapshot,
+    get_card_by_id,
+    get_card_by_number,
+    get_category_by_id,
+    get_category_by_name,
+)
+from app.services.crud.card import create_card, delete_card, seal_card
+from app.services.crud.category import delete_category
+from app.sql_app.models.models import Card, Category
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _db(row):
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = row
+    result.scalar_one_or_none.return_value = row
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_card_lookup_reads_through_once():
+    user_id = uuid4()
+    card = seal_card(Card(id=uuid4(), user_id=user_id), "4111111111111111")
+    db = _db(card)
+
+    first = await get_card_by_number(db, card.number, user_id)
+    second = await get_card_by_number(db, card.number, user_id)
+
+    assert first == second == CardSnapshot(card.id, card.number, user_id)
+    db.execute.assert_awaited_once()
+    assert metrics.get("cache_hits_total", cache="cards") >= 1
+
+
+@pytest.mark.asyncio
+async def test_misses_are_not_cached():
+    db = _db(None)
+
+    assert await get_category_by_name(db, "Groceries") is None
+    assert await get_category_by_name(db, "Groceries") is None
+
+    assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_lookups_by_id_use_their_own_keys():
+    category = Category(id=uuid4(), name="Travel", user_id=uuid4())
+    db = _db(category)
+
+    by_name = await get_category_by_name(db, "Travel")
+    by_id = await get_category_by_id(db, category.id)
+
+    assert by_name == by_id
+    assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_card_writes_invalidate_only_their_card():
+    user_id = uuid4()
+    card = seal_card(Card(id=uuid4(), user_id=user_id), "4111111111111111")
+    other = seal_card(Card(id=uuid4(), user_id=user_id), "4000056655665556")
+    await get_card_by_id(_db(card), card.id)
+    await get_card_by_number(_db(card), "4111111111111111", user_id)
+    await get_card_by_id(_db(other), other.id)
+
+    db = _db(None)
+    db.add = MagicMock()
+    await create_card(
+        db,
+        CardCreate(
+            number="5555555555554444",
+            card_holder="Holder",
+            exp_date="12/30",
+            cvv="123",
+            design="blue",
+        ),
+        user_id,
+    )
+    cached_db = _db(card)
+    await get_card_by_id(cached_db, card.id)
+    cached_db.execute.assert_not_awaited()
+
+    await delete_card(_db(card), card.id, user_id)
+    reload_db = _db(card)
+    await get_card_by_id(reload_db, card.id)
+    await get_card_by_number(reload_db, "4111111111111111", user_id)
+    assert reload_db.execute.await_count == 2
+    cached_db = _db(other)
+    await get_card_by_id(cached_db, other.id)
+    cached_db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_category_delete_invalidates_the_cache():
+    category = Category(id=uuid4(), name="Travel", user_id=uuid4())
+    other = Category(id=uuid4(), name="Food", user_id=category.user_id)
+    await get_category_by_name(_db(category), "Travel")
+    await get_category_by_id(_db(category), category.id)
+    await get_category_by_name(_db(other), "Food")
+
+    await delete_category(_db(category), "Travel", category.user_id)
+
+    reload_db = _db(category)
+    await get_category_by_name(reload_db, "Travel")
+    await get_category_by_id(reload_db, category.id)
+    assert reload_db.execute.await_count == 2
+    cached_db = _db(other)
+    await get_category_by_name(cached_db, "Food")
+    cached_db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_invalidations_of_other_processes_evict_local_entries():
+    user_id = uuid4()
+    card = seal_card(Card(id=uuid4(), user_id=user_id), "4111111111111111")
+    category = Category(id=uuid4(), name="Travel", user_id=user_id)
+    await get_card_by_id(_db(card), card.id)
+    await get_card_by_number(_db(card), "4111111111111111", user_id)
+    await get_category_by_name(_db(category), "Travel")
+
+    for kind, data in (
+        (
+            "card",
+            {
+                "id": str(card.id),
+                "user_id": str(user_id),
+                "digests": [card.number_digest],
+            },
+        ),
+        ("category", {"id": str(category.id), "name": "Travel"}),
+    ):
+        broadcast.receive(json.dumps({"origin": "other", "kind": kind, "data": data}))
+
+    reload_db = _db(card)
+    await get_card_by_id(reload_db, card.id)
+    await get_card_by_number(reload_db, "4111111111111111", user_id)
+    assert reload_db.execute.await_count == 2
+    reload_db = _db(category)
+    await get_category_by_name(reload_db, "Travel")
+    reload_db.execute.assert_awaited_once()
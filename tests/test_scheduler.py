@@ -0,0 +1,165 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.services.common import metrics
+from app.services.common.scheduler import LeaderElection, leader_only
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def make_connection(acquired=True):
+    connection = MagicMock()
+    result = MagicMock()
+    result.scalar.return_value = acquired
+    connection.execute = AsyncMock(return_value=result)
+    connection.commit = AsyncMock()
+    connection.close = AsyncMock()
+    connection.invalidate = AsyncMock()
+    return connection
+
+
+def make_engine(*connections):
+    engine = MagicMock()
+    engine.connect = AsyncMock(side_effect=list(connections))
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_acquires_leadership():
+    connection = make_connection(acquired=True)
+    election = LeaderElection(make_engine(connection), 42)
+
+    assert await election.heartbeat() is True
+
+    assert election.is_leader
+    connection.close.assert_not_called()
+    assert metrics.get("scheduler_is_leader") == 1
+    assert metrics.get("scheduler_leader_takeovers_total") == 1
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_follower_returns_connection():
+    connection = make_connection(acquired=False)
+    election = LeaderElection(make_engine(connection), 42)
+
+    assert await election.heartbeat() is False
+
+    assert not election.is_leader
+    connection.close.assert_awaited_once()
+    assert metrics.get("scheduler_is_leader") == 0
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_existing_leadership():
+    connection = make_connection(acquired=True)
+    engine = make_engine(connection)
+    election = LeaderElection(engine, 42)
+
+    await election.heartbeat()
+    await election.heartbeat()
+
+    assert election.is_leader
+    engine.connect.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_steps_down_and_retakes_after_lost_connection():
+    lost = make_connection(acquired=True)
+    replacement = make_connection(acquired=True)
+    election = LeaderElection(make_engine(lost, replacement), 42)
+    await election.heartbeat()
+
+    lost.execute.side_effect = ConnectionError("server closed the connection")
+    assert await election.heartbeat() is True
+
+    lost.invalidate.assert_awaited_once()
+    lost.close.assert_not_called()
+    assert metrics.get("scheduler_leader_takeovers_total") == 2
+
+
+@pytest.mark.asyncio
+async def test_release_unlocks_and_closes():
+    connection = make_connection(acquired=True)
+    election = LeaderElection(make_engine(connection), 42)
+    await election.heartbeat()
+
+    await election.release()
+
+    assert not election.is_leader
+    unlock_sql = str(connection.execute.call_args_list[-1].args[0])
+    assert "pg_advisory_unlock" in unlock_sql
+    connection.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_leader_only_skips_on_followers():
+    election = MagicMock(is_leader=False)
+    job = AsyncMock()
+
+    await leader_only(election, "recurring", job)()
+
+    job.assert_not_awaited()
+    assert metrics.get("scheduler_job_skipped_total", job="recurring") == 1
+
+
+@pytest.mark.asyncio
+async def test_leader_only_runs_on_leader_and_records_metrics():
+    election = MagicMock(is_leader=True)
+    job = AsyncMock()
+
+    await leader_only(election, "recurring", job)()
+
+    job.assert_awaited_once()
+    assert metrics.get("scheduler_job_runs_total", job="recurring") == 1
+    assert 'scheduler_job_runs_total{job="recurring"} 1.0' in metrics.render()
+
+
+@pytest.mark.asyncio
+async def test_leader_only_counts_errors():
+    election = MagicMock(is_leader=True)
+    job = AsyncMock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(RuntimeError):
+        await leader_only(election, "recurring", job)()
+
+    assert metrics.get("scheduler_job_errors_total", job="recurring") == 1
+    assert metrics.get("scheduler_job_runs_total", job="recurring") == 0
+
+
+@pytest.mark.asyncio
+async def test_leader_only_respects_shared_limiter():
+    election = MagicMock(is_leader=True)
+    limiter = asyncio.Semaphore(1)
+    running = []
+    peak = []
+
+    async def job():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    await asyncio.gather(
+        leader_only(election, "first", job, limiter)(),
+        leader_only(election, "second", job, limiter)(),
+    )
+
+    assert max(peak) == 1
+
+
+def test_outbox_is_relayed_and_purged_with_default_settings():
+    from app.core.config import get_settings
+    from app.services.common.scheduler import create_scheduler
+
+    assert get_settings().OUTBOX_LOG_FILE is None
+
+    scheduler = create_scheduler(MagicMock(), session_factory=MagicMock())
+
+    assert scheduler.get_job("outbox_relay") is not None
+    assert scheduler.get_job("outbox_purge") is not None
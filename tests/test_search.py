@@ -0,0 +1,120 @@
+from unittest.mock import AsyncMock, MagicMock
+from uuid import UUID, uuid4
+
+import pytest
+from app.services.common.search import (
+    NGramIndex,
+    format_cursor,
+    parse_cursor,
+    rank_users,
+    similarity,
+    trigrams,
+)
+from app.sql_app.models.models import User
+from fastapi import HTTPException, status
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def test_trigrams_match_pg_trgm():
+    assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+    assert trigrams(None) == set()
+
+
+def test_similarity():
+    assert similarity("alice", "alice") == 1.0
+    assert similarity("alice", "bob") == 0.0
+    assert 0 < similarity("alice", "alice@example.com") < 1
+
+
+def test_cursor_round_trip():
+    user_id = uuid4()
+
+    assert parse_cursor(format_cursor(0.25, user_id)) == (0.25, user_id)
+    assert parse_cursor(None) is None
+
+
+def test_parse_cursor_rejects_garbage():
+    with pytest.raises(HTTPException) as exc_info:
+        parse_cursor("not-a-cursor")
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert exc_info.value.detail == "Invalid cursor."
+
+
+def test_ngram_index_ranks_substring_matches():
+    alice, alicia, bob = uuid4(), uuid4(), uuid4()
+    index = NGramIndex(
+        [
+            (alice, "alice@example.com", "0888111222"),
+            (alicia, "alicia.long.name@example.com", None),
+            (bob, "bob@example.com", "0888333444"),
+        ]
+    )
+
+    assert [user_id for _, user_id in index.search("alic")] == [alice, alicia]
+    assert [user_id for _, user_id in index.search("333")] == [bob]
+    assert index.search("nobody") == []
+
+
+def test_ngram_index_short_search_scans_all_documents():
+    alice, bob = uuid4(), uuid4()
+    index = NGramIndex([(alice, "al@example.com", None), (bob, "bo@example.com", None)])
+
+    assert [user_id for _, user_id in index.search("b")] == [bob]
+    assert len(index.search(None)) == 2
+
+
+@pytest.mark.asyncio
+async def test_rank_users_on_postgres_uses_trigram_query_and_estimate():
+    db = AsyncMock(spec=AsyncSession)
+    db.get_bind = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    users = [User(id=uuid4()) for _ in range(3)]
+    page = MagicMock()
+    page.all.return_value = [(user, 0.5) for user in users]
+    db.execute = AsyncMock(return_value=page)
+    connection = MagicMock(dialect=asyncpg.dialect())
+    plan = MagicMock()
+    plan.scalar.return_value = '[{"Plan": {"Plan Rows": 1234}}]'
+    connection.exec_driver_sql = AsyncMock(return_value=plan)
+    db.connection = AsyncMock(return_value=connection)
+
+    response = await rank_users(db, "ali", 0, 2, format_cursor(0.75, UUID(int=1)))
+
+    assert response["users"] == users[:2]
+    assert response["total"] == 1234
+    assert response["next_cursor"] == format_cursor(0.5, users[1].id)
+    statement = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "users.email ILIKE" in statement
+    assert "word_similarity" in statement
+    assert "LIMIT" in statement
+    explain = connection.exec_driver_sql.call_args.args[0]
+    assert explain.startswith("EXPLAIN (FORMAT JSON) SELECT users.id")
+    assert "'%ali%'" in explain
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_rank_users_pages_through_sqlite_with_cursor(sqlite_session_factory):
+    users = [
+        User(id=uuid4(), email=f"user{i}@example.com", phone_number=f"0888{i:06d}")
+        for i in range(7)
+    ]
+    users.append(User(id=uuid4(), email="someone@else.org", phone_number="0999"))
+    async with sqlite_session_factory() as session:
+        session.add_all(users)
+        await session.commit()
+
+    seen, cursor = [], None
+    async with sqlite_session_factory() as session:
+        while True:
+            response = await rank_users(session, "example", 0, 3, cursor)
+            assert response["total"] == 7
+            seen.extend(user.email for user in response["users"])
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+
+    assert sorted(seen) == sorted(f"user{i}@example.com" for i in range(7))
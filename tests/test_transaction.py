@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime, timedelta, timezone
-from unittest.mock import ANY, AsyncMock, MagicMock
+from decimal import Decimal
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 from uuid import UUID, uuid4
 
 import pytest
+from app.services.common.fx import QuoteBook
+from app.services.common.reference_cache import CategorySnapshot
 from app.schemas.transaction import (
     TransactionCreate,
     TransactionFilter,
     TransactionView,
 )
+from app.services.common.vault import vault
+from app.services.crud.card import seal_card
 from app.services.crud.transaction import (
     approve_transaction,
     confirm_transaction,
@@ -18,13 +23,23 @@ from app.services.crud.transaction import (
     get_transactions_by_user_id,
     reject_transaction,
 )
-from app.sql_app.models.enums import Status
+from app.sql_app.models.enums import Currency, Status
 from app.sql_app.models.models import Card, Category, Transaction, User, Wallet
 from fastapi import HTTPException, status
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+@pytest.fixture(autouse=True)
+def category_owner():
+    # The category looked up after a status change, to find its summary's owner.
+    with patch(
+        "app.services.crud.transaction.get_category_by_id",
+        AsyncMock(return_value=None),
+    ) as lookup:
+        yield lookup
+
+
 def sql_string(query):
     """Convert SQLAlchemy query to its string representation."""
     return str(query.compile(compile_kwargs={"literal_binds": True}))
@@ -49,7 +64,7 @@ async def test_create_transaction_success():
     recipient = User(id=recipient_id, email="recipient@example.com")
     recipient_wallet = Wallet(user_id=recipient_id, balance=1000)
     sender_wallet = Wallet(user_id=sender_id, balance=200)
-    card = Card(user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(user_id=sender_id), "1234567890123456")
     category = Category(name="Groceries")
 
     sender_mock_result = MagicMock()
@@ -72,6 +87,9 @@ async def test_create_transaction_success():
     category_mock_result = MagicMock()
     category_mock_result.scalars.return_value.first.return_value = category
 
+    previous_transaction_mock_result = MagicMock()
+    previous_transaction_mock_result.scalars.return_value.first.return_value = None
+
     db.execute = AsyncMock(
         side_effect=[
             sender_mock_result,
@@ -80,6 +98,7 @@ async def test_create_transaction_success():
             recipient_mock_result,
             category_mock_result,
             recipient_wallet_mock_result,
+            previous_transaction_mock_result,
         ]
     )
     db.add = AsyncMock()
@@ -98,7 +117,8 @@ async def test_create_transaction_success():
         ),
         sql_string(
             select(Card).where(
-                Card.number == transaction_data.card_number, Card.user_id == sender_id
+                Card.number_digest == vault.digest(transaction_data.card_number),
+                Card.user_id == sender_id,
             )
         ),
         sql_string(select(User).where(User.email == transaction_data.recipient_email)),
@@ -109,6 +129,15 @@ async def test_create_transaction_success():
                 Wallet.currency == transaction_data.currency,
             )
         ),
+        sql_string(
+            select(Transaction.id)
+            .where(
+                Transaction.sender_id == sender_id,
+                Transaction.recipient_id == recipient_id,
+                Transaction.status != Status.declined,
+            )
+            .limit(1)
+        ),
     ]
 
     actual_calls = [sql_string(call.args[0]) for call in db.execute.call_args_list]
@@ -121,17 +150,101 @@ async def test_create_transaction_success():
             expected_call in actual_calls
         ), f"Expected call not found: {expected_call}"
 
-    db.add.assert_called_once_with(ANY)
+    stored, event = [call.args[0] for call in db.add.call_args_list]
+    assert isinstance(stored, Transaction)
+    assert event.topic == "transaction.pending"
+    assert event.aggregate_id == stored.id
     db.commit.assert_called_once()
     db.refresh.assert_called_once_with(ANY)
 
     assert transaction.amount == transaction_data.amount
     assert transaction.currency == transaction_data.currency
-    assert transaction.card_number == transaction_data.card_number
+    assert transaction.card_number == "**** **** **** 3456"
     assert transaction.recipient_email == transaction_data.recipient_email
     assert transaction.category == transaction_data.category
 
 
+def _transfer_db(sender_id, recipient_id):
+    sender = User(id=sender_id, is_blocked=False)
+    recipient = User(id=recipient_id, email="recipient@example.com")
+    card = seal_card(Card(id=uuid4(), user_id=sender_id), "1234567890123456")
+    results = []
+    for row in (
+        sender,
+        Wallet(user_id=sender_id, balance=200),
+        card,
+        recipient,
+        Category(name="Groceries"),
+        Wallet(user_id=recipient_id, balance=1000),
+    ):
+        result = MagicMock()
+        result.scalars.return_value.first.return_value = row
+        results.append(result)
+    db = AsyncMock(spec=AsyncSession)
+    db.execute = AsyncMock(side_effect=results)
+    db.add = MagicMock()
+    return db
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "enforce_velocity, rules, evaluated",
+    [(True, ["user_count"], 1), (False, ["user_count", "new_recipients"], 0)],
+)
+async def test_create_transaction_only_checks_what_the_rules_need(
+    enforce_velocity, rules, evaluated
+):
+    sender_id, recipient_id = uuid4(), uuid4()
+    db = _transfer_db(sender_id, recipient_id)
+    transaction_data = TransactionCreate(
+        amount=100,
+        currency="USD",
+        timestamp=datetime.now(timezone.utc),
+        card_number="1234567890123456",
+        recipient_email="recipient@example.com",
+        category="Groceries",
+    )
+
+    with patch("app.services.crud.transaction.velocity") as velocity, patch(
+        "app.services.crud.transaction.is_new_recipient", new_callable=AsyncMock
+    ) as new_recipient:
+        velocity.rules = rules
+        velocity.uses_new_recipient = "new_recipients" in rules
+        velocity.enforce = AsyncMock()
+        await create_transaction(
+            db, transaction_data, sender_id, enforce_velocity=enforce_velocity
+        )
+
+    new_recipient.assert_not_awaited()
+    assert velocity.enforce.await_count == evaluated
+    assert db.execute.await_count == 6
+
+
+@pytest.mark.asyncio
+async def test_create_transaction_releases_velocity_when_the_write_fails():
+    sender_id, recipient_id = uuid4(), uuid4()
+    db = _transfer_db(sender_id, recipient_id)
+    db.commit = AsyncMock(side_effect=RuntimeError("connection lost"))
+    transaction_data = TransactionCreate(
+        amount=100,
+        currency="USD",
+        timestamp=datetime.now(timezone.utc),
+        card_number="1234567890123456",
+        recipient_email="recipient@example.com",
+        category="Groceries",
+    )
+
+    with patch("app.services.crud.transaction.velocity") as velocity:
+        velocity.rules = ["user_count"]
+        velocity.uses_new_recipient = False
+        velocity.enforce = AsyncMock(return_value="reservation")
+        velocity.release = AsyncMock()
+        with pytest.raises(RuntimeError):
+            await create_transaction(db, transaction_data, sender_id)
+
+    velocity.release.assert_awaited_once_with("reservation")
+
+
 @pytest.mark.asyncio
 async def test_create_transaction_sender_not_found():
     db = AsyncMock(spec=AsyncSession)
@@ -358,7 +471,7 @@ async def test_create_transaction_recipient_wallet_not_found():
     sender = User(id=sender_id, is_blocked=False)
     recipient = User(id=recipient_id, email="recipient@example.com")
     sender_wallet = Wallet(user_id=sender_id, balance=200)
-    card = Card(user_id=sender_id, number="1234567890123456")
+    card = seal_card(Card(user_id=sender_id), "1234567890123456")
     category = Category(name="Groceries")
 
     sender_mock_result = MagicMock()
@@ -541,32 +654,41 @@ async def test_create_transaction_category_not_found():
     db.refresh.assert_not_called()
 
 
+def _updated(transaction):
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = transaction
+    return result
+
+
+def _probe(row):
+    result = MagicMock()
+    result.first.return_value = row
+    return result
+
+
 @pytest.mark.asyncio
 async def test_confirm_transaction_success():
     db = AsyncMock(spec=AsyncSession)
-    transaction_id = str(uuid.uuid4())
-    current_user_id = str(uuid.uuid4())
-
-    sender_id = current_user_id
-
+    transaction_id = uuid.uuid4()
+    current_user_id = uuid.uuid4()
     transaction = Transaction(
-        id=transaction_id, status=Status.pending, sender_id=sender_id
+        id=transaction_id, status=Status.awaiting, sender_id=current_user_id
     )
-
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_result)
-    db.commit = AsyncMock()
-    db.refresh = AsyncMock()
-
-    transaction.status = Status.pending
+    db.execute = AsyncMock(return_value=_updated(transaction))
 
     confirmed_transaction = await confirm_transaction(
-        transaction_id, db, current_user_id
+        transaction_id, db, str(current_user_id)
     )
 
     assert confirmed_transaction == transaction
+    assert db.execute.await_count == 1
+    query = sql_string(db.execute.call_args.args[0])
+    assert query.startswith("UPDATE transactions SET status='awaiting'")
+    assert "transactions.status IN ('pending')" in query
+    assert f"transactions.sender_id = '{current_user_id.hex}'" in query
+    assert "RETURNING" in query
+    db.commit.assert_awaited_once()
+    db.refresh.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -574,11 +696,7 @@ async def test_confirm_transaction_not_found():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = str(uuid4())
-
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = None
-
-    db.execute = AsyncMock(return_value=mock_result)
+    db.execute = AsyncMock(side_effect=[_updated(None), _probe(None)])
 
     with pytest.raises(HTTPException) as exc_info:
         await confirm_transaction(str(transaction_id), db, current_user_id)
@@ -586,32 +704,44 @@ async def test_confirm_transaction_not_found():
     assert exc_info.value.status_code == 404
     assert "Transaction with id" in exc_info.value.detail
     assert "not found" in exc_info.value.detail
+    db.commit.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_confirm_transaction_already_confirmed():
+async def test_confirm_transaction_not_sender():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    sender_id = uuid4()
-
-    transaction = Transaction(
-        id=transaction_id, status="confirmed", sender_id=sender_id
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.pending, uuid4()))]
     )
 
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = transaction
-    db.execute = AsyncMock(return_value=mock_result)
-
-    current_user_id_str = str(current_user_id)
-
     with pytest.raises(HTTPException) as exc_info:
-        await confirm_transaction(transaction_id, db, current_user_id_str)
+        await confirm_transaction(transaction_id, db, str(current_user_id))
 
     assert exc_info.value.status_code == 403
     assert exc_info.value.detail == "You are not allowed to confirm this transaction."
 
 
+@pytest.mark.asyncio
+async def test_confirm_transaction_already_confirmed():
+    db = AsyncMock(spec=AsyncSession)
+    transaction_id = uuid4()
+    current_user_id = uuid4()
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.confirmed, current_user_id))]
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await confirm_transaction(transaction_id, db, str(current_user_id))
+
+    assert exc_info.value.status_code == status.HTTP_409_CONFLICT
+    assert (
+        exc_info.value.detail
+        == "You can only confirm transactions that are pending your confirmation."
+    )
+
+
 @pytest.mark.asyncio
 async def test_get_transactions_by_user_id_no_transactions():
     db = AsyncMock(spec=AsyncSession)
@@ -667,13 +797,12 @@ async def test_approve_transaction_success():
         sender_id=sender_id,
         recipient_id=recipient_id,
         amount=amount,
-        status=Status.awaiting,
+        status=Status.confirmed,
     )
     sender_wallet = Wallet(user_id=sender_id, balance=200)
     recipient_wallet = Wallet(user_id=recipient_id, balance=50)
 
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = transaction
+    mock_transaction_result = _updated(transaction)
 
     mock_sender_wallet_result = MagicMock()
     mock_sender_wallet_result.scalars.return_value.first.return_value = sender_wallet
@@ -688,6 +817,9 @@ async def test_approve_transaction_success():
             mock_transaction_result,
             mock_sender_wallet_result,
             mock_recipient_wallet_result,
+            MagicMock(),
+            MagicMock(scalar_one=MagicMock(return_value=150)),
+            MagicMock(),
         ]
     )
     db.commit = AsyncMock()
@@ -698,6 +830,10 @@ async def test_approve_transaction_success():
     )
 
     assert approved_transaction.status == Status.confirmed
+    query = sql_string(db.execute.call_args_list[0].args[0])
+    assert query.startswith("UPDATE transactions SET status='confirmed'")
+    assert "transactions.status IN ('awaiting')" in query
+    assert f"transactions.recipient_id = '{current_user_id.hex}'" in query
     assert sender_wallet.balance == 100
     assert recipient_wallet.balance == 150
     db.commit.assert_called_once()
@@ -712,10 +848,7 @@ async def test_approve_transaction_not_found():
     transaction_id = uuid4()
     current_user_id = uuid4()
 
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = None
-
-    db.execute = AsyncMock(return_value=mock_transaction_result)
+    db.execute = AsyncMock(side_effect=[_updated(None), _probe(None)])
 
     with pytest.raises(HTTPException) as excinfo:
         await approve_transaction(db, transaction_id, str(current_user_id))
@@ -729,23 +862,12 @@ async def test_approve_transaction_unauthorized_user():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    sender_id = uuid4()
     recipient_id = uuid4()
-    amount = 100
 
-    transaction = Transaction(
-        id=transaction_id,
-        sender_id=sender_id,
-        recipient_id=recipient_id,
-        amount=amount,
-        status=Status.awaiting,
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.awaiting, recipient_id))]
     )
 
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_transaction_result)
-
     with pytest.raises(HTTPException) as excinfo:
         await approve_transaction(db, transaction_id, str(current_user_id))
 
@@ -753,36 +875,27 @@ async def test_approve_transaction_unauthorized_user():
     assert excinfo.value.detail == "You are not allowed to approve this transaction."
 
 
+
 @pytest.mark.asyncio
 async def test_approve_transaction_invalid_status():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    sender_id = uuid4()
-    recipient_id = current_user_id
-    amount = 100
 
-    transaction = Transaction(
-        id=transaction_id,
-        sender_id=sender_id,
-        recipient_id=recipient_id,
-        amount=amount,
-        status=Status.pending,
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.pending, current_user_id))]
     )
 
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_transaction_result)
-
     with pytest.raises(HTTPException) as excinfo:
         await approve_transaction(db, transaction_id, str(current_user_id))
 
-    assert excinfo.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert excinfo.value.status_code == status.HTTP_409_CONFLICT
     assert (
         excinfo.value.detail
         == "You can only approve transactions that are awaiting your approval."
     )
+    db.commit.assert_not_called()
+
 
 
 @pytest.mark.asyncio
@@ -804,8 +917,7 @@ async def test_approve_transaction_insufficient_funds():
     sender_wallet = Wallet(user_id=sender_id, balance=100)
     recipient_wallet = Wallet(user_id=recipient_id, balance=50)
 
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = transaction
+    mock_transaction_result = _updated(transaction)
 
     mock_sender_wallet_result = MagicMock()
     mock_sender_wallet_result.scalars.return_value.first.return_value = sender_wallet
@@ -849,31 +961,21 @@ async def test_approve_transaction_already_confirmed():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    sender_id = uuid4()
-    recipient_id = current_user_id
-    amount = 100
 
-    transaction = Transaction(
-        id=transaction_id,
-        sender_id=sender_id,
-        recipient_id=recipient_id,
-        amount=amount,
-        status=Status.confirmed,
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.confirmed, current_user_id))]
     )
 
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_transaction_result)
-
     with pytest.raises(HTTPException) as excinfo:
         await approve_transaction(db, transaction_id, str(current_user_id))
 
-    assert excinfo.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert excinfo.value.status_code == status.HTTP_409_CONFLICT
     assert (
         excinfo.value.detail
         == "You can only approve transactions that are awaiting your approval."
     )
+    db.commit.assert_not_called()
+
 
 
 @pytest.mark.asyncio
@@ -881,11 +983,7 @@ async def test_reject_transaction_not_found():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = None
-
-    db.execute = AsyncMock(return_value=mock_result)
+    db.execute = AsyncMock(side_effect=[_updated(None), _probe(None)])
 
     with pytest.raises(HTTPException) as excinfo:
         await reject_transaction(db, transaction_id, str(current_user_id))
@@ -899,17 +997,10 @@ async def test_reject_transaction_unauthorized_user():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    recipient_id = uuid4()
-
-    transaction = Transaction(
-        id=transaction_id, recipient_id=recipient_id, status=Status.awaiting
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.awaiting, uuid4()))]
     )
 
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_result)
-
     with pytest.raises(HTTPException) as excinfo:
         await reject_transaction(db, transaction_id, str(current_user_id))
 
@@ -922,21 +1013,14 @@ async def test_reject_transaction_invalid_status():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    recipient_id = current_user_id
-
-    transaction = Transaction(
-        id=transaction_id, recipient_id=recipient_id, status=Status.pending
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.pending, current_user_id))]
     )
 
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_result)
-
     with pytest.raises(HTTPException) as excinfo:
         await reject_transaction(db, transaction_id, str(current_user_id))
 
-    assert excinfo.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert excinfo.value.status_code == status.HTTP_409_CONFLICT
     assert excinfo.value.detail == "You can only reject awaiting transactions."
 
 
@@ -959,22 +1043,16 @@ async def test_reject_transaction_already_declined():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    recipient_id = current_user_id
-
-    transaction = Transaction(
-        id=transaction_id, recipient_id=recipient_id, status=Status.declined
+    db.execute = AsyncMock(
+        side_effect=[_updated(None), _probe((Status.declined, current_user_id))]
     )
 
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_result)
-
     with pytest.raises(HTTPException) as excinfo:
         await reject_transaction(db, transaction_id, str(current_user_id))
 
-    assert excinfo.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert excinfo.value.status_code == status.HTTP_409_CONFLICT
     assert excinfo.value.detail == "You can only reject awaiting transactions."
+    db.commit.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -982,49 +1060,23 @@ async def test_reject_transaction_success():
     db = AsyncMock(spec=AsyncSession)
     transaction_id = uuid4()
     current_user_id = uuid4()
-    recipient_id = current_user_id
-
     transaction = Transaction(
-        id=transaction_id, recipient_id=recipient_id, status=Status.awaiting
+        id=transaction_id, recipient_id=current_user_id, status=Status.declined
     )
-
-    mock_transaction_result = MagicMock()
-    mock_transaction_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(side_effect=[mock_transaction_result])
-    db.commit = AsyncMock()
-    db.refresh = AsyncMock()
+    db.execute = AsyncMock(return_value=_updated(transaction))
 
     rejected_transaction = await reject_transaction(
         db, transaction_id, str(current_user_id)
     )
 
     assert rejected_transaction.status == Status.declined
+    query = sql_string(db.execute.call_args.args[0])
+    assert query.startswith("UPDATE transactions SET status='declined'")
+    assert "transactions.status IN ('awaiting')" in query
+    assert f"transactions.recipient_id = '{current_user_id.hex}'" in query
+    db.execute.assert_awaited_once()
     db.commit.assert_called_once()
-    db.refresh.assert_called_once_with(transaction)
-
-
-@pytest.mark.asyncio
-async def test_reject_transaction_wrong_recipient():
-    db = AsyncMock(spec=AsyncSession)
-    transaction_id = uuid4()
-    current_user_id = uuid4()
-    wrong_recipient_id = uuid4()
-
-    transaction = Transaction(
-        id=transaction_id, recipient_id=wrong_recipient_id, status=Status.awaiting
-    )
-
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_result)
-
-    with pytest.raises(HTTPException) as excinfo:
-        await reject_transaction(db, transaction_id, str(current_user_id))
-
-    assert excinfo.value.status_code == status.HTTP_403_FORBIDDEN
-    assert excinfo.value.detail == "You are not allowed to reject this transaction."
+    db.refresh.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -1038,6 +1090,7 @@ async def test_deny_transaction_as_non_admin():
 
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
     assert exc_info.value.detail == "Only admins can deny transactions."
+    db.execute.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -1045,11 +1098,7 @@ async def test_deny_transaction_not_found():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4(), is_admin=True)
     transaction_id = uuid4()
-
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = None
-
-    db.execute = AsyncMock(return_value=mock_result)
+    db.execute = AsyncMock(side_effect=[_updated(None), _probe(None)])
 
     with pytest.raises(HTTPException) as exc_info:
         await deny_transaction(db, current_user, transaction_id)
@@ -1063,17 +1112,12 @@ async def test_deny_transaction_invalid_status():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4(), is_admin=True)
     transaction_id = uuid4()
-    transaction = Transaction(id=transaction_id, status=Status.confirmed)
-
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = transaction
-
-    db.execute = AsyncMock(return_value=mock_result)
+    db.execute = AsyncMock(side_effect=[_updated(None), _probe((Status.confirmed,))])
 
     with pytest.raises(HTTPException) as exc_info:
         await deny_transaction(db, current_user, transaction_id)
 
-    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert exc_info.value.status_code == status.HTTP_409_CONFLICT
     assert exc_info.value.detail == "Transaction is not pending or awaiting."
 
 
@@ -1082,28 +1126,26 @@ async def test_deny_transaction_success():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4(), is_admin=True)
     transaction_id = uuid4()
-    transaction = Transaction(id=transaction_id, status=Status.pending)
-
-    mock_select_result = MagicMock()
-    mock_select_result.scalars.return_value.first.return_value = transaction
-
-    mock_update_result = MagicMock()
-
-    db.execute = AsyncMock(side_effect=[mock_select_result, mock_update_result])
-    db.commit = AsyncMock()
+    transaction = Transaction(id=transaction_id, status=Status.declined)
+    db.execute = AsyncMock(return_value=_updated(transaction))
 
     result = await deny_transaction(db, current_user, transaction_id)
 
     expected_update_query = (
         update(Transaction)
-        .where(Transaction.id == transaction_id)
+        .where(
+            Transaction.id == transaction_id,
+            Transaction.status.in_((Status.pending, Status.awaiting)),
+        )
         .values(status=Status.declined)
+        .returning(Transaction)
     )
-    actual_update_query = db.execute.call_args_list[1][0][0]
+    actual_update_query = db.execute.call_args_list[0][0][0]
 
     assert (
         sql_string(expected_update_query) == sql_string(actual_update_query)
     ), f"Expected query: {sql_string(expected_update_query)}, but got: {sql_string(actual_update_query)}"
+    db.execute.assert_awaited_once()
     db.commit.assert_called_once()
 
     assert result == {"message": "Transaction declined."}
@@ -1114,7 +1156,7 @@ async def test_get_transactions_as_admin():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4(), is_admin=True)
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1155,7 +1197,7 @@ async def test_get_transactions_as_admin():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1197,7 +1239,7 @@ async def test_get_transactions_non_admin_user():
     sender_id = current_user.id
     recipient_id = uuid4()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1238,7 +1280,7 @@ async def test_get_transactions_non_admin_user():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1280,7 +1322,7 @@ async def test_get_transactions_with_filters():
     sender_id = current_user.id
     recipient_id = uuid4()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1321,7 +1363,7 @@ async def test_get_transactions_with_filters():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1361,7 +1403,7 @@ async def test_get_transactions_as_admin_no_filters():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4(), is_admin=True)
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1402,7 +1444,7 @@ async def test_get_transactions_as_admin_no_filters():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1444,7 +1486,7 @@ async def test_get_transactions_as_non_admin_no_filters():
     sender_id = current_user.id
     recipient_id = uuid4()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=recipient_id, email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1485,7 +1527,7 @@ async def test_get_transactions_as_non_admin_no_filters():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1527,7 +1569,7 @@ async def test_get_transactions_with_date_filters():
     start_date = datetime.utcnow() - timedelta(days=1)
     end_date = datetime.utcnow()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1568,7 +1610,7 @@ async def test_get_transactions_with_date_filters():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1610,7 +1652,7 @@ async def test_get_transactions_with_sender_and_recipient_filters():
     sender_id = uuid4()
     recipient_id = uuid4()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=recipient_id, email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1651,7 +1693,7 @@ async def test_get_transactions_with_sender_and_recipient_filters():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1693,7 +1735,7 @@ async def test_get_transactions_with_direction_filters_incoming():
     sender_id = current_user.id
     recipient_id = uuid4()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=recipient_id, email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1720,7 +1762,7 @@ async def test_get_transactions_with_direction_filters_incoming():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1762,7 +1804,7 @@ async def test_get_transactions_with_direction_filters_outgoing():
     sender_id = current_user.id
     recipient_id = uuid4()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=recipient_id, email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1789,7 +1831,7 @@ async def test_get_transactions_with_direction_filters_outgoing():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1829,7 +1871,7 @@ async def test_get_transactions_with_sorting_amount():
     db = AsyncMock(spec=AsyncSession)
     current_user = User(id=uuid4(), is_admin=True)
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1870,7 +1912,7 @@ async def test_get_transactions_with_sorting_amount():
     mock_total_result.scalar_one.return_value = len(transactions)
 
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(transactions)
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -1912,7 +1954,7 @@ async def test_get_transactions_sorted_by_date():
 
     now = datetime.utcnow()
 
-    mock_card = Card(id=uuid4(), number="1234-5678-8765-4321")
+    mock_card = seal_card(Card(id=uuid4()), "1234-5678-8765-4321")
     mock_recipient = User(id=uuid4(), email="recipient@example.com")
     mock_category = Category(id=uuid4(), name="Groceries")
 
@@ -1968,7 +2010,9 @@ async def test_get_transactions_sorted_by_date():
 
     sorted_transactions = sorted(transactions, key=lambda x: x.timestamp)
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = sorted_transactions
+    mock_result.mappings.return_value.all.return_value = _view_rows(
+        sorted_transactions
+    )
 
     db.execute = AsyncMock(side_effect=[mock_total_result, mock_result])
 
@@ -2001,3 +2045,176 @@ async def test_get_transactions_sorted_by_date():
     assert (
         result.transactions == expected_transactions
     ), "Transactions do not match the expected result."
+
+
+def _view_rows(transactions):
+    return [
+        {
+            "id": tx.id,
+            "amount": tx.amount,
+            "currency": tx.currency,
+            "timestamp": tx.timestamp,
+            "card_id": tx.card_id,
+            "sender_id": tx.sender_id,
+            "recipient_id": tx.recipient_id,
+            "category_id": tx.category_id,
+            "status": tx.status,
+            "card_number": tx.card.last4,
+            "recipient_email": tx.recipient.email,
+            "category_name": tx.category.name,
+        }
+        for tx in transactions
+    ]
+
+
+def _result(value):
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = value
+    return result
+
+
+@pytest.mark.asyncio
+async def test_create_transaction_cross_currency_with_quote():
+    db = AsyncMock(spec=AsyncSession)
+    sender_id = uuid4()
+    recipient_id = uuid4()
+    rates = {Currency.EUR: Decimal("1"), Currency.BGN: Decimal("0.5")}
+    quote = QuoteBook("secret", 30).lock(
+        sender_id, Currency.EUR, Currency.BGN, Decimal("10.00"), rates
+    )
+    transaction_data = TransactionCreate(
+        amount=Decimal("10.00"),
+        currency="EUR",
+        card_number="1234567890123456",
+        recipient_email="recipient@example.com",
+        category="Groceries",
+        quote_token=quote.token,
+    )
+    db.execute = AsyncMock(
+        side_effect=[
+            _result(User(id=sender_id, is_blocked=False)),
+            _result(Wallet(user_id=sender_id, balance=200, currency=Currency.EUR)),
+            _result(seal_card(Card(id=uuid4(), user_id=sender_id), "1234567890123456")),
+            _result(User(id=recipient_id, email="recipient@example.com")),
+            _result(Category(id=uuid4(), name="Groceries")),
+            _result(Wallet(user_id=recipient_id, balance=0, currency=Currency.BGN)),
+            _result(None),
+        ]
+    )
+
+    with patch("app.services.common.fx.quote_book", QuoteBook("secret", 30)), patch(
+        "app.services.common.fx.rate_cache"
+    ) as cache:
+        cache.get_rates = AsyncMock(return_value=rates)
+        await create_transaction(db, transaction_data, sender_id)
+
+    recipient_wallet_query = sql_string(db.execute.call_args_list[5].args[0])
+    assert "wallets.currency = 'BGN'" in recipient_wallet_query
+    assert db.add.call_args_list[0].args[0].id == quote.id
+    stored = db.add.call_args_list[1].args[0]
+    assert stored.currency == "EUR"
+    assert stored.amount == Decimal("10.00")
+    assert stored.target_currency == Currency.BGN
+    assert stored.target_amount == Decimal("20.00")
+    assert stored.exchange_rate == Decimal(2)
+
+
+@pytest.mark.asyncio
+async def test_create_transaction_quote_currency_mismatch():
+    db = AsyncMock(spec=AsyncSession)
+    sender_id = uuid4()
+    book = QuoteBook("secret", 30)
+    rates = {Currency.USD: Decimal("1"), Currency.BGN: Decimal("0.5")}
+    quote = book.lock(sender_id, Currency.USD, Currency.BGN, Decimal(10), rates)
+    transaction_data = TransactionCreate(
+        amount=10,
+        currency="EUR",
+        card_number="1234567890123456",
+        recipient_email="recipient@example.com",
+        category="Groceries",
+        quote_token=quote.token,
+    )
+    db.execute = AsyncMock(
+        side_effect=[
+            _result(User(id=sender_id, is_blocked=False)),
+            _result(Wallet(user_id=sender_id, balance=200, currency=Currency.EUR)),
+            _result(Card(id=uuid4(), user_id=sender_id)),
+            _result(User(id=uuid4(), email="recipient@example.com")),
+            _result(Category(id=uuid4(), name="Groceries")),
+        ]
+    )
+
+    with patch("app.services.common.fx.quote_book", book), patch(
+        "app.services.common.fx.rate_cache"
+    ) as cache:
+        cache.get_rates = AsyncMock(return_value=rates)
+        with pytest.raises(HTTPException) as exc_info:
+            await create_transaction(db, transaction_data, sender_id)
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert not any(
+        isinstance(call.args[0], Transaction) for call in db.add.call_args_list
+    )
+
+
+@pytest.mark.asyncio
+async def test_approve_cross_currency_transaction_credits_target_currency():
+    db = AsyncMock(spec=AsyncSession)
+    recipient_id = uuid4()
+    transaction = Transaction(
+        id=uuid4(),
+        sender_id=uuid4(),
+        recipient_id=recipient_id,
+        amount=Decimal("10.00"),
+        currency=Currency.EUR,
+        target_currency=Currency.BGN,
+        target_amount=Decimal("19.56"),
+        status=Status.awaiting,
+    )
+    sender_wallet = Wallet(balance=Decimal("50.00"), currency=Currency.EUR)
+    recipient_wallet = Wallet(balance=Decimal("1.00"), currency=Currency.BGN)
+    db.execute = AsyncMock(
+        side_effect=[
+            _result(transaction),
+            _result(sender_wallet),
+            _result(recipient_wallet),
+            MagicMock(),
+            MagicMock(scalar_one=MagicMock(return_value=Decimal("20.56"))),
+            MagicMock(),
+        ]
+    )
+
+    await approve_transaction(db, transaction.id, str(recipient_id))
+
+    assert sender_wallet.balance == Decimal("40.00")
+    assert recipient_wallet.balance == Decimal("20.56")
+    queries = [sql_string(call.args[0]) for call in db.execute.call_args_list]
+    assert queries[0].startswith("UPDATE transactions SET status='confirmed'")
+    assert "wallets.currency = 'EUR'" in queries[1]
+    assert "wallets.currency = 'BGN'" in queries[2]
+    assert "FOR UPDATE" in queries[1]
+    # The recipient's row is locked by the atomic credit, not by the read.
+    assert "FOR UPDATE" not in queries[2]
+    assert "balance=(wallets.balance + 19.56)" in queries[4]
+
+
+@pytest.mark.asyncio
+async def test_deny_transaction_invalidates_category_owner_summary(category_owner):
+    db = AsyncMock(spec=AsyncSession)
+    sender_id = uuid4()
+    owner_id = uuid4()
+    transaction = Transaction(
+        id=uuid4(), sender_id=sender_id, category_id=uuid4(), status=Status.declined
+    )
+    db.execute = AsyncMock(return_value=_result(transaction))
+    category_owner.return_value = CategorySnapshot(
+        id=transaction.category_id, name="Groceries", user_id=owner_id
+    )
+
+    with patch(
+        "app.services.crud.transaction.invalidate_category_summary"
+    ) as invalidate:
+        await deny_transaction(db, User(id=uuid4(), is_admin=True), transaction.id)
+
+    category_owner.assert_awaited_once_with(db, transaction.category_id)
+    assert set(invalidate.call_args.args) == {str(sender_id), str(owner_id)}
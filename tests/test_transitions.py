@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from app.services.common.transitions import (
+    CONFIRM,
+    DENY,
+    REJECT,
+    apply_transition,
+)
+from app.sql_app.models.enums import Currency, Status
+from app.sql_app.models.models import Transaction
+from fastapi import HTTPException, status
+from sqlalchemy import event, select
+
+
+async def _create_transaction(session_factory, transaction_status=Status.pending):
+    transaction = Transaction(
+        id=uuid4(),
+        amount=10,
+        currency=Currency.EUR,
+        timestamp=datetime(2026, 1, 1),
+        status=transaction_status,
+        card_id=uuid4(),
+        sender_id=uuid4(),
+        recipient_id=uuid4(),
+        category_id=uuid4(),
+        wallet_id=uuid4(),
+    )
+    async with session_factory() as session:
+        session.add(transaction)
+        await session.commit()
+    return transaction
+
+
+async def _status(session_factory, transaction_id):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Transaction.status).where(Transaction.id == transaction_id)
+        )
+        return result.scalar_one()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_transition_is_one_statement(sqlite_session_factory):
+    transaction = await _create_transaction(sqlite_session_factory)
+    statements = []
+    engine = sqlite_session_factory.kw["bind"].sync_engine
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        async with sqlite_session_factory() as session:
+            updated = await apply_transition(
+                session, CONFIRM, transaction.id, transaction.sender_id
+            )
+            await session.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert updated.id == transaction.id
+    assert updated.status == Status.awaiting
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE transactions SET status")
+    assert "RETURNING" in statements[0]
+    assert await _status(sqlite_session_factory, transaction.id) == Status.awaiting
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_transition_failures_are_explained(sqlite_session_factory):
+    transaction = await _create_transaction(sqlite_session_factory, Status.awaiting)
+
+    async with sqlite_session_factory() as session:
+        with pytest.raises(HTTPException) as missing:
+            await apply_transition(session, REJECT, uuid4(), transaction.recipient_id)
+        with pytest.raises(HTTPException) as forbidden:
+            await apply_transition(session, REJECT, transaction.id, uuid4())
+        with pytest.raises(HTTPException) as conflict:
+            await apply_transition(
+                session, CONFIRM, transaction.id, transaction.sender_id
+            )
+
+    assert missing.value.status_code == status.HTTP_404_NOT_FOUND
+    assert forbidden.value.status_code == status.HTTP_403_FORBIDDEN
+    assert conflict.value.status_code == status.HTTP_409_CONFLICT
+    assert await _status(sqlite_session_factory, transaction.id) == Status.awaiting
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_racing_transitions_apply_once(sqlite_session_factory):
+    transaction = await _create_transaction(sqlite_session_factory, Status.awaiting)
+
+    async def _deny():
+        async with sqlite_session_factory() as session:
+            try:
+                await apply_transition(session, DENY, transaction.id)
+                await session.commit()
+                return status.HTTP_200_OK
+            except HTTPException as ex:
+                return ex.status_code
+
+    outcomes = await asyncio.gather(_deny(), _deny(), _deny())
+
+    assert sorted(outcomes) == [
+        status.HTTP_200_OK,
+        status.HTTP_409_CONFLICT,
+        status.HTTP_409_CONFLICT,
+    ]
+    assert await _status(sqlite_session_factory, transaction.id) == Status.declined
@@ -3,6 +3,7 @@ from uuid import uuid4
 
 import pytest
 from app.schemas.user import UserBase
+from app.services.crud.card import seal_card
 from app.services.crud.user import (
     block_user,
     create_user,
@@ -61,14 +62,16 @@ async def test_user_info(db, mock_user):
         sub=mock_user.sub,
     )
 
-    card = Card(
-        id=uuid4(),
-        user_id=mock_user.id,
-        number="1234567812345678",
-        card_holder="Test Holder",
-        exp_date="12/24",
-        cvv="123",
-        design="Test Design",
+    card = seal_card(
+        Card(
+            id=uuid4(),
+            user_id=mock_user.id,
+            card_holder="Test Holder",
+            exp_date="12/24",
+            design="Test Design",
+        ),
+        "1234567812345678",
+        "123",
     )
     category = Category(id=uuid4(), user_id=mock_user.id, name="Test Category")
     contact = Contact(id=uuid4(), user_id=mock_user.id, user_contact_id=mock_user.id)
@@ -112,7 +115,7 @@ async def test_user_info(db, mock_user):
 
     assert result["email"] == user_base.email
     assert len(result["cards"]) == 1
-    assert result["cards"][0].number == "1234567812345678"
+    assert result["cards"][0].number == "**** **** **** 5678"
     assert len(result["categories"]) == 1
     assert result["categories"][0].name == "Test Category"
     assert len(result["contacts"]) == 1
@@ -426,3 +429,20 @@ async def test_search_users_not_authorized(db, mock_user):
 
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
     assert exc_info.value.detail == "You are not authorized to perform this action."
+
+
+@pytest.mark.asyncio
+async def test_search_users_delegates_to_ranked_search(db, mock_user):
+    admin_user = MagicMock(spec=User)
+    admin_user.is_admin = True
+    page = {"users": [mock_user], "total": 1, "next_cursor": None}
+
+    with patch(
+        "app.services.crud.user.rank_users", AsyncMock(return_value=page)
+    ) as rank_users:
+        result = await search_users(
+            db, skip=0, limit=10, current_user=admin_user, search="test", cursor="c"
+        )
+
+    assert result == page
+    rank_users.assert_awaited_once_with(db, "test", 0, 10, "c")
@@ -0,0 +1,74 @@
+import pytest
+from app.services.common.vault import CardVault
+from app.services.crud.card import seal_card
+from app.sql_app.models.models import Card, User
+from sqlalchemy import select
+
+
+def test_digest_is_keyed_and_deterministic():
+    vault = CardVault("secret")
+
+    assert vault.digest("1234567890123456") == vault.digest("1234567890123456")
+    assert vault.digest("1234567890123456") != vault.digest("1234567890123457")
+    assert vault.digest("1234567890123456") != CardVault("other").digest(
+        "1234567890123456"
+    )
+    assert len(vault.digest("1234567890123456")) == 64
+
+
+def test_encrypt_round_trips_and_is_randomized():
+    vault = CardVault("secret")
+
+    first = vault.encrypt("123")
+    second = vault.encrypt("123")
+
+    assert first != second
+    assert vault.decrypt(first) == vault.decrypt(second) == "123"
+
+
+def test_decrypt_with_another_key_raises_value_error():
+    token = CardVault("secret").encrypt("123")
+
+    with pytest.raises(ValueError):
+        CardVault("other").decrypt(token)
+
+
+@pytest.mark.asyncio
+async def test_card_is_stored_encrypted_and_found_by_digest(sqlite_session_factory):
+    from app.services.common.vault import vault
+
+    async with sqlite_session_factory() as db:
+        user = User(email="owner@example.com")
+        db.add(user)
+        await db.flush()
+        db.add(
+            seal_card(
+                Card(
+                    card_holder="Test User",
+                    exp_date="01/24",
+                    design="Design1",
+                    user_id=user.id,
+                ),
+                "1234567890123456",
+                "123",
+            )
+        )
+        await db.commit()
+
+        stored = (
+            await db.execute(
+                select(Card.number_encrypted, Card.cvv_encrypted, Card.last4)
+            )
+        ).one()
+        found = (
+            await db.execute(
+                select(Card).where(
+                    Card.number_digest == vault.digest("1234567890123456")
+                )
+            )
+        ).scalar_one()
+
+    assert "1234567890123456" not in stored.number_encrypted
+    assert vault.decrypt(stored.cvv_encrypted) == "123"
+    assert stored.last4 == "3456"
+    assert found.number == "**** **** **** 3456"
@@ -0,0 +1,209 @@
+from decimal import Decimal
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+from app.services.common import metrics
+from app.services.common.velocity import (
+    BUCKETS,
+    MemoryVelocityStore,
+    SharedVelocityStore,
+    SlidingWindow,
+    TransferAttempt,
+    VelocityEngine,
+    VelocityRule,
+    default_rules,
+)
+from app.sql_app.models.enums import Currency
+from fastapi import HTTPException, status
+
+SENDER = uuid4()
+CARD = uuid4()
+
+COUNT = VelocityRule("user_count", 60, lambda attempt: attempt.sender_id, max_count=3)
+AMOUNT = VelocityRule(
+    "user_amount",
+    60,
+    lambda attempt: attempt.sender_id,
+    max_amount=Decimal("100"),
+)
+NEW_RECIPIENTS = VelocityRule(
+    "new_recipients",
+    60,
+    lambda attempt: attempt.sender_id if attempt.new_recipient else None,
+    max_count=1,
+    uses_new_recipient=True,
+)
+
+
+def _attempt(amount="10", new_recipient=False, sender_id=SENDER):
+    return TransferAttempt(
+        sender_id=sender_id,
+        recipient_id=uuid4(),
+        card_id=CARD,
+        amount=Decimal(amount),
+        currency=Currency.EUR,
+        new_recipient=new_recipient,
+    )
+
+
+def test_sliding_window_drops_buckets_leaving_the_window():
+    window = SlidingWindow()
+    window.add(10, Decimal(1))
+    window.add(20, Decimal(2))
+
+    assert window.read(10 + BUCKETS - 1) == (2, Decimal(3))
+    assert window.read(10 + BUCKETS) == (1, Decimal(2))
+    assert window.oldest() == 20
+    assert window.read(20 + 10 * BUCKETS) == (0, Decimal(0))
+    assert window.oldest() is None
+
+
+@pytest.mark.asyncio
+async def test_count_rule_rejects_until_the_window_slides():
+    engine = VelocityEngine([COUNT], MemoryVelocityStore(100))
+
+    for second in range(3):
+        assert await engine.evaluate(_attempt(), now=1000 + second) is None
+    violation = await engine.evaluate(_attempt(), now=1003)
+
+    assert violation.rule == "user_count"
+    # The first transfer's bucket leaves the 60 second window at 1060.
+    assert violation.retry_after == 57
+    assert await engine.evaluate(_attempt(), now=1060) is None
+    assert await engine.evaluate(_attempt(sender_id=uuid4()), now=1003) is None
+
+
+@pytest.mark.asyncio
+async def test_rejected_transfer_is_not_counted_by_any_rule():
+    engine = VelocityEngine([COUNT, AMOUNT], MemoryVelocityStore(100))
+
+    assert await engine.evaluate(_attempt("90"), now=0) is None
+    violation = await engine.evaluate(_attempt("20"), now=1)
+    assert violation.rule == "user_amount"
+    assert await engine.evaluate(_attempt("10"), now=2) is None
+    assert await engine.evaluate(_attempt("0"), now=3) is None
+    assert (await engine.evaluate(_attempt("0"), now=4)).rule == "user_count"
+
+
+@pytest.mark.asyncio
+async def test_new_recipient_rule_only_counts_new_recipients():
+    engine = VelocityEngine([NEW_RECIPIENTS], MemoryVelocityStore(100))
+
+    assert await engine.evaluate(_attempt(new_recipient=True), now=0) is None
+    assert await engine.evaluate(_attempt(), now=1) is None
+    violation = await engine.evaluate(_attempt(new_recipient=True), now=2)
+    assert violation.rule == "new_recipients"
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recently_used_windows():
+    metrics.reset()
+    store = MemoryVelocityStore(2)
+    engine = VelocityEngine([COUNT], store)
+
+    for _ in range(3):
+        await engine.evaluate(_attempt(sender_id=uuid4()), now=0)
+
+    assert len(store._windows) == 2
+    assert metrics.get("velocity_windows_evicted_total") == 1
+
+
+@pytest.mark.asyncio
+async def test_enforce_raises_too_many_requests_with_retry_after():
+    metrics.reset()
+    engine = VelocityEngine([NEW_RECIPIENTS], MemoryVelocityStore(100))
+    await engine.enforce(_attempt(new_recipient=True))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await engine.enforce(_attempt(new_recipient=True))
+
+    assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+    assert metrics.get("velocity_rejections_total", rule="new_recipients") == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_store_runs_one_script_per_transfer():
+    client = AsyncMock()
+    client.eval.side_effect = [[0, 0], [2, 60]]
+    engine = VelocityEngine([COUNT, AMOUNT], SharedVelocityStore(client))
+
+    assert await engine.evaluate(_attempt("10"), now=61.5) is None
+    violation = await engine.evaluate(_attempt("10"), now=62.5)
+
+    script, numkeys, *arguments = client.eval.await_args_list[0].args
+    assert numkeys == 2
+    assert arguments[:2] == [
+        f"velocity:user_count:{SENDER}",
+        f"velocity:user_amount:{SENDER}",
+    ]
+    assert arguments[2:8] == ["61", str(BUCKETS), "3", "-1", "10", "60000"]
+    assert arguments[8:14] == ["61", str(BUCKETS), "-1", "100", "10", "60000"]
+    assert violation.rule == "user_amount"
+    assert violation.retry_after == 58
+
+
+@pytest.mark.asyncio
+async def test_released_transfer_frees_its_slot():
+    metrics.reset()
+    engine = VelocityEngine([COUNT, AMOUNT], MemoryVelocityStore(100))
+    for _ in range(2):
+        await engine.enforce(_attempt("40"))
+    reservation = await engine.enforce(_attempt("20"))
+
+    await engine.release(reservation)
+
+    assert await engine.evaluate(_attempt("20")) is None
+    assert metrics.get("velocity_releases_total") == 1
+
+
+def test_sliding_window_ignores_removals_of_expired_buckets():
+    window = SlidingWindow()
+    window.add(10, Decimal(1))
+    window.add(10 + BUCKETS, Decimal(2))
+
+    window.remove(10, Decimal(1))
+
+    assert window.read(10 + BUCKETS) == (1, Decimal(2))
+
+
+@pytest.mark.asyncio
+async def test_shared_store_releases_in_the_recorded_buckets():
+    client = AsyncMock()
+    client.eval.return_value = [0, 0]
+    store = SharedVelocityStore(client)
+    engine = VelocityEngine([COUNT, AMOUNT], store)
+
+    await store.release(engine._checks(_attempt("10")), now=61.5)
+
+    _, numkeys, *arguments = client.eval.await_args.args
+    assert numkeys == 2
+    assert arguments[2:] == ["61", "-10", "61", "-10"]
+
+
+def test_engine_tells_whether_a_rule_uses_new_recipient():
+    store = MemoryVelocityStore(10)
+
+    assert not VelocityEngine([COUNT, AMOUNT], store).uses_new_recipient
+    assert VelocityEngine([COUNT, NEW_RECIPIENTS], store).uses_new_recipient
+
+
+def test_default_rules_skip_disabled_limits(monkeypatch):
+    from app.core import config
+
+    settings = config.get_settings()
+    monkeypatch.setattr(settings, "VELOCITY_CARD_BURST_MAX", 0)
+    monkeypatch.setattr(settings, "VELOCITY_MAX_AMOUNT", {"EUR": Decimal(50)})
+
+    rules = {rule.name: rule for rule in default_rules()}
+
+    assert set(rules) == {"user_count", "user_amount_EUR", "new_recipients"}
+    usd = TransferAttempt(SENDER, uuid4(), CARD, Decimal(1), Currency.USD, False)
+    assert rules["user_amount_EUR"].key(usd) is None
+    assert rules["user_amount_EUR"].key(_attempt()) == SENDER
+
+    assert rules["new_recipients"].uses_new_recipient
+
+    monkeypatch.setattr(settings, "VELOCITY_ENABLED", False)
+    assert default_rules() == []
@@ -1,17 +1,24 @@
+import asyncio
+from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
+import numpy as np
 import pytest
+from app.services.common.fx import CURRENCIES
 from app.services.crud.auth_email import authenticate_user
 from app.services.crud.wallet import (
     add_funds_to_wallet,
     check_balance,
     create_wallet,
+    portfolio_valuation,
     withdraw_funds_from_wallet,
 )
 from app.sql_app.models.enums import Currency
 from app.sql_app.models.models import User, Wallet
 from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
@@ -49,7 +56,8 @@ async def test_create_wallet_success(db, mock_user):
 
     new_wallet = await create_wallet(db, user_id, currency)
 
-    db.add.assert_called_once()
+    assert db.add.call_count == 2
+    assert db.add.call_args_list[1].args[0].topic == "wallet.created"
     db.commit.assert_called_once()
     db.refresh.assert_called_once()
     assert new_wallet.user_id == user_id
@@ -125,19 +133,35 @@ async def test_authenticate_user_with_valid_credentials(db, mock_user):
     assert user == mock_user
 
 
+def sql_string(query):
+    return str(query.compile(compile_kwargs={"literal_binds": True}))
+
+
+def pg_sql_string(query):
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
 @pytest.mark.asyncio
 async def test_add_funds_to_wallet_existing_wallet(db, mock_user):
-    mock_wallet = Wallet(user_id=mock_user.id, currency=Currency.USD, balance=100.0)
+    mock_wallet = Wallet(
+        user_id=mock_user.id, currency=Currency.USD, balance=Decimal("200.00")
+    )
     db.execute.return_value.scalars().first.return_value = mock_wallet
 
     updated_wallet = await add_funds_to_wallet(
         db, amount=50.0, current_user=mock_user, currency=Currency.USD
     )
 
-    assert updated_wallet.balance == 150.0
-    db.execute.assert_called_once()
+    assert updated_wallet is mock_wallet
+    assert db.execute.call_count == 2
+    statement = sql_string(db.execute.call_args_list[0].args[0])
+    assert "SET balance=(wallets.balance + 50.0)" in statement
+    assert "RETURNING" in statement
+    rollup = pg_sql_string(db.execute.call_args_list[1].args[0])
+    assert "INSERT INTO wallet_daily_balances" in rollup
+    assert "ON CONFLICT (wallet_id, day) DO UPDATE" in rollup
     db.commit.assert_called_once()
-    db.refresh.assert_called_once_with(mock_wallet)
+    db.refresh.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -156,29 +180,48 @@ async def test_add_funds_to_wallet_non_existing_wallet(db, mock_user):
     db.refresh.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_add_funds_to_wallet_rejects_non_positive_amount(db, mock_user):
+    with pytest.raises(HTTPException) as exc_info:
+        await add_funds_to_wallet(
+            db, amount=-5.0, current_user=mock_user, currency=Currency.USD
+        )
+
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+    db.execute.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_withdraw_funds_from_wallet_existing_wallet_sufficient_balance(
     db, mock_user
 ):
-    mock_wallet = Wallet(user_id=mock_user.id, currency=Currency.USD, balance=100.0)
+    mock_wallet = Wallet(
+        user_id=mock_user.id, currency=Currency.USD, balance=Decimal("0.00")
+    )
     db.execute.return_value.scalars().first.return_value = mock_wallet
 
     updated_wallet = await withdraw_funds_from_wallet(
         db, current_user=mock_user, amount=50.0, currency=Currency.USD
     )
 
-    assert updated_wallet.balance == 50.0
-    db.execute.assert_called_once()
+    assert updated_wallet is mock_wallet
+    assert db.execute.call_count == 2
+    statement = sql_string(db.execute.call_args_list[0].args[0])
+    assert "SET balance=(wallets.balance - 50.0)" in statement
+    assert "wallets.balance >= 50.0" in statement
     db.commit.assert_called_once()
-    db.refresh.assert_called_once_with(mock_wallet)
+    db.refresh.assert_not_called()
 
 
 @pytest.mark.asyncio
 async def test_withdraw_funds_from_wallet_existing_wallet_insufficient_balance(
     db, mock_user
 ):
-    mock_wallet = Wallet(user_id=mock_user.id, currency=Currency.USD, balance=30.0)
-    db.execute.return_value.scalars().first.return_value = mock_wallet
+    update_result = MagicMock()
+    update_result.scalars.return_value.first.return_value = None
+    probe_result = MagicMock()
+    probe_result.scalars.return_value.first.return_value = 0
+    db.execute.side_effect = [update_result, probe_result]
 
     with pytest.raises(HTTPException) as exc_info:
         await withdraw_funds_from_wallet(
@@ -187,7 +230,7 @@ async def test_withdraw_funds_from_wallet_existing_wallet_insufficient_balance(
 
     assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
     assert exc_info.value.detail == "Insufficient funds."
-    db.execute.assert_called_once()
+    assert db.execute.call_count == 2
     db.commit.assert_not_called()
     db.refresh.assert_not_called()
 
@@ -203,18 +246,66 @@ async def test_withdraw_funds_from_wallet_non_existing_wallet(db, mock_user):
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "Wallet not found."
-    db.execute.assert_called_once()
+    assert db.execute.call_count == 2
     db.commit.assert_not_called()
     db.refresh.assert_not_called()
 
 
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_parallel_deposits_keep_exact_balance(sqlite_session_factory):
+    user = await _create_user_with_wallet(sqlite_session_factory, Currency.EUR)
+
+    async def _deposit():
+        async with sqlite_session_factory() as session:
+            await add_funds_to_wallet(session, 1.25, user, Currency.EUR)
+
+    await asyncio.gather(*[_deposit() for _ in range(40)])
+
+    assert await _balance(sqlite_session_factory, user) == 50.0
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_parallel_withdrawals_never_overdraw(sqlite_session_factory):
+    user = await _create_user_with_wallet(sqlite_session_factory, Currency.EUR, 10.0)
+
+    async def _withdraw():
+        async with sqlite_session_factory() as session:
+            try:
+                await withdraw_funds_from_wallet(session, user, 1.0, Currency.EUR)
+                return True
+            except HTTPException:
+                return False
+
+    outcomes = await asyncio.gather(*[_withdraw() for _ in range(25)])
+
+    assert outcomes.count(True) == 10
+    assert await _balance(sqlite_session_factory, user) == 0.0
+
+
+async def _create_user_with_wallet(session_factory, currency, balance=0.0):
+    user = User(id=uuid4(), email=f"{uuid4()}@example.com")
+    async with session_factory() as session:
+        session.add(user)
+        session.add(Wallet(user_id=user.id, currency=currency, balance=balance))
+        await session.commit()
+    return user
+
+
+async def _balance(session_factory, user):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Wallet.balance).where(Wallet.user_id == user.id)
+        )
+        return result.scalar_one()
+
+
 @pytest.mark.asyncio
 async def test_check_balance_with_wallets(db, mock_user):
-    mock_wallets = [
-        Wallet(user_id=mock_user.id, currency=Currency.USD, balance=100.0),
-        Wallet(user_id=mock_user.id, currency=Currency.EUR, balance=200.0),
-    ]
-    db.execute.return_value.scalars().all.return_value = mock_wallets
+    db.execute.return_value.all = MagicMock(
+        return_value=[(100.0, Currency.USD), (200.0, Currency.EUR)]
+    )
 
     balances = await check_balance(db, current_user=mock_user)
 
@@ -226,7 +317,7 @@ async def test_check_balance_with_wallets(db, mock_user):
 
 @pytest.mark.asyncio
 async def test_check_balance_no_wallets(db, mock_user):
-    db.execute.return_value.scalars().all.return_value = []
+    db.execute.return_value.all = MagicMock(return_value=[])
 
     with pytest.raises(HTTPException) as exc_info:
         await check_balance(db, current_user=mock_user)
@@ -234,3 +325,53 @@ async def test_check_balance_no_wallets(db, mock_user):
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "No wallets found."
     db.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_portfolio_valuation_values_all_wallets(db, mock_user):
+    db.execute.return_value.all = MagicMock(
+        return_value=[
+            (Currency.EUR, Decimal("100.00")),
+            (Currency.BGN, Decimal("195.58")),
+        ]
+    )
+    rates = {Currency.EUR: Decimal(1), Currency.BGN: 1 / Decimal("1.95583")}
+
+    with patch("app.services.crud.wallet.rate_cache") as cache:
+        cache.get_rates = AsyncMock(return_value=rates)
+        portfolio = await portfolio_valuation(db, mock_user, Currency.EUR)
+
+    assert portfolio["base"] == Currency.EUR
+    assert portfolio["total"] == Decimal("200.00")
+    assert [wallet["value"] for wallet in portfolio["wallets"]] == [
+        Decimal("100.00"),
+        Decimal("100.00"),
+    ]
+    db.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_portfolio_valuation_keeps_crypto_balances_exact(db, mock_user):
+    db.execute.return_value.all = MagicMock(
+        return_value=[
+            (Currency.ETH, Decimal("1.000000000000000001")),
+            (Currency.ETH, Decimal("2.000000000000000002")),
+        ]
+    )
+    rates = {Currency.ETH: Decimal("2500.5")}
+
+    with patch("app.services.crud.wallet.rate_cache") as cache:
+        cache.get_rates = AsyncMock(return_value=rates)
+        portfolio = await portfolio_valuation(db, mock_user, Currency.ETH)
+
+    assert portfolio["total"] == Decimal("3.000000000000000003")
+
+
+@pytest.mark.asyncio
+async def test_portfolio_valuation_no_wallets(db, mock_user):
+    db.execute.return_value.all = MagicMock(return_value=[])
+
+    with pytest.raises(HTTPException) as exc_info:
+        await portfolio_valuation(db, mock_user, Currency.EUR)
+
+    assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND